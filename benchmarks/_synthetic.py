@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Synthetic inputs shared by the benchmark suites.
+
+"""
+
+import datetime as dt
+import numpy as np
+
+import pysat
+
+# date used for all benchmark loads
+bench_date = dt.datetime(2018, 1, 1)
+
+
+def circular_orbit(inst, alt=400., inc=51.6, period=5550.):
+    """Add a circular orbit to an instrument in the pysatMissions labels
+
+    Adds 'glat', 'glong', 'alt', 'position_ecef_*' and 'velocity_ecef_*'
+    (*=x,y,z) so that every method can be run without a propagator.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object, modified in place
+    alt : float
+        Altitude of the orbit (km) (default=400.)
+    inc : float
+        Inclination of the orbit (degrees) (default=51.6)
+    period : float
+        Orbital period (seconds) (default=5550.)
+
+    """
+
+    secs = (inst.data.index - inst.data.index[0]).total_seconds().values
+    radius = 6371. + alt
+    phase = 2. * np.pi * secs / period
+    inc = np.radians(inc)
+    # Earth rotates underneath the orbit
+    node = -2. * np.pi * secs / 86164.
+
+    x_orb = radius * np.cos(phase)
+    y_orb = radius * np.sin(phase) * np.cos(inc)
+    z = radius * np.sin(phase) * np.sin(inc)
+    x = x_orb * np.cos(node) - y_orb * np.sin(node)
+    y = x_orb * np.sin(node) + y_orb * np.cos(node)
+
+    inst['position_ecef_x'] = x
+    inst['position_ecef_y'] = y
+    inst['position_ecef_z'] = z
+    inst['glat'] = np.degrees(np.arcsin(z / radius))
+    inst['glong'] = np.degrees(np.arctan2(y, x))
+    inst['alt'] = alt * np.ones(len(secs))
+
+    return
+
+
+def synthetic_instrument(num):
+    """Loaded test instrument with `num` samples of a synthetic orbit
+
+    Parameters
+    ----------
+    num : int
+        Number of one second samples
+
+    Returns
+    -------
+    pysat.Instrument
+
+    """
+
+    inst = pysat.Instrument(platform='pysat', name='testing',
+                            sat_id=str(num), clean_level='clean')
+    inst.custom.attach(circular_orbit)
+    inst.load(date=bench_date)
+
+    return inst
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the import time of pysatMissions.
+
+Each benchmark runs in a fresh interpreter.  Compare the lazy imports with
+`timeraw_import_everything`, which loads every submodule and model package
+as `import pysatMissions` did before submodules were imported on first use.
+
+"""
+
+
+def timeraw_import_pysatMissions():
+    return "import pysatMissions"
+
+
+def timeraw_import_pysat_sgp4():
+    return "from pysatMissions.instruments import pysat_sgp4"
+
+
+def timeraw_import_pysat_ephem():
+    return "from pysatMissions.instruments import pysat_ephem"
+
+
+def timeraw_import_everything():
+    return """
+    from pysatMissions.instruments import pysat_ephem, pysat_sgp4
+    from pysatMissions.methods import coverage, empirical, magcoord
+    from pysatMissions.methods import spacecraft
+    from pysatMissions import plot, profiling
+    import aacgmv2
+    import apexpy
+    try:
+        import pyglow
+    except ImportError:
+        pass
+    """
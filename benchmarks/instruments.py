@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the simulated instrument load routines.
+
+"""
+
+import pysat
+
+from pysatMissions.instruments import pysat_ephem, pysat_sgp4
+
+from benchmarks._synthetic import bench_date
+
+
+class SGP4Load(object):
+    """Time a load of pysat_sgp4 for a range of simulation lengths"""
+
+    # sat_id sets the number of seconds simulated, '' is a full day
+    params = ['60', '3600', '']
+    param_names = ['sat_id']
+    timeout = 600
+
+    def setup(self, sat_id):
+        self.inst = pysat.Instrument(inst_module=pysat_sgp4, sat_id=sat_id)
+
+    def time_load(self, sat_id):
+        self.inst.load(date=bench_date)
+
+    def peakmem_load(self, sat_id):
+        self.inst.load(date=bench_date)
+
+
+class EphemLoad(SGP4Load):
+    """Time a load of pysat_ephem, including the full custom chain"""
+
+    timeout = 3600
+
+    def setup(self, sat_id):
+        self.inst = pysat.Instrument(inst_module=pysat_ephem, sat_id=sat_id)
+
+
+class EphemPropagation(SGP4Load):
+    """Time the pysat_ephem propagation on its own"""
+
+    def setup(self, sat_id):
+        self.fnames = [bench_date.strftime('%Y-%m-%d') + '.nofile']
+
+    def time_load(self, sat_id):
+        pysat_ephem.load(self.fnames, sat_id=sat_id)
+
+    def peakmem_load(self, sat_id):
+        pysat_ephem.load(self.fnames, sat_id=sat_id)
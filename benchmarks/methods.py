@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the individual custom functions in pysatMissions.methods.
+
+Each function is timed on its own on a synthetic circular orbit, so that
+regressions are not hidden by the cost of the propagators.
+
+"""
+
+import numpy as np
+
+from pysatMissions import _kernels
+from pysatMissions.methods import coverage as mm_cov
+from pysatMissions.methods import empirical as mm_emp
+from pysatMissions.methods import magcoord as mm_magcoord
+from pysatMissions.methods import spacecraft as mm_sc
+
+from benchmarks._synthetic import synthetic_instrument
+
+
+class MethodSuite(object):
+    """Base suite that builds a synthetic instrument of each size"""
+
+    params = [100, 1000, 10000]
+    param_names = ['num']
+    timeout = 600
+
+    def setup(self, num):
+        self.inst = synthetic_instrument(num)
+
+
+class Magcoord(MethodSuite):
+
+    def time_add_aacgm_coordinates(self, num):
+        mm_magcoord.add_aacgm_coordinates(self.inst)
+
+    def peakmem_add_aacgm_coordinates(self, num):
+        mm_magcoord.add_aacgm_coordinates(self.inst)
+
+    def time_add_quasi_dipole_coordinates(self, num):
+        mm_magcoord.add_quasi_dipole_coordinates(self.inst)
+
+    def peakmem_add_quasi_dipole_coordinates(self, num):
+        mm_magcoord.add_quasi_dipole_coordinates(self.inst)
+
+
+class Empirical(MethodSuite):
+
+    params = [100, 1000]
+
+    def setup(self, num):
+        MethodSuite.setup(self, num)
+        mm_sc.calculate_ecef_velocity(self.inst)
+        mm_sc.add_ram_pointing_sc_attitude_vectors(self.inst)
+        mm_emp.add_hwm_winds_and_ecef_vectors(self.inst)
+
+    def time_add_iri_thermal_plasma(self, num):
+        mm_emp.add_iri_thermal_plasma(self.inst)
+
+    def peakmem_add_iri_thermal_plasma(self, num):
+        mm_emp.add_iri_thermal_plasma(self.inst)
+
+    def time_add_igrf(self, num):
+        mm_emp.add_igrf(self.inst)
+
+    def peakmem_add_igrf(self, num):
+        mm_emp.add_igrf(self.inst)
+
+    def time_add_msis(self, num):
+        mm_emp.add_msis(self.inst)
+
+    def peakmem_add_msis(self, num):
+        mm_emp.add_msis(self.inst)
+
+    def time_add_hwm_winds_and_ecef_vectors(self, num):
+        mm_emp.add_hwm_winds_and_ecef_vectors(self.inst)
+
+    def peakmem_add_hwm_winds_and_ecef_vectors(self, num):
+        mm_emp.add_hwm_winds_and_ecef_vectors(self.inst)
+
+    def time_project_hwm_onto_sc(self, num):
+        mm_emp.project_hwm_onto_sc(self.inst)
+
+    def peakmem_project_hwm_onto_sc(self, num):
+        mm_emp.project_hwm_onto_sc(self.inst)
+
+
+class Spacecraft(MethodSuite):
+
+    params = [100, 1000, 10000, 86400]
+
+    def setup(self, num):
+        MethodSuite.setup(self, num)
+        mm_sc.calculate_ecef_velocity(self.inst)
+        mm_sc.add_ram_pointing_sc_attitude_vectors(self.inst)
+
+    def time_calculate_ecef_velocity(self, num):
+        mm_sc.calculate_ecef_velocity(self.inst)
+
+    def peakmem_calculate_ecef_velocity(self, num):
+        mm_sc.calculate_ecef_velocity(self.inst)
+
+    def time_add_ram_pointing_sc_attitude_vectors(self, num):
+        mm_sc.add_ram_pointing_sc_attitude_vectors(self.inst)
+
+    def peakmem_add_ram_pointing_sc_attitude_vectors(self, num):
+        mm_sc.add_ram_pointing_sc_attitude_vectors(self.inst)
+
+    def time_project_ecef_vector_onto_sc(self, num):
+        mm_sc.project_ecef_vector_onto_sc(self.inst, 'position_ecef_x',
+                                          'position_ecef_y',
+                                          'position_ecef_z', 'pos_sc_x',
+                                          'pos_sc_y', 'pos_sc_z')
+
+    def peakmem_project_ecef_vector_onto_sc(self, num):
+        mm_sc.project_ecef_vector_onto_sc(self.inst, 'position_ecef_x',
+                                          'position_ecef_y',
+                                          'position_ecef_z', 'pos_sc_x',
+                                          'pos_sc_y', 'pos_sc_z')
+
+    def time_add_solar_geometry(self, num):
+        mm_sc.add_solar_geometry(self.inst)
+
+    def peakmem_add_solar_geometry(self, num):
+        mm_sc.add_solar_geometry(self.inst)
+
+
+class Coverage(MethodSuite):
+
+    params = [1000, 10000, 86400]
+
+    # accumulators only accept data in time order, so start a new one for
+    # each repeat of the benchmark
+    def time_accumulate_coverage(self, num):
+        cov = mm_cov.CoverageAccumulator(half_angle=30.)
+        mm_cov.accumulate_coverage(self.inst, cov)
+
+    def peakmem_accumulate_coverage(self, num):
+        cov = mm_cov.CoverageAccumulator(half_angle=30.)
+        mm_cov.accumulate_coverage(self.inst, cov)
+
+
+class Kernels(object):
+    """Fused geometry kernels, compiled with Numba or run with NumPy"""
+
+    params = [[1000, 86400, 864000], [False, True]]
+    param_names = ['num', 'use_numba']
+
+    def setup(self, num, use_numba):
+        if use_numba and not _kernels.numba_available():
+            raise NotImplementedError('Numba is not installed')
+        phase = np.linspace(0., 2. * np.pi * num / 5550., num)
+        self.position = 6771. * np.stack([np.cos(phase),
+                                          np.sin(phase) * np.cos(0.9),
+                                          np.sin(phase) * np.sin(0.9)],
+                                         axis=-1)
+        self.velocity = 7.67 * np.stack([-np.sin(phase),
+                                         np.cos(phase) * np.cos(0.9),
+                                         np.cos(phase) * np.sin(0.9)],
+                                        axis=-1)
+        # compile outside of the timed calls
+        _kernels.attitude_basis(self.position[:2], self.velocity[:2],
+                                use_numba=use_numba)
+        _kernels.wind_basis(self.position[:2], use_numba=use_numba)
+
+    def time_attitude_basis(self, num, use_numba):
+        _kernels.attitude_basis(self.position, self.velocity,
+                                use_numba=use_numba)
+
+    def peakmem_attitude_basis(self, num, use_numba):
+        _kernels.attitude_basis(self.position, self.velocity,
+                                use_numba=use_numba)
+
+    def time_wind_basis(self, num, use_numba):
+        _kernels.wind_basis(self.position, use_numba=use_numba)
+
+    def peakmem_wind_basis(self, num, use_numba):
+        _kernels.wind_basis(self.position, use_numba=use_numba)
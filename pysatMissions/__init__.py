@@ -2,15 +2,31 @@ from __future__ import print_function
 from __future__ import absolute_import
 import logging
 import os
+import sys
 
-try:
-    from pysatMissions import instruments
-    from pysatMissions import methods
-    from pysatMissions import plot
-except ImportError as errstr:
-    logging.exception('problem importing pysatMissions: ' + str(errstr))
+from pysatMissions._lazy import lazy_submodules
 
-__all__ = ['instruments', 'methods', 'plot']
+__all__ = ['archive', 'batch', 'campaign', 'catalog', 'ensemble',
+           'instruments', 'methods', 'models', 'plot', 'profiling']
+
+# Submodules, and the model packages they depend on, are imported on first
+# use so that importing pysatMissions stays fast
+__getattr__, __dir__ = lazy_submodules(__name__, __all__)
+
+if sys.version_info < (3, 7):
+    try:
+        from pysatMissions import archive
+        from pysatMissions import batch
+        from pysatMissions import campaign
+        from pysatMissions import catalog
+        from pysatMissions import ensemble
+        from pysatMissions import instruments
+        from pysatMissions import methods
+        from pysatMissions import models
+        from pysatMissions import plot
+        from pysatMissions import profiling
+    except ImportError as errstr:
+        logging.exception('problem importing pysatMissions: ' + str(errstr))
 
 # set version
 here = os.path.abspath(os.path.dirname(__file__))
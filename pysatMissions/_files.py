@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Supports writing files so that readers never see a partial file.
+
+"""
+
+import contextlib
+import os
+import tempfile
+
+# permissions given to written files, which follow the umask as with open
+_umask = os.umask(0)
+os.umask(_umask)
+_file_mode = 0o666 & ~_umask
+
+
+@contextlib.contextmanager
+def replace_file(filename):
+    """
+    Writes a file through a temporary file in the same directory.
+
+    Parameters
+    ----------
+    filename : string
+        Output file
+
+    Yields
+    ------
+    string
+        Name of the temporary file to write.  It replaces `filename` when
+        the block finishes, and is removed if the block raises an error.
+
+    Note
+    ----
+    The temporary file has a unique name, so the output is never partial,
+    even with several processes writing it.
+
+    """
+
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                                    suffix='.tmp')
+    os.close(fd)
+    try:
+        yield tmp_file
+        # mkstemp makes files readable by the owner only
+        os.chmod(tmp_file, _file_mode)
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    return
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Provides fused kernels for the geometry of the custom functions.
+
+Each kernel computes a full basis in one pass per sample, without the
+intermediate arrays of the equivalent NumPy expressions.  Kernels are
+compiled with Numba when it is installed, and the NumPy expressions are used
+otherwise.
+
+"""
+
+import math
+
+import numpy as np
+
+# compiled kernels, keyed by the name of the Python loop
+_compiled = {}
+
+
+def numba_available():
+    """True if Numba is installed and kernels may be compiled"""
+
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def _use_numba(use_numba):
+    """Whether to run the compiled kernels"""
+
+    if use_numba is None:
+        return numba_available()
+
+    return use_numba
+
+
+def _compile(loop):
+    """Compiled version of a kernel loop, compiled on first use"""
+
+    if loop.__name__ not in _compiled:
+        import numba
+
+        # numpy error model, so undefined directions give NaN rather than
+        # raising
+        _compiled[loop.__name__] = numba.njit(cache=True,
+                                              error_model='numpy')(loop)
+
+    return _compiled[loop.__name__]
+
+
+def _attitude_loop(position, velocity, attitude):
+    """Fills the ram pointing attitude of each sample"""
+
+    for n in range(position.shape[0]):
+        # x along the velocity
+        norm = math.sqrt(velocity[n, 0]**2 + velocity[n, 1]**2
+                         + velocity[n, 2]**2)
+        x0 = velocity[n, 0] / norm
+        x1 = velocity[n, 1] / norm
+        x2 = velocity[n, 2] / norm
+
+        # nadir, used to find y
+        norm = math.sqrt(position[n, 0]**2 + position[n, 1]**2
+                         + position[n, 2]**2)
+        z0 = -position[n, 0] / norm
+        z1 = -position[n, 1] / norm
+        z2 = -position[n, 2] / norm
+
+        # y = z x x
+        y0 = z1 * x2 - z2 * x1
+        y1 = z2 * x0 - z0 * x2
+        y2 = z0 * x1 - z1 * x0
+        norm = math.sqrt(y0**2 + y1**2 + y2**2)
+        y0 /= norm
+        y1 /= norm
+        y2 /= norm
+
+        attitude[n, 0, 0] = x0
+        attitude[n, 0, 1] = x1
+        attitude[n, 0, 2] = x2
+        attitude[n, 1, 0] = y0
+        attitude[n, 1, 1] = y1
+        attitude[n, 1, 2] = y2
+        # z = x x y
+        attitude[n, 2, 0] = x1 * y2 - x2 * y1
+        attitude[n, 2, 1] = x2 * y0 - x0 * y2
+        attitude[n, 2, 2] = x0 * y1 - x1 * y0
+
+    return
+
+
+def _attitude_numpy(position, velocity, attitude):
+    """NumPy equivalent of `_attitude_loop`"""
+
+    xhat = velocity / np.linalg.norm(velocity, axis=-1)[:, np.newaxis]
+    zhat = position / -np.linalg.norm(position, axis=-1)[:, np.newaxis]
+    yhat = np.cross(zhat, xhat)
+    yhat /= np.linalg.norm(yhat, axis=-1)[:, np.newaxis]
+    attitude[:, 0] = xhat
+    attitude[:, 1] = yhat
+    attitude[:, 2] = np.cross(xhat, yhat)
+
+    return
+
+
+def attitude_basis(position, velocity, use_numba=None):
+    """
+    Ram pointing spacecraft attitude.
+
+    Parameters
+    ----------
+    position, velocity : array_like
+        ECEF position and velocity with shape (time, 3)
+    use_numba : bool or NoneType
+        If True, runs the compiled kernel, and if False the NumPy
+        expressions.  If None, uses the compiled kernel when Numba is
+        installed. (default=None)
+
+    Returns
+    -------
+    np.array
+        Attitude with shape (time, 3, 3).  Element [:, i, j] is the ECEF j
+        component of the spacecraft i axis, with x along the velocity, y
+        along nadir cross x (generally south) and z completing the right
+        handed system (generally nadir).
+
+    """
+
+    position = np.ascontiguousarray(position, dtype=float)
+    velocity = np.ascontiguousarray(velocity, dtype=float)
+    attitude = np.empty((len(position), 3, 3))
+    if _use_numba(use_numba):
+        _compile(_attitude_loop)(position, velocity, attitude)
+    else:
+        _attitude_numpy(position, velocity, attitude)
+
+    return attitude
+
+
+def _wind_loop(position, basis):
+    """Fills the zonal and meridional unit vectors of each sample"""
+
+    for n in range(position.shape[0]):
+        # zonal is tangent to the circle of latitude, positive east
+        norm = math.sqrt(position[n, 0]**2 + position[n, 1]**2)
+        e0 = -position[n, 1] / norm
+        e1 = position[n, 0] / norm
+
+        # meridional = -r x zonal, positive north
+        norm = math.sqrt(norm**2 + position[n, 2]**2)
+        r0 = -position[n, 0] / norm
+        r1 = -position[n, 1] / norm
+        r2 = -position[n, 2] / norm
+
+        basis[n, 0, 0] = e0
+        basis[n, 0, 1] = e1
+        basis[n, 0, 2] = 0.
+        basis[n, 1, 0] = -r2 * e1
+        basis[n, 1, 1] = r2 * e0
+        basis[n, 1, 2] = r0 * e1 - r1 * e0
+
+    return
+
+
+def _wind_numpy(position, basis):
+    """NumPy equivalent of `_wind_loop`"""
+
+    mag = np.sqrt(position[:, 0]**2 + position[:, 1]**2)
+    basis[:, 0, 0] = -position[:, 1] / mag
+    basis[:, 0, 1] = position[:, 0] / mag
+    basis[:, 0, 2] = 0.
+    unit_pos = position / -np.linalg.norm(position, axis=-1)[:, np.newaxis]
+    basis[:, 1] = np.cross(unit_pos, basis[:, 0])
+
+    return
+
+
+def wind_basis(position, use_numba=None):
+    """
+    Unit vectors of the horizontal wind components.
+
+    Parameters
+    ----------
+    position : array_like
+        ECEF position with shape (time, 3)
+    use_numba : bool or NoneType
+        If True, runs the compiled kernel, and if False the NumPy
+        expressions.  If None, uses the compiled kernel when Numba is
+        installed. (default=None)
+
+    Returns
+    -------
+    np.array
+        Basis with shape (time, 2, 3), holding the ECEF zonal (positive
+        east) and meridional (positive north) unit vectors
+
+    """
+
+    position = np.ascontiguousarray(position, dtype=float)
+    basis = np.empty((len(position), 2, 3))
+    if _use_numba(use_numba):
+        _compile(_wind_loop)(position, basis)
+    else:
+        _wind_numpy(position, basis)
+
+    return basis
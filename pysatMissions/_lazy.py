@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Supports importing the submodules of a package on first access.
+
+"""
+
+import importlib
+
+
+def lazy_submodules(package, submodules):
+    """
+    Creates module level `__getattr__` and `__dir__` for a package.
+
+    Parameters
+    ----------
+    package : string
+        Full name of the package, usually `__name__`
+    submodules : list of strings
+        Names of the submodules to import on first access
+
+    Returns
+    -------
+    __getattr__ : function
+        Imports a submodule when it is first accessed as an attribute
+    __dir__ : function
+        Lists the submodules along with the names already in the package
+
+    Note
+    ----
+        Module level `__getattr__` requires python 3.7 or later.  Packages
+        should import their submodules directly on earlier versions.
+
+    """
+
+    def __getattr__(name):
+        if name in submodules:
+            # importing a submodule also sets it as a package attribute
+            return importlib.import_module('.'.join((package, name)))
+        raise AttributeError(' '.join(("module '{:s}' has no attribute",
+                                       "'{:s}'")).format(package, name))
+
+    def __dir__():
+        module = importlib.import_module(package)
+        return sorted(set(list(vars(module).keys()) + list(submodules)))
+
+    return __getattr__, __dir__
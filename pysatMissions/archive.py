@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""Provides an archive of simulated data in partitioned Parquet files, with
+an index of the range of each variable in every row group so that queries
+only read the data that may match.
+
+Files are stored as ``satellite=<name>/date=<YYYY-MM-DD>/part.parquet``
+below the archive directory, a layout which may also be read directly by
+pyarrow or dask.  Requires pyarrow.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions import _files
+
+# variables whose range is indexed by default
+index_columns = ['glat', 'glong', 'alt', 'qd_lat', 'mlt']
+
+# variables whose query ranges may wrap, with min > max selecting both ends
+_periodic = ['glong', 'mlt', 'aacgm_mlt', 'slt']
+
+
+def _in_range(values, bounds, periodic=False):
+    """True where values are within (min, max), inclusive"""
+
+    low, high = bounds
+    if periodic and low > high:
+        return (values >= low) | (values <= high)
+
+    return (values >= low) & (values <= high)
+
+
+def _overlaps(group_min, group_max, bounds, periodic=False):
+    """True where the range of a row group may hold values in bounds"""
+
+    low, high = bounds
+    if periodic and low > high:
+        return (group_max >= low) | (group_min <= high)
+
+    return (group_max >= low) & (group_min <= high)
+
+
+class Archive(object):
+    """
+    Partitioned Parquet archive of simulated data.
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the archive, created if needed
+    index_columns : list of strings
+        Variables whose range in each row group is indexed, and which may
+        be used in queries (default=index_columns)
+    row_group_size : int
+        Number of samples in each row group.  Smaller groups let queries
+        skip more data, at the cost of a larger index. (default=600)
+
+    Example
+    -------
+        store = Archive('~/campaign')
+        store.write(inst.data, satellite='iss')
+        passes = store.query(glat=(40., 50.), glong=(-110., -100.),
+                             columns=['alt', 'B'])
+
+    """
+
+    def __init__(self, directory, index_columns=index_columns,
+                 row_group_size=600):
+
+        self.directory = os.path.expanduser(directory)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.index_columns = list(index_columns)
+        self.row_group_size = row_group_size
+        self.last_query = {}
+        self._index = None
+
+        return
+
+    @property
+    def _index_file(self):
+        return os.path.join(self.directory, '_index.parquet')
+
+    def _path(self, satellite, date):
+        """Location of a partition file, relative to the directory"""
+
+        return os.path.join('satellite={:s}'.format(satellite),
+                            'date={:s}'.format(date.strftime('%Y-%m-%d')),
+                            'part.parquet')
+
+    def write(self, data, satellite=None, update_index=True):
+        """
+        Adds data to the archive, one file per satellite and day.
+
+        Parameters
+        ----------
+        data : pds.DataFrame
+            Simulated data indexed by time, such as `inst.data`
+        satellite : string or NoneType
+            Name of the satellite.  If None, uses the 'satellite' column of
+            the data, or 'sat' if there is none. (default=None)
+        update_index : bool
+            If True, adds the new files to the index.  Writers running in
+            parallel should pass False and call `reindex` once all have
+            finished. (default=True)
+
+        Returns
+        -------
+        list of strings
+            Files written, relative to the directory.  Existing files for
+            the same satellite and day are replaced.
+
+        """
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if satellite is not None:
+            groups = [(satellite, data)]
+        elif 'satellite' in data.columns:
+            groups = data.groupby('satellite', sort=False)
+        else:
+            groups = [('sat', data)]
+
+        paths = []
+        for name, sat_data in groups:
+            sat_data = sat_data.drop(columns='satellite', errors='ignore')
+            sat_data = sat_data.sort_index()
+            sat_data.index.name = 'Epoch'
+            days = sat_data.index.floor('D')
+            for date in days.unique():
+                path = self._path(name, date)
+                full_path = os.path.join(self.directory, path)
+                if not os.path.isdir(os.path.dirname(full_path)):
+                    os.makedirs(os.path.dirname(full_path))
+                table = pa.Table.from_pandas(sat_data[days == date],
+                                             preserve_index=True)
+                with _files.replace_file(full_path) as tmp_file:
+                    pq.write_table(table, tmp_file,
+                                   row_group_size=self.row_group_size,
+                                   write_statistics=True)
+                paths.append(path)
+
+        if update_index:
+            index = self.index
+            index = index[~index['file'].isin(paths)]
+            self._save_index(pds.concat([index] + [self._file_index(path)
+                                                   for path in paths],
+                                        ignore_index=True))
+
+        return paths
+
+    def _file_index(self, path):
+        """Range of the indexed variables in each row group of a file"""
+
+        import pyarrow.parquet as pq
+
+        metadata = pq.ParquetFile(os.path.join(self.directory,
+                                               path)).metadata
+        names = [metadata.schema.column(i).name
+                 for i in range(metadata.num_columns)]
+        satellite = path.split(os.sep)[0].split('=', 1)[1]
+
+        rows = []
+        for i in range(metadata.num_row_groups):
+            group = metadata.row_group(i)
+            row = {'file': path, 'satellite': satellite, 'row_group': i,
+                   'num_rows': group.num_rows}
+            for label in ['Epoch'] + self.index_columns:
+                low = high = np.nan
+                if label in names:
+                    stats = group.column(names.index(label)).statistics
+                    if stats is not None and stats.has_min_max:
+                        low, high = stats.min, stats.max
+                if label == 'Epoch':
+                    low, high = pds.Timestamp(low), pds.Timestamp(high)
+                row['_'.join((label, 'min'))] = low
+                row['_'.join((label, 'max'))] = high
+            rows.append(row)
+
+        return pds.DataFrame(rows)
+
+    def _save_index(self, index):
+        """Writes the index next to the partitions"""
+
+        with _files.replace_file(self._index_file) as tmp_file:
+            index.to_parquet(tmp_file, index=False)
+        self._index = index
+
+        return
+
+    @property
+    def index(self):
+        """Range of the indexed variables in every row group, as a
+        DataFrame with one row per row group"""
+
+        if self._index is None:
+            if os.path.isfile(self._index_file):
+                self._index = pds.read_parquet(self._index_file)
+            else:
+                self._index = pds.DataFrame(columns=['file', 'satellite',
+                                                     'row_group', 'num_rows'])
+
+        return self._index
+
+    def files(self):
+        """Partition files of the archive, relative to the directory"""
+
+        paths = []
+        for root, dirs, names in os.walk(self.directory):
+            dirs.sort()
+            for name in sorted(names):
+                if name.endswith('.parquet') and name != '_index.parquet':
+                    paths.append(os.path.relpath(os.path.join(root, name),
+                                                 self.directory))
+
+        return paths
+
+    def reindex(self):
+        """Rebuilds the index from the statistics stored in every file"""
+
+        files = self.files()
+        if len(files) == 0:
+            self._index = None
+            if os.path.isfile(self._index_file):
+                os.remove(self._index_file)
+            return
+
+        self._save_index(pds.concat([self._file_index(path)
+                                     for path in files], ignore_index=True))
+
+        return
+
+    def query(self, start=None, stop=None, satellites=None, columns=None,
+              **ranges):
+        """
+        Reads the samples within a time period and region.
+
+        Parameters
+        ----------
+        start, stop : datetime or NoneType
+            Time period, inclusive.  If None, the period is not limited.
+            (default=None)
+        satellites : list of strings or NoneType
+            Satellites to read.  If None, reads every satellite.
+            (default=None)
+        columns : list of strings or NoneType
+            Variables to read.  If None, reads every variable. (default=None)
+        **ranges : tuples
+            (min, max) of indexed variables, inclusive, such as
+            glat=(40., 50.).  For 'glong' and 'mlt', min > max selects a
+            range across the wrap, such as mlt=(22., 2.).
+
+        Returns
+        -------
+        pds.DataFrame
+            Matching samples indexed by time, with a 'satellite' column
+
+        Note
+        ----
+            Only the row groups whose indexed range may hold matching
+            samples are read.  The number read is kept in `last_query`.
+
+        """
+
+        import pyarrow.parquet as pq
+
+        for label in ranges:
+            if label not in self.index_columns:
+                raise ValueError('Variable is not indexed: {:}'.format(label))
+
+        index = self.index
+        empty = pds.DataFrame(columns=(list(columns) if columns is not None
+                                       else []) + ['satellite'])
+        if len(index) == 0:
+            self.last_query = {'row_groups': 0, 'row_groups_read': 0,
+                               'files_read': 0}
+            return empty
+
+        keep = np.ones(len(index), dtype=bool)
+        if satellites is not None:
+            keep &= index['satellite'].isin(satellites).values
+        if start is not None:
+            keep &= (index['Epoch_max'] >= pds.Timestamp(start)).values
+        if stop is not None:
+            keep &= (index['Epoch_min'] <= pds.Timestamp(stop)).values
+        for label, bounds in ranges.items():
+            keep &= _overlaps(index['_'.join((label, 'min'))].values,
+                              index['_'.join((label, 'max'))].values, bounds,
+                              periodic=label in _periodic)
+        selected = index[keep]
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns)
+                                              + list(ranges.keys())))
+
+        frames = []
+        for path, groups in selected.groupby('file', sort=True):
+            parquet = pq.ParquetFile(os.path.join(self.directory, path))
+            table = parquet.read_row_groups(list(groups['row_group']),
+                                            columns=read_columns,
+                                            use_pandas_metadata=True)
+            frame = table.to_pandas()
+            frame['satellite'] = groups['satellite'].iloc[0]
+            frames.append(frame)
+
+        self.last_query = {'row_groups': len(index),
+                           'row_groups_read': len(selected),
+                           'files_read': len(frames)}
+        if len(frames) == 0:
+            return empty
+
+        data = pds.concat(frames).sort_index()
+        keep = np.ones(len(data), dtype=bool)
+        if start is not None:
+            keep &= data.index >= pds.Timestamp(start)
+        if stop is not None:
+            keep &= data.index <= pds.Timestamp(stop)
+        for label, bounds in ranges.items():
+            keep &= _in_range(data[label].values, bounds,
+                              periodic=label in _periodic)
+        data = data[keep]
+        if columns is not None:
+            data = data[list(columns) + ['satellite']]
+
+        return data
@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""Provides resumable batch simulations, run from the command line with
+``pysatmissions-batch``.
+
+A job simulates each day of each satellite in a date range and writes the
+days to an `archive.Archive`.  The options and the days already finished are
+kept in a state file in the output directory, so an interrupted job
+continues where it stopped when run again.  Requires pyarrow.
+
+Example
+-------
+    pysatmissions-batch ~/runs/iss --start 2018-01-01 --stop 2018-01-31 \\
+        --catalog iss.tle --cadence 10 --outputs ion_dens B \\
+        --model-backend synthetic --field-backend numpy --workers 8
+
+"""
+
+import argparse
+from concurrent import futures
+import datetime as dt
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions import _files
+
+# name of the state file in the output directory
+state_file = 'job.json'
+
+# instrument modules which may be simulated
+instruments = {'ephem': 'pysatMissions.instruments.pysat_ephem',
+               'sgp4': 'pysatMissions.instruments.pysat_sgp4'}
+
+
+def _instrument_kwargs(config, satellite):
+    """Instrument keywords of a satellite, built from the job options"""
+
+    from pysatMissions.methods import interpolation as mm_interp
+
+    kwargs = dict(config['kwargs'])
+    kwargs.update(config['satellites'][satellite])
+    kwargs['step'] = config['cadence']
+    if config['interpolate'] is not None:
+        kwargs['interpolator'] = mm_interp.Interpolator(
+            step=config['interpolate'])
+
+    return kwargs
+
+
+def _run_chunk(directory, config, satellite, date, sat_id=None):
+    """
+    Simulates one day of one satellite and writes it to the archive.
+
+    Parameters
+    ----------
+    directory : string
+        Output directory of the job
+    config : dict
+        Job options
+    satellite : string
+        Name of the satellite
+    date : string
+        Day to simulate, as 'YYYY-MM-DD'
+    sat_id : string or NoneType
+        Instrument satellite ID.  If None, uses the ID of the job and
+        writes the data.  Otherwise, only simulates. (default=None)
+
+    Returns
+    -------
+    dict
+        'rows' simulated and run time of the 'simulate' and 'write' stages
+        (seconds)
+
+    """
+
+    from pysatMissions import archive as mm_archive
+    from pysatMissions import campaign as mm_campaign
+
+    start = time.perf_counter()
+    data = mm_campaign._simulate(config['instrument'],
+                                 dt.datetime.strptime(date, '%Y-%m-%d'),
+                                 satellite, config['sat_id'] if sat_id is None
+                                 else sat_id, config['columns'],
+                                 _instrument_kwargs(config, satellite))
+    timing = {'rows': len(data), 'simulate': time.perf_counter() - start,
+              'write': 0.}
+    if sat_id is None:
+        start = time.perf_counter()
+        mm_archive.Archive(directory).write(data, update_index=False)
+        timing['write'] = time.perf_counter() - start
+
+    return timing
+
+
+class Job(object):
+    """
+    Batch simulation of one or more satellites over many days.
+
+    Parameters
+    ----------
+    directory : string
+        Output directory, holding the archive and the job state.  Created if
+        needed.
+    start : string or datetime
+        First day to simulate
+    stop : string or datetime
+        Last day to simulate
+    instrument : string
+        'ephem' or 'sgp4' (default='ephem')
+    satellites : dict or NoneType
+        Load keywords of each satellite, such as `catalog` and `satnum` or
+        `TLE1` and `TLE2`, keyed by the name of the satellite.  If None,
+        simulates a single satellite named 'sat' with the default TLEs.
+        (default=None)
+    cadence : float
+        Time between samples (seconds), a whole number of seconds
+        (default=1.)
+    sat_id : string
+        Instrument satellite ID, setting the number of seconds simulated
+        each day.  If '', simulates the full day. (default='')
+    columns : list of strings or NoneType
+        Variables written.  If None, writes every variable. (default=None)
+    interpolate : float or NoneType
+        If given, propagates at nodes this many seconds apart and
+        interpolates, see `methods.interpolation` (default=None)
+    **kwargs : dict
+        Other keywords passed to every Instrument, such as `outputs`,
+        `model_backend` or `field_backend`.  Values must be JSON
+        serializable.
+
+    Attributes
+    ----------
+    state : dict
+        'config' of the job, and the 'done' and 'failed' days, keyed by
+        '<satellite>/<YYYY-MM-DD>'.  Done days hold the number of rows and
+        the run time of each stage, and failed days the error.
+
+    Note
+    ----
+        Options are fixed when the job is first created.  A job created again
+        in the same directory resumes if the options are the same, and raises
+        a ValueError otherwise.
+
+    Example
+    -------
+        job = Job('~/runs/iss', '2018-01-01', '2018-01-31',
+                  satellites={'iss': {'catalog': 'iss.tle'}}, cadence=10.,
+                  outputs=['ion_dens'], model_backend='synthetic')
+        print(job.estimate())
+        job.run(max_workers=8)
+
+    """
+
+    def __init__(self, directory, start, stop, instrument='ephem',
+                 satellites=None, cadence=1., sat_id='', columns=None,
+                 interpolate=None, **kwargs):
+
+        if instrument not in instruments:
+            raise ValueError('Unknown instrument: {:}'.format(instrument))
+        if cadence < 1. or not np.isclose(cadence, round(cadence)):
+            raise ValueError('cadence must be a whole number of seconds')
+        start = pds.Timestamp(start).floor('D')
+        stop = pds.Timestamp(stop).floor('D')
+        if stop < start:
+            raise ValueError('stop must not be before start')
+        if satellites is None:
+            satellites = {'sat': {}}
+        for satellite in satellites:
+            if '/' in satellite or satellite == '':
+                raise ValueError('Bad satellite name: {:}'.format(satellite))
+
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        config = {'instrument': instruments[instrument],
+                  'start': start.strftime('%Y-%m-%d'),
+                  'stop': stop.strftime('%Y-%m-%d'),
+                  'satellites': satellites, 'cadence': float(cadence),
+                  'sat_id': sat_id,
+                  'columns': None if columns is None else list(columns),
+                  'interpolate': interpolate, 'kwargs': kwargs}
+        # compare as stored, so tuples and lists are the same
+        config = json.loads(json.dumps(config))
+
+        self.state = self._read_state()
+        if self.state is None:
+            self.state = {'config': config, 'done': {}, 'failed': {}}
+        elif self.state['config'] != config:
+            raise ValueError(' '.join(('The options differ from the job in',
+                                       '{:s}.  Use a new directory, or',
+                                       'remove {:s} to restart.')).format(
+                                           self.directory, state_file))
+        self.last_estimate = {}
+
+        return
+
+    @property
+    def config(self):
+        """Options of the job"""
+
+        return self.state['config']
+
+    def _state_path(self):
+        return os.path.join(self.directory, state_file)
+
+    def _read_state(self):
+        """State saved in the directory, or None for a new job"""
+
+        if not os.path.isfile(self._state_path()):
+            return None
+
+        with open(self._state_path()) as fin:
+            return json.load(fin)
+
+    def _save_state(self):
+        """Writes the state, replacing the previous file at once"""
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        with _files.replace_file(self._state_path()) as tmp_file:
+            with open(tmp_file, 'w') as fout:
+                json.dump(self.state, fout, indent=1, sort_keys=True)
+
+        return
+
+    @property
+    def chunks(self):
+        """'<satellite>/<YYYY-MM-DD>' of each day of each satellite"""
+
+        dates = pds.date_range(self.config['start'], self.config['stop'])
+
+        return ['/'.join((satellite, date.strftime('%Y-%m-%d')))
+                for satellite in self.config['satellites'] for date in dates]
+
+    @property
+    def remaining(self):
+        """Chunks not yet done, in order"""
+
+        return [chunk for chunk in self.chunks
+                if chunk not in self.state['done']]
+
+    def rows_per_chunk(self):
+        """Number of samples simulated each day"""
+
+        num = 86400 if self.config['sat_id'] == '' \
+            else int(self.config['sat_id']) + 1
+        return len(range(0, num, int(round(self.config['cadence']))))
+
+    def estimate(self, max_workers=1, calibrate=600):
+        """
+        Estimates the size and run time of the remaining days.
+
+        Parameters
+        ----------
+        max_workers : int
+            Number of worker processes of the run (default=1)
+        calibrate : int
+            Seconds of the first day simulated to time a new job.  Jobs with
+            days already done use their measured rate instead. (default=600)
+
+        Returns
+        -------
+        dict
+            Number of 'chunks', 'remaining' chunks, 'rows' of the whole job
+            and 'remaining_rows', the expected 'seconds_per_chunk' and
+            'runtime' of the remaining chunks (seconds)
+
+        Note
+        ----
+            Estimates for a new job do not include the time taken to write
+            the archive.
+
+        """
+
+        done = list(self.state['done'].values())
+        per_chunk = self.rows_per_chunk()
+        if len(done) > 0:
+            seconds = np.mean([chunk['simulate'] + chunk['write']
+                               for chunk in done])
+        else:
+            satellite, date = self.chunks[0].split('/')
+            # the first load imports the models
+            _run_chunk(self.directory, self.config, satellite, date,
+                       sat_id='2')
+            # time a short and a long load, to separate the time taken by
+            # each load from the time taken by each row
+            short = _run_chunk(self.directory, self.config, satellite, date,
+                               sat_id='2')
+            long = _run_chunk(self.directory, self.config, satellite, date,
+                              sat_id=str(calibrate))
+            rate = max(long['simulate'] - short['simulate'], 0.) \
+                / max(long['rows'] - short['rows'], 1)
+            seconds = short['simulate'] + rate * (per_chunk - short['rows'])
+
+        remaining = len(self.remaining)
+        waves = int(np.ceil(remaining / max(min(max_workers, remaining), 1)))
+        self.last_estimate = {'chunks': len(self.chunks),
+                              'remaining': remaining,
+                              'rows': per_chunk * len(self.chunks),
+                              'remaining_rows': per_chunk * remaining,
+                              'seconds_per_chunk': seconds,
+                              'runtime': waves * seconds}
+
+        return self.last_estimate
+
+    def run(self, max_workers=1, log=None):
+        """
+        Simulates the remaining days.
+
+        Parameters
+        ----------
+        max_workers : int
+            Number of worker processes.  If 1, runs in this process.
+            (default=1)
+        log : function or NoneType
+            Called with a line of text as each day finishes (default=None)
+
+        Returns
+        -------
+        archive.Archive
+            Indexed archive of every day done so far
+
+        Note
+        ----
+            The state is saved as each day finishes.  Days which fail are
+            recorded in the state and run again when the job resumes.
+
+        """
+
+        from pysatMissions import archive as mm_archive
+
+        self._save_state()
+        remaining = self.remaining
+        if max_workers > 1:
+            with futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+                jobs = {pool.submit(_run_chunk, self.directory, self.config,
+                                    *chunk.split('/')): chunk
+                        for chunk in remaining}
+                for future in futures.as_completed(jobs):
+                    try:
+                        self._record(jobs[future], future.result(), log)
+                    except Exception as err:
+                        self._record(jobs[future], err, log)
+        else:
+            for chunk in remaining:
+                try:
+                    timing = _run_chunk(self.directory, self.config,
+                                        *chunk.split('/'))
+                except Exception as err:
+                    timing = err
+                self._record(chunk, timing, log)
+
+        store = mm_archive.Archive(self.directory)
+        store.reindex()
+
+        return store
+
+    def _record(self, chunk, timing, log=None):
+        """Saves the result of a chunk, either its timing or an error"""
+
+        if isinstance(timing, Exception):
+            self.state['failed'][chunk] = repr(timing)
+            line = '{:s} failed: {:s}'.format(chunk, repr(timing))
+        else:
+            self.state['failed'].pop(chunk, None)
+            self.state['done'][chunk] = timing
+            line = ' '.join(('{:s} {:d} rows, simulate {:.1f} s,',
+                             'write {:.1f} s')).format(chunk, timing['rows'],
+                                                       timing['simulate'],
+                                                       timing['write'])
+        self._save_state()
+        if log is not None:
+            log(line)
+
+        return
+
+    def timing(self):
+        """
+        Returns the run time of each day done.
+
+        Returns
+        -------
+        pds.DataFrame
+            'rows', 'simulate' and 'write' (seconds), indexed by satellite
+            and date
+
+        """
+
+        done = self.state['done']
+        index = pds.MultiIndex.from_tuples([tuple(chunk.split('/'))
+                                            for chunk in sorted(done)],
+                                           names=['satellite', 'date'])
+
+        return pds.DataFrame([done[chunk] for chunk in sorted(done)],
+                             index=index, columns=['rows', 'simulate',
+                                                   'write'])
+
+
+def _satellites(args):
+    """Load keywords of each satellite, from the TLE options"""
+
+    if args.catalog is None:
+        if args.satnum is not None:
+            raise ValueError('--satnum requires --catalog')
+        if args.tle is None:
+            return None
+        return {args.name: {'TLE1': args.tle[0], 'TLE2': args.tle[1]}}
+
+    if args.tle is not None:
+        raise ValueError('Use either --catalog or --tle')
+
+    from pysatMissions import catalog as mm_catalog
+
+    catalog = os.path.abspath(os.path.expanduser(args.catalog))
+    satnums = args.satnum
+    if satnums is None:
+        satnums = mm_catalog.TLECatalog.read(catalog).satellites
+    return {str(satnum): {'catalog': catalog, 'satnum': int(satnum)}
+            for satnum in satnums}
+
+
+def _parser():
+    """Command line options"""
+
+    parser = argparse.ArgumentParser(
+        prog='pysatmissions-batch',
+        description=' '.join(('Simulates each day of each satellite in a',
+                              'date range into a Parquet archive.  Running',
+                              'again in the same directory resumes the',
+                              'job.')))
+    parser.add_argument('directory', help='output directory')
+    parser.add_argument('--start', required=True,
+                        help='first day, as YYYY-MM-DD')
+    parser.add_argument('--stop', required=True,
+                        help='last day, as YYYY-MM-DD')
+    parser.add_argument('--instrument', choices=sorted(instruments),
+                        default='ephem', help='instrument (default: ephem)')
+    parser.add_argument('--catalog',
+                        help=' '.join(('TLE or 3LE history file.  Simulates',
+                                       'every satellite in the file unless',
+                                       '--satnum is given.')))
+    parser.add_argument('--satnum', type=int, nargs='+',
+                        help='catalog numbers of the satellites simulated')
+    parser.add_argument('--tle', nargs=2, metavar=('LINE1', 'LINE2'),
+                        help='element set of a single satellite')
+    parser.add_argument('--name', default='sat',
+                        help='name of the satellite given by --tle')
+    parser.add_argument('--cadence', type=float, default=1.,
+                        help='time between samples (s) (default: 1)')
+    parser.add_argument('--seconds', type=int,
+                        help='seconds simulated each day (default: all)')
+    parser.add_argument('--interpolate', type=float, metavar='STEP',
+                        help='propagate at nodes STEP seconds apart')
+    parser.add_argument('--outputs', nargs='+',
+                        help='variables of the method chain to compute')
+    parser.add_argument('--columns', nargs='+',
+                        help='variables written (default: all)')
+    parser.add_argument('--model-backend',
+                        help='backend of IRI, MSIS, HWM and IGRF')
+    parser.add_argument('--field-backend', help='backend of IGRF')
+    parser.add_argument('--attitude', help='spacecraft pointing mode')
+    parser.add_argument('--executor', choices=['serial', 'thread',
+                                               'process'],
+                        help='executor of the method chain')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='estimate the rows and run time, then stop')
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs a batch job from the command line.
+
+    Parameters
+    ----------
+    argv : list of strings or NoneType
+        Command line arguments.  If None, uses sys.argv. (default=None)
+
+    Returns
+    -------
+    int
+        Exit status, 1 if any day failed
+
+    """
+
+    parser = _parser()
+    args = parser.parse_args(argv)
+
+    kwargs = {}
+    for key in ['outputs', 'model_backend', 'field_backend', 'executor']:
+        if getattr(args, key) is not None:
+            kwargs[key] = getattr(args, key)
+    if args.attitude is not None:
+        kwargs['attitude'] = {'mode': args.attitude}
+
+    try:
+        job = Job(args.directory, args.start, args.stop,
+                  instrument=args.instrument, satellites=_satellites(args),
+                  cadence=args.cadence,
+                  sat_id='' if args.seconds is None else str(args.seconds),
+                  columns=args.columns, interpolate=args.interpolate,
+                  **kwargs)
+    except ValueError as err:
+        parser.error(str(err))
+
+    if args.dry_run:
+        estimate = job.estimate(max_workers=args.workers)
+        print('{:d} of {:d} days remaining'.format(estimate['remaining'],
+                                                   estimate['chunks']))
+        print('{:d} rows remaining of {:d}'.format(estimate['remaining_rows'],
+                                                   estimate['rows']))
+        print('{:.1f} s per day, about {:.0f} s with {:d} workers'.format(
+            estimate['seconds_per_chunk'], estimate['runtime'], args.workers))
+        return 0
+
+    job.run(max_workers=args.workers,
+            log=lambda line: print(line, flush=True))
+    if len(job.state['failed']) > 0:
+        print('{:d} days failed, run again to retry'.format(
+            len(job.state['failed'])), file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""Provides lazy simulations spanning many days and satellites, held as
+chunked Dask collections.
+
+Each chunk is one day of one satellite.  Chunks are simulated on demand by a
+pysat Instrument, so the load routine and custom functions of the instrument
+module are used unchanged.  Requires dask.
+
+"""
+
+import importlib
+
+import numpy as np
+import pandas as pds
+
+import pysat
+
+
+def _simulate(module_name, date, satellite, sat_id, columns, kwargs):
+    """
+    Simulates one day of one satellite.
+
+    Parameters
+    ----------
+    module_name : string
+        Full name of the instrument module, imported by the worker
+    date : datetime
+        Day to simulate
+    satellite : string
+        Name of the satellite, added as the 'satellite' column
+    sat_id : string
+        Instrument satellite ID, setting the number of seconds simulated
+    columns : list of strings or NoneType
+        Variables to keep.  If None, keeps every variable.
+    kwargs : dict
+        Keywords passed to the Instrument
+
+    Returns
+    -------
+    pds.DataFrame
+        Simulated data
+
+    """
+
+    inst = pysat.Instrument(inst_module=importlib.import_module(module_name),
+                            sat_id=sat_id, **kwargs)
+    inst.load(date=date)
+    data = inst.data
+    if columns is not None:
+        data = data[list(columns)]
+    data = data.copy()
+    data['satellite'] = satellite
+
+    return data
+
+
+def _accumulate(module_name, date, satellite, sat_id, bins, variables,
+                kwargs):
+    """Binned statistics of one day of one satellite"""
+
+    from pysatMissions.methods import binning as mm_bin
+
+    data = _simulate(module_name, date, satellite, sat_id,
+                     list(dict.fromkeys(list(bins) + list(variables))),
+                     kwargs)
+    accumulator = mm_bin.BinnedStatistics(bins, variables)
+    accumulator.update(data)
+
+    return accumulator
+
+
+def _merge(first, second):
+    """Combines two partial accumulators"""
+
+    return first.merge(second)
+
+
+def _bin_partition(data, bins, columns):
+    """Adds the bin number along each dimension, drops samples outside"""
+
+    from pysatMissions.methods import binning as mm_bin
+
+    binned = data[list(columns)].copy()
+    keep = np.ones(len(data), dtype=bool)
+    for label, edges in bins.items():
+        index = mm_bin.bin_index(data[label], edges)
+        keep &= index >= 0
+        binned['_'.join((label, 'bin'))] = index
+    binned['satellite'] = data['satellite']
+
+    return binned[keep]
+
+
+class Campaign(object):
+    """
+    Simulation of one or more satellites over many days.
+
+    Parameters
+    ----------
+    inst_module : module
+        pysatMissions instrument module, such as `pysat_ephem`
+    start : datetime
+        First day to simulate
+    stop : datetime
+        Last day to simulate
+    satellites : dict or NoneType
+        Load keywords of each satellite, such as TLE1 and TLE2, keyed by
+        the name of the satellite.  If None, simulates a single satellite
+        named 'sat' with the default TLEs. (default=None)
+    sat_id : string
+        Instrument satellite ID, setting the number of seconds simulated
+        each day.  If '', simulates the full day. (default='')
+    scheduler : string
+        Local Dask scheduler used by `compute`, 'processes', 'threads' or
+        'synchronous'.  The load routines loop over samples in python, so
+        'processes' scales best. (default='processes')
+    num_workers : int or NoneType
+        Number of workers used by `compute`.  If None, uses one per core.
+        (default=None)
+    **kwargs : dict
+        Keywords passed to every Instrument, such as `outputs` or
+        `model_backend`
+
+    Example
+    -------
+        tles = {'iss': {'TLE1': iss_line1, 'TLE2': iss_line2},
+                'hst': {'TLE1': hst_line1, 'TLE2': hst_line2}}
+        campaign = Campaign(pysat_ephem, dt.datetime(2018, 1, 1),
+                            dt.datetime(2018, 12, 31), satellites=tles,
+                            outputs=['B'], field_backend='numpy')
+        averages = campaign.compute(campaign.orbit_average(['B'], 92.7))
+
+    """
+
+    def __init__(self, inst_module, start, stop, satellites=None, sat_id='',
+                 scheduler='processes', num_workers=None, **kwargs):
+
+        self.module_name = inst_module.__name__
+        self.start = pds.Timestamp(start).floor('D')
+        self.dates = pds.date_range(self.start, pds.Timestamp(stop).floor('D'))
+        if satellites is None:
+            satellites = {'sat': {}}
+        self.satellites = satellites
+        self.sat_id = sat_id
+        self.scheduler = scheduler
+        self.num_workers = num_workers
+        self.kwargs = kwargs
+
+        return
+
+    @property
+    def chunks(self):
+        """(satellite, date) of each chunk, in order"""
+
+        return [(satellite, date) for satellite in self.satellites
+                for date in self.dates]
+
+    def _chunk_kwargs(self, satellite):
+        """Instrument keywords of a satellite"""
+
+        kwargs = dict(self.kwargs)
+        kwargs.update(self.satellites[satellite])
+
+        return kwargs
+
+    def _meta(self, columns=None):
+        """Empty DataFrame with the columns and types of every chunk"""
+
+        satellite, date = self.chunks[0]
+        sample = _simulate(self.module_name, date, satellite, '2', columns,
+                           self._chunk_kwargs(satellite))
+
+        return sample.iloc[:0]
+
+    def to_dask(self, columns=None):
+        """
+        Returns the simulation as a lazy Dask DataFrame.
+
+        Parameters
+        ----------
+        columns : list of strings or NoneType
+            Variables to keep.  If None, keeps every variable. (default=None)
+
+        Returns
+        -------
+        dask.dataframe.DataFrame
+            One partition per chunk, indexed by time, with a 'satellite'
+            column.  Nothing is simulated until the result is computed,
+            except for a few samples used to find the variables.
+
+        """
+
+        import dask
+        import dask.dataframe as dd
+
+        simulate = dask.delayed(_simulate, pure=True)
+        parts = [simulate(self.module_name, date.to_pydatetime(), satellite,
+                          self.sat_id, columns, self._chunk_kwargs(satellite))
+                 for satellite, date in self.chunks]
+
+        return dd.from_delayed(parts, meta=self._meta(columns))
+
+    def orbit_average(self, columns, period, data=None):
+        """
+        Averages variables over windows of one orbital period.
+
+        Parameters
+        ----------
+        columns : list of strings
+            Variables to average
+        period : float
+            Orbital period (minutes).  Windows start at the first day of the
+            campaign.
+        data : dask.dataframe.DataFrame or NoneType
+            Output of `to_dask`.  If None, uses `to_dask(columns)`.
+            (default=None)
+
+        Returns
+        -------
+        dask.dataframe.DataFrame
+            Lazy mean of each variable, indexed by satellite and orbit number
+
+        """
+
+        if data is None:
+            data = self.to_dask(columns)
+        start = self.start
+        width = pds.Timedelta(minutes=period)
+
+        def add_orbit(frame):
+            frame = frame[list(columns) + ['satellite']].copy()
+            frame['orbit'] = np.asarray((frame.index - start) // width,
+                                        dtype=np.int64)
+            return frame
+
+        meta = add_orbit(data._meta)
+        orbits = data.map_partitions(add_orbit, meta=meta)
+
+        return orbits.groupby(['satellite', 'orbit'])[list(columns)].mean()
+
+    def binned_statistics(self, columns, bins, data=None):
+        """
+        Calculates the mean, standard deviation and count of variables in
+        bins.
+
+        Parameters
+        ----------
+        columns : list of strings
+            Variables to summarize
+        bins : dict
+            Bin edges, keyed by the variable binned along, such as
+            {'glat': np.arange(-90, 91, 5), 'glong': np.arange(0, 361, 10)}.
+            Samples are binned as by `methods.binning.bin_index`, and
+            samples outside the edges are dropped.
+        data : dask.dataframe.DataFrame or NoneType
+            Output of `to_dask`.  If None, uses `to_dask` with the needed
+            variables. (default=None)
+
+        Returns
+        -------
+        dask.dataframe.DataFrame
+            Lazy statistics indexed by satellite and the bin number along
+            each dimension, named with a '_bin' suffix
+
+        """
+
+        if data is None:
+            data = self.to_dask(list(set(columns) | set(bins.keys())))
+        meta = _bin_partition(data._meta, bins, columns)
+        binned = data.map_partitions(_bin_partition, bins, columns, meta=meta)
+        labels = ['satellite'] + ['_'.join((label, 'bin')) for label in bins]
+
+        return binned.groupby(labels)[list(columns)].agg(['mean', 'std',
+                                                          'count'])
+
+    def accumulate(self, bins, variables):
+        """
+        Accumulates streaming binned statistics of variables.
+
+        Parameters
+        ----------
+        bins : dict
+            Bin edges, keyed by the variable binned along, such as
+            {'qd_lat': np.arange(-90, 91, 5), 'mlt': np.arange(0, 25, 1)}
+        variables : list of strings
+            Variables to summarize
+
+        Returns
+        -------
+        dask.delayed.Delayed
+            Lazy `methods.binning.BinnedStatistics` of the whole campaign
+
+        Note
+        ----
+            Each chunk is reduced to a partial accumulator by its worker,
+            and the partial accumulators are merged in pairs, so only the
+            statistics of each bin are passed between workers.
+
+        """
+
+        import dask
+
+        accumulate = dask.delayed(_accumulate, pure=True)
+        merge = dask.delayed(_merge, pure=True)
+        parts = [accumulate(self.module_name, date.to_pydatetime(),
+                            satellite, self.sat_id, bins, variables,
+                            self._chunk_kwargs(satellite))
+                 for satellite, date in self.chunks]
+        while len(parts) > 1:
+            parts = [merge(*parts[i:i + 2]) if i + 1 < len(parts)
+                     else parts[i] for i in range(0, len(parts), 2)]
+
+        return parts[0]
+
+    def to_archive(self, directory, columns=None, **kwargs):
+        """
+        Simulates the campaign into a Parquet archive.
+
+        Parameters
+        ----------
+        directory : string
+            Directory of the archive
+        columns : list of strings or NoneType
+            Variables to keep.  If None, keeps every variable. (default=None)
+        **kwargs : dict
+            Keywords passed to `archive.Archive`, such as `row_group_size`
+
+        Returns
+        -------
+        archive.Archive
+            Indexed archive of the simulation
+
+        Note
+        ----
+            Chunks are simulated and written in parallel, then the index is
+            built once every file is written.
+
+        """
+
+        import dask
+
+        from pysatMissions import archive as mm_archive
+
+        store = mm_archive.Archive(directory, **kwargs)
+        write = dask.delayed(store.write)
+        writes = [write(part, update_index=False)
+                  for part in self.to_dask(columns).to_delayed()]
+        self.compute(*writes)
+        store.reindex()
+
+        return store
+
+    def compute(self, *collections):
+        """
+        Computes lazy results on the local scheduler of the campaign.
+
+        Parameters
+        ----------
+        *collections : Dask collections
+            Results from `to_dask`, `orbit_average`, `binned_statistics` or
+            `accumulate`
+
+        Returns
+        -------
+        object or tuple
+            Computed result, or a tuple of results if several were given
+
+        """
+
+        import dask
+
+        results = dask.compute(*collections, scheduler=self.scheduler,
+                               num_workers=self.num_workers)
+        if len(results) == 1:
+            return results[0]
+
+        return results
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""Provides a catalog of Two Line Element sets for many objects and epochs,
+so that simulations use the element set closest in time to each day.
+
+Catalogs are read from TLE or 3LE (name line followed by the two element
+lines) history files, such as those distributed by Space-Track or
+CelesTrak.  Lines are parsed as fixed width byte arrays, and parsed
+catalogs are kept in a binary file next to the source so later reads are
+immediate.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions import _files
+
+# length of a TLE element line
+_line_length = 69
+
+# value of the leading character of Alpha-5 catalog numbers, which skip the
+# letters I and O
+_alpha5 = dict((letter, 10 + i) for i, letter in
+               enumerate('ABCDEFGHJKLMNPQRSTUVWXYZ'))
+
+
+def _digits(chars, start, stop):
+    """Integer value of fixed width columns of digits, blanks read as 0"""
+
+    digits = chars[:, start:stop].view(np.uint8).astype(np.int64) - 48
+    digits[(digits < 0) | (digits > 9)] = 0
+
+    return digits.dot(10 ** np.arange(stop - start - 1, -1, -1))
+
+
+def _satnum(chars):
+    """Catalog numbers of element lines, including Alpha-5 numbers"""
+
+    satnum = _digits(chars, 2, 7)
+    lead = chars[:, 2].view(np.uint8)
+    alpha, = np.where((lead >= ord('A')) & (lead <= ord('Z')))
+    if len(alpha) > 0:
+        values = np.array([_alpha5.get(chr(char), 0)
+                           for char in lead[alpha]])
+        satnum[alpha] += values * 10000
+
+    return satnum
+
+
+def parse_tle(text):
+    """
+    Parses the element sets of a TLE or 3LE file.
+
+    Parameters
+    ----------
+    text : bytes or string
+        Contents of the file
+
+    Returns
+    -------
+    dict
+        Arrays of the catalog number ('satnum'), the epoch ('epoch'), the
+        element lines ('line1' and 'line2') and the name of the object
+        ('name', empty without a name line), one value per element set
+
+    """
+
+    if isinstance(text, str):
+        text = text.encode('ascii', 'replace')
+    lines = np.array([line.rstrip() for line in text.splitlines()],
+                     dtype='S{:d}'.format(_line_length))
+    chars = lines.view('S1').reshape(-1, _line_length)
+
+    first = (chars[:, 0] == b'1') & (chars[:, 1] == b' ')
+    second = (chars[:, 0] == b'2') & (chars[:, 1] == b' ')
+    # first element lines directly followed by a second element line
+    index, = np.where(first[:-1] & second[1:])
+
+    line1 = chars[index]
+    year = _digits(line1, 18, 20)
+    year = np.where(year < 57, year + 2000, year + 1900)
+    day = line1[:, 20:32].copy().view('S12').ravel().astype(float)
+    epoch = (year - 1970).astype('datetime64[Y]').astype('datetime64[ns]') \
+        + ((day - 1.) * 86400.e9).astype('timedelta64[ns]')
+
+    # names are on the line before the elements in 3LE files
+    name = np.full(len(index), b'', dtype='S{:d}'.format(_line_length))
+    has_name = (index > 0)
+    has_name[has_name] = ~(first[index[has_name] - 1]
+                           | second[index[has_name] - 1])
+    name[has_name] = lines[index[has_name] - 1]
+    name = np.char.strip(name)
+    zero = np.char.startswith(name, b'0 ')
+    name[zero] = np.char.strip(np.array([value[2:] for value in name[zero]],
+                                        dtype=name.dtype))
+
+    return {'satnum': _satnum(line1), 'epoch': epoch, 'line1': lines[index],
+            'line2': lines[index + 1], 'name': name}
+
+
+def _write_npz(filename, **arrays):
+    """Writes arrays to a numpy npz file through a temporary file
+
+    Parameters
+    ----------
+    filename : string
+        Output file
+    **arrays : numpy.array
+        Arrays to write, by name
+
+    Note
+    ----
+    The temporary file has a unique name in the same directory, so the
+    output is never partial, even with several processes writing it.
+
+    """
+
+    with _files.replace_file(filename) as tmp_file:
+        with open(tmp_file, 'wb') as fout:
+            np.savez(fout, **arrays)
+
+    return
+
+
+def _read_cache(cache_file, source):
+    """Reads a cached catalog file, if it matches the source
+
+    Parameters
+    ----------
+    cache_file : string
+        Cache written by `TLECatalog.read`
+    source : numpy.array
+        Size and modification time of the source file
+
+    Returns
+    -------
+    dict or NoneType
+        Parsed element sets, or None if the cache is missing, stale or
+        can't be read
+
+    """
+
+    try:
+        with np.load(cache_file) as saved:
+            if np.array_equal(saved['source'], source):
+                return dict((key, saved[key]) for key in
+                            ['satnum', 'epoch', 'line1', 'line2', 'name'])
+    except Exception:
+        # a missing or damaged cache is parsed again from the source
+        pass
+
+    return None
+
+
+class TLECatalog(object):
+    """
+    Element sets of many objects, indexed by catalog number and epoch.
+
+    Parameters
+    ----------
+    satnum : array_like
+        Catalog number of each element set
+    epoch : array_like
+        Epoch of each element set
+    line1, line2 : array_like
+        Element lines of each element set
+    name : array_like or NoneType
+        Name of the object of each element set.  If None, names are empty.
+        (default=None)
+
+    Note
+    ----
+    Element sets are sorted by catalog number and epoch, and repeated
+    epochs of the same object keep the last element set given.
+
+    Example
+    -------
+        tles = TLECatalog.read('~/tle/iss_history.txt')
+        inst = pysat.Instrument(inst_module=pysat_ephem, catalog=tles)
+
+    """
+
+    def __init__(self, satnum, epoch, line1, line2, name=None):
+
+        satnum = np.asarray(satnum, dtype=np.int64)
+        epoch = np.asarray(epoch, dtype='datetime64[ns]')
+        if name is None:
+            name = np.full(len(satnum), b'')
+        order = np.lexsort((np.arange(len(satnum)), epoch, satnum))
+        # drop repeated epochs, keeping the last set given
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = (satnum[order][1:] != satnum[order][:-1]) | \
+            (epoch[order][1:] != epoch[order][:-1])
+        order = order[keep]
+
+        self.satnum = satnum[order]
+        self.epoch = epoch[order]
+        self.line1 = np.asarray(line1, dtype='S{:d}'.format(_line_length))
+        self.line1 = self.line1[order]
+        self.line2 = np.asarray(line2, dtype='S{:d}'.format(_line_length))
+        self.line2 = self.line2[order]
+        self.name = np.asarray(name, dtype='S{:d}'.format(_line_length))
+        self.name = self.name[order]
+
+        return
+
+    def __len__(self):
+        return len(self.satnum)
+
+    @property
+    def satellites(self):
+        """Catalog numbers of the objects in the catalog"""
+        return np.unique(self.satnum)
+
+    @classmethod
+    def read(cls, filenames, cache=True):
+        """
+        Reads element sets from TLE or 3LE files.
+
+        Parameters
+        ----------
+        filenames : string or list of strings
+            Files to read
+        cache : bool
+            If True, each parsed file is kept in a binary file named with a
+            '.npz' suffix next to it, and read instead of the source while
+            the source is unchanged.  A cache that can't be read or written
+            is ignored. (default=True)
+
+        Returns
+        -------
+        TLECatalog
+            Element sets of every file
+
+        """
+
+        if isinstance(filenames, str):
+            filenames = [filenames]
+
+        parts = []
+        for filename in filenames:
+            filename = os.path.expanduser(filename)
+            stat = os.stat(filename)
+            source = np.array([stat.st_size, stat.st_mtime_ns])
+            cache_file = filename + '.npz'
+            part = _read_cache(cache_file, source) if cache else None
+            if part is None:
+                with open(filename, 'rb') as fin:
+                    part = parse_tle(fin.read())
+                if cache:
+                    # the cache is only an optimization, so a directory
+                    # that can't be written is read from the source
+                    try:
+                        _write_npz(cache_file, source=source, **part)
+                    except OSError:
+                        pass
+            parts.append(part)
+
+        return cls(*[np.concatenate([part[key] for part in parts])
+                     for key in ['satnum', 'epoch', 'line1', 'line2',
+                                 'name']])
+
+    def save(self, filename):
+        """
+        Writes the catalog to a binary file.
+
+        Parameters
+        ----------
+        filename : string
+            Output file, in the numpy npz format
+
+        """
+
+        _write_npz(os.path.expanduser(filename), satnum=self.satnum,
+                   epoch=self.epoch, line1=self.line1, line2=self.line2,
+                   name=self.name)
+
+        return
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a catalog written by `save`.
+
+        Parameters
+        ----------
+        filename : string
+            File written by `save`
+
+        Returns
+        -------
+        TLECatalog
+            Catalog holding the saved element sets
+
+        """
+
+        with np.load(os.path.expanduser(filename)) as saved:
+            return cls(saved['satnum'], saved['epoch'], saved['line1'],
+                       saved['line2'], saved['name'])
+
+    def _satnum(self, satnum):
+        """Catalog number to use, defaulting to the only object"""
+
+        if satnum is None:
+            satellites = self.satellites
+            if len(satellites) != 1:
+                raise ValueError(' '.join(('satnum must be given for a',
+                                           'catalog of several objects.')))
+            return satellites[0]
+
+        return satnum
+
+    def nearest(self, times, satnum=None):
+        """
+        Finds the element set with the epoch closest to each time.
+
+        Parameters
+        ----------
+        times : array_like of datetimes
+            Times of interest
+        satnum : int or NoneType
+            Catalog number of the object.  May be None if the catalog holds
+            a single object. (default=None)
+
+        Returns
+        -------
+        np.array
+            Index of the closest element set of each time
+
+        """
+
+        satnum = self._satnum(satnum)
+        start, stop = np.searchsorted(self.satnum, [satnum, satnum + 1])
+        if start == stop:
+            raise ValueError('Object not in catalog: {:}'.format(satnum))
+
+        epochs = self.epoch[start:stop]
+        times = np.asarray(pds.DatetimeIndex(times), dtype='datetime64[ns]')
+        after = np.clip(np.searchsorted(epochs, times), 1, len(epochs) - 1)
+        before = after - 1
+        if len(epochs) == 1:
+            return np.full(len(times), start)
+        closer = np.abs(epochs[after] - times) < np.abs(times
+                                                        - epochs[before])
+
+        return start + np.where(closer, after, before)
+
+    def select(self, time, satnum=None):
+        """
+        Returns the element set with the epoch closest to a time.
+
+        Parameters
+        ----------
+        time : datetime
+            Time of interest
+        satnum : int or NoneType
+            Catalog number of the object.  May be None if the catalog holds
+            a single object. (default=None)
+
+        Returns
+        -------
+        line1, line2 : string
+            Element lines
+
+        """
+
+        index = self.nearest([time], satnum=satnum)[0]
+
+        return self.line1[index].decode(), self.line2[index].decode()
+
+    def groups(self, times, satnum=None, block=24.):
+        """
+        Splits times into blocks sharing the same element set.
+
+        Parameters
+        ----------
+        times : array_like of datetimes
+            Sample times
+        satnum : int or NoneType
+            Catalog number of the object.  May be None if the catalog holds
+            a single object. (default=None)
+        block : float
+            Length of the blocks (hours), counted from midnight.  Each block
+            uses the element set closest to its center. (default=24.)
+
+        Returns
+        -------
+        list of tuples
+            (index, line1, line2) of each block, where index selects the
+            times of the block
+
+        """
+
+        times = pds.DatetimeIndex(times)
+        width = pds.Timedelta(hours=block)
+        day = times.floor('D')
+        centers = day + ((times - day) // width) * width + width / 2
+        index = self.nearest(centers, satnum=satnum)
+
+        groups = []
+        for element in np.unique(index):
+            groups.append((np.where(index == element)[0],
+                           self.line1[element].decode(),
+                           self.line2[element].decode()))
+
+        return groups
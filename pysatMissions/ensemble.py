@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Provides Monte Carlo ensembles of orbits, propagated from perturbed Two
+Line Element sets to estimate the uncertainty of a simulated orbit.
+
+Every member of the ensemble is propagated in a single vectorized SGP4 call
+over a block of times, and only statistics over the members are kept.
+Requires sgp4 2.0 or greater.
+
+"""
+
+import numpy as np
+import pandas as pds
+
+# elements of the SGP4 model perturbed by the ensemble, in the order used by
+# covariance matrices.  Angles are in radians, the mean motion in radians
+# per minute and the drag term in inverse Earth radii.
+elements = ['inclo', 'nodeo', 'ecco', 'argpo', 'mo', 'no_kozai', 'bstar']
+
+# Julian date of the SGP4 epoch reference, 1949 December 31 00:00 UT
+_sgp4_epoch = 2433281.5
+
+
+def _satellite(line1, line2):
+    """SGP4 satellite record of a TLE, using the wgs72 gravity model"""
+
+    from sgp4.api import Satrec, WGS72
+
+    return Satrec.twoline2rv(line1, line2, WGS72)
+
+
+def perturb_elements(line1, line2, num_members, sigma=None, covariance=None,
+                     seed=None):
+    """
+    Draws element sets from a normal distribution around a TLE.
+
+    Parameters
+    ----------
+    line1, line2 : string
+        Two Line Element set of the nominal orbit
+    num_members : int
+        Number of element sets to draw
+    sigma : dict or NoneType
+        Standard deviation of each perturbed element, keyed by the names in
+        `elements`, such as {'mo': 1.e-5, 'bstar': 1.e-5}.  Elements not
+        included are not perturbed. (default=None)
+    covariance : array_like or NoneType
+        Covariance matrix of the elements, with rows and columns in the
+        order of `elements`.  Used instead of `sigma` for correlated
+        errors. (default=None)
+    seed : int or NoneType
+        Seed of the random number generator, for repeatable ensembles
+        (default=None)
+
+    Returns
+    -------
+    np.array
+        Element sets with shape (num_members, len(elements))
+
+    """
+
+    if (sigma is None) == (covariance is None):
+        raise ValueError('Either sigma or covariance must be given.')
+    if covariance is None:
+        unknown = set(sigma.keys()) - set(elements)
+        if len(unknown) > 0:
+            raise ValueError('Unknown elements: {:}'.format(sorted(unknown)))
+        covariance = np.diag([sigma.get(name, 0.)**2 for name in elements])
+    covariance = np.asarray(covariance, dtype=float)
+    if covariance.shape != (len(elements), len(elements)):
+        raise ValueError('covariance must have shape ({0:d}, {0:d})'.format(
+            len(elements)))
+
+    satellite = _satellite(line1, line2)
+    nominal = np.array([getattr(satellite, name) for name in elements])
+    rng = np.random.RandomState(seed)
+    # elements without variance are kept at their nominal value
+    varied, = np.where(np.diag(covariance) > 0.)
+    members = np.tile(nominal, (num_members, 1))
+    if len(varied) > 0:
+        members[:, varied] = rng.multivariate_normal(
+            nominal[varied], covariance[np.ix_(varied, varied)],
+            size=num_members)
+    # the eccentricity must remain within the range of the model
+    index = elements.index('ecco')
+    members[:, index] = np.clip(members[:, index], 0., 0.999)
+
+    return members
+
+
+def _satellites(line1, line2, members):
+    """SGP4 satellite records of the nominal orbit and each member"""
+
+    from sgp4.api import Satrec, WGS72
+
+    nominal = _satellite(line1, line2)
+    epoch = nominal.jdsatepoch + nominal.jdsatepochF - _sgp4_epoch
+    satellites = [nominal]
+    for member in members:
+        values = dict(zip(elements, member))
+        satellite = Satrec()
+        satellite.sgp4init(WGS72, 'i', nominal.satnum, epoch,
+                           values['bstar'], nominal.ndot, nominal.nddot,
+                           values['ecco'], values['argpo'], values['inclo'],
+                           values['mo'], values['no_kozai'],
+                           values['nodeo'])
+        satellites.append(satellite)
+
+    return satellites
+
+
+def _julian_dates(times):
+    """Whole and fractional Julian dates of a set of times"""
+
+    days = (pds.DatetimeIndex(times) - pds.Timestamp(2000, 1, 1, 12)) \
+        / pds.Timedelta(days=1)
+    whole = np.floor(np.asarray(days, dtype=float))
+
+    return whole + 2451545., np.asarray(days, dtype=float) - whole
+
+
+def propagate_ensemble(line1, line2, times, members):
+    """
+    Propagates the nominal orbit and every member of an ensemble.
+
+    Parameters
+    ----------
+    line1, line2 : string
+        Two Line Element set of the nominal orbit
+    times : array_like of datetimes
+        Sample times
+    members : array_like
+        Element sets from `perturb_elements`
+
+    Returns
+    -------
+    position, velocity : np.array
+        ECI (TEME) position (km) and velocity (km/s) with shape
+        (members + 1, times, 3).  The first row is the nominal orbit.
+        Samples where the propagation failed, such as after reentry, are
+        NaN.
+
+    """
+
+    from sgp4.api import SatrecArray
+
+    jd, fr = _julian_dates(times)
+    satellites = SatrecArray(_satellites(line1, line2, members))
+    errors, position, velocity = satellites.sgp4(jd, fr)
+    position[errors != 0] = np.nan
+    velocity[errors != 0] = np.nan
+
+    return position, velocity
+
+
+def _frame(position, velocity):
+    """Radial, along track and cross track unit vectors of an orbit"""
+
+    radial = position / np.linalg.norm(position, axis=-1)[:, np.newaxis]
+    cross = np.cross(position, velocity)
+    cross /= np.linalg.norm(cross, axis=-1)[:, np.newaxis]
+
+    return radial, np.cross(cross, radial), cross
+
+
+def ensemble_statistics(line1, line2, times, members,
+                        percentiles=(5., 50., 95.), block_size=1800):
+    """
+    Calculates statistics of the ensemble at each time.
+
+    Parameters
+    ----------
+    line1, line2 : string
+        Two Line Element set of the nominal orbit
+    times : array_like of datetimes
+        Sample times
+    members : array_like
+        Element sets from `perturb_elements`
+    percentiles : list of floats
+        Percentiles of the deviations from the nominal orbit
+        (default=(5., 50., 95.))
+    block_size : int
+        Number of times propagated at once.  Memory use is set by the
+        number of members times the block size. (default=1800)
+
+    Returns
+    -------
+    pds.DataFrame
+        Indexed by time, with the nominal position ('position_eci_*'), the
+        ensemble mean ('position_eci_*_mean') and the six independent
+        terms of the position covariance ('position_eci_cov_xx', ...; km^2).
+        Percentiles of the 'radial', 'along_track' and 'cross_track'
+        deviations from the nominal orbit (km), and of the total
+        'deviation', are named with a '_p<percentile>' suffix, such as
+        'along_track_p95'.
+
+    """
+
+    times = pds.DatetimeIndex(times)
+    coords = ['x', 'y', 'z']
+    pairs = [(i, j) for i in range(3) for j in range(i, 3)]
+    blocks = []
+    for start in range(0, len(times), block_size):
+        block_times = times[start:start + block_size]
+        position, velocity = propagate_ensemble(line1, line2, block_times,
+                                                members)
+        nominal = position[0]
+        spread = position[1:]
+
+        columns = {}
+        mean = np.nanmean(spread, axis=0)
+        for i, coord in enumerate(coords):
+            columns['_'.join(('position_eci', coord))] = nominal[:, i]
+        for i, coord in enumerate(coords):
+            columns['_'.join(('position_eci', coord, 'mean'))] = mean[:, i]
+        anomaly = spread - mean
+        count = np.sum(np.isfinite(anomaly[:, :, 0]), axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i, j in pairs:
+                label = '_'.join(('position_eci_cov', coords[i] + coords[j]))
+                columns[label] = np.nansum(anomaly[:, :, i]
+                                           * anomaly[:, :, j],
+                                           axis=0) / (count - 1)
+
+        # deviations from the nominal orbit in its orbital frame
+        deviation = spread - nominal
+        frame = _frame(nominal, velocity[0])
+        components = [np.einsum('knj,nj->kn', deviation, unit)
+                      for unit in frame]
+        components.append(np.linalg.norm(deviation, axis=-1))
+        # members that failed to propagate are skipped when present
+        if np.isfinite(spread).all():
+            percentile = np.percentile
+        else:
+            percentile = np.nanpercentile
+        for name, values in zip(['radial', 'along_track', 'cross_track',
+                                 'deviation'], components):
+            levels = percentile(values, percentiles, axis=0)
+            for pct, level in zip(percentiles, levels):
+                columns['{:s}_p{:g}'.format(name, pct)] = level
+
+        blocks.append(pds.DataFrame(columns, index=block_times))
+
+    data = pds.concat(blocks)
+    data.index.name = 'Epoch'
+
+    return data
@@ -3,6 +3,15 @@ pysatMissions.instruments is a pysat module that provides
 the instrument modules to be used with pysat
 """
 
-from pysatMissions.instruments import pysat_ephem, pysat_sgp4
+import sys
 
-__all__ = ['pysat_ephem', 'pysat_sgp4']
+from pysatMissions._lazy import lazy_submodules
+
+__all__ = ['pysat_ephem', 'pysat_ephem_xarray', 'pysat_sgp4',
+           'pysat_sgp4_xarray']
+
+__getattr__, __dir__ = lazy_submodules(__name__, __all__)
+
+if sys.version_info < (3, 7):
+    from pysatMissions.instruments import pysat_ephem, pysat_ephem_xarray
+    from pysatMissions.instruments import pysat_sgp4, pysat_sgp4_xarray
@@ -3,6 +3,8 @@ Handles the default pysat functions for simulated instruments
 """
 
 import datetime as dt
+import functools
+import numpy as np
 import os
 import pandas as pds
 
@@ -25,8 +27,186 @@ def _download(date_array, tag, sat_id, data_path=None):
     pass
 
 
-def _get_times(fnames, sat_id):
-    """Construct list of times for simulated instruments"""
+def _get_load_kwarg(inst, key, default=None):
+    """Value of a keyword passed to the Instrument for the load routine
+
+    Allows init to use options declared in the load routine signature.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object
+    key : string
+        Name of the load keyword
+    default
+        Value returned if the keyword was not set (default=None)
+
+    """
+
+    kwargs = getattr(inst, 'kwargs', {})
+    # newer pysat versions store keywords for each routine separately
+    if isinstance(kwargs.get('load', None), dict):
+        kwargs = kwargs['load']
+
+    return kwargs.get(key, default)
+
+
+def _check_data_format(inst):
+    """Checks the 'data_format' load keyword matches the instrument module
+
+    The data format is set by the `pandas_format` of the instrument module,
+    so xarray data is loaded by the '_xarray' modules.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object, using the 'data_format' load keyword
+
+    """
+
+    data_format = _get_load_kwarg(inst, 'data_format')
+    if data_format is None:
+        return
+    if data_format not in ['pandas', 'xarray']:
+        raise ValueError('Unknown data_format: {:}'.format(data_format))
+    if (data_format == 'pandas') != inst.pandas_format:
+        raise ValueError(' '.join(('Use the pysat_sgp4_xarray or',
+                                   'pysat_ephem_xarray instrument modules',
+                                   'to load xarray data')))
+
+    return
+
+
+def _build_data(times, variables, data_format='pandas'):
+    """Collects simulated arrays into the data returned by load
+
+    Parameters
+    ----------
+    times : pds.DatetimeIndex
+        Sample times
+    variables : list of tuples
+        (name, array) pairs, in output order.  Arrays with shape (time, 3)
+        are vectors.
+    data_format : string
+        'pandas' returns a DataFrame with a column for each vector
+        component, named with a '_x', '_y' or '_z' suffix.  'xarray' returns
+        a Dataset with (time, component) vectors, which use the arrays
+        without copying them. (default='pandas')
+
+    Returns
+    -------
+    pds.DataFrame or xr.Dataset
+        Simulated data
+
+    """
+
+    if data_format == 'xarray':
+        import xarray as xr
+
+        data_vars = {}
+        for name, values in variables:
+            data_vars[name] = (('time', 'component')[:np.ndim(values)],
+                               values)
+
+        return xr.Dataset(data_vars,
+                          coords={'time': np.asarray(times),
+                                  'component': ['x', 'y', 'z']})
+    elif data_format != 'pandas':
+        raise ValueError('Unknown data_format: {:}'.format(data_format))
+
+    columns = {}
+    order = []
+    for name, values in variables:
+        if np.ndim(values) == 2:
+            for i, coord in enumerate(['x', 'y', 'z']):
+                columns['_'.join((name, coord))] = values[:, i]
+                order.append('_'.join((name, coord)))
+        else:
+            columns[name] = values
+            order.append(name)
+    data = pds.DataFrame(columns, index=times, columns=order)
+    data.index.name = 'Epoch'
+
+    return data
+
+
+def _get_catalog(catalog):
+    """TLE catalog, read from a file if given by name
+
+    Parameters
+    ----------
+    catalog : catalog.TLECatalog or string
+        Catalog, or the name of a TLE or 3LE file.  Files are read once per
+        session, and the parsed file is cached next to it.
+
+    """
+
+    from pysatMissions import catalog as mm_catalog
+
+    if isinstance(catalog, mm_catalog.TLECatalog):
+        return catalog
+
+    filename = os.path.abspath(os.path.expanduser(catalog))
+    stat = os.stat(filename)
+    version = (stat.st_size, stat.st_mtime_ns)
+    # a rewritten file replaces the catalog read from its earlier version
+    if _catalogs.get(filename, (None, None))[0] != version:
+        _catalogs[filename] = (version, mm_catalog.TLECatalog.read(filename))
+
+    return _catalogs[filename][1]
+
+
+# catalogs read from files, keyed by file name, along with the size and
+# modification time of the file when read
+_catalogs = {}
+
+
+def _tle_groups(times, line1, line2, catalog=None, satnum=None,
+                tle_block=24.):
+    """Element set used for each block of times
+
+    Parameters
+    ----------
+    times : pds.DatetimeIndex
+        Sample times
+    line1, line2 : string
+        Element set used without a catalog
+    catalog : catalog.TLECatalog, string or NoneType
+        If given, each block of times uses the element set of the catalog
+        with the closest epoch. (default=None)
+    satnum : int or NoneType
+        Catalog number of the object in the catalog (default=None)
+    tle_block : float
+        Length of the blocks (hours) (default=24.)
+
+    Returns
+    -------
+    list of tuples
+        (index, line1, line2) of each block, where index selects the times
+        of the block
+
+    """
+
+    if catalog is None:
+        return [(np.arange(len(times)), line1, line2)]
+
+    return _get_catalog(catalog).groups(times, satnum=satnum,
+                                        block=tle_block)
+
+
+def _get_times(fnames, sat_id, step=1.):
+    """Construct list of times for simulated instruments
+
+    Parameters
+    ----------
+    fnames : list-like collection
+        File name that contains date in its name.
+    sat_id : string
+        '' for a full day, or the number of seconds to simulate
+    step : float
+        Time between samples (seconds) (default=1.)
+
+    """
 
     # grab date from filename
     parts = os.path.split(fnames[0])[-1].split('-')
@@ -35,10 +215,60 @@ def _get_times(fnames, sat_id):
     day = int(parts[2][0:2])
     date = dt.datetime(yr, month, day)
 
-    # create timing at 1 Hz (defaults to 1 day)
+    # create timing at 1 Hz by default (defaults to 1 day)
     # Allow numeric string to set number of time steps
     num = 86399 if sat_id == '' else int(sat_id)
     times = pds.date_range(start=date, end=date+pds.DateOffset(seconds=num),
-                           freq='1S')
+                           freq=pds.Timedelta(seconds=step))
 
     return times
+
+
+def _sample_times(fnames, sat_id, propagate, sampler=None, interpolator=None,
+                  rates=None, periodic=None, step=1.):
+    """Propagates an orbit at the simulated times
+
+    Parameters
+    ----------
+    fnames : list-like collection
+        File name that contains date in its name.
+    sat_id : string
+        '' for a full day, or the number of seconds to simulate
+    propagate : function
+        Takes the sample times and returns a list of (name, array) pairs of
+        the simulated variables
+    sampler : methods.sampling.AdaptiveSampler or NoneType
+        If given, samples at the cadence chosen by the sampler.  If None,
+        samples every `step` seconds. (default=None)
+    interpolator : methods.interpolation.Interpolator or NoneType
+        If given, propagates at the nodes of the interpolator and
+        interpolates to the sample times. (default=None)
+    rates : dict or NoneType
+        Variables which are the time derivative of another variable, keyed
+        by that variable, passed to the interpolator (default=None)
+    periodic : dict or NoneType
+        (min, max) range of variables which wrap, passed to the
+        interpolator (default=None)
+    step : float
+        Time between samples without a sampler (seconds) (default=1.)
+
+    Returns
+    -------
+    times : pds.DatetimeIndex
+        Sample times
+    variables : list of tuples
+        (name, array) pairs of the simulated variables
+
+    """
+
+    if interpolator is not None:
+        propagate = functools.partial(interpolator.propagate,
+                                      propagate=propagate, rates=rates,
+                                      periodic=periodic)
+
+    if sampler is None:
+        times = _get_times(fnames, sat_id, step=step)
+        return times, propagate(times)
+
+    return sampler.sample(_get_times(fnames, sat_id, step=sampler.fine_step),
+                          propagate)
@@ -16,12 +16,16 @@ import numpy as np
 import ephem
 import pandas as pds
 import pysat
-import pysatMagVect
 
 from pysatMissions.instruments import _core as mcore
+from pysatMissions.methods import attitude as mm_att
+from pysatMissions.methods import cache as mm_cache
+from pysatMissions.methods import chain as mm_chain
 from pysatMissions.methods import magcoord as mm_magcoord
 from pysatMissions.methods import empirical as mm_emp
 from pysatMissions.methods import spacecraft as mm_sc
+from pysatMissions.models import backends as mm_backends
+from pysatMissions.models import igrf as mm_igrf
 
 # pysat required parameters
 platform = 'pysat'
@@ -33,6 +37,121 @@ sat_ids = {'': ['']}
 _test_dates = {'': {'': dt.datetime(2018, 1, 1)}}
 
 
+def _vector(prefix):
+    """Labels of the ECEF x, y and z components of a vector"""
+    return ['_'.join((prefix, coord)) for coord in ['x', 'y', 'z']]
+
+
+def _attitude():
+    """Labels of the spacecraft attitude vectors in the ECEF basis"""
+    return _vector('sc_xhat_ecef') + _vector('sc_yhat_ecef') + \
+        _vector('sc_zhat_ecef')
+
+
+# variables produced by the load routine
+_load_outputs = ['glong', 'glat', 'alt', 'obs_sat_az_angle',
+                 'obs_sat_el_angle', 'obs_sat_slant_range'] + \
+    _vector('position_ecef')
+_geo = ['glat', 'glong', 'alt']
+
+# metadata to be added along with IGRF vector projection
+_igrf_sc_meta = {'desc': 'IGRF geomagnetic field expressed in the s/c basis.',
+                 'units': 'nT'}
+
+# custom functions, in the order they are run, with their inputs and outputs
+_chain_steps = [
+    mm_chain.make_step(mm_magcoord.add_quasi_dipole_coordinates, _geo,
+                       ['qd_lat', 'qd_long', 'mlt']),
+    mm_chain.make_step(mm_magcoord.add_aacgm_coordinates, _geo,
+                       ['aacgm_lat', 'aacgm_long', 'aacgm_mlt']),
+    mm_chain.make_step(mm_sc.calculate_ecef_velocity,
+                       _vector('position_ecef'), _vector('velocity_ecef')),
+    mm_chain.make_step(mm_sc.add_ram_pointing_sc_attitude_vectors,
+                       _vector('position_ecef') + _vector('velocity_ecef'),
+                       _attitude()),
+    mm_chain.make_step(mm_sc.add_solar_geometry,
+                       ['glat', 'glong'] + _vector('position_ecef'),
+                       _vector('sun_ecef') + ['subsolar_lat', 'subsolar_long',
+                                              'sza', 'slt', 'sunlit_frac',
+                                              'umbra', 'penumbra']),
+    # project simulated vectors onto s/c basis
+    # IGRF
+    mm_chain.make_step(mm_emp.add_igrf, _geo,
+                       ['B', 'B_east', 'B_north', 'B_up'] +
+                       _vector('B_ecef')),
+    mm_chain.make_step(mm_sc.project_ecef_vector_onto_sc,
+                       _vector('B_ecef') + _attitude(), _vector('B_sc'),
+                       args=_vector('B_ecef') + _vector('B_sc'),
+                       kwargs={'meta': [_igrf_sc_meta.copy(),
+                                        _igrf_sc_meta.copy(),
+                                        _igrf_sc_meta.copy()]},
+                       name='project_igrf_onto_sc'),
+    # Thermal Ion Parameters
+    mm_chain.make_step(mm_emp.add_iri_thermal_plasma, _geo,
+                       ['ion_temp', 'e_temp', 'ion_dens', 'frac_dens_o',
+                        'frac_dens_h', 'frac_dens_he']),
+    # Thermal Neutral parameters
+    mm_chain.make_step(mm_emp.add_msis, _geo,
+                       ['Nn', 'Nn_H', 'Nn_He', 'Nn_N', 'Nn_N2', 'Nn_O',
+                        'Nn_O2', 'Nn_Ar', 'Tn_msis']),
+    mm_chain.make_step(mm_emp.add_hwm_winds_and_ecef_vectors,
+                       _geo + _vector('position_ecef'),
+                       ['zonal_wind', 'meridional_wind'] +
+                       _vector('unit_zonal_wind_ecef') +
+                       _vector('unit_mer_wind_ecef')),
+    # project total wind vector
+    mm_chain.make_step(mm_emp.project_hwm_onto_sc,
+                       ['zonal_wind', 'meridional_wind'] +
+                       _vector('unit_zonal_wind_ecef') +
+                       _vector('unit_mer_wind_ecef') + _attitude(),
+                       _vector('total_wind') + _vector('sim_wind_sc'))]
+
+# steps running empirical models, which accept a model backend, along with
+# the model they run
+_model_steps = {'add_igrf': 'igrf', 'add_iri_thermal_plasma': 'iri',
+                'add_msis': 'msis', 'add_hwm_winds_and_ecef_vectors': 'hwm'}
+
+
+def _set_attitude_step(steps, kwargs):
+    """
+    Replaces the ram pointing attitude with `attitude.add_attitude`.
+
+    Parameters
+    ----------
+    steps : list of dicts
+        Steps from `mm_chain.make_step`
+    kwargs : dict
+        Keyword arguments of `attitude.add_attitude`, such as
+        {'mode': 'sun'}
+
+    Returns
+    -------
+    list of dicts
+        Copy of `steps` where the attitude is stored as quaternions, and
+        the steps using the attitude read the quaternions
+
+    """
+
+    inputs = _vector('position_ecef')
+    if kwargs.get('mode', 'ram') in ['ram', 'nadir']:
+        inputs += _vector('velocity_ecef')
+
+    new_steps = []
+    for step in steps:
+        if step['name'] == 'add_ram_pointing_sc_attitude_vectors':
+            step = mm_chain.make_step(mm_att.add_attitude, inputs,
+                                      mm_att.quaternion_labels,
+                                      kwargs=kwargs)
+        elif set(_attitude()).intersection(step['inputs']):
+            step = dict(step)
+            step['inputs'] = [label for label in step['inputs']
+                              if label not in _attitude()] + \
+                mm_att.quaternion_labels
+        new_steps.append(step)
+
+    return new_steps
+
+
 def init(self):
     """
     Adds custom calculations to orbit simulation.
@@ -42,37 +161,67 @@ def init(self):
     adds the attitude vectors of spacecraft assuming x is ram pointing and
     z is generally nadir, adds ionospheric parameters from the Interational
     Reference Ionosphere (IRI), as well as simulated winds from the
-    Horiontal Wind Model (HWM).
+    Horiontal Wind Model (HWM).  Solar geometry and eclipse state of the
+    spacecraft are also included.
+
+    If the `outputs` keyword is passed to the Instrument, only the custom
+    functions needed to produce those variables are attached.  If the
+    `executor` keyword is passed, independent functions are run concurrently.
+    If the `store` keyword is passed, only functions whose inputs or
+    parameters changed since they were last run are run again.
+    The `model_backend` keyword selects the implementation of the empirical
+    models, and `field_backend` the geomagnetic field model.  The
+    `attitude` keyword selects a pointing mode other than ram pointing.
 
     """
 
-    self.custom.attach(mm_magcoord.add_quasi_dipole_coordinates)
-    self.custom.attach(mm_magcoord.add_aacgm_coordinates)
-    self.custom.attach(mm_sc.calculate_ecef_velocity)
-    self.custom.attach(mm_sc.add_ram_pointing_sc_attitude_vectors)
-    # project simulated vectors onto s/c basis
-    # IGRF
-    self.custom.attach(mm_emp.add_igrf)
-    # create metadata to be added along with vector projection
-    in_meta = {'desc': 'IGRF geomagnetic field expressed in the s/c basis.',
-               'units': 'nT'}
-    # project IGRF
-    self.custom.attach(mm_sc.project_ecef_vector_onto_sc,
-                       args=['B_ecef_x', 'B_ecef_y', 'B_ecef_z', 'B_sc_x',
-                             'B_sc_y', 'B_sc_z'],
-                       kwargs={'meta': [in_meta.copy(), in_meta.copy(),
-                                        in_meta.copy()]})
-    # Thermal Ion Parameters
-    self.custom.attach(mm_emp.add_iri_thermal_plasma)
-    # Thermal Neutral parameters
-    self.custom.attach(mm_emp.add_msis)
-    self.custom.attach(mm_emp.add_hwm_winds_and_ecef_vectors)
-    # project total wind vector
-    self.custom.attach(mm_emp.project_hwm_onto_sc)
+    mcore._check_data_format(self)
+
+    steps = _chain_steps
+    model_backend = mcore._get_load_kwarg(self, 'model_backend')
+    if model_backend is not None:
+        backend = mm_backends.get_backend(model_backend)
+        provided = [step for step, model in _model_steps.items()
+                    if backend.provides(model)]
+        if len(provided) == 0:
+            raise ValueError(' '.join(('The {:} backend does not provide',
+                                       'any model')).format(backend.name))
+        # models the backend does not provide use their default backend
+        for step in provided:
+            steps = mm_chain.set_step_kwargs(steps, step,
+                                             {'backend': model_backend})
+
+    attitude = mcore._get_load_kwarg(self, 'attitude')
+    if attitude is not None:
+        steps = _set_attitude_step(steps, attitude)
+
+    field_backend = mcore._get_load_kwarg(self, 'field_backend')
+    if field_backend is not None:
+        steps = mm_chain.set_step_kwargs(steps, 'add_igrf',
+                                         {'backend': field_backend})
+
+    outputs = mcore._get_load_kwarg(self, 'outputs')
+    if outputs is not None:
+        steps = mm_chain.resolve_steps(steps, outputs,
+                                       available=_load_outputs)
+
+    executor = mcore._get_load_kwarg(self, 'executor')
+    store = mcore._get_load_kwarg(self, 'store')
+    if executor is None and store is None:
+        mm_chain.attach_steps(self, steps)
+    else:
+        if executor is None:
+            executor = 'serial'
+        self.custom.attach(mm_chain.run_steps,
+                           kwargs={'steps': steps, 'executor': executor,
+                                   'store': store})
 
 
 def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
-         TLE1=None, TLE2=None):
+         TLE1=None, TLE2=None, outputs=None, executor=None,
+         model_backend=None, field_backend=None, store=None,
+         data_format='pandas', sampler=None, catalog=None, satnum=None,
+         tle_block=24., interpolator=None, attitude=None, step=1.):
     """
     Returns data and metadata in the format required by pysat. Generates
     position of satellite in both geographic and ECEF co-ordinates.
@@ -102,10 +251,74 @@ def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
         First string for Two Line Element. Must be in TLE format
     TLE2 : string
         Second string for Two Line Element. Must be in TLE format
+    outputs : list of strings or NoneType
+        Variables to simulate.  Used by init to attach only the custom
+        functions, and the functions they depend on, needed for these
+        variables.  If None, all functions are attached.  Not used by load.
+        (default=None)
+    executor : string or NoneType
+        Used by init to run custom functions that do not depend on each
+        other concurrently, in a 'thread' or 'process' pool.  If None, the
+        functions are attached and run one at a time.  Not used by load.
+        (default=None)
+    model_backend : string or NoneType
+        Used by init to select the backend of the IRI, MSIS, HWM and IGRF
+        models, such as 'synthetic' for dry runs without pyglow.  Models the
+        backend does not provide, and every model if None, use the default
+        of each model function.  Not used by load. (default=None)
+    field_backend : string or NoneType
+        Used by init to select the geomagnetic field model, passed to
+        `add_igrf` as its `backend`.  'dipole' is orders of magnitude faster
+        than the full IGRF for early design studies.  Takes precedence over
+        `model_backend`.  If None, uses the `add_igrf` default.  Not used by
+        load. (default=None)
+    store : methods.cache.ColumnStore or NoneType
+        If given, the load output and the variables added by each custom
+        function are kept in the store, and reused when the same day, TLE
+        and parameters are loaded again.  Used by load and init.
+        (default=None)
+    data_format : string
+        'pandas' returns a DataFrame with a column for each vector
+        component.  'xarray' returns a Dataset with the 'position_ecef'
+        vector indexed by time and component, and the custom functions add
+        vectors such as 'velocity_ecef' and the (time, sc_axis, component)
+        attitude 'sc_attitude_ecef'.  'xarray' is set by the
+        `pysat_ephem_xarray` module, whose custom functions are attached one
+        at a time, without `executor` or `store`. (default='pandas')
+    sampler : methods.sampling.AdaptiveSampler or NoneType
+        If given, the orbit is sampled at a coarse cadence and refined
+        inside the regions of the sampler, and the custom functions only
+        run on the samples kept.  The load output is then not kept in the
+        `store`.  If None, samples every `step` seconds. (default=None)
+    catalog : catalog.TLECatalog, string or NoneType
+        If given, each block of times uses the element set of this catalog
+        with the closest epoch, instead of TLE1 and TLE2.  May be the name
+        of a TLE or 3LE file, read once and cached. (default=None)
+    satnum : int or NoneType
+        Catalog number of the object in the catalog.  May be None if the
+        catalog holds a single object. (default=None)
+    tle_block : float
+        Length of the blocks of time sharing an element set of the catalog
+        (hours) (default=24.)
+    interpolator : methods.interpolation.Interpolator or NoneType
+        If given, the orbit is propagated at the nodes of the interpolator,
+        and every variable is interpolated to the sample times using rates
+        from a central difference at each node.  The error at a few times
+        between nodes is kept in its `last_error`. (default=None)
+    attitude : dict or NoneType
+        Used by init to store the spacecraft attitude as quaternions from
+        `attitude.add_attitude`, called with these keyword arguments, such
+        as {'mode': 'sun'}, instead of the ram pointing attitude vectors.
+        Projections onto the spacecraft frame use this attitude.  If None,
+        uses `add_ram_pointing_sc_attitude_vectors`.  Not used by load.
+        (default=None)
+    step : float
+        Time between samples (seconds).  Not used with a `sampler`, whose
+        `fine_step` sets the times. (default=1.)
 
     Returns
     -------
-    data : (pandas.DataFrame)
+    data : (pandas.DataFrame or xarray.Dataset)
         Object containing satellite data
     meta : (pysat.Meta)
         Object containing metadata such as column names and units
@@ -117,6 +330,17 @@ def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
           TLE2='2 25544  51.6402 181.0633 0004018  88.8954  22.2246 15.54059185113452')
       inst.load(2018, 1)
 
+      # Only run the models needed for quasi-dipole coordinates and the
+      # IGRF field in the spacecraft frame
+      inst = pysat.Instrument('pysat', 'ephem',
+                              outputs=['qd_lat', 'mlt', 'B_sc_x'])
+
+      # Sample every minute, and every second poleward of 60 degrees
+      # magnetic latitude
+      sampler = sampling.AdaptiveSampler(
+          sampling.magnetic_latitude_above(60.), coarse_step=60.)
+      inst = pysat.Instrument('pysat', 'ephem', sampler=sampler)
+
     """
 
     # TLEs (Two Line Elements for ISS)
@@ -133,8 +357,22 @@ def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
     if TLE2 is not None:
         line2 = TLE2
 
-    # Extract list of times from filenames and sat_id
-    times = mcore._get_times(fnames, sat_id)
+    if store is not None and sampler is None:
+        # Extract list of times from filenames and sat_id
+        times = mcore._get_times(fnames, sat_id, step=step)
+        # the element sets chosen from a catalog are part of the key
+        tles = [(tle1, tle2) for index, tle1, tle2
+                in mcore._tle_groups(times, line1, line2, catalog=catalog,
+                                     satnum=satnum, tle_block=tle_block)]
+        key_args = [tles, tle_block, obs_long, obs_lat, obs_alt, data_format,
+                    pds.DataFrame({'time': times})]
+        if interpolator is not None:
+            # interpolated data differs slightly from propagated data
+            key_args += [interpolator.step, interpolator.delta]
+        key = mm_cache.hash_key('pysat_ephem.load', *key_args)
+        data = store.get(key)
+        if data is not None:
+            return data.copy(), _get_meta(data_format)
 
     # the observer's (ground station) position on the Earth surface
     site = ephem.Observer()
@@ -142,48 +380,68 @@ def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
     site.lat = str(obs_lat)
     site.elevation = obs_alt
 
-    # The first parameter in readtle() is the satellite name
-    sat = ephem.readtle('pysat', line1, line2)
-    output_params = []
-    for timestep in times:
-        lp = {}
-        site.date = timestep
-        sat.compute(site)
-        # parameters relative to the ground station
-        lp['obs_sat_az_angle'] = ephem.degrees(sat.az)
-        lp['obs_sat_el_angle'] = ephem.degrees(sat.alt)
-        # total distance away
-        lp['obs_sat_slant_range'] = sat.range
-        # satellite location
-        # sub latitude point
-        lp['glat'] = np.degrees(sat.sublat)
-        # sublongitude point
-        lp['glong'] = np.degrees(sat.sublong)
-        # elevation of sat in m, stored as km
-        lp['alt'] = sat.elevation/1000.
+    def propagate(times):
+        # arrays to hold the output, filled one sample at a time
+        num = len(times)
+        az_angle = np.empty(num)
+        el_angle = np.empty(num)
+        slant_range = np.empty(num)
+        glat = np.empty(num)
+        glong = np.empty(num)
+        alt = np.empty(num)
+        for index, tle1, tle2 in mcore._tle_groups(times, line1, line2,
+                                                   catalog=catalog,
+                                                   satnum=satnum,
+                                                   tle_block=tle_block):
+            # The first parameter in readtle() is the satellite name
+            sat = ephem.readtle('pysat', tle1, tle2)
+            for i, timestep in zip(index, times[index]):
+                site.date = timestep
+                sat.compute(site)
+                # parameters relative to the ground station
+                az_angle[i] = ephem.degrees(sat.az)
+                el_angle[i] = ephem.degrees(sat.alt)
+                # total distance away
+                slant_range[i] = sat.range
+                # satellite location
+                # sub latitude point
+                glat[i] = np.degrees(sat.sublat)
+                # sublongitude point
+                glong[i] = np.degrees(sat.sublong)
+                # elevation of sat in m, stored as km
+                alt[i] = sat.elevation/1000.
+
         # get ECEF position of satellite
-        lp['x'], lp['y'], lp['z'] = pysatMagVect.geodetic_to_ecef(lp['glat'],
-                                                                  lp['glong'],
-                                                                  lp['alt'])
-        output_params.append(lp)
-
-    output = pds.DataFrame(output_params, index=times)
-    # modify input object to include calculated parameters
-    # put data into DataFrame
-    data = pds.DataFrame({'glong': output['glong'],
-                          'glat': output['glat'],
-                          'alt': output['alt'],
-                          'position_ecef_x': output['x'],
-                          'position_ecef_y': output['y'],
-                          'position_ecef_z': output['z'],
-                          'obs_sat_az_angle': output['obs_sat_az_angle'],
-                          'obs_sat_el_angle': output['obs_sat_el_angle'],
-                          'obs_sat_slant_range':
-                          output['obs_sat_slant_range']},
-                         index=times)
-    data.index.name = 'Epoch'
-
-    return data, meta.copy()
+        position = np.empty((num, 3))
+        position[:, 0], position[:, 1], position[:, 2] = \
+            mm_igrf.geodetic_to_ecef(glat, glong, alt)
+
+        return [('glong', glong), ('glat', glat), ('alt', alt),
+                ('position_ecef', position), ('obs_sat_az_angle', az_angle),
+                ('obs_sat_el_angle', el_angle),
+                ('obs_sat_slant_range', slant_range)]
+
+    # Extract list of times from filenames and sat_id, and propagate
+    times, variables = mcore._sample_times(
+        fnames, sat_id, propagate, sampler=sampler, interpolator=interpolator,
+        periodic={'glong': (-180., 180.),
+                  'obs_sat_az_angle': (0., 2. * np.pi)}, step=step)
+
+    data = mcore._build_data(times, variables, data_format=data_format)
+
+    if store is not None and sampler is None:
+        store.put(key, data.copy())
+
+    return data, _get_meta(data_format)
+
+
+def _get_meta(data_format='pandas'):
+    """Copy of the metadata of the variables returned by load"""
+
+    if data_format == 'xarray':
+        return xarray_meta.copy()
+
+    return meta.copy()
 
 
 list_files = functools.partial(mcore._list_files)
@@ -220,3 +478,9 @@ meta['obs_sat_el_angle'] = {'units': 'degrees',
 meta['obs_sat_slant_range'] = {'units': 'km',
                                'desc': 'Distance of satellite from ground ' +
                                'station'}
+
+# metadata of xarray data, where the position is a single vector
+xarray_meta = meta.copy()
+xarray_meta.drop(['position_ecef_x', 'position_ecef_y', 'position_ecef_z'])
+xarray_meta['position_ecef'] = {'units': 'km',
+                                'desc': 'ECEF position of satellite'}
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Produces the satellite orbit and model data of pysat_ephem as an xarray
+Dataset.  Vectors such as 'position_ecef' are indexed by time and
+component, and the spacecraft attitude 'sc_attitude_ecef' by time,
+spacecraft axis and component.
+
+"""
+
+from __future__ import print_function
+from __future__ import absolute_import
+import functools
+
+from pysatMissions.instruments import _core as mcore
+from pysatMissions.instruments import pysat_ephem
+
+# pysat required parameters
+platform = 'pysat'
+name = 'ephem_xarray'
+# dictionary of data 'tags' and corresponding description
+tags = pysat_ephem.tags
+# dictionary of satellite IDs, list of corresponding tags
+sat_ids = pysat_ephem.sat_ids
+_test_dates = pysat_ephem._test_dates
+pandas_format = False
+
+init = pysat_ephem.init
+
+
+def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
+         TLE1=None, TLE2=None, outputs=None, model_backend=None,
+         field_backend=None, sampler=None, catalog=None, satnum=None,
+         tle_block=24., interpolator=None, attitude=None, step=1.):
+    """
+    Returns data and metadata in the format required by pysat. Generates
+    position of satellite in both geographic and ECEF co-ordinates.
+
+    Routine is directly called by pysat and not the user.  Parameters are
+    those of `pysat_ephem.load`, which is run with `data_format='xarray'`.
+    Custom functions are attached one at a time, so `executor` and `store`
+    are not available.
+
+    Returns
+    -------
+    data : (xarray.Dataset)
+        Object containing satellite data
+    meta : (pysat.Meta)
+        Object containing metadata such as column names and units
+
+    """
+
+    return pysat_ephem.load(fnames, tag=tag, sat_id=sat_id,
+                            obs_long=obs_long, obs_lat=obs_lat,
+                            obs_alt=obs_alt, TLE1=TLE1, TLE2=TLE2,
+                            outputs=outputs, model_backend=model_backend,
+                            field_backend=field_backend,
+                            data_format='xarray', sampler=sampler,
+                            catalog=catalog, satnum=satnum,
+                            tle_block=tle_block, interpolator=interpolator,
+                            attitude=attitude, step=step)
+
+
+list_files = functools.partial(mcore._list_files)
+download = functools.partial(mcore._download)
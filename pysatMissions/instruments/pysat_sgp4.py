@@ -9,7 +9,7 @@ from __future__ import print_function
 from __future__ import absolute_import
 import datetime as dt
 import functools
-import pandas as pds
+import numpy as np
 
 import pysat
 
@@ -32,11 +32,13 @@ def init(self):
 
     """
 
-    pass
+    mcore._check_data_format(self)
 
 
 def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
-         TLE1=None, TLE2=None):
+         TLE1=None, TLE2=None, data_format='pandas', sampler=None,
+         catalog=None, satnum=None, tle_block=24., interpolator=None,
+         step=1.):
     """
     Returns data and metadata in the format required by pysat. Generates
     position of satellite in ECI co-ordinates.
@@ -66,10 +68,37 @@ def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
         First string for Two Line Element. Must be in TLE format
     TLE2 : string
         Second string for Two Line Element. Must be in TLE format
+    data_format : string
+        'pandas' returns a DataFrame with a column for each vector
+        component.  'xarray' returns a Dataset with 'position_eci' and
+        'velocity_eci' vectors indexed by time and component, and is set by
+        the `pysat_sgp4_xarray` module. (default='pandas')
+    sampler : methods.sampling.AdaptiveSampler or NoneType
+        If given, the orbit is sampled at a coarse cadence and refined
+        inside the regions of the sampler.  If None, samples every `step`
+        seconds. (default=None)
+    catalog : catalog.TLECatalog, string or NoneType
+        If given, each block of times uses the element set of this catalog
+        with the closest epoch, instead of TLE1 and TLE2.  May be the name
+        of a TLE or 3LE file, read once and cached. (default=None)
+    satnum : int or NoneType
+        Catalog number of the object in the catalog.  May be None if the
+        catalog holds a single object. (default=None)
+    tle_block : float
+        Length of the blocks of time sharing an element set of the catalog
+        (hours) (default=24.)
+    interpolator : methods.interpolation.Interpolator or NoneType
+        If given, the orbit is propagated at the nodes of the interpolator,
+        and the position and velocity are interpolated to the sample times
+        from the propagated position and velocity.  The error at a few
+        times between nodes is kept in its `last_error`. (default=None)
+    step : float
+        Time between samples (seconds).  Not used with a `sampler`, whose
+        `fine_step` sets the times. (default=1.)
 
     Returns
     -------
-    data : (pandas.DataFrame)
+    data : (pandas.DataFrame or xarray.Dataset)
         Object containing satellite data
     meta : (pysat.Meta)
         Object containing metadata such as column names and units
@@ -100,36 +129,38 @@ def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
     if TLE2 is not None:
         line2 = TLE2
 
-    # create satellite from TLEs and assuming a gravity model
-    # according to module webpage, wgs72 is common
-    satellite = twoline2rv(line1, line2, wgs72)
-
-    # Extract list of times from filenames and sat_id
-    times = mcore._get_times(fnames, sat_id)
-
-    # create list to hold satellite position, velocity
-    position = []
-    velocity = []
-    for timestep in times:
-        # orbit propagator - computes x,y,z position and velocity
-        pos, vel = satellite.propagate(timestep.year, timestep.month,
-                                       timestep.day, timestep.hour,
-                                       timestep.minute, timestep.second)
-        position.extend(pos)
-        velocity.extend(vel)
-
-    # put data into DataFrame
-    data = pds.DataFrame({'position_eci_x': position[::3],
-                          'position_eci_y': position[1::3],
-                          'position_eci_z': position[2::3],
-                          'velocity_eci_x': velocity[::3],
-                          'velocity_eci_y': velocity[1::3],
-                          'velocity_eci_z': velocity[2::3]},
-                         index=times)
-    data.index.name = 'Epoch'
+    def propagate(times):
+        # arrays to hold satellite position, velocity
+        position = np.empty((len(times), 3))
+        velocity = np.empty((len(times), 3))
+        for index, tle1, tle2 in mcore._tle_groups(times, line1, line2,
+                                                   catalog=catalog,
+                                                   satnum=satnum,
+                                                   tle_block=tle_block):
+            # create satellite from TLEs and assuming a gravity model
+            # according to module webpage, wgs72 is common
+            satellite = twoline2rv(tle1, tle2, wgs72)
+            for i, timestep in zip(index, times[index]):
+                # orbit propagator - computes x,y,z position and velocity
+                position[i], velocity[i] = \
+                    satellite.propagate(timestep.year, timestep.month,
+                                        timestep.day, timestep.hour,
+                                        timestep.minute, timestep.second
+                                        + timestep.microsecond * 1.e-6)
+        return [('position_eci', position), ('velocity_eci', velocity)]
+
+    # Extract list of times from filenames and sat_id, and propagate
+    times, variables = mcore._sample_times(
+        fnames, sat_id, propagate, sampler=sampler, interpolator=interpolator,
+        rates={'position_eci': 'velocity_eci'}, step=step)
+
+    data = mcore._build_data(times, variables, data_format=data_format)
 
     # TODO: add call for GEI/ECEF translation here
 
+    if data_format == 'xarray':
+        return data, xarray_meta.copy()
+
     return data, meta.copy()
 
 
@@ -168,3 +199,16 @@ meta['velocity_eci_y'] = {'units': 'km/s',
 meta['velocity_eci_z'] = {'units': 'km/s',
                           'desc': 'Satellite velocity along ECI-z',
                           'long_name': 'Satellite velocity ECI-z'}
+
+# metadata of the vectors in xarray data
+xarray_meta = meta.copy()
+xarray_meta.drop(['position_eci_x', 'position_eci_y', 'position_eci_z',
+                  'velocity_eci_x', 'velocity_eci_y', 'velocity_eci_z'])
+xarray_meta['position_eci'] = {'units': 'km',
+                               'long_name': 'ECI position',
+                               'desc': 'Earth Centered Inertial position ' +
+                               'of satellite.'}
+xarray_meta['velocity_eci'] = {'units': 'km/s',
+                               'long_name': 'Satellite velocity ECI',
+                               'desc': 'Satellite velocity in Earth ' +
+                               'Centered Inertial basis'}
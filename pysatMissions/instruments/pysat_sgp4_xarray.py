@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Produces the satellite orbit data of pysat_sgp4 as an xarray Dataset. The
+'position_eci' and 'velocity_eci' vectors are indexed by time and
+component.
+
+"""
+
+from __future__ import print_function
+from __future__ import absolute_import
+import functools
+
+from pysatMissions.instruments import _core as mcore
+from pysatMissions.instruments import pysat_sgp4
+
+# pysat required parameters
+platform = 'pysat'
+name = 'sgp4_xarray'
+# dictionary of data 'tags' and corresponding description
+tags = pysat_sgp4.tags
+# dictionary of satellite IDs, list of corresponding tags
+sat_ids = pysat_sgp4.sat_ids
+_test_dates = pysat_sgp4._test_dates
+pandas_format = False
+
+init = pysat_sgp4.init
+
+
+def load(fnames, tag=None, sat_id=None, obs_long=0., obs_lat=0., obs_alt=0.,
+         TLE1=None, TLE2=None, sampler=None, catalog=None, satnum=None,
+         tle_block=24., interpolator=None, step=1.):
+    """
+    Returns data and metadata in the format required by pysat. Generates
+    position of satellite in ECI co-ordinates.
+
+    Routine is directly called by pysat and not the user.  Parameters are
+    those of `pysat_sgp4.load`, which is run with `data_format='xarray'`.
+
+    Returns
+    -------
+    data : (xarray.Dataset)
+        Object containing satellite data
+    meta : (pysat.Meta)
+        Object containing metadata such as column names and units
+
+    """
+
+    return pysat_sgp4.load(fnames, tag=tag, sat_id=sat_id, obs_long=obs_long,
+                           obs_lat=obs_lat, obs_alt=obs_alt, TLE1=TLE1,
+                           TLE2=TLE2, data_format='xarray', sampler=sampler,
+                           catalog=catalog, satnum=satnum,
+                           tle_block=tle_block, interpolator=interpolator,
+                           step=step)
+
+
+list_files = functools.partial(mcore._list_files)
+download = functools.partial(mcore._download)
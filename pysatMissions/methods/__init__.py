@@ -3,8 +3,26 @@ pysatMissions.methods is a module that provides
 the methods to interface with numerous empirical model packages
 """
 
-from pysatMissions.methods import empirical
-from pysatMissions.methods import magcoord
-from pysatMissions.methods import spacecraft
+import sys
 
-__all__ = ['empirical', 'magcoord', 'spacecraft']
+from pysatMissions._lazy import lazy_submodules
+
+__all__ = ['attitude', 'binning', 'cache', 'chain', 'contexts', 'coverage',
+           'empirical', 'interpolation', 'lineofsight', 'magcoord', 'sampling',
+           'spacecraft']
+
+__getattr__, __dir__ = lazy_submodules(__name__, __all__)
+
+if sys.version_info < (3, 7):
+    from pysatMissions.methods import attitude
+    from pysatMissions.methods import binning
+    from pysatMissions.methods import cache
+    from pysatMissions.methods import chain
+    from pysatMissions.methods import contexts
+    from pysatMissions.methods import coverage
+    from pysatMissions.methods import empirical
+    from pysatMissions.methods import interpolation
+    from pysatMissions.methods import lineofsight
+    from pysatMissions.methods import magcoord
+    from pysatMissions.methods import sampling
+    from pysatMissions.methods import spacecraft
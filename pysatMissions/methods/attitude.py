@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""Provides spacecraft attitude in several pointing modes, stored compactly
+as quaternions, and vectorized rotations between the ECEF and spacecraft
+frames.
+
+An attitude is either a (time, 3, 3) array, where element [:, i, j] is the
+ECEF j component of the spacecraft i axis, or a (time, 4) array of the
+quaternions (w, x, y, z) of that rotation.  Either form rotates ECEF vectors
+into the spacecraft frame.
+
+"""
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions import _kernels
+from pysatMissions.methods import spacecraft as mm_sc
+
+# pointing modes supported by `add_attitude`
+modes = ['ram', 'nadir', 'sun', 'inertial', 'quaternion']
+
+# labels of the quaternion components of the attitude
+quaternion_labels = ['sc_quat_w', 'sc_quat_x', 'sc_quat_y', 'sc_quat_z']
+
+
+def matrix_from_quaternion(quaternion):
+    """
+    Rotation matrices of quaternions.
+
+    Parameters
+    ----------
+    quaternion : array_like
+        Quaternions (w, x, y, z) with shape (time, 4).  Quaternions need not
+        be normalized.
+
+    Returns
+    -------
+    np.array
+        Rotation matrices with shape (time, 3, 3)
+
+    """
+
+    quaternion = np.asarray(quaternion, dtype=float)
+    quaternion = quaternion / np.linalg.norm(quaternion, axis=-1,
+                                             keepdims=True)
+    w, x, y, z = quaternion.T
+
+    matrix = np.empty((len(quaternion), 3, 3))
+    matrix[:, 0, 0] = 1. - 2. * (y * y + z * z)
+    matrix[:, 0, 1] = 2. * (x * y - z * w)
+    matrix[:, 0, 2] = 2. * (x * z + y * w)
+    matrix[:, 1, 0] = 2. * (x * y + z * w)
+    matrix[:, 1, 1] = 1. - 2. * (x * x + z * z)
+    matrix[:, 1, 2] = 2. * (y * z - x * w)
+    matrix[:, 2, 0] = 2. * (x * z - y * w)
+    matrix[:, 2, 1] = 2. * (y * z + x * w)
+    matrix[:, 2, 2] = 1. - 2. * (x * x + y * y)
+
+    return matrix
+
+
+def quaternion_from_matrix(matrix):
+    """
+    Quaternions of rotation matrices.
+
+    Parameters
+    ----------
+    matrix : array_like
+        Rotation matrices with shape (time, 3, 3)
+
+    Returns
+    -------
+    np.array
+        Unit quaternions (w, x, y, z) with shape (time, 4) and w >= 0.
+        Samples where the matrix is not finite are NaN.
+
+    """
+
+    matrix = np.asarray(matrix, dtype=float)
+    trace = np.trace(matrix, axis1=1, axis2=2)
+    diagonal = np.stack([trace, matrix[:, 0, 0], matrix[:, 1, 1],
+                         matrix[:, 2, 2]], axis=-1)
+    # use the largest component as the pivot, for accuracy at all angles
+    finite = np.isfinite(diagonal).all(axis=-1)
+    pivot = np.zeros(len(matrix), dtype=int)
+    pivot[finite] = np.argmax(diagonal[finite], axis=-1)
+    m = matrix
+
+    quaternion = np.full((len(matrix), 4), np.nan)
+    for index, columns in enumerate([
+            (1. + trace, m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0],
+             m[:, 1, 0] - m[:, 0, 1]),
+            (m[:, 2, 1] - m[:, 1, 2], 1. + 2. * m[:, 0, 0] - trace,
+             m[:, 0, 1] + m[:, 1, 0], m[:, 0, 2] + m[:, 2, 0]),
+            (m[:, 0, 2] - m[:, 2, 0], m[:, 0, 1] + m[:, 1, 0],
+             1. + 2. * m[:, 1, 1] - trace, m[:, 1, 2] + m[:, 2, 1]),
+            (m[:, 1, 0] - m[:, 0, 1], m[:, 0, 2] + m[:, 2, 0],
+             m[:, 1, 2] + m[:, 2, 1], 1. + 2. * m[:, 2, 2] - trace)]):
+        select = finite & (pivot == index)
+        quaternion[select] = np.stack(columns, axis=-1)[select]
+
+    quaternion /= np.linalg.norm(quaternion, axis=-1, keepdims=True)
+    quaternion *= np.where(quaternion[:, :1] < 0., -1., 1.)
+
+    return quaternion
+
+
+def rotate(attitude, vectors, inverse=False):
+    """
+    Rotates vectors from the ECEF frame into the spacecraft frame.
+
+    Parameters
+    ----------
+    attitude : array_like
+        Attitude as (time, 3, 3) rotation matrices or (time, 4) unit
+        quaternions
+    vectors : array_like
+        Vectors with shape (time, 3)
+    inverse : bool
+        If True, rotates spacecraft frame vectors into the ECEF frame
+        (default=False)
+
+    Returns
+    -------
+    np.array
+        Rotated vectors with shape (time, 3)
+
+    """
+
+    attitude = np.asarray(attitude, dtype=float)
+    vectors = np.asarray(vectors, dtype=float)
+
+    if attitude.ndim == 3:
+        if inverse:
+            return np.einsum('nji,nj->ni', attitude, vectors)
+        return np.einsum('nij,nj->ni', attitude, vectors)
+
+    # v' = v + 2 w (u x v) + 2 u x (u x v), with u the vector part
+    w = attitude[:, :1]
+    u = attitude[:, 1:]
+    if inverse:
+        u = -u
+    twice = 2. * np.cross(u, vectors)
+
+    return vectors + w * twice + np.cross(u, twice)
+
+
+def slerp(times, sample_times, quaternions):
+    """
+    Interpolates quaternions along the shortest rotation between samples.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Times of the interpolated quaternions
+    sample_times : array_like of datetimes
+        Increasing times of the quaternion samples
+    quaternions : array_like
+        Quaternions (w, x, y, z) at the sample times, with shape
+        (samples, 4)
+
+    Returns
+    -------
+    np.array
+        Unit quaternions with shape (time, 4).  Times outside the samples
+        use the first or last sample.
+
+    """
+
+    secs = np.asarray(pds.DatetimeIndex(times), dtype='datetime64[ns]'
+                      ).astype(np.int64) * 1.e-9
+    sample_secs = np.asarray(pds.DatetimeIndex(sample_times),
+                             dtype='datetime64[ns]').astype(np.int64) * 1.e-9
+    quaternions = np.asarray(quaternions, dtype=float)
+    quaternions = quaternions / np.linalg.norm(quaternions, axis=-1,
+                                               keepdims=True)
+    if len(quaternions) == 1:
+        return np.repeat(quaternions, len(secs), axis=0)
+
+    index = np.clip(np.searchsorted(sample_secs, secs, side='right') - 1, 0,
+                    len(sample_secs) - 2)
+    fraction = np.clip((secs - sample_secs[index])
+                       / (sample_secs[index + 1] - sample_secs[index]),
+                       0., 1.)[:, np.newaxis]
+    first = quaternions[index]
+    second = quaternions[index + 1]
+    dot = np.sum(first * second, axis=-1, keepdims=True)
+    # q and -q are the same rotation, so take the shorter path
+    second = np.where(dot < 0., -second, second)
+    dot = np.abs(dot)
+
+    angle = np.arccos(np.clip(dot, -1., 1.))
+    sin_angle = np.sin(angle)
+    # nearly equal quaternions are interpolated linearly
+    linear = sin_angle < 1.e-8
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight_first = np.where(linear, 1. - fraction,
+                                np.sin((1. - fraction) * angle) / sin_angle)
+        weight_second = np.where(linear, fraction,
+                                 np.sin(fraction * angle) / sin_angle)
+    result = weight_first * first + weight_second * second
+
+    return result / np.linalg.norm(result, axis=-1, keepdims=True)
+
+
+def _eci_to_ecef(times):
+    """Rotation matrices from the inertial to the Earth fixed frame"""
+
+    gmst = mm_sc._gmst(times)
+    matrix = np.zeros((len(gmst), 3, 3))
+    matrix[:, 0, 0] = np.cos(gmst)
+    matrix[:, 0, 1] = np.sin(gmst)
+    matrix[:, 1, 0] = -np.sin(gmst)
+    matrix[:, 1, 1] = np.cos(gmst)
+    matrix[:, 2, 2] = 1.
+
+    return matrix
+
+
+def pointing_attitude(times, position, velocity=None, mode='ram',
+                      quaternions=None, frame='eci'):
+    """
+    Attitude of a spacecraft in a pointing mode.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Sample times
+    position : array_like
+        ECEF position (km) with shape (time, 3)
+    velocity : array_like or NoneType
+        ECEF velocity with shape (time, 3), needed by the 'ram' and 'nadir'
+        modes (default=None)
+    mode : string
+        'ram' points x along the velocity and z as close to nadir as
+        possible.  'nadir' points z at nadir and x as close to the velocity
+        as possible.  'sun' points x at the Sun and z as close to nadir as
+        possible.  'inertial' holds a fixed attitude in the inertial frame,
+        and 'quaternion' follows a quaternion history. (default='ram')
+    quaternions : pds.DataFrame, array_like or NoneType
+        Attitude used by the 'inertial' mode, as a single quaternion
+        (w, x, y, z), or the history used by the 'quaternion' mode, as a
+        DataFrame indexed by time with 'w', 'x', 'y' and 'z' columns.
+        History samples are interpolated to the sample times by `slerp`.
+        (default=None)
+    frame : string
+        Frame the quaternions rotate into the spacecraft frame, 'eci' for
+        the inertial frame or 'ecef' (default='eci')
+
+    Returns
+    -------
+    np.array
+        Attitude with shape (time, 3, 3)
+
+    """
+
+    if mode not in modes:
+        raise ValueError('Unknown attitude mode: {:}'.format(mode))
+    if frame not in ['eci', 'ecef']:
+        raise ValueError('Unknown attitude frame: {:}'.format(frame))
+
+    position = np.asarray(position, dtype=float)
+    if mode in ['ram', 'nadir'] and velocity is None:
+        raise ValueError('The {:s} mode needs the velocity.'.format(mode))
+
+    if mode == 'ram':
+        attitude = _kernels.attitude_basis(position, velocity)
+        mm_sc._check_attitude(attitude, [position, velocity])
+    elif mode == 'nadir':
+        # the ram basis shares y, and x completes the basis around nadir
+        attitude = _kernels.attitude_basis(position, velocity)
+        mm_sc._check_attitude(attitude, [position, velocity])
+        attitude[:, 2] = position / -np.linalg.norm(position, axis=-1,
+                                                    keepdims=True)
+        attitude[:, 0] = np.cross(attitude[:, 1], attitude[:, 2])
+    elif mode == 'sun':
+        sun = mm_sc._sun_position_ecef(times) - position
+        attitude = _kernels.attitude_basis(position, sun)
+        mm_sc._check_attitude(attitude, [position, sun])
+    else:
+        if quaternions is None:
+            raise ValueError('The {:s} mode needs quaternions.'.format(mode))
+        if mode == 'inertial':
+            quaternions = np.asarray(quaternions, dtype=float).reshape(1, 4)
+            quaternion = np.repeat(quaternions, len(position), axis=0)
+        else:
+            quaternion = slerp(times, quaternions.index,
+                               quaternions[['w', 'x', 'y', 'z']].values)
+        attitude = matrix_from_quaternion(quaternion)
+        if frame == 'eci':
+            # rotate ECEF vectors into the inertial frame first
+            attitude = np.einsum('nij,nkj->nik', attitude,
+                                 _eci_to_ecef(times))
+
+    return attitude
+
+
+def add_attitude(inst, mode='ram', quaternions=None, frame='eci'):
+    """
+    Adds the spacecraft attitude in a pointing mode, stored as quaternions.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object, including 'position_ecef_*' and, for the 'ram'
+        and 'nadir' modes, 'velocity_ecef_*' (*=x,y,z)
+    mode : string
+        Pointing mode, one of 'ram', 'nadir', 'sun', 'inertial' or
+        'quaternion'.  See `pointing_attitude`. (default='ram')
+    quaternions : pds.DataFrame, array_like or NoneType
+        Fixed quaternion of the 'inertial' mode, or the history of the
+        'quaternion' mode (default=None)
+    frame : string
+        Frame the quaternions rotate into the spacecraft frame, 'eci' or
+        'ecef' (default='eci')
+
+    Returns
+    -------
+    None
+        Modifies the instrument in place to include 'sc_quat_w', 'sc_quat_x',
+        'sc_quat_y' and 'sc_quat_z', the quaternion rotating ECEF vectors
+        into the spacecraft frame.  For xarray data, the quaternion is
+        stored as 'sc_attitude_quat' with dimensions (time, quaternion).
+        Functions projecting vectors onto the spacecraft frame, such as
+        `spacecraft.project_ecef_vector_onto_sc`, use this attitude when
+        the attitude vectors of `add_ram_pointing_sc_attitude_vectors` are
+        not present.
+
+    Example
+    -------
+        inst.custom.attach(add_attitude, kwargs={'mode': 'sun'})
+
+    """
+
+    position = mm_sc._get_vector(inst, ['position_ecef_x', 'position_ecef_y',
+                                        'position_ecef_z'])
+    velocity = None
+    if mode in ['ram', 'nadir']:
+        velocity = mm_sc._get_vector(inst, ['velocity_ecef_x',
+                                            'velocity_ecef_y',
+                                            'velocity_ecef_z'])
+
+    attitude = pointing_attitude(inst.index, position, velocity=velocity,
+                                 mode=mode, quaternions=quaternions,
+                                 frame=frame)
+    quaternion = quaternion_from_matrix(attitude)
+
+    desc = ' '.join(('Quaternion rotating ECEF vectors into the S/C frame,',
+                     '{:s} pointing'.format(mode)))
+    if inst.pandas_format:
+        for i, label in enumerate(quaternion_labels):
+            inst[label] = quaternion[:, i]
+            inst.meta[label] = {'units': '',
+                                'desc': '{:s}, {:s}-component'.format(
+                                    desc, label[-1])}
+    else:
+        if 'quaternion' not in inst.data.coords:
+            inst.data.coords['quaternion'] = ['w', 'x', 'y', 'z']
+        inst.data['sc_attitude_quat'] = (('time', 'quaternion'), quaternion)
+        inst.meta['sc_attitude_quat'] = {'units': '', 'desc': desc}
+
+    return
+
+
+def get_attitude(inst):
+    """
+    Returns the stored spacecraft attitude as quaternions.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including the attitude from `add_attitude` or
+        `spacecraft.add_ram_pointing_sc_attitude_vectors`
+
+    Returns
+    -------
+    np.array
+        Unit quaternions (w, x, y, z) with shape (time, 4)
+
+    """
+
+    if not inst.pandas_format and 'sc_attitude_quat' in inst.data:
+        return np.asarray(inst.data['sc_attitude_quat'].values, dtype=float)
+    if inst.pandas_format and quaternion_labels[0] in inst.data:
+        return mm_sc._get_vector(inst, quaternion_labels)
+
+    return quaternion_from_matrix(mm_sc._get_attitude(inst))
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""Provides streaming binned statistics of simulated variables, such as a
+climatology of ion density binned by magnetic latitude, local time and
+altitude over many months.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions import _files
+
+
+def bin_index(values, edges):
+    """
+    Bin number of each value along one dimension.
+
+    Parameters
+    ----------
+    values : array_like
+        Values to bin
+    edges : array_like
+        Increasing bin edges
+
+    Returns
+    -------
+    np.array
+        Bin number of each value, or -1 outside the edges.  Each bin
+        includes its lower edge, and the last bin its upper edge as well,
+        as in np.histogramdd.
+
+    """
+
+    values = np.asarray(values, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    index = np.searchsorted(edges, values, side='right') - 1
+    index[values == edges[-1]] = len(edges) - 2
+
+    return np.where((index >= 0) & (index < len(edges) - 1), index, -1)
+
+
+class BinnedStatistics(object):
+    """
+    Accumulates the count, mean, variance, minimum and maximum of variables
+    in bins, without keeping the samples.
+
+    Parameters
+    ----------
+    bins : dict
+        Bin edges, keyed by the variable binned along, such as
+        {'qd_lat': np.arange(-90, 91, 5), 'mlt': np.arange(0, 25, 1)}.
+        Each bin includes its lower edge, and the last bin its upper edge as
+        well.  Samples outside the edges are dropped.
+    variables : list of strings
+        Variables to summarize
+
+    Attributes
+    ----------
+    labels : list of strings
+        Variables binned along, in the order of the bin dimensions
+    edges : list of np.arrays
+        Bin edges along each dimension
+    count : np.array
+        Number of finite samples of each variable in each bin, with shape
+        (variable, bin dimensions)
+    mean, minimum, maximum : np.array
+        Running statistics of each variable in each bin, NaN where the bin
+        is empty
+
+    Note
+    ----
+    The mean and variance are updated with the pairwise algorithm of Chan,
+    Golub and LeVeque, so accumulators filled by separate workers may be
+    combined with `merge` to give the same result as a single accumulator.
+    Memory use is set by the number of bins, not the number of samples.
+
+    Example
+    -------
+        clim = BinnedStatistics({'qd_lat': np.arange(-90, 91, 5),
+                                 'mlt': np.arange(0, 25, 1)},
+                                ['ion_dens', 'B_sc_x'])
+        inst.custom.attach(accumulate_binned_statistics,
+                           kwargs={'accumulator': clim})
+        for day in inst:
+            pass
+        clim.save('climatology.npz')
+
+    """
+
+    def __init__(self, bins, variables):
+
+        self.labels = list(bins.keys())
+        self.edges = [np.asarray(bins[label], dtype=float)
+                      for label in self.labels]
+        for label, edges in zip(self.labels, self.edges):
+            if edges.ndim != 1 or len(edges) < 2 or np.any(np.diff(edges)
+                                                           <= 0.):
+                raise ValueError(' '.join(('Bin edges must be increasing:',
+                                           label)))
+        self.variables = list(variables)
+
+        shape = (len(self.variables),) + self.shape
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.full(shape, np.nan)
+        self._m2 = np.zeros(shape)
+        self.minimum = np.full(shape, np.nan)
+        self.maximum = np.full(shape, np.nan)
+
+        return
+
+    @property
+    def shape(self):
+        """Number of bins along each dimension"""
+        return tuple(len(edges) - 1 for edges in self.edges)
+
+    @property
+    def centers(self):
+        """Bin centers along each dimension"""
+        return [0.5 * (edges[1:] + edges[:-1]) for edges in self.edges]
+
+    @property
+    def variance(self):
+        """Sample variance of each variable in each bin, NaN where the bin
+        holds fewer than two samples"""
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > 1, self._m2 / (self.count - 1),
+                            np.nan)
+
+    def _bin_index(self, data):
+        """Flat bin number of each sample, -1 outside the bins"""
+
+        flat = None
+        valid = None
+        for label, edges in zip(self.labels, self.edges):
+            index = bin_index(data[label], edges)
+            inside = index >= 0
+            if flat is None:
+                flat = np.zeros(index.shape, dtype=np.int64)
+                valid = np.ones(index.shape, dtype=bool)
+            flat = flat * (len(edges) - 1) + np.where(inside, index, 0)
+            valid &= inside
+
+        return np.where(valid, flat, -1)
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        """Adds statistics of a partial sample, all with flat bins"""
+
+        own_count = self.count.reshape(count.shape)
+        own_mean = self.mean.reshape(count.shape)
+        own_m2 = self._m2.reshape(count.shape)
+
+        total = own_count + count
+        new = count > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = np.where(own_count > 0, mean - own_mean, 0.)
+            weight = np.where(new, count / total, 0.)
+        own_m2[new] += m2[new] + (delta[new] ** 2 * own_count[new]
+                                  * weight[new])
+        own_mean[new] = np.where(own_count[new] > 0,
+                                 own_mean[new] + delta[new] * weight[new],
+                                 mean[new])
+        own_count += count
+
+        shape = self.minimum.shape
+        self.minimum = np.fmin(self.minimum.reshape(count.shape),
+                               minimum).reshape(shape)
+        self.maximum = np.fmax(self.maximum.reshape(count.shape),
+                               maximum).reshape(shape)
+
+        return
+
+    def update(self, data):
+        """
+        Adds samples to the statistics.
+
+        Parameters
+        ----------
+        data : pds.DataFrame, xr.Dataset or dict
+            Samples of the variables binned along and the variables
+            summarized, such as `inst.data`.  Non-finite values of a
+            variable are ignored.
+
+        """
+
+        flat = self._bin_index(data)
+        if flat.size == 0:
+            return
+
+        num_bins = int(np.prod(self.shape))
+        shape = (len(self.variables), num_bins)
+        count = np.zeros(shape, dtype=np.int64)
+        mean = np.full(shape, np.nan)
+        m2 = np.zeros(shape)
+        minimum = np.full(shape, np.nan)
+        maximum = np.full(shape, np.nan)
+
+        for i, var in enumerate(self.variables):
+            values = np.asarray(data[var], dtype=float)
+            use = (flat >= 0) & np.isfinite(values)
+            bins = flat[use]
+            values = values[use]
+            if len(values) == 0:
+                continue
+
+            count[i] = np.bincount(bins, minlength=num_bins)
+            filled = count[i] > 0
+            total = np.bincount(bins, weights=values, minlength=num_bins)
+            mean[i, filled] = total[filled] / count[i, filled]
+            m2[i] = np.bincount(bins, weights=(values - mean[i, bins]) ** 2,
+                                minlength=num_bins)
+
+            low = np.full(num_bins, np.inf)
+            high = np.full(num_bins, -np.inf)
+            np.minimum.at(low, bins, values)
+            np.maximum.at(high, bins, values)
+            minimum[i, filled] = low[filled]
+            maximum[i, filled] = high[filled]
+
+        self._combine(count, mean, m2, minimum, maximum)
+
+        return
+
+    def merge(self, other):
+        """
+        Adds the statistics of another accumulator, such as one filled by a
+        parallel worker.
+
+        Parameters
+        ----------
+        other : BinnedStatistics
+            Accumulator with the same bins and variables
+
+        Returns
+        -------
+        BinnedStatistics
+            This accumulator, updated in place
+
+        """
+
+        if (other.labels != self.labels or other.variables != self.variables
+                or len(other.edges) != len(self.edges)
+                or not all(np.array_equal(mine, theirs) for mine, theirs
+                           in zip(self.edges, other.edges))):
+            raise ValueError('Accumulators must have the same bins and '
+                             'variables to be merged.')
+
+        shape = (len(self.variables), -1)
+        self._combine(other.count.reshape(shape), other.mean.reshape(shape),
+                      other._m2.reshape(shape),
+                      other.minimum.reshape(shape),
+                      other.maximum.reshape(shape))
+
+        return self
+
+    def summary(self):
+        """
+        Returns the statistics of every bin.
+
+        Returns
+        -------
+        pds.DataFrame
+            One row per bin with the bin center along each dimension, and
+            the count, mean, std, min and max of each variable, named with
+            a '_count', '_mean', '_std', '_min' or '_max' suffix
+
+        """
+
+        grids = np.meshgrid(*self.centers, indexing='ij')
+        columns = {}
+        for label, grid in zip(self.labels, grids):
+            columns[label] = grid.ravel()
+        std = np.sqrt(self.variance)
+        for i, var in enumerate(self.variables):
+            for stat, values in [('count', self.count), ('mean', self.mean),
+                                 ('std', std), ('min', self.minimum),
+                                 ('max', self.maximum)]:
+                columns['_'.join((var, stat))] = values[i].ravel()
+
+        return pds.DataFrame(columns)
+
+    def save(self, filename):
+        """
+        Writes the accumulator to a file, for checkpointing.
+
+        Parameters
+        ----------
+        filename : string
+            Output file, in the numpy npz format
+
+        """
+
+        filename = os.path.expanduser(filename)
+        arrays = {'labels': np.array(self.labels),
+                  'variables': np.array(self.variables),
+                  'count': self.count, 'mean': self.mean, 'm2': self._m2,
+                  'minimum': self.minimum, 'maximum': self.maximum}
+        for i, edges in enumerate(self.edges):
+            arrays['edges_{:d}'.format(i)] = edges
+
+        # write to a temporary file first, so a checkpoint is never partial
+        with _files.replace_file(filename) as tmp_file:
+            with open(tmp_file, 'wb') as fout:
+                np.savez(fout, **arrays)
+
+        return
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads an accumulator written by `save`.
+
+        Parameters
+        ----------
+        filename : string
+            File written by `save`
+
+        Returns
+        -------
+        BinnedStatistics
+            Accumulator holding the saved statistics
+
+        """
+
+        with np.load(os.path.expanduser(filename)) as saved:
+            labels = [str(label) for label in saved['labels']]
+            bins = dict((label, saved['edges_{:d}'.format(i)])
+                        for i, label in enumerate(labels))
+            accumulator = cls(bins, [str(var) for var in saved['variables']])
+            accumulator.count = saved['count']
+            accumulator.mean = saved['mean']
+            accumulator._m2 = saved['m2']
+            accumulator.minimum = saved['minimum']
+            accumulator.maximum = saved['maximum']
+
+        return accumulator
+
+
+def accumulate_binned_statistics(inst, accumulator):
+    """
+    Adds the loaded data to a binned statistics accumulator.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        instrument object including the variables binned along and the
+        variables summarized
+    accumulator : BinnedStatistics
+        accumulator updated in place with the loaded data
+
+    Returns
+    -------
+    None
+        Instrument data is not modified.
+
+    Example
+    -------
+        # function added below updates the accumulator upon every inst.load
+        clim = BinnedStatistics({'qd_lat': np.arange(-90, 91, 5)},
+                                ['ion_dens'])
+        inst.custom.attach(accumulate_binned_statistics,
+                           kwargs={'accumulator': clim})
+
+    """
+
+    if len(inst.index) == 0:
+        return
+
+    accumulator.update(inst.data)
+
+    return
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Provides a store of previously calculated variables, so that a model chain
+only recomputes the steps whose inputs or parameters have changed.
+
+"""
+
+import collections
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions import _files
+
+
+def _digest(data):
+    """Hexadecimal digest of bytes"""
+
+    return hashlib.sha1(data).hexdigest()
+
+
+def _token(obj):
+    """Stable text describing a step parameter, used to build cache keys
+
+    Containers, arrays and pandas objects are described by their contents,
+    functions and classes by their full name, and other objects by their type
+    and attributes.  Objects whose value does not affect the results, such
+    as model pools, may define a `_cache_token` method returning their
+    description.  Raises a TypeError for objects that cannot be described.
+
+    """
+
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+        return repr(obj)
+    elif isinstance(obj, np.generic):
+        return repr(obj.item())
+    elif isinstance(obj, dict):
+        return '{' + ','.join(sorted(':'.join((_token(key), _token(value)))
+                                     for key, value in obj.items())) + '}'
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = [_token(item) for item in obj]
+        if isinstance(obj, (set, frozenset)):
+            items = sorted(items)
+        return '[' + ','.join(items) + ']'
+    elif isinstance(obj, np.ndarray):
+        return ':'.join((str(obj.dtype), str(obj.shape),
+                         _digest(np.ascontiguousarray(obj).tobytes())))
+    elif isinstance(obj, (pds.DataFrame, pds.Series, pds.Index)):
+        names = list(obj.columns) if isinstance(obj, pds.DataFrame) \
+            else [obj.name]
+        values = pds.util.hash_pandas_object(
+            obj, index=not isinstance(obj, pds.Index)).values
+        return ':'.join((type(obj).__name__, _token(names),
+                         _digest(values.tobytes())))
+    elif hasattr(obj, '_cache_token'):
+        return obj._cache_token()
+    elif isinstance(obj, functools.partial):
+        return 'partial' + _token([obj.func, obj.args, obj.keywords])
+    elif inspect.ismethod(obj):
+        # methods also depend on the object they are bound to
+        return _token(obj.__func__) + _token(obj.__self__)
+    elif isinstance(obj, type) or callable(obj) and hasattr(obj,
+                                                            '__qualname__'):
+        return '.'.join((getattr(obj, '__module__', ''), obj.__qualname__))
+
+    name = '.'.join((type(obj).__module__, type(obj).__qualname__))
+    if hasattr(obj, '__dict__') and not hasattr(obj, '__slots__'):
+        return name + _token(vars(obj))
+
+    # objects without attributes, such as datetimes
+    try:
+        return name + _digest(pickle.dumps(obj, protocol=4))
+    except Exception:
+        raise TypeError('Unable to build a cache key from {:}'.format(name))
+
+
+def hash_key(*parts):
+    """
+    Builds a cache key from step parameters and data.
+
+    Parameters
+    ----------
+    *parts : objects
+        Parameters describing the calculation.  DataFrames, Series and
+        arrays are hashed by their contents, including the index and column
+        names, and other objects by their attributes.
+
+    Returns
+    -------
+    string
+        Hexadecimal key
+
+    Raises
+    ------
+    TypeError
+        If a parameter cannot be described, such as an object that can not
+        be pickled or that refers to itself
+
+    """
+
+    sha = hashlib.sha1()
+    try:
+        for part in parts:
+            sha.update(_token(part).encode())
+            sha.update(b'|')
+    except RecursionError:
+        raise TypeError('Unable to build a cache key from a recursive object')
+
+    return sha.hexdigest()
+
+
+def step_key(step, data, date=None):
+    """
+    Builds the cache key of a chain step.
+
+    Parameters
+    ----------
+    step : dict
+        Step from `chain.make_step`
+    data : pandas.DataFrame
+        Input variables of the step
+    date : datetime or NoneType
+        Date of the loaded data (default=None)
+
+    Returns
+    -------
+    string
+        Key that changes whenever the function, its parameters or its
+        inputs change
+
+    """
+
+    return hash_key(step['func'], step['args'], step['kwargs'],
+                    step['outputs'], str(date), data)
+
+
+class ColumnStore(object):
+    """
+    Stores variables calculated by chain steps, keyed by `step_key`.
+
+    Parameters
+    ----------
+    directory : string or NoneType
+        If given, entries are also written to this directory, so they may be
+        reused by later sessions. (default=None)
+    maxsize : int or NoneType
+        Largest number of entries held in memory.  When full, the least
+        recently used entry is removed from memory.  Entries on disk are
+        kept.  If None, the number is not limited. (default=None)
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups that found and did not find an entry
+
+    Note
+    ----
+    Functions are identified by name, so the store should be cleared after
+    changing the code of a model.
+
+    Example
+    -------
+        store = ColumnStore(directory='~/sim_cache')
+        inst = pysat.Instrument(inst_module=pysat_ephem, store=store)
+
+    """
+
+    def __init__(self, directory=None, maxsize=None):
+
+        if directory is not None:
+            directory = os.path.expanduser(directory)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        self.directory = directory
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        return
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """
+        Returns a stored entry.
+
+        Parameters
+        ----------
+        key : string
+            Key from `step_key` or `hash_key`
+
+        Returns
+        -------
+        object or NoneType
+            Stored entry, or None if there is none or its file can't be read
+
+        """
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.directory is not None and os.path.isfile(self._filename(key)):
+            try:
+                with open(self._filename(key), 'rb') as fin:
+                    entry = pickle.load(fin)
+            except Exception:
+                # a damaged or removed entry is calculated again
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        """
+        Adds an entry to the store.
+
+        Parameters
+        ----------
+        key : string
+            Key from `step_key` or `hash_key`
+        entry : object
+            Picklable entry, such as a tuple of calculated data and metadata
+
+        """
+
+        self._remember(key, entry)
+        if self.directory is not None:
+            # write to a temporary file first, so readers never see a
+            # partial entry
+            with _files.replace_file(self._filename(key)) as tmp_file:
+                with open(tmp_file, 'wb') as fout:
+                    pickle.dump(entry, fout, protocol=pickle.HIGHEST_PROTOCOL)
+
+        return
+
+    def _remember(self, key, entry):
+        """Holds an entry in memory, removing old entries if needed"""
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return
+
+    def clear(self):
+        """Removes all entries from memory and disk"""
+
+        self._entries.clear()
+        if self.directory is not None:
+            for fname in os.listdir(self.directory):
+                if fname.endswith('.pkl'):
+                    os.remove(os.path.join(self.directory, fname))
+
+        return
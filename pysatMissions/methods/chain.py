@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+"""Provides routines for declaring the custom functions attached to an
+instrument as a chain of steps with known inputs and outputs.
+
+"""
+
+from concurrent import futures
+import warnings
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions.methods import cache as mm_cache
+from pysatMissions import profiling
+
+
+def make_step(func, inputs, outputs, args=None, kwargs=None, name=None):
+    """
+    Declares a custom function as a step of a model chain.
+
+    Parameters
+    ----------
+    func : function
+        Custom function, called as func(inst, *args, **kwargs)
+    inputs : list of strings
+        Variables read by the function
+    outputs : list of strings
+        Variables added to the instrument by the function
+    args : list or NoneType
+        Positional arguments passed to func after the instrument
+        (default=None)
+    kwargs : dict or NoneType
+        Keyword arguments passed to func (default=None)
+    name : string or NoneType
+        Name of the step.  If None, the function name is used. (default=None)
+
+    Returns
+    -------
+    dict
+        Step with keys 'name', 'func', 'args', 'kwargs', 'inputs' and
+        'outputs'
+
+    """
+
+    if name is None:
+        name = func.__name__
+
+    return {'name': name, 'func': func,
+            'args': [] if args is None else list(args),
+            'kwargs': {} if kwargs is None else dict(kwargs),
+            'inputs': list(inputs), 'outputs': list(outputs)}
+
+
+def resolve_steps(steps, outputs, available=None):
+    """
+    Selects the steps needed to produce a set of variables.
+
+    Parameters
+    ----------
+    steps : list of dicts
+        Steps of the full chain, from `make_step`, in the order they run
+    outputs : list of strings
+        Variables requested by the user
+    available : list of strings or NoneType
+        Variables that exist before the chain runs, such as the output of the
+        load routine. (default=None)
+
+    Returns
+    -------
+    list of dicts
+        Minimal subset of `steps` that produces `outputs`, including the
+        steps they depend on, in the original order
+
+    Raises
+    ------
+    ValueError
+        If a requested variable, or an input of a needed step, is neither
+        available nor produced by any step
+
+    """
+
+    available = set() if available is None else set(available)
+
+    # first step producing each variable
+    producers = {}
+    for i, step in enumerate(steps):
+        for output in step['outputs']:
+            producers.setdefault(output, i)
+
+    selected = set()
+    needed = [(output, None) for output in outputs]
+    while len(needed) > 0:
+        var, parent = needed.pop()
+        if var in available:
+            continue
+        if var not in producers:
+            if parent is None:
+                estr = 'No step produces requested variable {:}'.format(var)
+            else:
+                estr = ' '.join(('Input {:} of step {:} is not available',
+                                 'or produced by any step'))
+                estr = estr.format(var, parent)
+            raise ValueError(estr)
+        i = producers[var]
+        if i not in selected:
+            selected.add(i)
+            needed.extend([(item, steps[i]['name'])
+                           for item in steps[i]['inputs']])
+
+    return [steps[i] for i in sorted(selected)]
+
+
+def attach_steps(inst, steps):
+    """
+    Attaches the custom function of each step to an instrument.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object
+    steps : list of dicts
+        Steps from `make_step`, in the order they should run
+
+    """
+
+    for step in steps:
+        inst.custom.attach(step['func'], args=step['args'],
+                           kwargs=step['kwargs'])
+
+    return
+
+
+def set_step_kwargs(steps, name, kwargs):
+    """
+    Changes keyword arguments of a step.
+
+    Parameters
+    ----------
+    steps : list of dicts
+        Steps from `make_step`
+    name : string
+        Name of the step to change
+    kwargs : dict
+        Keyword arguments to add to, or replace in, the step
+
+    Returns
+    -------
+    list of dicts
+        Copy of `steps` with the keyword arguments of the step changed.  The
+        input steps are not modified.
+
+    """
+
+    if name not in [step['name'] for step in steps]:
+        raise ValueError('Unknown step: {:}'.format(name))
+
+    new_steps = []
+    for step in steps:
+        if step['name'] == name:
+            step = dict(step)
+            step['kwargs'] = dict(step['kwargs'], **kwargs)
+        new_steps.append(step)
+
+    return new_steps
+
+
+def step_dependencies(steps):
+    """
+    Builds the dependency graph of a chain of steps.
+
+    Parameters
+    ----------
+    steps : list of dicts
+        Steps from `make_step`, in the order they should run
+
+    Returns
+    -------
+    list of sets
+        For each step, the indices of the earlier steps that must finish
+        first, because they produce one of its inputs or write one of the
+        same outputs
+
+    """
+
+    deps = []
+    for i, step in enumerate(steps):
+        needs = set(step['inputs'])
+        writes = set(step['outputs'])
+        deps.append(set([j for j in range(i)
+                         if len(needs.intersection(steps[j]['outputs'])) > 0
+                         or len(writes.intersection(steps[j]['outputs']))
+                         > 0]))
+
+    return deps
+
+
+class _StepContext(object):
+    """Stand-in for an Instrument holding only the inputs of a single step
+
+    Supports the subset of the Instrument interface used by custom functions,
+    so that a step can run in a worker thread or process without sharing the
+    Instrument.
+
+    """
+
+    def __init__(self, data, date=None):
+
+        self.data = data
+        self.date = date
+        self.meta = {}
+        self.pandas_format = True
+
+        return
+
+    @property
+    def index(self):
+        return self.data.index
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.data[key[1]].iloc[key[0]]
+        return self.data[key]
+
+    def __setitem__(self, key, new):
+        if isinstance(key, tuple):
+            if key[1] not in self.data:
+                self.data[key[1]] = np.nan
+            self.data.iloc[key[0], self.data.columns.get_loc(key[1])] = new
+        elif isinstance(new, pds.DataFrame):
+            for label in key:
+                self.data[label] = new[label]
+        else:
+            self.data[key] = new
+
+        return
+
+
+def _copy_params(value):
+    """Copies the lists, tuples and dicts of step parameters
+
+    Other objects, such as model backends, are shared with the step.
+
+    """
+
+    if isinstance(value, dict):
+        return {key: _copy_params(item) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [_copy_params(item) for item in value]
+    elif type(value) is tuple:
+        return tuple(_copy_params(item) for item in value)
+
+    return value
+
+
+def _run_step(step, data, date, track_memory=None):
+    """Runs one step on its inputs, returning new variables and metadata
+
+    If `track_memory` is not None, the step is timed by a profiler in the
+    worker, and its records are returned as well.
+
+    """
+
+    func = step['func']
+    if track_memory is not None:
+        profiler = profiling.Profiler(track_memory=track_memory)
+        func = profiler.wrap(func, name=step['name'])
+
+    inputs = list(data.columns)
+    context = _StepContext(data, date=date)
+    # copied so the step cannot change the parameters its key is built from
+    func(context, *_copy_params(step['args']),
+         **_copy_params(step['kwargs']))
+    new = [label for label in context.data.columns if label not in inputs]
+
+    if track_memory is not None:
+        return (context.data[new], context.meta), profiler.records
+
+    return context.data[new], context.meta
+
+
+def _step_key(step, data, date):
+    """Cache key of a step, or None if its parameters cannot be hashed"""
+
+    try:
+        return mm_cache.step_key(step, data, date)
+    except TypeError as err:
+        warnings.warn('Step {:s} is not cached: {:s}'.format(step['name'],
+                                                             str(err)),
+                      stacklevel=4)
+
+    return None
+
+
+class _SerialExecutor(futures.Executor):
+    """Executor running each task when it is submitted"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as err:
+            future.set_exception(err)
+        return future
+
+
+class _StepExecutor(object):
+    """Pool kept by an instrument between loads, created upon first use
+
+    Copies of the instrument start without a pool of their own.
+
+    """
+
+    def __init__(self):
+
+        self.options = None
+        self.pool = None
+
+        return
+
+    def get(self, executor, max_workers):
+        """Returns the pool, replacing it if the options changed"""
+
+        if self.options != (executor, max_workers):
+            self.shutdown()
+            if executor == 'thread':
+                self.pool = futures.ThreadPoolExecutor(max_workers=max_workers)
+            else:
+                self.pool = futures.ProcessPoolExecutor(
+                    max_workers=max_workers)
+            self.options = (executor, max_workers)
+
+        return self.pool
+
+    def shutdown(self):
+        """Stops the workers of the pool"""
+
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.options = None
+        self.pool = None
+
+        return
+
+    def __deepcopy__(self, memo):
+        return _StepExecutor()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+def shutdown_executor(inst):
+    """
+    Stops the workers kept by `run_steps` for an instrument.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object
+
+    Note
+    ----
+        A later `run_steps` starts a new pool.
+
+    """
+
+    executor = getattr(inst, '_step_executor', None)
+    if executor is not None:
+        executor.shutdown()
+
+    return
+
+
+def run_steps(inst, steps, executor='thread', max_workers=None, store=None):
+    """
+    Runs a chain of steps, concurrently where their inputs allow.
+
+    Each step starts as soon as the steps that produce its inputs have
+    finished.  Steps run in a worker on a copy of their input variables and
+    the results are merged back into the instrument, so the functions do not
+    share the instrument.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object, modified in place
+    steps : list of dicts
+        Steps from `make_step`, in an order that would also be valid if run
+        serially.  The declared inputs of each step must include every
+        variable it reads.
+    executor : string
+        'thread' to run independent steps in a thread pool, 'process' for a
+        process pool, or 'serial' to run each step in turn on the instrument
+        itself. (default='thread')
+    max_workers : int or NoneType
+        Size of the pool.  If None, uses the concurrent.futures default.
+        (default=None)
+    store : cache.ColumnStore or NoneType
+        If given, the outputs of each step are kept in the store, keyed by a
+        hash of the step parameters and input variables.  Steps whose key is
+        already stored are not run again.  Steps with parameters that cannot
+        be hashed run without the store, with a warning.  With 'serial',
+        steps then run on a copy of their inputs, as for the pools.
+        (default=None)
+
+    Note
+    ----
+        Threads only help for steps that release the GIL, such as numpy
+        operations.  Steps that loop over samples in python, like the pyglow
+        models, should use 'process'.  Step functions and arguments must be
+        picklable to use 'process'.  Apart from 'serial' without a store,
+        the instrument must hold pandas data.
+
+        The thread or process pool is kept by the instrument and reused by
+        later loads, so that process workers keep their pooled model
+        handles.  `shutdown_executor` stops it.
+
+        If the instrument is profiled with `profiling.enable_profiling`,
+        each step that runs is recorded under its name.  Steps in a pool
+        are timed in the worker, so the CPU time of a thread also counts
+        the other threads.  The memory peak is shared by threads, so it is
+        not tracked for steps in a thread pool.
+
+    Example
+    -------
+        # run the steps in a process pool upon every inst.load
+        inst.custom.attach(run_steps, kwargs={'steps': steps,
+                                              'executor': 'process'})
+
+    """
+
+    if executor not in ['serial', 'thread', 'process']:
+        raise ValueError('Unknown executor: {:}'.format(executor))
+
+    # each step is recorded when the instrument is profiled
+    profiler = getattr(inst, 'profiler', None)
+
+    if executor == 'serial' and store is None:
+        for step in steps:
+            func = step['func']
+            if profiler is not None:
+                func = profiler.wrap(func, name=step['name'])
+            func(inst, *step['args'], **step['kwargs'])
+        return
+
+    if not getattr(inst, 'pandas_format', True):
+        raise ValueError(' '.join(('Steps may only run concurrently or with',
+                                   'a store on pandas data')))
+
+    if executor == 'serial':
+        pool = _SerialExecutor()
+    else:
+        if getattr(inst, '_step_executor', None) is None:
+            inst._step_executor = _StepExecutor()
+        pool = inst._step_executor.get(executor, max_workers)
+
+    if profiler is None:
+        track_memory = None
+    else:
+        # threads running at the same time share the memory peak
+        track_memory = profiler.track_memory and executor != 'thread'
+    waiting = dict(enumerate(step_dependencies(steps)))
+    running = {}
+    keys = {}
+    while len(waiting) > 0 or len(running) > 0:
+        finished = []
+        # submit every step whose inputs are ready
+        for i in sorted(waiting.keys()):
+            if len(waiting[i]) == 0:
+                data = inst.data[steps[i]['inputs']].copy()
+                del waiting[i]
+                if store is not None:
+                    keys[i] = _step_key(steps[i], data, inst.date)
+                if keys.get(i) is not None:
+                    entry = store.get(keys[i])
+                    if entry is not None:
+                        finished.append((i, entry))
+                        continue
+                running[pool.submit(_run_step, steps[i], data, inst.date,
+                                    track_memory=track_memory)] = i
+
+        if len(finished) == 0:
+            done, _ = futures.wait(list(running.keys()),
+                                   return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                result = future.result()
+                if profiler is not None:
+                    result, records = result
+                    profiler.records.extend(records)
+                finished.append((i, result))
+                if keys.get(i) is not None:
+                    store.put(keys[i], result)
+
+        for i, (data, meta) in finished:
+            for label in data.columns:
+                inst[label] = data[label]
+            for label in meta.keys():
+                inst.meta[label] = meta[label]
+            for deps in waiting.values():
+                deps.discard(i)
+
+    return
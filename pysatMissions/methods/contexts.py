@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""Provides a registry of model handles that are expensive to set up, so they
+may be reused across loads, instruments and worker tasks.
+
+"""
+
+import collections
+import datetime as dt
+import threading
+import time
+
+import pandas as pds
+
+
+def _apex_factory(date):
+    """Creates an apexpy.Apex object for a given epoch"""
+
+    # imported on first use, as loading the coefficients is slow
+    import apexpy
+
+    return apexpy.Apex(date=date)
+
+
+def _apex_activate(handle):
+    """Makes the epoch of an apexpy.Apex object the active one"""
+
+    # apexpy keeps the coefficients of the last epoch set in global state
+    handle.set_epoch(handle.year)
+
+    return
+
+
+# handle of each model whose epoch is currently active in this process, for
+# models keeping global state
+_active = {}
+
+
+def epoch_start(date, epoch='day'):
+    """
+    Returns the start of the epoch containing a date.
+
+    Parameters
+    ----------
+    date : datetime
+        Date or time within the epoch
+    epoch : string
+        'day' or 'year' (default='day')
+
+    Returns
+    -------
+    datetime
+        Start of the day or year containing `date`
+
+    """
+
+    if epoch == 'day':
+        return dt.datetime(date.year, date.month, date.day)
+    elif epoch == 'year':
+        return dt.datetime(date.year, 1, 1)
+    else:
+        raise ValueError('Unknown epoch: {:}'.format(epoch))
+
+
+class ModelPool(object):
+    """
+    Least recently used cache of model handles, keyed by model and epoch.
+
+    Parameters
+    ----------
+    maxsize : int
+        Largest number of handles kept.  When full, the least recently used
+        handle is removed. (default=8)
+
+    Attributes
+    ----------
+    factories : dict
+        For each registered model, a tuple with the function creating a
+        handle from the start of an epoch, the epoch length and the function
+        activating a handle, or None.  The 'apex' model, an apexpy.Apex
+        object for each day, is registered by default.
+
+    Note
+    ----
+    Handles are shared, so they must not be modified by their users.  The
+    pool is safe to use from several threads.  Each worker process has its
+    own copy, which starts empty and is reused by every task run in that
+    worker.  Models keeping their epoch in global state, such as apexpy, are
+    switched to the epoch of a handle when it is returned, so handles of
+    different epochs must not be used at the same time by several threads.
+
+    Example
+    -------
+        pool = ModelPool(maxsize=4)
+        inst.custom.attach(add_quasi_dipole_coordinates,
+                           kwargs={'pool': pool})
+        for day in inst:
+            pass
+        print(pool.stats())
+
+    """
+
+    def __init__(self, maxsize=8):
+
+        self.maxsize = int(maxsize)
+        self.factories = {}
+        self._handles = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self.register('apex', _apex_factory, epoch='day',
+                      activate=_apex_activate)
+
+        return
+
+    def __getstate__(self):
+        """Handles and locks are not copied to other processes"""
+
+        state = self.__dict__.copy()
+        state['_handles'] = collections.OrderedDict()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        """Restores the lock of an unpickled pool"""
+
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+        return
+
+    def __len__(self):
+        return len(self._handles)
+
+    def _cache_token(self):
+        """Pooled handles do not change results, so pools share cache keys"""
+
+        return '.'.join((type(self).__module__, type(self).__qualname__))
+
+    def register(self, name, factory, epoch='day', activate=None):
+        """
+        Adds a model to the pool.
+
+        Parameters
+        ----------
+        name : string
+            Name used to request handles of the model
+        factory : function
+            Called as factory(start), with the start of the epoch as a
+            datetime, to create a handle
+        epoch : string
+            Length of time a handle is valid for, 'day' or 'year'.  Using
+            'year' trades some accuracy of time varying models for more
+            reuse. (default='day')
+        activate : function or NoneType
+            For models keeping the epoch in global state, called as
+            activate(handle) when a handle is returned that was not the last
+            one created or activated in this process.  None for models
+            without global state. (default=None)
+
+        """
+
+        # check the epoch before accepting the model
+        epoch_start(dt.datetime(2000, 1, 1), epoch)
+        self.factories[name] = (factory, epoch, activate)
+
+        return
+
+    def get(self, name, date):
+        """
+        Returns the handle of a model for the epoch containing a date.
+
+        Parameters
+        ----------
+        name : string
+            Name of a registered model
+        date : datetime
+            Date or time within the epoch
+
+        Returns
+        -------
+        object
+            Handle created by the model factory
+
+        """
+
+        if name not in self.factories:
+            raise ValueError('Unknown model: {:}'.format(name))
+        factory, epoch, activate = self.factories[name]
+        key = (name, epoch_start(date, epoch))
+
+        with self._lock:
+            if key in self._handles:
+                self._handles.move_to_end(key)
+                self._model_stats(name)['hits'] += 1
+                handle = self._handles[key]
+                if activate is not None and _active.get(name) is not handle:
+                    activate(handle)
+                    _active[name] = handle
+                return handle
+
+        # create outside of the lock, so other models are not blocked
+        start = time.perf_counter()
+        handle = factory(key[1])
+        setup = time.perf_counter() - start
+
+        with self._lock:
+            stats = self._model_stats(name)
+            stats['misses'] += 1
+            stats['setup_time'] += setup
+            if activate is not None:
+                # creating a handle sets its epoch
+                _active[name] = handle
+            self._handles[key] = handle
+            self._handles.move_to_end(key)
+            while len(self._handles) > self.maxsize:
+                old, _ = self._handles.popitem(last=False)
+                self._model_stats(old[0])['evictions'] += 1
+
+        return handle
+
+    def clear(self):
+        """Removes all handles, keeping the registered models"""
+
+        with self._lock:
+            self._handles.clear()
+
+        return
+
+    def reset_stats(self):
+        """Sets the hit and miss counts and setup times to zero"""
+
+        self._stats = {}
+
+        return
+
+    def _model_stats(self, name):
+        """Counters of a single model"""
+
+        return self._stats.setdefault(name, {'hits': 0, 'misses': 0,
+                                             'evictions': 0,
+                                             'setup_time': 0.})
+
+    def stats(self):
+        """
+        Returns reuse statistics for each model.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by model, with the number of 'hits', 'misses' and
+            'evictions', the 'hit_rate', the total 'setup_time' in seconds
+            and the estimated 'time_saved' by the hits, based on the mean
+            setup time.
+
+        """
+
+        columns = ['hits', 'misses', 'evictions', 'setup_time']
+        stats = pds.DataFrame.from_dict(self._stats, orient='index',
+                                        columns=columns)
+        stats.index.name = 'model'
+        calls = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / calls.where(calls > 0)
+        stats['time_saved'] = (stats['hits'] * stats['setup_time']
+                               / stats['misses'].where(stats['misses'] > 0))
+
+        return stats
+
+
+default_pool = ModelPool()
+
+
+def get_model(name, date, pool=None):
+    """
+    Returns a pooled model handle.
+
+    Parameters
+    ----------
+    name : string
+        Name of a registered model, such as 'apex'
+    date : datetime
+        Date or time the model is needed for
+    pool : ModelPool or NoneType
+        Pool to take the handle from.  If None, uses `default_pool`, which is
+        shared by every instrument in the process. (default=None)
+
+    Returns
+    -------
+    object
+        Model handle
+
+    """
+
+    if pool is None:
+        pool = default_pool
+
+    return pool.get(name, date)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Provides routines for accumulating ground coverage and revisit statistics
+from simulated pysat instruments.
+
+"""
+
+import numpy as np
+import pandas as pds
+
+# Mean radius of the Earth in km
+earth_radius = 6371.0088
+
+
+def footprint_radius(alt, half_angle, radius=earth_radius):
+    """
+    Calculates the ground radius of a nadir pointing sensor footprint.
+
+    Parameters
+    ----------
+    alt : float or array_like
+        Altitude of the spacecraft above the surface (km)
+    half_angle : float or array_like
+        Half-cone angle of the sensor field of view, measured from nadir
+        (degrees)
+    radius : float
+        Radius of the spherical Earth used for the calculation (km)
+        (default=earth_radius)
+
+    Returns
+    -------
+    float or array_like
+        Great-circle distance from the sub-satellite point to the edge of the
+        footprint (km).  Where the cone is wider than the visible disk of the
+        Earth the footprint is limited by the horizon.
+
+    Notes
+    -----
+    Uses a spherical Earth.  The Earth central angle lambda between the
+    sub-satellite point and the footprint edge follows from the nadir angle
+    eta and the angular radius of the Earth rho as seen from the spacecraft,
+    cos(eps) = sin(eta) / sin(rho) and lambda = 90 - eta - eps.
+
+    """
+
+    return radius * _central_angle(alt, half_angle, radius)
+
+
+def _central_angle(alt, half_angle, radius=earth_radius):
+    """Earth central angle (radians) of the footprint edge"""
+
+    eta = np.radians(np.asarray(half_angle, dtype=float))
+    sin_rho = radius / (radius + np.asarray(alt, dtype=float))
+    cos_eps = np.clip(np.sin(eta) / sin_rho, -1., 1.)
+    lam = 0.5 * np.pi - eta - np.arccos(cos_eps)
+    # cone extends beyond the horizon
+    horizon = 0.5 * np.pi - np.arcsin(sin_rho)
+    return np.where(cos_eps >= 1., horizon, lam)
+
+
+class CoverageAccumulator(object):
+    """
+    Accumulates access and revisit statistics on a latitude/longitude grid.
+
+    Parameters
+    ----------
+    half_angle : float
+        Half-cone angle of the sensor field of view, measured from nadir
+        (degrees)
+    lat_res : float
+        Latitude resolution of the grid (degrees) (default=1.)
+    lon_res : float
+        Longitude resolution of the grid (degrees) (default=1.)
+    pass_gap : float
+        Minimum time between two footprint hits on a cell for the second hit
+        to be counted as a new access (seconds).  Consecutive samples during
+        a single overflight are shorter than this and belong to the same
+        access.  (default=60.)
+    chunk_size : int
+        Maximum number of samples rasterized at once.  Bounds the memory used
+        by `update`. (default=10000)
+
+    Attributes
+    ----------
+    lat_edges, lon_edges : np.array
+        Cell edges of the grid (degrees).  Longitudes span -180 to 180.
+    count : np.array
+        Number of accesses for each (lat, lon) cell
+    first_access, last_access : np.array
+        Time of the first and last footprint hit for each cell, in seconds
+        since 1970-1-1.  NaN where the cell has not been seen.
+    max_revisit_gap : np.array
+        Longest time between two accesses of each cell (seconds).  NaN where
+        the cell has been accessed fewer than two times.
+
+    Note
+    ----
+    Data must be supplied in time order, so that a campaign spanning many
+    days may be streamed through `update` one day at a time.  Memory use is
+    set by the grid size and `chunk_size`, not the number of samples.
+
+    Example
+    -------
+        cov = CoverageAccumulator(half_angle=30., lat_res=2., lon_res=2.)
+        inst.custom.attach(accumulate_coverage, kwargs={'accumulator': cov})
+        for day in inst:
+            pass
+
+    """
+
+    def __init__(self, half_angle, lat_res=1., lon_res=1., pass_gap=60.,
+                 chunk_size=10000):
+
+        self.half_angle = half_angle
+        self.pass_gap = pass_gap
+        self.chunk_size = int(chunk_size)
+
+        self.lat_edges = np.linspace(-90., 90., int(round(180. / lat_res)) + 1)
+        self.lon_edges = np.linspace(-180., 180.,
+                                     int(round(360. / lon_res)) + 1)
+        self.lat_res = self.lat_edges[1] - self.lat_edges[0]
+        self.lon_res = self.lon_edges[1] - self.lon_edges[0]
+
+        shape = (len(self.lat_edges) - 1, len(self.lon_edges) - 1)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.first_access = np.full(shape, np.nan)
+        self.last_access = np.full(shape, np.nan)
+        self.max_revisit_gap = np.full(shape, np.nan)
+        self._latest = -np.inf
+
+        return
+
+    @property
+    def lat_centers(self):
+        """Latitude of the cell centers (degrees)"""
+        return 0.5 * (self.lat_edges[1:] + self.lat_edges[:-1])
+
+    @property
+    def lon_centers(self):
+        """Longitude of the cell centers (degrees)"""
+        return 0.5 * (self.lon_edges[1:] + self.lon_edges[:-1])
+
+    def update(self, times, glat, glong, alt):
+        """
+        Adds footprint hits from a time series of spacecraft locations.
+
+        Parameters
+        ----------
+        times : array_like of datetimes
+            Sample times, in increasing order
+        glat : array_like
+            Geodetic latitude of the spacecraft (degrees)
+        glong : array_like
+            Geodetic longitude of the spacecraft (degrees)
+        alt : array_like
+            Altitude of the spacecraft (km)
+
+        """
+
+        secs = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+        secs = secs * 1.e-9
+        glat = np.asarray(glat, dtype=float)
+        glong = np.asarray(glong, dtype=float)
+        alt = np.asarray(alt, dtype=float)
+
+        if len(secs) == 0:
+            return
+        if secs[0] < self._latest:
+            raise ValueError('Coverage data must be supplied in time order.')
+
+        for start in range(0, len(secs), self.chunk_size):
+            stop = start + self.chunk_size
+            self._update_chunk(secs[start:stop], glat[start:stop],
+                               glong[start:stop], alt[start:stop])
+        self._latest = secs[-1]
+
+        return
+
+    def _rasterize(self, glat, glong, alt):
+        """Flat grid cell index and sample index of every footprint hit"""
+
+        nlat, nlon = self.count.shape
+        lat0 = self.lat_edges[0]
+        lon0 = self.lon_edges[0]
+        glong = np.mod(glong + 180., 360.) - 180.
+        lam = np.degrees(_central_angle(alt, self.half_angle))
+
+        # latitude rows whose centers lie within the footprint
+        row_lo = np.ceil((glat - lam - lat0) / self.lat_res - 0.5)
+        row_hi = np.floor((glat + lam - lat0) / self.lat_res - 0.5)
+        row_lo = np.clip(row_lo, 0, nlat).astype(np.int64)
+        row_hi = np.clip(row_hi, -1, nlat - 1).astype(np.int64)
+        nrows = np.maximum(row_hi - row_lo + 1, 0)
+
+        # expand into (sample, row) pairs
+        sample = np.repeat(np.arange(len(glat)), nrows)
+        offset = np.arange(nrows.sum()) - np.repeat(np.cumsum(nrows) - nrows,
+                                                    nrows)
+        row = row_lo[sample] + offset
+
+        # longitude half-width of the footprint along each row
+        phi = np.radians(self.lat_centers[row])
+        phi_s = np.radians(glat[sample])
+        denom = np.cos(phi) * np.cos(phi_s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cos_dlon = ((np.cos(np.radians(lam[sample]))
+                         - np.sin(phi) * np.sin(phi_s)) / denom)
+        cos_dlon = np.where(denom > 1.e-12, cos_dlon, -1.)
+        dlon = np.degrees(np.arccos(np.clip(cos_dlon, -1., 1.)))
+
+        col_lo = np.ceil((glong[sample] - dlon - lon0) / self.lon_res - 0.5)
+        col_hi = np.floor((glong[sample] + dlon - lon0) / self.lon_res - 0.5)
+        ncols = np.clip(col_hi - col_lo + 1, 0, nlon).astype(np.int64)
+        ncols[cos_dlon > 1.] = 0
+        col_lo = col_lo.astype(np.int64)
+
+        # expand into (sample, row, column) triples
+        pair = np.repeat(np.arange(len(row)), ncols)
+        offset = np.arange(ncols.sum()) - np.repeat(np.cumsum(ncols) - ncols,
+                                                    ncols)
+        col = np.mod(col_lo[pair] + offset, nlon)
+
+        return row[pair] * nlon + col, sample[pair]
+
+    def _update_chunk(self, secs, glat, glong, alt):
+        """Accumulates statistics for a single chunk of samples"""
+
+        cell, sample = self._rasterize(glat, glong, alt)
+        if len(cell) == 0:
+            return
+        times = secs[sample]
+
+        # group hits by cell, keeping time order within each cell
+        order = np.argsort(cell, kind='stable')
+        cell = cell[order]
+        times = times[order]
+
+        count = self.count.ravel()
+        first = self.first_access.ravel()
+        last = self.last_access.ravel()
+        max_gap = self.max_revisit_gap.ravel()
+
+        starts = np.ones(len(cell), dtype=bool)
+        starts[1:] = cell[1:] != cell[:-1]
+        ends = np.ones(len(cell), dtype=bool)
+        ends[:-1] = starts[1:]
+
+        # time since the previous hit on the same cell
+        gap = np.empty(len(cell))
+        gap[1:] = times[1:] - times[:-1]
+        gap[starts] = times[starts] - last[cell[starts]]
+
+        new = np.isnan(gap) | (gap > self.pass_gap)
+        revisit = new & ~np.isnan(gap)
+        count += np.bincount(cell[new], minlength=len(count))
+        unset = np.isnan(max_gap[cell[revisit]])
+        max_gap[cell[revisit][unset]] = -np.inf
+        np.maximum.at(max_gap, cell[revisit], gap[revisit])
+
+        unseen = starts & np.isnan(first[cell])
+        first[cell[unseen]] = times[unseen]
+        last[cell[ends]] = times[ends]
+
+        return
+
+    def summary(self):
+        """
+        Returns coverage statistics for every grid cell.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per cell with the cell center ('lat', 'long'), the access
+            'count', 'first_access' and 'last_access' times and the
+            'max_revisit_gap' in seconds.
+
+        """
+
+        lon, lat = np.meshgrid(self.lon_centers, self.lat_centers)
+        first = pds.to_datetime(self.first_access.ravel(), unit='s')
+        last = pds.to_datetime(self.last_access.ravel(), unit='s')
+        return pds.DataFrame({'lat': lat.ravel(), 'long': lon.ravel(),
+                              'count': self.count.ravel(),
+                              'first_access': first,
+                              'last_access': last,
+                              'max_revisit_gap': self.max_revisit_gap.ravel()})
+
+
+def accumulate_coverage(inst, accumulator, glat_label='glat',
+                        glong_label='glong', alt_label='alt'):
+    """
+    Adds the footprints of the loaded data to a coverage accumulator.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        instrument object including lat, lon, and alt as timeseries
+    accumulator : CoverageAccumulator
+        accumulator updated in place with the loaded data
+    glat_label : string
+        label used in inst to identify WGS84 geodetic latitude (degrees)
+    glong_label : string
+        label used in inst to identify WGS84 geodetic longitude (degrees)
+    alt_label : string
+        label used in inst to identify WGS84 geodetic altitude (km, height
+        above surface)
+
+    Returns
+    -------
+    None
+        Instrument data is not modified.
+
+    Example
+    -------
+        # function added below updates the accumulator upon every inst.load
+        cov = CoverageAccumulator(half_angle=30.)
+        inst.custom.attach(accumulate_coverage, kwargs={'accumulator': cov})
+
+    """
+
+    if len(inst.data.index) == 0:
+        return
+
+    accumulator.update(inst.data.index, inst[glat_label], inst[glong_label],
+                       inst[alt_label])
+
+    return
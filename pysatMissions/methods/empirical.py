@@ -4,17 +4,12 @@ from pysat instruments.
 
 """
 
-import pandas as pds
 import numpy as np
 import warnings
 
-try:
-    from pyglow.pyglow import Point
-except ImportError:
-    pass
-import pysatMagVect
-
+from pysatMissions import _kernels
 from pysatMissions.methods import spacecraft as mm_sc
+from pysatMissions.models import backends as mm_backends
 
 
 # TODO add checks for ECEF and import rest of changes here
@@ -23,14 +18,55 @@ pyglow_warning = ' '.join(['pyglow must be installed to use this',
                            'https://github.com/pysat/pysatMissions'])
 
 
+def _run_backend(inst, model, backend, glat_label, glong_label, alt_label):
+    """Adds the outputs of a model backend to the instrument
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        instrument object including lat, lon, and alt as timeseries
+    model : string
+        'iri', 'msis', 'hwm' or 'igrf'
+    backend : string or ModelBackend
+        Name of a registered backend, or a backend
+    glat_label, glong_label, alt_label : string
+        labels of the WGS84 geodetic location in inst
+
+    """
+
+    func = getattr(mm_backends.get_backend(backend), model)
+    try:
+        output = func(inst.index, np.asarray(inst[glat_label]),
+                      np.asarray(inst[glong_label]),
+                      np.asarray(inst[alt_label]))
+    except mm_backends.ModelUnavailable:
+        # Triggered if pyglow not installed
+        warnings.warn(pyglow_warning, stacklevel=3)
+        return
+
+    if not inst.pandas_format:
+        # xarray data holds vector components in a single variable
+        for key in [key[:-2] for key in output.keys()
+                    if key.endswith('_x') and key[:-2] + '_z' in output]:
+            labels = ['_'.join((key, coord)) for coord in 'xyz']
+            mm_sc._set_vector(inst, labels,
+                              np.stack([output.pop(label)
+                                        for label in labels], axis=-1))
+    for key in output.keys():
+        inst[key] = output[key]
+
+    return
+
+
 def add_iri_thermal_plasma(inst, glat_label='glat', glong_label='glong',
-                           alt_label='alt'):
+                           alt_label='alt', backend='pyglow'):
     """
     Uses IRI (International Reference Ionosphere) model to simulate an
     ionosphere.
 
-    Uses pyglow module to run IRI. Configured to use actual solar parameters
-    to run model.
+    Uses pyglow module to run IRI by default. Configured to use actual solar
+    parameters to run model.  Other backends from pysatMissions.models.backends
+    may be selected.
 
     Parameters
     ----------
@@ -43,6 +79,10 @@ def add_iri_thermal_plasma(inst, glat_label='glat', glong_label='glong',
     alt_label : string
         label used in inst to identify WGS84 geodetic altitude (km, height
         above surface)
+    backend : string or ModelBackend
+        'pyglow' to run the pyglow model at each sample, 'synthetic' for
+        fast analytic values suited to tests and dry runs, or any other
+        registered backend. (default='pyglow')
 
     Returns
     -------
@@ -63,32 +103,7 @@ def add_iri_thermal_plasma(inst, glat_label='glat', glong_label='glong',
 
     """
 
-    iri_params = []
-    try:
-        for time, lat, lon, alt in zip(inst.data.index, inst[glat_label],
-                                       inst[glong_label], inst[alt_label]):
-            # Point class is instantiated. Its parameters are a function of
-            # time and spatial location
-            pt = Point(time, lat, lon, alt)
-            # IRI-2016 currently experiencing bugs in pyglow
-            pt.run_iri(version=2012)
-            iri = {}
-            # After the model is run, its members like Ti, ni[O+], etc. can be
-            # accessed
-            iri['ion_temp'] = pt.Ti
-            iri['e_temp'] = pt.Te
-            iri['ion_dens'] = pt.ni['O+'] + pt.ni['H+'] + pt.ni['HE+']
-            # pt.ne - pt.ni['NO+'] - pt.ni['O2+'] - pt.ni['HE+']
-            iri['frac_dens_o'] = pt.ni['O+']/iri['ion_dens']
-            iri['frac_dens_h'] = pt.ni['H+']/iri['ion_dens']
-            iri['frac_dens_he'] = pt.ni['HE+']/iri['ion_dens']
-            iri_params.append(iri)
-        iri = pds.DataFrame(iri_params)
-        iri.index = inst.data.index
-        inst[iri.keys()] = iri
-    except NameError:
-        # Triggered if pyglow not installed
-        warnings.warn(pyglow_warning, stacklevel=2)
+    _run_backend(inst, 'iri', backend, glat_label, glong_label, alt_label)
 
     inst.meta['ion_temp'] = {'units': 'Kelvin', 'long_name': 'Ion Temperature',
                              'desc': ' '.join(['Ion temperature from IRI',
@@ -106,13 +121,15 @@ def add_iri_thermal_plasma(inst, glat_label='glat', glong_label='glong',
                                                   'from IRI model run.'])}
 
 
-def add_igrf(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
+def add_igrf(inst, glat_label='glat', glong_label='glong', alt_label='alt',
+             backend='pyglow'):
     """
     Uses International Geomagnetic Reference Field (IGRF) model to obtain
     geomagnetic field values.
 
-    Uses pyglow module to run IGRF. Configured to use actual solar parameters
-    to run model.
+    Uses pyglow module to run IGRF by default, or the vectorized
+    implementations in pysatMissions.models.backends, which do not require
+    pyglow.
 
     Parameters
     ----------
@@ -125,6 +142,12 @@ def add_igrf(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
     alt_label : string
         label used in inst to identify WGS84 geodetic altitude (km, height
         above surface)
+    backend : string or ModelBackend
+        'pyglow' to run the pyglow IGRF at each sample, 'numpy' to evaluate
+        the bundled IGRF-14 coefficients over all samples at once,
+        'dipole' and 'eccentric_dipole' for the low fidelity tilted dipole
+        approximations of IGRF-14, suited to early design studies, or any
+        other registered backend. (default='pyglow')
 
     Returns
     -------
@@ -147,34 +170,8 @@ def add_igrf(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
 
     """
 
-    igrf_params = []
-    try:
-        for time, lat, lon, alt in zip(inst.data.index, inst[glat_label],
-                                       inst[glong_label], inst[alt_label]):
-            pt = Point(time, lat, lon, alt)
-            pt.run_igrf()
-            igrf = {}
-            igrf['B'] = pt.B
-            igrf['B_east'] = pt.Bx
-            igrf['B_north'] = pt.By
-            igrf['B_up'] = pt.Bz
-            igrf_params.append(igrf)
-        igrf = pds.DataFrame(igrf_params)
-        igrf.index = inst.data.index
-        inst[igrf.keys()] = igrf
-
-        # convert magnetic field in East/north/up to ECEF basis
-        x, y, z = pysatMagVect.enu_to_ecef_vector(inst['B_east'],
-                                                  inst['B_north'],
-                                                  inst['B_up'],
-                                                  inst[glat_label],
-                                                  inst[glong_label])
-        inst['B_ecef_x'] = x
-        inst['B_ecef_y'] = y
-        inst['B_ecef_z'] = z
-    except NameError:
-        # Triggered if pyglow not installed
-        warnings.warn(pyglow_warning, stacklevel=2)
+    _run_backend(inst, 'igrf', backend, glat_label, glong_label,
+                 alt_label)
 
     # metadata
     inst.meta['B'] = {'units': 'nT',
@@ -189,27 +186,26 @@ def add_igrf(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
                          'desc': 'Geomagnetic field from IGRF expressed ' +
                          'using the East/North/Up (ENU) basis.'}
 
-    inst.meta['B_ecef_x'] = {'units': 'nT',
-                             'desc': 'Geomagnetic field from IGRF expressed ' +
-                             'using the Earth Centered Earth Fixed (ECEF) ' +
-                             'basis.'}
-    inst.meta['B_ecef_y'] = {'units': 'nT',
-                             'desc': 'Geomagnetic field from IGRF expressed ' +
-                             'using the Earth Centered Earth Fixed (ECEF) ' +
-                             'basis.'}
-    inst.meta['B_ecef_z'] = {'units': 'nT',
-                             'desc': 'Geomagnetic field from IGRF expressed ' +
-                             'using the Earth Centered Earth Fixed (ECEF) ' +
-                             'basis.'}
+    ecef_meta = {'units': 'nT',
+                 'desc': 'Geomagnetic field from IGRF expressed using the ' +
+                 'Earth Centered Earth Fixed (ECEF) basis.'}
+    if inst.pandas_format:
+        for coord in ['x', 'y', 'z']:
+            inst.meta['B_ecef_' + coord] = ecef_meta.copy()
+    else:
+        inst.meta['B_ecef'] = ecef_meta
+
     return
 
 
-def add_msis(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
+def add_msis(inst, glat_label='glat', glong_label='glong', alt_label='alt',
+             backend='pyglow'):
     """
     Uses MSIS model to obtain thermospheric values.
 
-    Uses pyglow module to run MSIS. Configured to use actual solar parameters
-    to run model.
+    Uses pyglow module to run MSIS by default. Configured to use actual solar
+    parameters to run model.  Other backends from pysatMissions.models.backends
+    may be selected.
 
     Parameters
     ----------
@@ -222,6 +218,10 @@ def add_msis(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
     alt_label : string
         label used in inst to identify WGS84 geodetic altitude (km, height
         above surface)
+    backend : string or ModelBackend
+        'pyglow' to run the pyglow model at each sample, 'synthetic' for
+        fast analytic values suited to tests and dry runs, or any other
+        registered backend. (default='pyglow')
 
     Returns
     -------
@@ -241,32 +241,7 @@ def add_msis(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
 
     """
 
-    msis_params = []
-    try:
-        for time, lat, lon, alt in zip(inst.data.index, inst[glat_label],
-                                       inst[glong_label], inst[alt_label]):
-            pt = Point(time, lat, lon, alt)
-            pt.run_msis()
-            msis = {}
-            total = 0
-            for key in pt.nn.keys():
-                total += pt.nn[key]
-            msis['Nn'] = total
-            msis['Nn_H'] = pt.nn['H']
-            msis['Nn_He'] = pt.nn['HE']
-            msis['Nn_N'] = pt.nn['N']
-            msis['Nn_N2'] = pt.nn['N2']
-            msis['Nn_O'] = pt.nn['O']
-            msis['Nn_O2'] = pt.nn['O2']
-            msis['Nn_Ar'] = pt.nn['AR']
-            msis['Tn_msis'] = pt.Tn_msis
-            msis_params.append(msis)
-        msis = pds.DataFrame(msis_params)
-        msis.index = inst.data.index
-        inst[msis.keys()] = msis
-    except NameError:
-        # Triggered if pyglow not installed
-        warnings.warn(pyglow_warning, stacklevel=2)
+    _run_backend(inst, 'msis', backend, glat_label, glong_label, alt_label)
 
     # metadata
     inst.meta['Nn'] = {'units': 'cm^-3',
@@ -300,12 +275,14 @@ def add_msis(inst, glat_label='glat', glong_label='glong', alt_label='alt'):
 
 
 def add_hwm_winds_and_ecef_vectors(inst, glat_label='glat',
-                                   glong_label='glong', alt_label='alt'):
+                                   glong_label='glong', alt_label='alt',
+                                   backend='pyglow'):
     """
     Uses HWM (Horizontal Wind Model) model to obtain neutral wind details.
 
-    Uses pyglow module to run HWM. Configured to use actual solar parameters
-    to run model.
+    Uses pyglow module to run HWM by default. Configured to use actual solar
+    parameters to run model.  Other backends from pysatMissions.models.backends
+    may be selected.
 
     Parameters
     ----------
@@ -318,6 +295,10 @@ def add_hwm_winds_and_ecef_vectors(inst, glat_label='glat',
     alt_label : string
         label used in inst to identify WGS84 geodetic altitude (km, height
         above surface)
+    backend : string or ModelBackend
+        'pyglow' to run the pyglow model at each sample, 'synthetic' for
+        fast analytic values suited to tests and dry runs, or any other
+        registered backend. (default='pyglow')
 
     Returns
     -------
@@ -340,51 +321,17 @@ def add_hwm_winds_and_ecef_vectors(inst, glat_label='glat',
 
     """
 
-    hwm_params = []
-    try:
-        for time, lat, lon, alt in zip(inst.data.index, inst[glat_label],
-                                       inst[glong_label], inst[alt_label]):
-            # Point class is instantiated.
-            # Its parameters are a function of time and spatial location
-            pt = Point(time, lat, lon, alt)
-            pt.run_hwm()
-            hwm = {}
-            hwm['zonal_wind'] = pt.u
-            hwm['meridional_wind'] = pt.v
-            hwm_params.append(hwm)
-        hwm = pds.DataFrame(hwm_params)
-        hwm.index = inst.data.index
-        inst[['zonal_wind', 'meridional_wind']] = hwm[['zonal_wind',
-                                                       'meridional_wind']]
-    except NameError:
-        # Triggered if pyglow not installed
-        warnings.warn(pyglow_warning, stacklevel=2)
+    _run_backend(inst, 'hwm', backend, glat_label, glong_label, alt_label)
 
-    # calculate zonal unit vector in ECEF
+    # calculate zonal and meridional unit vectors in ECEF
     # zonal wind: east - west; positive east
     # EW direction is tangent to XY location of S/C in ECEF coordinates
-    mag = np.sqrt(inst['position_ecef_x']**2 + inst['position_ecef_y']**2)
-    inst['unit_zonal_wind_ecef_x'] = -inst['position_ecef_y']/mag
-    inst['unit_zonal_wind_ecef_y'] = inst['position_ecef_x']/mag
-    inst['unit_zonal_wind_ecef_z'] = 0 * inst['position_ecef_x']
-
-    # calculate meridional unit vector in ECEF
     # meridional wind: north - south; positive north
     # mer direction completes RHS of position and zonal vector
-    unit_pos_x, unit_pos_y, unit_pos_z = \
-        pysatMagVect.normalize_vector(-inst['position_ecef_x'],
-                                      -inst['position_ecef_y'],
-                                      -inst['position_ecef_z'])
-
-    # mer = r x zonal
-    merx, mery, merz = \
-        pysatMagVect.cross_product(unit_pos_x, unit_pos_y, unit_pos_z,
-                                   inst['unit_zonal_wind_ecef_x'],
-                                   inst['unit_zonal_wind_ecef_y'],
-                                   inst['unit_zonal_wind_ecef_z'])
-    inst['unit_mer_wind_ecef_x'] = merx
-    inst['unit_mer_wind_ecef_y'] = mery
-    inst['unit_mer_wind_ecef_z'] = merz
+    pos = mm_sc._get_vector(inst, ['position_ecef_x', 'position_ecef_y',
+                                   'position_ecef_z'])
+    basis = _kernels.wind_basis(pos)
+    unit_zonal, unit_mer = basis[:, 0], basis[:, 1]
 
     # Adding metadata information
     def get_ecef_wind_meta(coord='x', geo='mer'):
@@ -402,24 +349,27 @@ def add_hwm_winds_and_ecef_vectors(inst, glat_label='glat',
                                  ).format(name=name.lower(), coord=coord)}
         return dict
 
+    for geo, name, vector in [('zon', 'zonal', unit_zonal),
+                              ('mer', 'mer', unit_mer)]:
+        long_name = 'Meridional' if geo == 'mer' else 'Zonal'
+        mm_sc._set_vector(inst, ['unit_{:s}_wind_ecef_{:s}'.format(name, coord)
+                                 for coord in ['x', 'y', 'z']], vector,
+                          meta=[get_ecef_wind_meta(coord=coord, geo=geo)
+                                for coord in ['x', 'y', 'z']],
+                          vector_meta={'units': '',
+                                       'long_name': ' '.join([long_name,
+                                                              'Wind Unit ECEF',
+                                                              'vector']),
+                                       'desc': ' '.join([long_name.lower(),
+                                                         'wind unit vector in',
+                                                         'ECEF coordinates'])})
+
     inst.meta['zonal_wind'] = {'units': 'm/s',
                                'long_name': 'Zonal Wind',
                                'desc': 'HWM model zonal wind'}
     inst.meta['meridional_wind'] = {'units': 'm/s',
                                     'long_name': 'Meridional Wind',
                                     'desc': 'HWM model meridional wind'}
-    inst.meta['unit_zonal_wind_ecef_x'] = get_ecef_wind_meta(coord='x',
-                                                             geo='zon')
-    inst.meta['unit_zonal_wind_ecef_y'] = get_ecef_wind_meta(coord='y',
-                                                             geo='zon')
-    inst.meta['unit_zonal_wind_ecef_z'] = get_ecef_wind_meta(coord='z',
-                                                             geo='zon')
-    inst.meta['unit_mer_wind_ecef_x'] = get_ecef_wind_meta(coord='x',
-                                                           geo='mer')
-    inst.meta['unit_mer_wind_ecef_y'] = get_ecef_wind_meta(coord='y',
-                                                           geo='mer')
-    inst.meta['unit_mer_wind_ecef_z'] = get_ecef_wind_meta(coord='z',
-                                                           geo='mer')
 
     return
 
@@ -446,13 +396,6 @@ def project_hwm_onto_sc(inst):
 
     """
 
-    def get_wind_comp(inst, direction='x'):
-        unit_zon = 'unit_zonal_wind_ecef_' + direction
-        unit_mer = 'unit_mer_wind_ecef_' + direction
-
-        return (inst['zonal_wind']*inst[unit_zon] +
-                inst['meridional_wind']*inst[unit_mer])
-
     def get_wind_meta(coord='x'):
         dict = {'units': 'm/s',
                 'long_name': ' '.join(['Simulated {:s}-vector instrument',
@@ -461,16 +404,30 @@ def project_hwm_onto_sc(inst):
                                   'in its {:s}-direction']).format(coord)}
         return dict
 
-    inst['total_wind_x'] = get_wind_comp(inst, direction='x')
-    inst['total_wind_y'] = get_wind_comp(inst, direction='y')
-    inst['total_wind_z'] = get_wind_comp(inst, direction='z')
+    def get_unit_vector(name):
+        return mm_sc._get_vector(inst, ['unit_{:s}_wind_ecef_{:s}'.format(
+            name, coord) for coord in ['x', 'y', 'z']])
+
+    zonal = np.asarray(inst['zonal_wind'], dtype=float)[:, np.newaxis]
+    meridional = np.asarray(inst['meridional_wind'],
+                            dtype=float)[:, np.newaxis]
+    mm_sc._set_vector(inst, ['total_wind_x', 'total_wind_y', 'total_wind_z'],
+                      zonal * get_unit_vector('zonal')
+                      + meridional * get_unit_vector('mer'))
 
     mm_sc.project_ecef_vector_onto_sc(inst, 'total_wind_x', 'total_wind_y',
                                       'total_wind_z', 'sim_wind_sc_x',
                                       'sim_wind_sc_y', 'sim_wind_sc_z')
 
-    inst.meta['sim_wind_sc_x'] = get_wind_meta('x')
-    inst.meta['sim_wind_sc_y'] = get_wind_meta('y')
-    inst.meta['sim_wind_sc_z'] = get_wind_meta('z')
+    if inst.pandas_format:
+        inst.meta['sim_wind_sc_x'] = get_wind_meta('x')
+        inst.meta['sim_wind_sc_y'] = get_wind_meta('y')
+        inst.meta['sim_wind_sc_z'] = get_wind_meta('z')
+    else:
+        inst.meta['sim_wind_sc'] = {'units': 'm/s',
+                                    'long_name': 'Simulated instrument wind',
+                                    'desc': ' '.join(['Wind from model as',
+                                                      'measured by instrument',
+                                                      'along each axis'])}
 
     return
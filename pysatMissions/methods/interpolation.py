@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Provides interpolated ephemerides, which propagate an orbit at widely
+spaced nodes and reproduce it at the requested times by cubic Hermite
+interpolation of the values and time derivatives at the nodes.
+
+"""
+
+import numpy as np
+import pandas as pds
+
+
+def hermite(times, node_times, values, derivatives):
+    """
+    Interpolates values with cubic Hermite polynomials.
+
+    Parameters
+    ----------
+    times : array_like
+        Times of the interpolated values (seconds)
+    node_times : array_like
+        Increasing times of the nodes (seconds), spanning `times`
+    values : array_like
+        Values at the nodes, with time along the first dimension
+    derivatives : array_like
+        Time derivatives of the values at the nodes (per second)
+
+    Returns
+    -------
+    values, derivatives : np.array
+        Interpolated values and their time derivatives
+
+    """
+
+    times = np.asarray(times, dtype=float)
+    node_times = np.asarray(node_times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    derivatives = np.asarray(derivatives, dtype=float)
+
+    # coefficients of the polynomial of each interval, in the normalized
+    # time s = (t - t0) / width, evaluated by Horner's rule
+    shape = (-1,) + (1,) * (values.ndim - 1)
+    widths = np.diff(node_times).reshape(shape)
+    m0 = derivatives[:-1] * widths
+    m1 = derivatives[1:] * widths
+    change = values[1:] - values[:-1]
+    c2 = 3. * change - 2. * m0 - m1
+    c3 = m0 + m1 - 2. * change
+
+    index = np.clip(np.searchsorted(node_times, times, side='right') - 1, 0,
+                    len(node_times) - 2)
+    s = ((times - node_times[index]).reshape(shape) / widths[index])
+    m0 = m0[index]
+    c2 = c2[index]
+    c3 = c3[index]
+    interp = values[index] + s * (m0 + s * (c2 + s * c3))
+    rate = (m0 + s * (2. * c2 + 3. * s * c3)) / widths[index]
+
+    return interp, rate
+
+
+def _seconds(times):
+    """Seconds since 1970-1-1 of a set of times"""
+
+    return np.asarray(pds.DatetimeIndex(times), dtype='datetime64[ns]'
+                      ).astype(np.int64) * 1.e-9
+
+
+def _unwrap(values, bounds):
+    """Removes jumps of a full period along the first dimension"""
+
+    period = bounds[1] - bounds[0]
+    steps = np.diff(values, axis=0)
+    jumps = np.cumsum(np.round(steps / period), axis=0) * period
+
+    return values - np.concatenate([np.zeros_like(values[:1]), jumps])
+
+
+def _wrap(values, bounds):
+    """Returns periodic values to their range"""
+
+    return np.mod(values - bounds[0], bounds[1] - bounds[0]) + bounds[0]
+
+
+class Interpolator(object):
+    """
+    Propagates an orbit at coarse nodes and interpolates to every sample.
+
+    Parameters
+    ----------
+    step : float
+        Time between nodes (seconds).  Nodes are counted from midnight.
+        (default=60.)
+    delta : float
+        Half width of the central difference used for the time derivative
+        of variables the propagator does not provide a rate for (seconds)
+        (default=2.)
+    num_checks : int
+        Number of times, midway between nodes where the interpolation error
+        is largest, which are also propagated directly to estimate the
+        error.  If 0, the error is not estimated. (default=50)
+
+    Attributes
+    ----------
+    last_error : dict
+        Largest difference between the interpolated and directly propagated
+        values of each variable at the check times of the last call of
+        `propagate`.  Vectors use the length of the difference.
+    last_nodes : int
+        Number of nodes propagated by the last call of `propagate`
+
+    Example
+    -------
+        interpolator = Interpolator(step=30.)
+        inst = pysat.Instrument(inst_module=pysat_sgp4,
+                                interpolator=interpolator)
+        inst.load(2018, 1)
+        interpolator.last_error['position_eci']
+
+    """
+
+    def __init__(self, step=60., delta=2., num_checks=50):
+
+        if step <= 2. * delta:
+            raise ValueError('step must be larger than twice delta.')
+        self.step = step
+        self.delta = delta
+        self.num_checks = num_checks
+        self.last_error = {}
+        self.last_nodes = 0
+
+        return
+
+    def node_times(self, times):
+        """
+        Nodes needed to interpolate to a set of times.
+
+        Parameters
+        ----------
+        times : pds.DatetimeIndex
+            Sample times, in increasing order
+
+        Returns
+        -------
+        pds.DatetimeIndex
+            Nodes on the node spacing before and after every sample
+
+        """
+
+        secs = _seconds(times)
+        start = np.floor(secs[0] / 86400.) * 86400.
+        scaled = (secs - start) / self.step
+        nodes = np.unique(np.concatenate([np.floor(scaled), np.ceil(scaled)]))
+        if len(nodes) == 1:
+            nodes = np.append(nodes, nodes[0] + 1.)
+        nodes = start + nodes * self.step
+
+        return pds.to_datetime(np.round(nodes * 1.e9).astype(np.int64))
+
+    def propagate(self, times, propagate, rates=None, periodic=None):
+        """
+        Propagates an orbit at the nodes and interpolates to the times.
+
+        Parameters
+        ----------
+        times : pds.DatetimeIndex
+            Sample times, in increasing order
+        propagate : function
+            Takes times and returns a list of (name, array) pairs of the
+            variables at those times
+        rates : dict or NoneType
+            Names of variables which are the time derivative of another
+            variable, keyed by that variable, such as
+            {'position_eci': 'velocity_eci'}.  Rates are interpolated as the
+            derivative of their variable, and other variables use a central
+            difference. (default=None)
+        periodic : dict or NoneType
+            (min, max) range of variables which wrap, such as
+            {'glong': (-180., 180.)} (default=None)
+
+        Returns
+        -------
+        list of tuples
+            (name, array) pairs of the variables at the times
+
+        """
+
+        if rates is None:
+            rates = {}
+        if periodic is None:
+            periodic = {}
+        derived = set(rates.values())
+
+        nodes = self.node_times(times)
+        node_secs = _seconds(nodes)
+        node_vars = propagate(nodes)
+        names = [name for name, values in node_vars]
+        values = dict(node_vars)
+
+        # central differences of the variables without a rate
+        differenced = [name for name in names
+                       if name not in rates and name not in derived]
+        derivatives = {}
+        if len(differenced) > 0:
+            offset = pds.Timedelta(seconds=self.delta)
+            after = dict(propagate(nodes + offset))
+            before = dict(propagate(nodes - offset))
+            for name in differenced:
+                change = after[name] - before[name]
+                if name in periodic:
+                    period = periodic[name][1] - periodic[name][0]
+                    change = change - np.round(change / period) * period
+                derivatives[name] = change / (2. * self.delta)
+        for name, rate in rates.items():
+            derivatives[name] = values[rate]
+        self.last_nodes = len(nodes)
+
+        secs = _seconds(times)
+        result = {}
+        for name in names:
+            if name in derived:
+                continue
+            node_values = values[name]
+            if name in periodic:
+                node_values = _unwrap(node_values, periodic[name])
+            result[name], rate = hermite(secs, node_secs, node_values,
+                                         derivatives[name])
+            if name in periodic:
+                result[name] = _wrap(result[name], periodic[name])
+            if name in rates:
+                result[rates[name]] = rate
+
+        if self.num_checks > 0:
+            self._check(nodes, node_secs, values, derivatives, propagate,
+                        rates, periodic)
+
+        return [(name, result[name]) for name in names]
+
+    def _check(self, nodes, node_secs, values, derivatives, propagate, rates,
+               periodic):
+        """Compares interpolated and propagated values between nodes"""
+
+        gaps, = np.where(np.diff(node_secs) <= self.step * 1.001)
+        if len(gaps) == 0:
+            self.last_error = {}
+            return
+        gaps = gaps[np.unique(np.linspace(0, len(gaps) - 1,
+                                          self.num_checks).astype(int))]
+        midpoints = nodes[gaps] + (nodes[gaps + 1] - nodes[gaps]) / 2
+        direct = propagate(midpoints)
+
+        mid_secs = _seconds(midpoints)
+        self.last_error = {}
+        for name, target in direct:
+            if name in rates.values():
+                continue
+            node_values = values[name]
+            if name in periodic:
+                node_values = _unwrap(node_values, periodic[name])
+            interp, rate = hermite(mid_secs, node_secs, node_values,
+                                   derivatives[name])
+            pairs = [(name, interp, target)]
+            if name in rates:
+                pairs.append((rates[name], rate, dict(direct)[rates[name]]))
+            for label, estimate, truth in pairs:
+                error = estimate - truth
+                if label in periodic:
+                    period = periodic[label][1] - periodic[label][0]
+                    error = error - np.round(error / period) * period
+                if error.ndim > 1:
+                    error = np.sqrt(np.sum(error**2, axis=-1))
+                self.last_error[label] = np.max(np.abs(error))
+
+        return
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""Provides empirical model values along the line of sight of remote sensing
+instruments.
+
+Points are spaced along a look ray from the spacecraft, the models of
+pysatMissions.models.backends are evaluated on all the points of a block of
+samples in a single call, and the values are integrated along the ray, such
+as slant TEC from IRI or column density from MSIS.  Rays are processed in
+blocks of samples, so memory use is set by the block size and the number of
+points on each ray rather than the number of samples.
+
+"""
+
+from concurrent import futures
+import numpy as np
+
+from pysatMissions.methods import attitude as mm_att
+from pysatMissions.methods import spacecraft as mm_sc
+from pysatMissions.models import backends as mm_backends
+from pysatMissions.models import igrf as mm_igrf
+
+# electron content (cm^-3 km) in TEC units (1e16 m^-2)
+tecu = 1.e-7
+
+# number density (cm^-3 km) in cm^-2
+column_cm2 = 1.e5
+
+
+def look_vectors(attitude, look):
+    """
+    ECEF unit vectors of a look direction fixed in the spacecraft frame.
+
+    Parameters
+    ----------
+    attitude : array_like
+        Attitude as (time, 3, 3) rotation matrices or (time, 4) unit
+        quaternions, see `methods.attitude`
+    look : array_like
+        Look direction in the spacecraft frame, with shape (3,) or
+        (time, 3).  Need not be normalized.
+
+    Returns
+    -------
+    np.array
+        ECEF look directions with shape (time, 3)
+
+    """
+
+    attitude = np.asarray(attitude, dtype=float)
+    look = np.broadcast_to(np.asarray(look, dtype=float), (len(attitude), 3))
+    look = look / np.linalg.norm(look, axis=-1, keepdims=True)
+
+    return mm_att.rotate(attitude, look, inverse=True)
+
+
+def ray_points(position, look, distances):
+    """
+    Points spaced along look rays.
+
+    Parameters
+    ----------
+    position : array_like
+        ECEF position of the spacecraft (km) with shape (time, 3)
+    look : array_like
+        ECEF unit look directions with shape (time, 3)
+    distances : array_like
+        Distances of the points from the spacecraft (km)
+
+    Returns
+    -------
+    np.array
+        ECEF positions (km) with shape (time, point, 3)
+
+    """
+
+    position = np.asarray(position, dtype=float)
+    look = np.asarray(look, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+
+    return (position[:, np.newaxis, :]
+            + distances[np.newaxis, :, np.newaxis] * look[:, np.newaxis, :])
+
+
+def _blocked(alt, min_alt):
+    """Points beyond the first point of each ray below `min_alt`"""
+
+    return np.cumsum(alt < min_alt, axis=-1) > 0
+
+
+def _integrate_block(times, position, look, distances, func, variables,
+                     min_alt):
+    """Integrals of the model variables along the rays of a block"""
+
+    points = ray_points(position, look, distances)
+    shape = points.shape[:2]
+    glat, glong, alt = mm_igrf.ecef_to_geodetic(points[..., 0],
+                                                points[..., 1],
+                                                points[..., 2])
+    # every point of a ray shares the sample time
+    point_times = np.repeat(np.asarray(times), shape[1])
+    output = func(point_times, glat.ravel(), glong.ravel(), alt.ravel())
+
+    blocked = _blocked(alt, min_alt)
+    # trapezoid weights of the points
+    step = np.diff(distances)
+    weights = 0.5 * (np.append(step, 0.) + np.insert(step, 0, 0.))
+    integrals = {}
+    for variable in variables:
+        values = np.reshape(output[variable], shape)
+        values = np.where(blocked, 0., values)
+        integrals[variable] = values @ weights
+
+    return integrals
+
+
+def integrate_rays(times, position, look, distances, model='iri',
+                   variables=('ion_dens',), backend='pyglow', min_alt=0.,
+                   block_size=1000, max_workers=1):
+    """
+    Integrates model variables along look rays.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Sample times
+    position : array_like
+        ECEF position of the spacecraft (km) with shape (time, 3)
+    look : array_like
+        ECEF unit look directions with shape (time, 3), see `look_vectors`
+    distances : array_like
+        Increasing distances of the sample points from the spacecraft (km)
+    model : string
+        'iri', 'msis', 'hwm' or 'igrf' (default='iri')
+    variables : list of strings
+        Variables of the model to integrate (default=('ion_dens',))
+    backend : string or ModelBackend
+        Name of a registered backend, or a backend.  Vectorized backends,
+        such as 'synthetic', evaluate all the points of a block at once.
+        (default='pyglow')
+    min_alt : float
+        Altitude of the surface blocking the rays (km).  Points beyond the
+        first point of a ray below `min_alt` do not contribute.
+        (default=0.)
+    block_size : int
+        Number of samples evaluated at once.  Memory use is set by the block
+        size times the number of distances, times `max_workers`.
+        (default=1000)
+    max_workers : int
+        Number of blocks evaluated concurrently in threads.  Backends must
+        be thread safe to use more than one worker. (default=1)
+
+    Returns
+    -------
+    dict
+        Integral of each variable along the rays, with shape (time,), in the
+        units of the variable times km
+
+    """
+
+    times = np.asarray(times)
+    position = np.asarray(position, dtype=float)
+    look = np.asarray(look, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    if distances.ndim != 1 or len(distances) < 2:
+        raise ValueError('At least two ray distances are needed')
+    if np.any(np.diff(distances) <= 0.):
+        raise ValueError('Ray distances must be increasing')
+    if block_size < 1:
+        raise ValueError('block_size must be positive')
+
+    func = getattr(mm_backends.get_backend(backend), model)
+    starts = range(0, len(times), block_size)
+
+    def integrate(start):
+        select = slice(start, start + block_size)
+        return _integrate_block(times[select], position[select],
+                                look[select], distances, func, variables,
+                                min_alt)
+
+    if max_workers > 1:
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            blocks = list(pool.map(integrate, starts))
+    else:
+        blocks = [integrate(start) for start in starts]
+
+    return {variable: np.concatenate([block[variable] for block in blocks]
+                                     + [np.empty(0)])
+            for variable in variables}
+
+
+def add_ray_integrals(inst, look=(1., 0., 0.), distances=None, model='iri',
+                      variables=('ion_dens',), labels=None, scale=1.,
+                      units='', backend='pyglow', min_alt=0., block_size=1000,
+                      max_workers=1):
+    """
+    Adds model variables integrated along a look ray of the spacecraft.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including 'position_ecef_*' (*=x,y,z) and the
+        spacecraft attitude, from `attitude.add_attitude` or
+        `spacecraft.add_ram_pointing_sc_attitude_vectors`
+    look : array_like
+        Look direction in the spacecraft frame.  The default looks along
+        the spacecraft x axis, toward the limb ahead of a ram pointing
+        spacecraft. (default=(1., 0., 0.))
+    distances : array_like or NoneType
+        Distances of the sample points from the spacecraft (km).  If None,
+        uses 61 points from 0 to 3000 km. (default=None)
+    model : string
+        'iri', 'msis', 'hwm' or 'igrf' (default='iri')
+    variables : list of strings
+        Variables of the model to integrate (default=('ion_dens',))
+    labels : list of strings or NoneType
+        Labels of the integrals in inst.  If None, uses the variable names
+        with a '_los' suffix. (default=None)
+    scale : float
+        Factor converting the integrals, in the units of the variable times
+        km, to `units` (default=1.)
+    units : string
+        Units of the integrals (default='')
+    backend : string or ModelBackend
+        Name of a registered backend, or a backend (default='pyglow')
+    min_alt : float
+        Altitude of the surface blocking the rays (km) (default=0.)
+    block_size : int
+        Number of samples evaluated at once (default=1000)
+    max_workers : int
+        Number of blocks evaluated concurrently (default=1)
+
+    Returns
+    -------
+    None
+        Modifies the instrument in place to include the integrals
+
+    Example
+    -------
+        inst.custom.attach(add_ray_integrals,
+                           kwargs={'look': (-1., 0., 0.),
+                                   'backend': 'synthetic'})
+
+    """
+
+    if distances is None:
+        distances = np.linspace(0., 3000., 61)
+    if labels is None:
+        labels = ['_'.join((variable, 'los')) for variable in variables]
+    if len(labels) != len(variables):
+        raise ValueError('A label is needed for each variable')
+
+    position = mm_sc._get_vector(inst, ['position_ecef_x', 'position_ecef_y',
+                                        'position_ecef_z'])
+    look_ecef = look_vectors(mm_sc._get_attitude(inst), look)
+    integrals = integrate_rays(inst.index, position, look_ecef, distances,
+                               model=model, variables=variables,
+                               backend=backend, min_alt=min_alt,
+                               block_size=block_size,
+                               max_workers=max_workers)
+
+    for variable, label in zip(variables, labels):
+        inst[label] = scale * integrals[variable]
+        inst.meta[label] = {'units': units,
+                            'desc': ' '.join(('{:s} from {:s} integrated',
+                                              'along the line of sight'))
+                            .format(variable, model.upper())}
+
+    return
+
+
+def add_slant_tec(inst, look=(1., 0., 0.), distances=None, label='slant_tec',
+                  backend='pyglow', **kwargs):
+    """
+    Adds the electron content along a look ray of the spacecraft.
+
+    Integrates the IRI ion density, equal to the electron density for a
+    neutral plasma.  See `add_ray_integrals` for the other keywords.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including 'position_ecef_*' (*=x,y,z) and the
+        spacecraft attitude
+    look : array_like
+        Look direction in the spacecraft frame (default=(1., 0., 0.))
+    distances : array_like or NoneType
+        Distances of the sample points from the spacecraft (km)
+        (default=None)
+    label : string
+        Label of the electron content in inst (default='slant_tec')
+    backend : string or ModelBackend
+        Name of a registered backend, or a backend (default='pyglow')
+
+    Returns
+    -------
+    None
+        Modifies the instrument in place to include the slant TEC (TECU)
+
+    """
+
+    add_ray_integrals(inst, look=look, distances=distances, model='iri',
+                      variables=['ion_dens'], labels=[label], scale=tecu,
+                      units='TECU', backend=backend, **kwargs)
+
+    return
+
+
+def add_column_density(inst, look=(1., 0., 0.), distances=None,
+                       label='column_dens', backend='pyglow', **kwargs):
+    """
+    Adds the neutral column density along a look ray of the spacecraft.
+
+    Integrates the MSIS total number density.  See `add_ray_integrals` for
+    the other keywords.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including 'position_ecef_*' (*=x,y,z) and the
+        spacecraft attitude
+    look : array_like
+        Look direction in the spacecraft frame (default=(1., 0., 0.))
+    distances : array_like or NoneType
+        Distances of the sample points from the spacecraft (km)
+        (default=None)
+    label : string
+        Label of the column density in inst (default='column_dens')
+    backend : string or ModelBackend
+        Name of a registered backend, or a backend (default='pyglow')
+
+    Returns
+    -------
+    None
+        Modifies the instrument in place to include the column density
+        (cm^-2)
+
+    """
+
+    add_ray_integrals(inst, look=look, distances=distances, model='msis',
+                      variables=['Nn'], labels=[label], scale=column_cm2,
+                      units='cm^-2', backend=backend, **kwargs)
+
+    return
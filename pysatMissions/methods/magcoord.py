@@ -3,8 +3,7 @@ from pysat instruments.
 
 """
 
-import aacgmv2
-import apexpy
+from pysatMissions.methods import contexts
 
 
 def add_aacgm_coordinates(inst, glat_label='glat', glong_label='glong',
@@ -43,11 +42,14 @@ def add_aacgm_coordinates(inst, glat_label='glat', glong_label='glong',
 
     """
 
+    # imported on first use, as loading the coefficients is slow
+    import aacgmv2
+
     aalat = []
     aalon = []
     mlt = []
     for lat, lon, alt, time in zip(inst[glat_label], inst[glong_label],
-                                   inst[alt_label], inst.data.index):
+                                   inst[alt_label], inst.index):
         # aacgmv2 latitude and longitude from geodetic coords
         tlat, tlon, tmlt = aacgmv2.get_aacgm_coord(lat, lon, alt, time)
         aalat.append(tlat)
@@ -69,7 +71,7 @@ def add_aacgm_coordinates(inst, glat_label='glat', glong_label='glong',
 
 
 def add_quasi_dipole_coordinates(inst, glat_label='glat', glong_label='glong',
-                                 alt_label='alt'):
+                                 alt_label='alt', pool=None):
     """
     Uses Apexpy package to add quasi-dipole coordinates to instrument object.
 
@@ -90,6 +92,10 @@ def add_quasi_dipole_coordinates(inst, glat_label='glat', glong_label='glong',
     alt_label : string
         label used in inst to identify WGS84 geodetic altitude (km, height
         above surface)
+    pool : contexts.ModelPool or NoneType
+        Pool the apexpy.Apex object is taken from, so it is set up once per
+        day rather than on every load.  If None, uses the pool shared by the
+        whole process. (default=None)
 
     Returns
     -------
@@ -106,13 +112,13 @@ def add_quasi_dipole_coordinates(inst, glat_label='glat', glong_label='glong',
 
     """
 
-    ap = apexpy.Apex(date=inst.date)
+    ap = contexts.get_model('apex', inst.date, pool=pool)
 
     qd_lat = []
     qd_lon = []
     mlt = []
     for lat, lon, alt, time in zip(inst[glat_label], inst[glong_label],
-                                   inst[alt_label], inst.data.index):
+                                   inst[alt_label], inst.index):
         # quasi-dipole latitude and longitude from geodetic coords
         tlat, tlon = ap.geo2qd(lat, lon, alt)
         qd_lat.append(tlat)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Provides adaptive sampling of simulated orbits, which propagate at a
+coarse cadence and refine to a fine cadence only inside regions of
+interest, such as the auroral zones or passes over a ground station.
+
+Custom functions attached to the instrument then run only on the samples
+kept, reducing the number of model evaluations.
+
+"""
+
+import functools
+
+import numpy as np
+
+
+def _in_range(data, label, low, high, absolute):
+    """True where a variable lies within (low, high)"""
+
+    values = np.asarray(data[label], dtype=float)
+    if absolute:
+        values = np.abs(values)
+
+    return (values >= low) & (values <= high)
+
+
+def in_range(label, low=-np.inf, high=np.inf, absolute=False):
+    """
+    Region where a variable returned by load lies within a range.
+
+    Parameters
+    ----------
+    label : string
+        Variable returned by the load routine, such as 'glat'
+    low, high : float
+        Limits of the region, inclusive (default=-inf, inf)
+    absolute : bool
+        If True, uses the absolute value of the variable (default=False)
+
+    Returns
+    -------
+    function
+        Region used by `AdaptiveSampler`
+
+    """
+
+    return functools.partial(_in_range, label=label, low=low, high=high,
+                             absolute=absolute)
+
+
+def _magnetic_latitude_above(data, limit, glat_label, glong_label, alt_label):
+    """True where the absolute dipole latitude is above a limit"""
+
+    from pysatMissions.models import dipole as mm_dipole
+
+    mlat = mm_dipole.dipole_latitude(data.index, data[glat_label],
+                                     data[glong_label], data[alt_label])
+
+    return np.abs(mlat) >= limit
+
+
+def magnetic_latitude_above(limit, glat_label='glat', glong_label='glong',
+                            alt_label='alt'):
+    """
+    Region poleward of a magnetic latitude in either hemisphere.
+
+    Parameters
+    ----------
+    limit : float
+        Absolute magnetic latitude (degrees)
+    glat_label : string
+        label used to identify WGS84 geodetic latitude (degrees)
+    glong_label : string
+        label used to identify WGS84 geodetic longitude (degrees)
+    alt_label : string
+        label used to identify WGS84 geodetic altitude (km)
+
+    Returns
+    -------
+    function
+        Region used by `AdaptiveSampler`
+
+    Note
+    ----
+        Uses the centered dipole latitude, which is within a few degrees of
+        the quasi-dipole latitude and much faster to evaluate.  Regions are
+        found at the coarse cadence, so a margin of a few degrees is
+        recommended.
+
+    """
+
+    return functools.partial(_magnetic_latitude_above, limit=limit,
+                             glat_label=glat_label, glong_label=glong_label,
+                             alt_label=alt_label)
+
+
+def station_in_view(min_elevation=0., el_label='obs_sat_el_angle'):
+    """
+    Region where the spacecraft is above the horizon of the ground station.
+
+    Parameters
+    ----------
+    min_elevation : float
+        Minimum elevation of the spacecraft seen from the ground station
+        (degrees) (default=0.)
+    el_label : string
+        label used to identify the elevation in radians, as returned by
+        `pysat_ephem` (default='obs_sat_el_angle')
+
+    Returns
+    -------
+    function
+        Region used by `AdaptiveSampler`
+
+    """
+
+    return in_range(el_label, low=np.radians(min_elevation))
+
+
+class AdaptiveSampler(object):
+    """
+    Selects the sample times of a simulated orbit.
+
+    Parameters
+    ----------
+    regions : function or list of functions
+        Regions of interest.  Each takes a DataFrame of the variables
+        returned by the load routine, indexed by time, and returns True
+        for the samples inside the region.  See `in_range`,
+        `magnetic_latitude_above` and `station_in_view`.
+    coarse_step : float
+        Time between samples outside the regions (seconds) (default=60.)
+    fine_step : float
+        Time between samples inside the regions (seconds) (default=1.)
+    margin : float
+        Time added before and after each region (seconds), rounded up to a
+        whole number of coarse steps (default=0.)
+
+    Attributes
+    ----------
+    last_sample : dict
+        Number of 'coarse' and 'fine' samples propagated by the last call of
+        `sample`, and the number of samples at the fine cadence, 'full'
+
+    Note
+    ----
+    The orbit is first propagated at the coarse cadence, and the regions
+    are found from these samples.  Every coarse interval with an end inside
+    a region is then filled at the fine cadence.  Regions shorter than the
+    coarse step may be missed.
+
+    Example
+    -------
+        sampler = AdaptiveSampler([magnetic_latitude_above(60.),
+                                   station_in_view(10.)],
+                                  coarse_step=60., margin=120.)
+        inst = pysat.Instrument(inst_module=pysat_ephem, sampler=sampler)
+
+    """
+
+    def __init__(self, regions, coarse_step=60., fine_step=1., margin=0.):
+
+        if callable(regions):
+            regions = [regions]
+        self.regions = list(regions)
+
+        ratio = coarse_step / fine_step
+        if fine_step <= 0. or ratio < 1. or not np.isclose(ratio,
+                                                           round(ratio)):
+            raise ValueError('coarse_step must be a multiple of fine_step.')
+        self.coarse_step = coarse_step
+        self.fine_step = fine_step
+        self.margin = margin
+        self.last_sample = {}
+
+        return
+
+    def flag(self, data):
+        """
+        Finds the samples inside any region.
+
+        Parameters
+        ----------
+        data : pds.DataFrame
+            Variables returned by the load routine, indexed by time
+
+        Returns
+        -------
+        np.array
+            True for the samples inside a region
+
+        """
+
+        flags = np.zeros(len(data), dtype=bool)
+        for region in self.regions:
+            flags |= np.asarray(region(data), dtype=bool)
+
+        return flags
+
+    def sample(self, times, propagate):
+        """
+        Propagates an orbit at the coarse cadence, refined inside regions.
+
+        Parameters
+        ----------
+        times : pds.DatetimeIndex
+            Sample times at the fine cadence
+        propagate : function
+            Takes a subset of the times and returns a list of (name, array)
+            pairs of the variables at those times, as used by
+            `instruments._core._build_data`
+
+        Returns
+        -------
+        times : pds.DatetimeIndex
+            Times kept, in order
+        variables : list of tuples
+            (name, array) pairs of the variables at the times kept
+
+        """
+
+        from pysatMissions.instruments import _core as mcore
+
+        num = len(times)
+        ratio = int(round(self.coarse_step / self.fine_step))
+        coarse = np.arange(0, num, ratio)
+        if coarse[-1] != num - 1:
+            coarse = np.append(coarse, num - 1)
+        coarse_vars = propagate(times[coarse])
+
+        flags = self.flag(mcore._build_data(times[coarse], coarse_vars))
+        width = int(np.ceil(self.margin / self.coarse_step))
+        if width > 0:
+            flags = np.convolve(flags, np.ones(2 * width + 1),
+                                mode='same') > 0
+
+        # fill every coarse interval with an end in a region
+        refine = flags[:-1] | flags[1:]
+        interval = np.repeat(np.arange(len(refine)), np.diff(coarse))
+        fine = coarse[0] + np.where(refine[interval])[0]
+        fine = fine[np.isin(fine, coarse, invert=True)]
+
+        self.last_sample = {'coarse': len(coarse), 'fine': len(fine),
+                            'full': num}
+        if len(fine) == 0:
+            return times[coarse], coarse_vars
+
+        fine_vars = propagate(times[fine])
+        order = np.argsort(np.concatenate([coarse, fine]), kind='stable')
+        variables = [(name, np.concatenate([values, fine_values])[order])
+                     for (name, values), (_, fine_values)
+                     in zip(coarse_vars, fine_vars)]
+
+        return times[np.concatenate([coarse, fine])[order]], variables
@@ -4,7 +4,142 @@ for pysat instruments.
 """
 
 import numpy as np
-import pysatMagVect
+import pandas as pds
+
+from pysatMissions import _kernels
+
+# Radii used by the shadow models, in km
+earth_radius = 6378.137
+sun_radius = 696000.
+# Astronomical unit in km
+astronomical_unit = 149597870.7
+
+# labels of the spacecraft attitude unit vectors in the ECEF basis
+_attitude_labels = [['sc_{:s}hat_ecef_{:s}'.format(axis, coord)
+                     for coord in ['x', 'y', 'z']] for axis in ['x', 'y', 'z']]
+
+
+def _vector_name(labels):
+    """Name of the xarray variable holding a vector given component labels
+
+    Returns None if the labels are not a common prefix followed by '_x',
+    '_y' and '_z'.
+
+    """
+
+    name = labels[0][:-2]
+    if list(labels) != [name + suffix for suffix in ['_x', '_y', '_z']]:
+        return None
+
+    return name
+
+
+def _get_vector(inst, labels):
+    """
+    Returns a vector stored in an instrument as a single array.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object
+    labels : list of strings
+        Labels of the x, y and z components, such as 'position_ecef_x'.  For
+        xarray data, a (time, component) variable named without the
+        component suffix, such as 'position_ecef', is used when present.
+
+    Returns
+    -------
+    np.array
+        Vector with shape (time, 3)
+
+    """
+
+    name = _vector_name(labels)
+    if not inst.pandas_format and name is not None:
+        if name in inst.data:
+            return np.asarray(inst.data[name].values, dtype=float)
+
+    return np.stack([np.asarray(inst[label], dtype=float)
+                     for label in labels], axis=-1)
+
+
+def _set_vector(inst, labels, values, meta=None, vector_meta=None):
+    """
+    Stores a vector in an instrument.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object
+    labels : list of strings
+        Labels of the x, y and z components.  For xarray data and labels
+        ending in '_x', '_y' and '_z', a single (time, component) variable
+        named without the suffix is stored instead.
+    values : np.array
+        Vector with shape (time, 3)
+    meta : list of dicts or NoneType
+        Metadata of each component (default=None)
+    vector_meta : dict or NoneType
+        Metadata of the xarray variable.  If None, uses the first entry of
+        `meta`. (default=None)
+
+    """
+
+    name = _vector_name(labels)
+    if inst.pandas_format or name is None:
+        for i, label in enumerate(labels):
+            inst[label] = values[:, i]
+            if meta is not None:
+                # pysat rewrites the assigned dict, which may be a caller
+                # keyword argument
+                inst.meta[label] = dict(meta[i])
+    else:
+        if 'component' not in inst.data.coords:
+            inst.data.coords['component'] = ['x', 'y', 'z']
+        inst.data[name] = (('time', 'component'), values)
+        if vector_meta is None and meta is not None:
+            vector_meta = meta[0]
+        if vector_meta is not None:
+            inst.meta[name] = dict(vector_meta)
+
+    return
+
+
+def _get_attitude(inst):
+    """
+    Returns the spacecraft attitude as a single array.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including the attitude from
+        `add_ram_pointing_sc_attitude_vectors`, or the quaternions from
+        `attitude.add_attitude`
+
+    Returns
+    -------
+    np.array
+        Attitude with shape (time, 3, 3).  Element [:, i, j] is the ECEF j
+        component of the spacecraft i axis, so the array rotates ECEF
+        vectors into the spacecraft basis.
+
+    """
+
+    if not inst.pandas_format and 'sc_attitude_ecef' in inst.data:
+        return np.asarray(inst.data['sc_attitude_ecef'].values, dtype=float)
+
+    if _attitude_labels[0][0] not in inst.data:
+        from pysatMissions.methods import attitude as mm_att
+
+        if not inst.pandas_format and 'sc_attitude_quat' in inst.data:
+            return mm_att.matrix_from_quaternion(
+                inst.data['sc_attitude_quat'].values)
+        if inst.pandas_format and mm_att.quaternion_labels[0] in inst.data:
+            return mm_att.matrix_from_quaternion(
+                _get_vector(inst, mm_att.quaternion_labels))
+
+    return np.stack([_get_vector(inst, labels)
+                     for labels in _attitude_labels], axis=1)
 
 
 def add_ram_pointing_sc_attitude_vectors(inst):
@@ -27,7 +162,9 @@ def add_ram_pointing_sc_attitude_vectors(inst):
         unit vectors, expressed in ECEF basis. Vectors are named
         sc_(x,y,z)hat_ecef_(x,y,z).
         sc_xhat_ecef_x is the spacecraft unit vector along x (positive along
-        velocity vector) reported in ECEF, ECEF x-component.
+        velocity vector) reported in ECEF, ECEF x-component.  For xarray
+        data, the vectors are stored together as sc_attitude_ecef, with
+        dimensions (time, sc_axis, component).
 
     Notes
     -----
@@ -40,96 +177,43 @@ def add_ram_pointing_sc_attitude_vectors(inst):
 
     """
 
-    # ram pointing is along velocity vector
-    inst['sc_xhat_ecef_x'], inst['sc_xhat_ecef_y'], inst['sc_xhat_ecef_z'] = \
-        pysatMagVect.normalize_vector(inst['velocity_ecef_x'],
-                                      inst['velocity_ecef_y'],
-                                      inst['velocity_ecef_z'])
-
-    # begin with z along Nadir (towards Earth)
-    # if orbit isn't perfectly circular, then the s/c z vector won't
-    # point exactly along nadir. However, nadir pointing is close enough
-    # to the true z (in the orbital plane) that we can use it to get y,
-    # and use x and y to get the real z
-    inst['sc_zhat_ecef_x'], inst['sc_zhat_ecef_y'], inst['sc_zhat_ecef_z'] = \
-        pysatMagVect.normalize_vector(-inst['position_ecef_x'],
-                                      -inst['position_ecef_y'],
-                                      -inst['position_ecef_z'])
-
-    # get y vector assuming right hand rule
-    # Z x X = Y
-    inst['sc_yhat_ecef_x'], inst['sc_yhat_ecef_y'], inst['sc_yhat_ecef_z'] = \
-        pysatMagVect.cross_product(inst['sc_zhat_ecef_x'],
-                                   inst['sc_zhat_ecef_y'],
-                                   inst['sc_zhat_ecef_z'],
-                                   inst['sc_xhat_ecef_x'],
-                                   inst['sc_xhat_ecef_y'],
-                                   inst['sc_xhat_ecef_z'])
-    # normalize since Xhat and Zhat from above may not be orthogonal
-    inst['sc_yhat_ecef_x'], inst['sc_yhat_ecef_y'], inst['sc_yhat_ecef_z'] = \
-        pysatMagVect.normalize_vector(inst['sc_yhat_ecef_x'],
-                                      inst['sc_yhat_ecef_y'],
-                                      inst['sc_yhat_ecef_z'])
-
-    # strictly, need to recalculate Zhat so that it is consistent with RHS
-    # just created
-    # Z = X x Y
-    inst['sc_zhat_ecef_x'], inst['sc_zhat_ecef_y'], inst['sc_zhat_ecef_z'] = \
-        pysatMagVect.cross_product(inst['sc_xhat_ecef_x'],
-                                   inst['sc_xhat_ecef_y'],
-                                   inst['sc_xhat_ecef_z'],
-                                   inst['sc_yhat_ecef_x'],
-                                   inst['sc_yhat_ecef_y'],
-                                   inst['sc_yhat_ecef_z'])
-
-    # Adding metadata
-    inst.meta['sc_xhat_ecef_x'] = {'units': '',
-                                   'desc': 'S/C attitude (x-direction, ram) ' +
-                                   'unit vector, expressed in ECEF basis, ' +
-                                   'x-component'}
-    inst.meta['sc_xhat_ecef_y'] = {'units': '',
-                                   'desc': 'S/C attitude (x-direction, ram) ' +
-                                   'unit vector, expressed in ECEF basis, ' +
-                                   'y-component'}
-    inst.meta['sc_xhat_ecef_z'] = {'units': '',
-                                   'desc': 'S/C attitude (x-direction, ram) ' +
-                                   'unit vector, expressed in ECEF basis, ' +
-                                   'z-component'}
-
-    inst.meta['sc_zhat_ecef_x'] = {'units': '',
-                                   'desc': 'S/C attitude (z-direction, ' +
-                                   'generally nadir) unit vector, expressed ' +
-                                   'in ECEF basis, x-component'}
-    inst.meta['sc_zhat_ecef_y'] = {'units': '',
-                                   'desc': 'S/C attitude (z-direction, ' +
-                                   'generally nadir) unit vector, expressed ' +
-                                   'in ECEF basis, y-component'}
-    inst.meta['sc_zhat_ecef_z'] = {'units': '',
-                                   'desc': 'S/C attitude (z-direction, ' +
-                                   'generally nadir) unit vector, expressed ' +
-                                   'in ECEF basis, z-component'}
-
-    inst.meta['sc_yhat_ecef_x'] = {'units': '',
-                                   'desc': 'S/C attitude (y-direction, ' +
-                                   'generally south) unit vector, expressed ' +
-                                   'in ECEF basis, x-component'}
-    inst.meta['sc_yhat_ecef_y'] = {'units': '',
-                                   'desc': 'S/C attitude (y-direction, ' +
-                                   'generally south) unit vector, expressed ' +
-                                   'in ECEF basis, y-component'}
-    inst.meta['sc_yhat_ecef_z'] = {'units': '',
-                                   'desc': 'S/C attitude (y-direction, ' +
-                                   'generally south) unit vector, expressed ' +
-                                   'in ECEF basis, z-component'}
-
-    # check what magnitudes we get
-    mag = np.sqrt(inst['sc_zhat_ecef_x']**2 + inst['sc_zhat_ecef_y']**2 +
-                  inst['sc_zhat_ecef_z']**2)
-    idx, = np.where((mag < .999999999) | (mag > 1.000000001))
-    if len(idx) > 0:
-        print(mag[idx])
-        raise RuntimeError('Unit vector generation failure. Not sufficently ' +
-                           'orthogonal.')
+    # ram pointing is along velocity vector, and z begins along nadir
+    # (towards Earth).  If the orbit isn't perfectly circular, then the s/c
+    # z vector won't point exactly along nadir.  However, nadir pointing is
+    # close enough to the true z (in the orbital plane) that we can use it
+    # to get y (Z x X = Y), and use x and y to get the real z (Z = X x Y).
+    # The whole basis is found in one pass per sample.
+    position = _get_vector(inst, ['position_ecef_x', 'position_ecef_y',
+                                  'position_ecef_z'])
+    velocity = _get_vector(inst, ['velocity_ecef_x', 'velocity_ecef_y',
+                                  'velocity_ecef_z'])
+    attitude = _kernels.attitude_basis(position, velocity)
+    _check_attitude(attitude, [position, velocity])
+    xhat, yhat, zhat = attitude[:, 0], attitude[:, 1], attitude[:, 2]
+
+    # Adding data and metadata
+    names = {'x': 'x-direction, ram', 'y': 'y-direction, generally south',
+             'z': 'z-direction, generally nadir'}
+    if inst.pandas_format:
+        for axis, labels, vector in zip(['x', 'y', 'z'], _attitude_labels,
+                                        [xhat, yhat, zhat]):
+            meta = [{'units': '',
+                     'desc': 'S/C attitude (' + names[axis] + ') unit ' +
+                     'vector, expressed in ECEF basis, ' +
+                     '{:s}-component'.format(coord)}
+                    for coord in ['x', 'y', 'z']]
+            _set_vector(inst, labels, vector, meta=meta)
+    else:
+        for coord in ['component', 'sc_axis']:
+            if coord not in inst.data.coords:
+                inst.data.coords[coord] = ['x', 'y', 'z']
+        inst.data['sc_attitude_ecef'] = (('time', 'sc_axis', 'component'),
+                                         attitude)
+        inst.meta['sc_attitude_ecef'] = \
+            {'units': '',
+             'desc': 'S/C attitude unit vectors (x ram, y generally south, ' +
+             'z generally nadir) along sc_axis, expressed in ECEF basis ' +
+             'along component'}
 
     return
 
@@ -140,7 +224,8 @@ def calculate_ecef_velocity(inst):
 
     Presumes that the spacecraft velocity in ECEF is in
     the input instrument object as position_ecef_*. Uses a symmetric
-    difference to calculate the velocity thus endpoints will be
+    difference over the time between the neighbouring samples to calculate
+    the velocity, so samples need not be evenly spaced.  Endpoints will be
     set to NaN. Routine should be run using pysat data padding feature
     to create valid end points.
 
@@ -153,31 +238,25 @@ def calculate_ecef_velocity(inst):
     -------
     None
         Modifies pysat.Instrument object in place to include ECEF velocity
-        using naming scheme velocity_ecef_* (*=x,y,z)
+        using naming scheme velocity_ecef_* (*=x,y,z), or velocity_ecef with
+        dimensions (time, component) for xarray data
 
     """
 
-    def get_vel_from_pos(x):
-        vel = (x.values[2:] - x.values[0:-2])/2.
-        return vel
-
-    vel_x = get_vel_from_pos(inst['position_ecef_x'])
-    vel_y = get_vel_from_pos(inst['position_ecef_y'])
-    vel_z = get_vel_from_pos(inst['position_ecef_z'])
+    pos = _get_vector(inst, ['position_ecef_x', 'position_ecef_y',
+                             'position_ecef_z'])
+    secs = np.asarray(inst.index, dtype='datetime64[ns]').astype(np.int64)
+    secs = secs * 1.e-9
+    vel = np.full(pos.shape, np.nan)
+    vel[1:-1] = (pos[2:] - pos[:-2]) / (secs[2:] - secs[:-2])[:, np.newaxis]
 
-    inst[1:-1, 'velocity_ecef_x'] = vel_x
-    inst[1:-1, 'velocity_ecef_y'] = vel_y
-    inst[1:-1, 'velocity_ecef_z'] = vel_z
+    meta = {'units': 'km/s',
+            'desc': 'Velocity of satellite calculated with respect to ECEF ' +
+            'frame.'}
+    _set_vector(inst, ['velocity_ecef_x', 'velocity_ecef_y',
+                       'velocity_ecef_z'], vel,
+                meta=[meta.copy(), meta.copy(), meta.copy()])
 
-    inst.meta['velocity_ecef_x'] = {'units': 'km/s',
-                                    'desc': 'Velocity of satellite ' +
-                                    'calculated with respect to ECEF frame.'}
-    inst.meta['velocity_ecef_y'] = {'units': 'km/s',
-                                    'desc': 'Velocity of satellite ' +
-                                    'calculated with respect to ECEF frame.'}
-    inst.meta['velocity_ecef_z'] = {'units': 'km/s',
-                                    'desc': 'Velocity of satellite ' +
-                                    'calculated with respect to ECEF frame.'}
     return
 
 
@@ -210,26 +289,296 @@ def project_ecef_vector_onto_sc(inst, x_label, y_label, z_label,
 
     # TODO: add checks for existence of ecef labels in inst
 
-    x, y, z = \
-        pysatMagVect.project_ecef_vector_onto_basis(inst[x_label],
-                                                    inst[y_label],
-                                                    inst[z_label],
-                                                    inst['sc_xhat_ecef_x'],
-                                                    inst['sc_xhat_ecef_y'],
-                                                    inst['sc_xhat_ecef_z'],
-                                                    inst['sc_yhat_ecef_x'],
-                                                    inst['sc_yhat_ecef_y'],
-                                                    inst['sc_yhat_ecef_z'],
-                                                    inst['sc_zhat_ecef_x'],
-                                                    inst['sc_zhat_ecef_y'],
-                                                    inst['sc_zhat_ecef_z'])
-    inst[new_x_label] = x
-    inst[new_y_label] = y
-    inst[new_z_label] = z
-
-    if meta is not None:
-        inst.meta[new_x_label] = meta[0]
-        inst.meta[new_y_label] = meta[1]
-        inst.meta[new_z_label] = meta[2]
+    vector = _get_vector(inst, [x_label, y_label, z_label])
+    projected = np.einsum('nij,nj->ni', _get_attitude(inst), vector)
+    _set_vector(inst, [new_x_label, new_y_label, new_z_label], projected,
+                meta=meta)
+
+    return
+
+
+def _j2000_days(times):
+    """Days since J2000.0 of a set of times"""
+
+    unix = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+
+    return unix * 1.e-9 / 86400. + 2440587.5 - 2451545.0
+
+
+def _gmst(times):
+    """Greenwich mean sidereal time (radians) of a set of times"""
+
+    return np.radians(np.mod(280.46061837 + 360.98564736629
+                             * _j2000_days(times), 360.))
+
+
+def _check_attitude(attitude, inputs):
+    """
+    Raises an error where the attitude is undefined.
+
+    Parameters
+    ----------
+    attitude : np.array
+        Attitude with shape (time, 3, 3)
+    inputs : list of np.array
+        Vectors the attitude was found from, with shape (time, 3).  Samples
+        where an input is not finite, such as the ends of a velocity found
+        by differences, are not checked.
+
+    """
+
+    known = np.all([np.isfinite(vector).all(axis=-1) for vector in inputs],
+                   axis=0)
+    bad, = np.where(known & ~np.isfinite(attitude).all(axis=(1, 2)))
+    if len(bad) > 0:
+        raise ValueError(' '.join(('Attitude undefined at {:d} samples, such',
+                                   'as sample {:d}, where the pointing',
+                                   'directions are zero or parallel.')).format(
+                                       len(bad), bad[0]))
 
     return
+
+
+def _sun_position_ecef(times):
+    """Closed-form solar ephemeris in the ECEF frame
+
+    Uses the low precision formulae from the Astronomical Almanac, good to
+    about 0.01 degrees between 1950 and 2050.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Times at which to calculate the solar position
+
+    Returns
+    -------
+    np.array
+        Position of the Sun in ECEF (km), shape (N, 3)
+
+    """
+
+    n = _j2000_days(times)
+
+    mean_long = np.radians(np.mod(280.460 + 0.9856474 * n, 360.))
+    mean_anom = np.radians(np.mod(357.528 + 0.9856003 * n, 360.))
+    ecl_long = (mean_long + np.radians(1.915) * np.sin(mean_anom)
+                + np.radians(0.020) * np.sin(2. * mean_anom))
+    obliquity = np.radians(23.439 - 4.e-7 * n)
+    dist = astronomical_unit * (1.00014 - 0.01671 * np.cos(mean_anom)
+                                - 0.00014 * np.cos(2. * mean_anom))
+
+    # Sun in the inertial frame
+    x_eci = dist * np.cos(ecl_long)
+    y_eci = dist * np.cos(obliquity) * np.sin(ecl_long)
+    z_eci = dist * np.sin(obliquity) * np.sin(ecl_long)
+
+    # rotate into Earth fixed frame with Greenwich mean sidereal time
+    gmst = _gmst(times)
+    sun = np.empty((len(n), 3))
+    sun[:, 0] = np.cos(gmst) * x_eci + np.sin(gmst) * y_eci
+    sun[:, 1] = -np.sin(gmst) * x_eci + np.cos(gmst) * y_eci
+    sun[:, 2] = z_eci
+
+    return sun
+
+
+def _disk_overlap(a, b, c):
+    """Overlapping area of two disks with radii a and b separated by c"""
+
+    a, b, c = np.broadcast_arrays(a, b, c)
+    area = np.zeros(a.shape)
+
+    inner = c <= np.abs(a - b)
+    area[inner] = np.pi * np.minimum(a[inner], b[inner])**2
+
+    part = (c < a + b) & ~inner
+    ap, bp, cp = a[part], b[part], c[part]
+    alpha = np.arccos(np.clip((cp**2 + ap**2 - bp**2) / (2. * cp * ap), -1., 1.))
+    beta = np.arccos(np.clip((cp**2 + bp**2 - ap**2) / (2. * cp * bp), -1., 1.))
+    kite = np.sqrt(np.clip((-cp + ap + bp) * (cp + ap - bp) * (cp - ap + bp)
+                           * (cp + ap + bp), 0., None))
+    area[part] = ap**2 * alpha + bp**2 * beta - 0.5 * kite
+
+    return area
+
+
+def add_solar_geometry(inst, glat_label='glat', glong_label='glong',
+                       shadow_model='conical'):
+    """
+    Add solar position, illumination and eclipse state of the spacecraft.
+
+    All quantities are calculated over the full time array at once using a
+    closed-form solar ephemeris.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object
+    glat_label : string
+        label used in inst to identify WGS84 geodetic latitude (degrees)
+    glong_label : string
+        label used in inst to identify WGS84 geodetic longitude (degrees)
+    shadow_model : string
+        'conical' accounts for the finite size of the Sun and flags the
+        penumbra, 'cylindrical' treats the Earth shadow as a cylinder with no
+        penumbra. (default='conical')
+
+    Returns
+    -------
+    None
+        Modifies pysat.Instrument object in place to include
+        'sun_ecef_*' (*=x,y,z) position of the Sun in ECEF (km)
+        'subsolar_lat', 'subsolar_long' location of the subsolar point
+        'sza' solar zenith angle at the sub-satellite point (degrees)
+        'slt' local solar time at the sub-satellite point (hours)
+        'sunlit_frac' fraction of the solar disk visible from the spacecraft
+        'umbra' True where the spacecraft is in the Earth umbra
+        'penumbra' True where the spacecraft is in the Earth penumbra
+
+    Notes
+    -----
+        Expects the position of the spacecraft in Earth Centered Earth Fixed
+        (ECEF) coordinates to be in the instrument object and named
+        position_ecef_* (*=x,y,z)
+
+    """
+
+    if shadow_model not in ['conical', 'cylindrical']:
+        raise ValueError('Unknown shadow model: {:}'.format(shadow_model))
+
+    sun = _sun_position_ecef(inst.index)
+    pos = _get_vector(inst, ['position_ecef_x', 'position_ecef_y',
+                             'position_ecef_z'])
+
+    sun_dist = np.linalg.norm(sun, axis=1)
+    ss_lat = np.arcsin(sun[:, 2] / sun_dist)
+    ss_lon = np.arctan2(sun[:, 1], sun[:, 0])
+
+    # illumination at the sub-satellite point
+    lat = np.radians(np.asarray(inst[glat_label], dtype=float))
+    lon = np.radians(np.asarray(inst[glong_label], dtype=float))
+    cos_sza = (np.sin(lat) * np.sin(ss_lat)
+               + np.cos(lat) * np.cos(ss_lat) * np.cos(lon - ss_lon))
+    sza = np.degrees(np.arccos(np.clip(cos_sza, -1., 1.)))
+    slt = np.mod(12. + np.degrees(lon - ss_lon) / 15., 24.)
+
+    # shadow state of the spacecraft
+    if shadow_model == 'cylindrical':
+        sun_hat = sun / sun_dist[:, np.newaxis]
+        along = np.einsum('ij,ij->i', pos, sun_hat)
+        perp = np.linalg.norm(pos - along[:, np.newaxis] * sun_hat, axis=1)
+        umbra = (along < 0.) & (perp < earth_radius)
+        penumbra = np.zeros(len(umbra), dtype=bool)
+        sunlit_frac = np.where(umbra, 0., 1.)
+    else:
+        to_sun = sun - pos
+        to_sun_dist = np.linalg.norm(to_sun, axis=1)
+        pos_dist = np.linalg.norm(pos, axis=1)
+        # apparent angular radii and separation as seen from the spacecraft
+        rad_sun = np.arcsin(sun_radius / to_sun_dist)
+        rad_earth = np.arcsin(np.clip(earth_radius / pos_dist, -1., 1.))
+        cos_sep = (-np.einsum('ij,ij->i', pos, to_sun)
+                   / (pos_dist * to_sun_dist))
+        sep = np.arccos(np.clip(cos_sep, -1., 1.))
+        hidden = _disk_overlap(rad_sun, rad_earth, sep)
+        sunlit_frac = np.clip(1. - hidden / (np.pi * rad_sun**2), 0., 1.)
+        umbra = sep <= rad_earth - rad_sun
+        penumbra = (sunlit_frac < 1.) & ~umbra
+
+    _set_vector(inst, ['sun_ecef_x', 'sun_ecef_y', 'sun_ecef_z'], sun,
+                meta=[{'units': 'km',
+                       'desc': 'Position of the Sun expressed in ECEF ' +
+                       'basis, {:s}-component'.format(coord)}
+                      for coord in ['x', 'y', 'z']],
+                vector_meta={'units': 'km',
+                             'desc': 'Position of the Sun expressed in ECEF ' +
+                             'basis'})
+    inst['subsolar_lat'] = np.degrees(ss_lat)
+    inst['subsolar_long'] = np.degrees(ss_lon)
+    inst['sza'] = sza
+    inst['slt'] = slt
+    inst['sunlit_frac'] = sunlit_frac
+    inst['umbra'] = umbra
+    inst['penumbra'] = penumbra
+
+    inst.meta['subsolar_lat'] = {'units': 'degrees',
+                                 'long_name': 'Subsolar latitude',
+                                 'desc': 'Geocentric latitude of the ' +
+                                 'subsolar point'}
+    inst.meta['subsolar_long'] = {'units': 'degrees',
+                                  'long_name': 'Subsolar longitude',
+                                  'desc': 'Longitude of the subsolar point'}
+    inst.meta['sza'] = {'units': 'degrees',
+                        'long_name': 'Solar zenith angle',
+                        'desc': 'Solar zenith angle at the sub-satellite ' +
+                        'point'}
+    inst.meta['slt'] = {'units': 'hrs',
+                        'long_name': 'Solar local time',
+                        'desc': 'Apparent solar local time at the ' +
+                        'sub-satellite point'}
+    inst.meta['sunlit_frac'] = {'units': '',
+                                'long_name': 'Sunlit fraction',
+                                'desc': 'Fraction of the solar disk visible ' +
+                                'from the spacecraft ({:s} shadow '
+                                'model)'.format(shadow_model)}
+    inst.meta['umbra'] = {'units': '',
+                          'long_name': 'Umbra flag',
+                          'desc': 'True when the spacecraft is in the ' +
+                          'Earth umbra'}
+    inst.meta['penumbra'] = {'units': '',
+                             'long_name': 'Penumbra flag',
+                             'desc': 'True when the spacecraft is in the ' +
+                             'Earth penumbra'}
+
+    return
+
+
+def calculate_eclipse_durations(inst, kind='umbra'):
+    """
+    Calculates the start, end and duration of each eclipse in the data.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including eclipse flags from add_solar_geometry
+    kind : string
+        'umbra', 'penumbra', or 'eclipse' for any time the solar disk is
+        at least partially hidden. (default='umbra')
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per eclipse (generally one per orbit) with 'start' and 'end'
+        times, the 'duration' in seconds and 'partial', which is True when
+        the eclipse is cut off by the start or end of the loaded data.
+
+    Note
+    ----
+        The end of an eclipse is the time of the first sample after the
+        spacecraft leaves the shadow.
+
+    """
+
+    if kind == 'eclipse':
+        flag = np.asarray(inst['umbra'], dtype=bool) | \
+            np.asarray(inst['penumbra'], dtype=bool)
+    elif kind in ['umbra', 'penumbra']:
+        flag = np.asarray(inst[kind], dtype=bool)
+    else:
+        raise ValueError('Unknown eclipse kind: {:}'.format(kind))
+
+    index = inst.index
+    edges = np.diff(np.concatenate([[0], flag.astype(np.int8), [0]]))
+    starts, = np.where(edges == 1)
+    stops, = np.where(edges == -1)
+    # use the first sample after the eclipse when available
+    partial = (starts == 0) | (stops == len(flag))
+    stops = np.minimum(stops, len(flag) - 1)
+
+    start_times = index[starts]
+    end_times = index[stops]
+    duration = (end_times - start_times).total_seconds()
+
+    return pds.DataFrame({'start': start_times, 'end': end_times,
+                          'duration': np.asarray(duration),
+                          'partial': partial})
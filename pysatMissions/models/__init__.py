@@ -0,0 +1,17 @@
+"""
+pysatMissions.models is a module that provides vectorized implementations of
+geophysical models, which do not depend on external model packages
+"""
+
+import sys
+
+from pysatMissions._lazy import lazy_submodules
+
+__all__ = ['backends', 'dipole', 'igrf']
+
+__getattr__, __dir__ = lazy_submodules(__name__, __all__)
+
+if sys.version_info < (3, 7):
+    from pysatMissions.models import backends
+    from pysatMissions.models import dipole
+    from pysatMissions.models import igrf
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""Provides a common interface to the empirical models used by
+pysatMissions.methods.empirical, so that implementations may be selected
+for each call.
+
+Every backend takes arrays of time, WGS84 geodetic latitude, longitude
+(degrees) and altitude (km) and returns a dict of arrays keyed by the
+variable names added to the instrument.
+
+"""
+
+import numpy as np
+import pandas as pds
+
+from pysatMissions.models import dipole as mm_dipole
+from pysatMissions.models import igrf as mm_igrf
+
+
+class ModelUnavailable(ImportError):
+    """Raised when the package running a model is not installed"""
+
+
+class ModelBackend(object):
+    """
+    Base class of the empirical model backends.
+
+    Subclasses provide any of the `iri`, `msis`, `hwm` and `igrf` methods.
+    Models that are not provided raise a NotImplementedError.
+
+    """
+
+    name = 'base'
+
+    def provides(self, model):
+        """
+        Checks whether the backend runs a model.
+
+        Parameters
+        ----------
+        model : string
+            'iri', 'msis', 'hwm' or 'igrf'
+
+        Returns
+        -------
+        bool
+            True if the backend provides the model
+
+        """
+
+        return getattr(type(self), model) is not getattr(ModelBackend, model)
+
+    def _not_provided(self, model):
+        raise NotImplementedError(' '.join(('The {:} backend does not',
+                                            'provide {:}')).format(self.name,
+                                                                   model))
+
+    def iri(self, times, glat, glong, alt):
+        """
+        Thermal plasma from the International Reference Ionosphere.
+
+        Returns
+        -------
+        dict
+            Arrays for 'ion_temp' and 'e_temp' (K), 'ion_dens' (cm^-3) and
+            'frac_dens_o', 'frac_dens_h' and 'frac_dens_he'
+
+        """
+        self._not_provided('IRI')
+
+    def msis(self, times, glat, glong, alt):
+        """
+        Neutral atmosphere from MSIS.
+
+        Returns
+        -------
+        dict
+            Arrays for 'Nn' and the 'Nn_H', 'Nn_He', 'Nn_N', 'Nn_N2',
+            'Nn_O', 'Nn_O2' and 'Nn_Ar' number densities (cm^-3) and
+            'Tn_msis' (K)
+
+        """
+        self._not_provided('MSIS')
+
+    def hwm(self, times, glat, glong, alt):
+        """
+        Neutral winds from the Horizontal Wind Model.
+
+        Returns
+        -------
+        dict
+            Arrays for 'zonal_wind' and 'meridional_wind' (m/s)
+
+        """
+        self._not_provided('HWM')
+
+    def igrf(self, times, glat, glong, alt):
+        """
+        Geomagnetic field.
+
+        Returns
+        -------
+        dict
+            Arrays for 'B', 'B_east', 'B_north', 'B_up', 'B_ecef_x',
+            'B_ecef_y' and 'B_ecef_z' (nT)
+
+        """
+        self._not_provided('IGRF')
+
+
+def _import_point():
+    """Imports the pyglow Point class on first use
+
+    Returns
+    -------
+    Point : class
+        pyglow.pyglow.Point
+
+    Raises
+    ------
+    ModelUnavailable
+        If pyglow is not installed
+
+    """
+
+    try:
+        from pyglow.pyglow import Point
+    except ImportError:
+        raise ModelUnavailable('pyglow is not installed')
+
+    return Point
+
+
+class PyglowBackend(ModelBackend):
+    """
+    Runs the pyglow models one sample at a time.
+
+    Configured to use actual solar parameters to run the models.  Raises
+    ModelUnavailable if pyglow is not installed.
+
+    """
+
+    name = 'pyglow'
+
+    def _run(self, times, glat, glong, alt, run):
+        """Collects the outputs of `run(point)` for every sample"""
+
+        Point = _import_point()
+        params = []
+        for time, lat, lon, height in zip(times, glat, glong, alt):
+            # Point class is instantiated. Its parameters are a function of
+            # time and spatial location
+            params.append(run(Point(time, lat, lon, height)))
+        params = pds.DataFrame(params)
+
+        return {key: params[key].values for key in params.keys()}
+
+    def iri(self, times, glat, glong, alt):
+
+        def run(pt):
+            # IRI-2016 currently experiencing bugs in pyglow
+            pt.run_iri(version=2012)
+            iri = {}
+            # After the model is run, its members like Ti, ni[O+], etc. can
+            # be accessed
+            iri['ion_temp'] = pt.Ti
+            iri['e_temp'] = pt.Te
+            iri['ion_dens'] = pt.ni['O+'] + pt.ni['H+'] + pt.ni['HE+']
+            # pt.ne - pt.ni['NO+'] - pt.ni['O2+'] - pt.ni['HE+']
+            iri['frac_dens_o'] = pt.ni['O+'] / iri['ion_dens']
+            iri['frac_dens_h'] = pt.ni['H+'] / iri['ion_dens']
+            iri['frac_dens_he'] = pt.ni['HE+'] / iri['ion_dens']
+            return iri
+
+        return self._run(times, glat, glong, alt, run)
+
+    def msis(self, times, glat, glong, alt):
+
+        def run(pt):
+            pt.run_msis()
+            msis = {}
+            total = 0
+            for key in pt.nn.keys():
+                total += pt.nn[key]
+            msis['Nn'] = total
+            msis['Nn_H'] = pt.nn['H']
+            msis['Nn_He'] = pt.nn['HE']
+            msis['Nn_N'] = pt.nn['N']
+            msis['Nn_N2'] = pt.nn['N2']
+            msis['Nn_O'] = pt.nn['O']
+            msis['Nn_O2'] = pt.nn['O2']
+            msis['Nn_Ar'] = pt.nn['AR']
+            msis['Tn_msis'] = pt.Tn_msis
+            return msis
+
+        return self._run(times, glat, glong, alt, run)
+
+    def hwm(self, times, glat, glong, alt):
+
+        def run(pt):
+            pt.run_hwm()
+            return {'zonal_wind': pt.u, 'meridional_wind': pt.v}
+
+        return self._run(times, glat, glong, alt, run)
+
+    def igrf(self, times, glat, glong, alt):
+
+        def run(pt):
+            pt.run_igrf()
+            return {'B': pt.B, 'B_east': pt.Bx, 'B_north': pt.By,
+                    'B_up': pt.Bz}
+
+        igrf = self._run(times, glat, glong, alt, run)
+        # convert magnetic field in East/north/up to ECEF basis
+        x, y, z = mm_igrf.enu_to_ecef(igrf['B_east'], igrf['B_north'],
+                                      igrf['B_up'], glat, glong)
+        igrf['B_ecef_x'] = x
+        igrf['B_ecef_y'] = y
+        igrf['B_ecef_z'] = z
+
+        return igrf
+
+
+class IGRFBackend(ModelBackend):
+    """Evaluates the bundled IGRF-14 coefficients over all samples at once"""
+
+    name = 'numpy'
+
+    def igrf(self, times, glat, glong, alt):
+        return mm_igrf.igrf_field(times, glat, glong, alt)
+
+
+class DipoleBackend(ModelBackend):
+    """
+    Tilted dipole approximation of IGRF-14.
+
+    Parameters
+    ----------
+    eccentric : bool
+        If True, uses the eccentric rather than the centered dipole.
+        (default=False)
+
+    """
+
+    def __init__(self, eccentric=False):
+
+        self.eccentric = eccentric
+        self.name = 'eccentric_dipole' if eccentric else 'dipole'
+
+        return
+
+    def igrf(self, times, glat, glong, alt):
+        return mm_dipole.dipole_field(times, glat, glong, alt,
+                                      eccentric=self.eccentric)
+
+
+def _solar_angles(times, glat, glong):
+    """Cosine of the solar zenith angle and local solar time (hours)"""
+
+    times = pds.DatetimeIndex(times)
+    doy = times.dayofyear.values
+    ut = (times.hour.values + times.minute.values / 60.
+          + times.second.values / 3600.)
+    slt = np.mod(ut + np.asarray(glong, dtype=float) / 15., 24.)
+
+    decl = np.radians(-23.44) * np.cos(2. * np.pi * (doy + 10.) / 365.25)
+    lat = np.radians(np.asarray(glat, dtype=float))
+    hour_angle = np.radians(15. * (slt - 12.))
+    cos_sza = (np.sin(lat) * np.sin(decl)
+               + np.cos(lat) * np.cos(decl) * np.cos(hour_angle))
+
+    return cos_sza, slt
+
+
+class SyntheticBackend(ModelBackend):
+    """
+    Fast analytic stand-ins for the empirical models.
+
+    Produces smooth, physically plausible values with the same variables and
+    units as the full models, evaluated over all samples at once.  Intended
+    for tests, dry runs and timing studies, not for science.
+
+    Note
+    ----
+        The ionosphere is a Chapman layer peaking at 300 km whose density
+        follows the solar zenith angle.  The thermosphere is a Bates
+        temperature profile with diffusive equilibrium above 120 km.  Winds
+        are a diurnal tide.  The field is the centered dipole.
+
+    """
+
+    name = 'synthetic'
+
+    # number densities at 120 km (cm^-3) and masses (amu)
+    _species = {'N2': (4.e11, 28.), 'O2': (7.5e10, 32.), 'O': (7.6e10, 16.),
+                'Ar': (1.2e9, 40.), 'He': (2.5e7, 4.), 'N': (3.e6, 14.),
+                'H': (2.e5, 1.)}
+
+    def iri(self, times, glat, glong, alt):
+        cos_sza, slt = _solar_angles(times, glat, glong)
+        alt = np.asarray(alt, dtype=float)
+
+        sun = np.sqrt(np.clip(cos_sza, 0., 1.))
+        peak = 1.e5 + 1.e6 * sun
+        z = (alt - 300.) / 60.
+        dens = peak * np.exp(0.5 * (1. - z - np.exp(-z)))
+
+        # helium is a fixed share, and hydrogen replaces oxygen with altitude
+        frac_he = 0.05 * np.ones_like(alt)
+        frac_h = (1. - frac_he) / (1. + np.exp(-(alt - 900.) / 120.))
+        frac_o = 1. - frac_he - frac_h
+        ion_temp = 800. + 1.2 * np.clip(alt - 100., 0., None) + 100. * sun
+        e_temp = ion_temp + 1000. * sun
+
+        return {'ion_temp': ion_temp, 'e_temp': e_temp, 'ion_dens': dens,
+                'frac_dens_o': frac_o, 'frac_dens_h': frac_h,
+                'frac_dens_he': frac_he}
+
+    def msis(self, times, glat, glong, alt):
+        cos_sza, slt = _solar_angles(times, glat, glong)
+        alt = np.asarray(alt, dtype=float)
+
+        t_inf = 900. + 200. * np.clip(cos_sza, 0., 1.)
+        temp = t_inf - (t_inf - 355.) * np.exp(-0.02 * (alt - 120.))
+        # scale height of a 1 amu species (km)
+        unit_height = 8.314e-3 * t_inf / 9.5e-3
+
+        msis = {}
+        total = np.zeros_like(alt)
+        for species, (base, mass) in self._species.items():
+            dens = base * np.exp(-(alt - 120.) * mass / unit_height)
+            msis['Nn_' + species] = dens
+            total += dens
+        msis['Nn'] = total
+        msis['Tn_msis'] = temp
+
+        return msis
+
+    def hwm(self, times, glat, glong, alt):
+        cos_sza, slt = _solar_angles(times, glat, glong)
+        lat = np.radians(np.asarray(glat, dtype=float))
+        phase = 2. * np.pi * slt / 24.
+
+        return {'zonal_wind': 60. * np.cos(lat) * np.sin(phase),
+                'meridional_wind': 40. * np.sin(lat) * np.cos(phase)}
+
+    def igrf(self, times, glat, glong, alt):
+        return mm_dipole.dipole_field(times, glat, glong, alt)
+
+
+backends = {}
+
+
+def register_backend(backend, name=None):
+    """
+    Makes a backend available by name to the empirical model functions.
+
+    Parameters
+    ----------
+    backend : ModelBackend
+        Backend providing any of the `iri`, `msis`, `hwm` and `igrf` methods
+    name : string or NoneType
+        Name used to select the backend.  If None, uses `backend.name`.
+        (default=None)
+
+    """
+
+    if name is None:
+        name = backend.name
+    backends[name] = backend
+
+    return
+
+
+def get_backend(name):
+    """
+    Returns a registered backend.
+
+    Parameters
+    ----------
+    name : string or ModelBackend
+        Name of a registered backend, or a backend, which is returned
+        unchanged
+
+    Returns
+    -------
+    ModelBackend
+        Backend providing the models
+
+    """
+
+    if isinstance(name, ModelBackend):
+        return name
+    if name not in backends:
+        raise ValueError('Unknown model backend: {:}'.format(name))
+
+    return backends[name]
+
+
+register_backend(PyglowBackend())
+register_backend(IGRFBackend())
+register_backend(DipoleBackend())
+register_backend(DipoleBackend(eccentric=True))
+register_backend(SyntheticBackend())
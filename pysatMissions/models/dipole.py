@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Provides centered and eccentric tilted dipole approximations of the
+geomagnetic field, for studies that do not need the full IGRF.
+
+The dipoles are derived from the degree 1 and 2 IGRF coefficients at each
+sample time.
+
+"""
+
+import numpy as np
+
+from pysatMissions.models import igrf as mm_igrf
+
+
+def dipole_coefficients(times, filename=mm_igrf.coefficient_file):
+    """
+    Interpolates the degree 1 and 2 IGRF coefficients to a set of times.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Sample times
+    filename : string
+        Coefficient file in the shc format
+        (default=pysatMissions.models.igrf.coefficient_file)
+
+    Returns
+    -------
+    g, h : np.array
+        Gauss coefficients (nT) with shape (3, 3, samples), indexed by
+        degree and order
+
+    Note
+    ----
+        Times outside the epochs of the coefficient file use the first or
+        last epoch.
+
+    """
+
+    epochs, g_all, h_all = mm_igrf.load_coefficients(filename)
+    year = mm_igrf.decimal_year(times)
+
+    g = np.zeros((3, 3, len(year)))
+    h = np.zeros((3, 3, len(year)))
+    for n in [1, 2]:
+        for m in range(n + 1):
+            g[n, m] = np.interp(year, epochs, g_all[:, n, m])
+            h[n, m] = np.interp(year, epochs, h_all[:, n, m])
+
+    return g, h
+
+
+def dipole_offset(g, h):
+    """
+    Calculates the location of the eccentric dipole.
+
+    Parameters
+    ----------
+    g, h : np.array
+        Gauss coefficients from `dipole_coefficients`
+
+    Returns
+    -------
+    np.array
+        ECEF offset of the dipole center from the center of the Earth (km),
+        with shape (samples, 3)
+
+    Note
+    ----
+        Follows Fraser-Smith (1987), doi:10.1029/RG025i001p00001
+
+    """
+
+    sqrt3 = np.sqrt(3.)
+    b0_sq = g[1, 0]**2 + g[1, 1]**2 + h[1, 1]**2
+    l0 = 2. * g[1, 0] * g[2, 0] + sqrt3 * (g[1, 1] * g[2, 1]
+                                           + h[1, 1] * h[2, 1])
+    l1 = -g[1, 1] * g[2, 0] + sqrt3 * (g[1, 0] * g[2, 1] + g[1, 1] * g[2, 2]
+                                       + h[1, 1] * h[2, 2])
+    l2 = -h[1, 1] * g[2, 0] + sqrt3 * (g[1, 0] * h[2, 1] - h[1, 1] * g[2, 2]
+                                       + g[1, 1] * h[2, 2])
+    energy = (l0 * g[1, 0] + l1 * g[1, 1] + l2 * h[1, 1]) / (4. * b0_sq)
+
+    scale = mm_igrf.reference_radius / (3. * b0_sq)
+    return np.stack([scale * (l1 - g[1, 1] * energy),
+                     scale * (l2 - h[1, 1] * energy),
+                     scale * (l0 - g[1, 0] * energy)], axis=-1)
+
+
+def dipole_field(times, glat, glong, alt, eccentric=False,
+                 filename=mm_igrf.coefficient_file):
+    """
+    Calculates a tilted dipole geomagnetic field at a set of locations.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Sample times
+    glat : array_like
+        WGS84 geodetic latitude (degrees)
+    glong : array_like
+        WGS84 geodetic longitude (degrees)
+    alt : array_like
+        WGS84 geodetic altitude (km, height above surface)
+    eccentric : bool
+        If True, the dipole is moved from the center of the Earth to the
+        eccentric dipole location, which better represents the field
+        strength in the South Atlantic.  (default=False)
+    filename : string
+        Coefficient file in the shc format
+        (default=pysatMissions.models.igrf.coefficient_file)
+
+    Returns
+    -------
+    dict
+        Arrays for 'B', the field magnitude, 'B_east', 'B_north' and 'B_up',
+        the field in the geodetic ENU basis, and 'B_ecef_x', 'B_ecef_y' and
+        'B_ecef_z', the field in the ECEF basis (nT)
+
+    """
+
+    g, h = dipole_coefficients(times, filename=filename)
+    position = np.stack(mm_igrf.geodetic_to_ecef(glat, glong, alt), axis=-1)
+    if eccentric:
+        position = position - dipole_offset(g, h)
+
+    # dipole moment direction in ECEF, scaled by the reference radius cubed
+    moment = np.stack([g[1, 1], h[1, 1], g[1, 0]], axis=-1)
+    r = np.sqrt(np.sum(position**2, axis=-1))
+    unit = position / r[:, np.newaxis]
+    projection = np.sum(moment * unit, axis=-1)
+    scale = (mm_igrf.reference_radius / r)**3
+    field = scale[:, np.newaxis] * (3. * projection[:, np.newaxis] * unit
+                                    - moment)
+
+    east, north, up = mm_igrf.ecef_to_enu(field[:, 0], field[:, 1],
+                                          field[:, 2], glat, glong)
+
+    return {'B': np.sqrt(np.sum(field**2, axis=-1)),
+            'B_east': east, 'B_north': north, 'B_up': up,
+            'B_ecef_x': field[:, 0], 'B_ecef_y': field[:, 1],
+            'B_ecef_z': field[:, 2]}
+
+
+def dipole_latitude(times, glat, glong, alt, filename=mm_igrf.coefficient_file):
+    """
+    Calculates the latitude of locations in the centered dipole frame.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Sample times
+    glat : array_like
+        WGS84 geodetic latitude (degrees)
+    glong : array_like
+        WGS84 geodetic longitude (degrees)
+    alt : array_like
+        WGS84 geodetic altitude (km, height above surface)
+    filename : string
+        Coefficient file in the shc format
+        (default=pysatMissions.models.igrf.coefficient_file)
+
+    Returns
+    -------
+    np.array
+        Dipole (geomagnetic) latitude (degrees), positive towards the
+        northern geomagnetic pole
+
+    """
+
+    g, h = dipole_coefficients(times, filename=filename)
+    position = np.stack(mm_igrf.geodetic_to_ecef(glat, glong, alt), axis=-1)
+
+    # the dipole moment points towards the southern geomagnetic pole
+    moment = np.stack([g[1, 1], h[1, 1], g[1, 0]], axis=-1)
+    projection = -np.sum(moment * position, axis=-1) / \
+        (np.sqrt(np.sum(moment**2, axis=-1))
+         * np.sqrt(np.sum(position**2, axis=-1)))
+
+    return np.degrees(np.arcsin(np.clip(projection, -1., 1.)))
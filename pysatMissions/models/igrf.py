@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""Provides a vectorized implementation of the International Geomagnetic
+Reference Field (IGRF).
+
+The coefficients of the 14th generation of the model are included with the
+package, in the IAGA spherical harmonic coefficient (shc) format.
+
+"""
+
+import functools
+import os
+import warnings
+
+import numpy as np
+
+# Reference radius of the IGRF expansion in km
+reference_radius = 6371.2
+
+# WGS84 ellipsoid, semi-major axis in km and eccentricity squared
+wgs84_a = 6378.137
+wgs84_e2 = 6.69437999014e-3
+
+coefficient_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'IGRF14.shc')
+
+
+@functools.lru_cache(maxsize=4)
+def load_coefficients(filename=coefficient_file):
+    """
+    Reads Gauss coefficients from a file in the shc format.
+
+    Parameters
+    ----------
+    filename : string
+        Coefficient file (default=coefficient_file)
+
+    Returns
+    -------
+    epochs : np.array
+        Decimal year of each set of coefficients
+    g, h : np.array
+        Schmidt semi-normalized Gauss coefficients (nT), with shape
+        (epoch, n, m)
+
+    Note
+    ----
+        Results are cached, so the arrays must not be modified.
+
+    """
+
+    with open(filename) as fin:
+        lines = [line.split() for line in fin
+                 if not line.startswith('#') and len(line.strip()) > 0]
+
+    max_degree = int(lines[0][1])
+    epochs = np.array(lines[1], dtype=float)
+    shape = (len(epochs), max_degree + 1, max_degree + 1)
+    g = np.zeros(shape)
+    h = np.zeros(shape)
+    for line in lines[2:]:
+        n = int(line[0])
+        m = int(line[1])
+        if m >= 0:
+            g[:, n, m] = np.array(line[2:], dtype=float)
+        else:
+            h[:, n, -m] = np.array(line[2:], dtype=float)
+
+    return epochs, g, h
+
+
+def decimal_year(times):
+    """
+    Converts times to decimal years.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Times to convert
+
+    Returns
+    -------
+    np.array
+        Year and fraction of the year elapsed
+
+    """
+
+    times = np.asarray(times, dtype='datetime64[ns]')
+    years = times.astype('datetime64[Y]')
+    start = years.astype('datetime64[ns]')
+    length = (years + 1).astype('datetime64[ns]') - start
+
+    return (years.astype(np.int64) + 1970.
+            + (times - start).astype(np.int64) / length.astype(np.int64))
+
+
+def geodetic_to_ecef(glat, glong, alt):
+    """
+    Converts WGS84 geodetic coordinates to ECEF.
+
+    Parameters
+    ----------
+    glat, glong : array_like
+        Geodetic latitude and longitude (degrees)
+    alt : array_like
+        Height above the WGS84 ellipsoid (km)
+
+    Returns
+    -------
+    x, y, z : np.array
+        ECEF position (km)
+
+    """
+
+    lat = np.radians(np.asarray(glat, dtype=float))
+    lon = np.radians(np.asarray(glong, dtype=float))
+    alt = np.asarray(alt, dtype=float)
+
+    r_n = wgs84_a / np.sqrt(1. - wgs84_e2 * np.sin(lat)**2)
+    x = (r_n + alt) * np.cos(lat) * np.cos(lon)
+    y = (r_n + alt) * np.cos(lat) * np.sin(lon)
+    z = (r_n * (1. - wgs84_e2) + alt) * np.sin(lat)
+
+    return x, y, z
+
+
+def ecef_to_geodetic(x, y, z, num_iter=4):
+    """
+    Converts ECEF positions to WGS84 geodetic coordinates.
+
+    Parameters
+    ----------
+    x, y, z : array_like
+        ECEF position (km)
+    num_iter : int
+        Number of iterations of the latitude.  Four iterations are accurate
+        to better than a millimeter below 10000 km altitude. (default=4)
+
+    Returns
+    -------
+    glat, glong : np.array
+        Geodetic latitude and longitude (degrees)
+    alt : np.array
+        Height above the WGS84 ellipsoid (km)
+
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+
+    rho = np.hypot(x, y)
+    lat = np.arctan2(z, rho * (1. - wgs84_e2))
+    for i in range(num_iter):
+        slat = np.sin(lat)
+        r_n = wgs84_a / np.sqrt(1. - wgs84_e2 * slat**2)
+        lat = np.arctan2(z + wgs84_e2 * r_n * slat, rho)
+
+    slat, clat = np.sin(lat), np.cos(lat)
+    # height along the normal, defined at the poles
+    alt = rho * clat + z * slat - wgs84_a * np.sqrt(1. - wgs84_e2 * slat**2)
+
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), alt
+
+
+def ecef_to_enu(x, y, z, glat, glong):
+    """
+    Expresses ECEF vectors in the local geodetic East/North/Up basis.
+
+    Parameters
+    ----------
+    x, y, z : array_like
+        Vector components in the ECEF basis
+    glat, glong : array_like
+        Geodetic latitude and longitude of the local basis (degrees)
+
+    Returns
+    -------
+    east, north, up : np.array
+        Vector components in the ENU basis
+
+    """
+
+    lat = np.radians(np.asarray(glat, dtype=float))
+    lon = np.radians(np.asarray(glong, dtype=float))
+    slat, clat = np.sin(lat), np.cos(lat)
+    slon, clon = np.sin(lon), np.cos(lon)
+
+    east = -slon * x + clon * y
+    north = -slat * clon * x - slat * slon * y + clat * z
+    up = clat * clon * x + clat * slon * y + slat * z
+
+    return east, north, up
+
+
+def enu_to_ecef(east, north, up, glat, glong):
+    """
+    Expresses vectors in the local geodetic East/North/Up basis in ECEF.
+
+    Parameters
+    ----------
+    east, north, up : array_like
+        Vector components in the ENU basis
+    glat, glong : array_like
+        Geodetic latitude and longitude of the local basis (degrees)
+
+    Returns
+    -------
+    x, y, z : np.array
+        Vector components in the ECEF basis
+
+    """
+
+    lat = np.radians(np.asarray(glat, dtype=float))
+    lon = np.radians(np.asarray(glong, dtype=float))
+    slat, clat = np.sin(lat), np.cos(lat)
+    slon, clon = np.sin(lon), np.cos(lon)
+    east = np.asarray(east, dtype=float)
+    north = np.asarray(north, dtype=float)
+    up = np.asarray(up, dtype=float)
+
+    x = -slon * east - slat * clon * north + clat * clon * up
+    y = clon * east - slat * slon * north + clat * slon * up
+    z = clat * north + slat * up
+
+    return x, y, z
+
+
+def _spherical_field(r, theta, phi, g, h, max_degree):
+    """
+    Evaluates the internal field expansion in spherical components.
+
+    Parameters
+    ----------
+    r, theta, phi : np.array
+        Geocentric radius (km), colatitude and longitude (radians)
+    g, h : np.array
+        Gauss coefficients with shape (n, m) or (n, m, samples)
+    max_degree : int
+        Largest degree of the expansion
+
+    Returns
+    -------
+    b_r, b_theta, b_phi : np.array
+        Radial, southward and eastward field (nT)
+
+    Note
+    ----
+        Legendre functions are built by recursion in degree for each order,
+        so memory use does not grow with the degree of the expansion.
+
+    """
+
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    # avoid dividing by zero at the poles, where b_phi is not defined
+    sin_safe = np.where(np.abs(sin_t) < 1.e-10, 1.e-10, sin_t)
+    ratio = reference_radius / r
+
+    b_r = np.zeros_like(r)
+    b_theta = np.zeros_like(r)
+    b_phi = np.zeros_like(r)
+
+    # P_m^m and its derivative in theta
+    p_mm = np.ones_like(r)
+    dp_mm = np.zeros_like(r)
+    for m in range(max_degree + 1):
+        if m > 0:
+            scale = np.sqrt((2. * m - 1.) / (2. * m))
+            if m == 1:
+                scale *= np.sqrt(2.)
+            p_mm, dp_mm = (scale * sin_t * p_mm,
+                           scale * (cos_t * p_mm + sin_t * dp_mm))
+        cos_m = np.cos(m * phi)
+        sin_m = np.sin(m * phi)
+
+        p_prev = np.zeros_like(r)
+        dp_prev = np.zeros_like(r)
+        p_n = p_mm
+        dp_n = dp_mm
+        for n in range(max(m, 1), max_degree + 1):
+            if n > m:
+                norm = np.sqrt(n**2 - m**2)
+                lower = np.sqrt((n - 1.)**2 - m**2)
+                p_next = ((2. * n - 1.) * cos_t * p_n - lower * p_prev) / norm
+                dp_next = ((2. * n - 1.) * (cos_t * dp_n - sin_t * p_n)
+                           - lower * dp_prev) / norm
+                p_prev, dp_prev = p_n, dp_n
+                p_n, dp_n = p_next, dp_next
+
+            scale = ratio**(n + 2)
+            gc = g[n, m] * cos_m + h[n, m] * sin_m
+            b_r += (n + 1.) * scale * gc * p_n
+            b_theta -= scale * gc * dp_n
+            if m > 0:
+                b_phi += (scale * m * (g[n, m] * sin_m - h[n, m] * cos_m)
+                          * p_n / sin_safe)
+
+    return b_r, b_theta, b_phi
+
+
+def igrf_field(times, glat, glong, alt, max_degree=None,
+               filename=coefficient_file):
+    """
+    Calculates the IGRF geomagnetic field at a set of locations.
+
+    Parameters
+    ----------
+    times : array_like of datetimes
+        Sample times
+    glat : array_like
+        WGS84 geodetic latitude (degrees)
+    glong : array_like
+        WGS84 geodetic longitude (degrees)
+    alt : array_like
+        WGS84 geodetic altitude (km, height above surface)
+    max_degree : int or NoneType
+        Largest degree of the expansion.  If None, uses every coefficient
+        in the file. (default=None)
+    filename : string
+        Coefficient file in the shc format (default=coefficient_file)
+
+    Returns
+    -------
+    dict
+        Arrays for 'B', the field magnitude, 'B_east', 'B_north' and 'B_up',
+        the field in the geodetic ENU basis, and 'B_ecef_x', 'B_ecef_y' and
+        'B_ecef_z', the field in the ECEF basis (nT)
+
+    Note
+    ----
+        Coefficients are interpolated linearly in time between the model
+        epochs.  The final epoch of the file holds the predicted secular
+        variation, times beyond it are extrapolated with a warning.
+
+    """
+
+    epochs, g, h = load_coefficients(filename)
+    if max_degree is None:
+        max_degree = g.shape[1] - 1
+
+    year = decimal_year(times)
+    x, y, z = geodetic_to_ecef(glat, glong, alt)
+    r = np.sqrt(x**2 + y**2 + z**2)
+    theta = np.arccos(z / r)
+    phi = np.arctan2(y, x)
+
+    if np.any(year < epochs[0]) or np.any(year > epochs[-1]):
+        warnings.warn(' '.join(('IGRF coefficients are extrapolated outside',
+                                '{:.0f} to {:.0f}'.format(epochs[0],
+                                                          epochs[-1]))),
+                      stacklevel=2)
+
+    # the field is linear in the coefficients, so it is evaluated at the
+    # epochs bounding each sample and then interpolated
+    interval = np.clip(np.searchsorted(epochs, year, side='right') - 1, 0,
+                       len(epochs) - 2)
+    b_r = np.empty_like(r)
+    b_theta = np.empty_like(r)
+    b_phi = np.empty_like(r)
+    for i in np.unique(interval):
+        idx = interval == i
+        weight = (year[idx] - epochs[i]) / (epochs[i + 1] - epochs[i])
+        start = _spherical_field(r[idx], theta[idx], phi[idx], g[i], h[i],
+                                 max_degree)
+        delta = _spherical_field(r[idx], theta[idx], phi[idx],
+                                 g[i + 1] - g[i], h[i + 1] - h[i],
+                                 max_degree)
+        b_r[idx] = start[0] + weight * delta[0]
+        b_theta[idx] = start[1] + weight * delta[1]
+        b_phi[idx] = start[2] + weight * delta[2]
+
+    # spherical components to ECEF
+    sin_t, cos_t = np.sin(theta), np.cos(theta)
+    sin_p, cos_p = np.sin(phi), np.cos(phi)
+    bx = sin_t * cos_p * b_r + cos_t * cos_p * b_theta - sin_p * b_phi
+    by = sin_t * sin_p * b_r + cos_t * sin_p * b_theta + cos_p * b_phi
+    bz = cos_t * b_r - sin_t * b_theta
+
+    east, north, up = ecef_to_enu(bx, by, bz, glat, glong)
+
+    return {'B': np.sqrt(b_r**2 + b_theta**2 + b_phi**2),
+            'B_east': east, 'B_north': north, 'B_up': up,
+            'B_ecef_x': bx, 'B_ecef_y': by, 'B_ecef_z': bz}
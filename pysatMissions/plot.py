@@ -3,93 +3,305 @@
 
 """
 
+import importlib
+import os
+
+from concurrent import futures
 import numpy as np
+import pandas as pds
+
+
+def unwrap_longitude(glong):
+    """
+    Makes a continuous longitude signal.
+
+    Parameters
+    ----------
+    glong : array_like
+        Longitude (degrees), wrapping from 180 to -180 or 360 to 0, or the
+        reverse for retrograde orbits
+
+    Returns
+    -------
+    np.array
+        Longitude with 360 degrees added after each eastward wrap, and
+        removed after each westward wrap, so prograde tracks increase and
+        retrograde tracks decrease
+
+    Note
+    ----
+        Steps larger than 180 degrees are treated as wraps
+
+    """
+
+    glong = np.asarray(glong, dtype=float)
+    step = np.diff(glong)
+    wraps = np.concatenate(([0.], np.cumsum((step < -180.).astype(int)
+                                            - (step > 180.))))
+
+    return glong + 360. * wraps
+
+
+def _minmax_indices(values, num_bins):
+    """Indices of the smallest and largest sample in each of num_bins bins"""
+
+    width = int(np.ceil(len(values) / num_bins))
+    padded = np.full(width * num_bins, np.nan)
+    padded[:len(values)] = values
+    padded = padded.reshape(num_bins, width)
+
+    # bins of NaN only are dropped
+    valid = ~np.all(np.isnan(padded), axis=1)
+    low = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    high = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    offset = np.arange(num_bins) * width
+    index = np.sort(np.stack([low + offset, high + offset], axis=1), axis=1)
+
+    return np.unique(index[valid].ravel())
+
+
+def _lttb_indices(x, values, num_points):
+    """Indices chosen by Largest-Triangle-Three-Buckets downsampling"""
+
+    finite, = np.where(np.isfinite(values))
+    if len(finite) <= num_points:
+        return finite
+    x = x[finite]
+    y = values[finite]
+
+    # first and last points are kept, the rest are split into buckets
+    edges = np.linspace(1, len(y) - 1, num_points - 1).astype(int)
+    chosen = np.empty(num_points, dtype=int)
+    chosen[0] = 0
+    chosen[-1] = len(y) - 1
+    for i in range(num_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        # average of the next bucket, or the last point
+        if i < num_points - 3:
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        prev = chosen[i]
+        area = np.abs((x[prev] - next_x) * (y[start:stop] - y[prev])
+                      - (x[prev] - x[start:stop]) * (next_y - y[prev]))
+        chosen[i + 1] = start + np.argmax(area)
+
+    return finite[chosen]
+
+
+def decimate(index, values, num_points, method='minmax'):
+    """
+    Selects the samples to draw at a given resolution.
 
+    Parameters
+    ----------
+    index : pds.DatetimeIndex or array_like
+        Sample times or positions
+    values : array_like
+        Sample values
+    num_points : int
+        Approximate number of points to keep, usually the width of the
+        plot in pixels
+    method : string or NoneType
+        'minmax' keeps the smallest and largest sample of each pixel
+        column, so spikes are never lost.  'lttb' keeps the points forming
+        the largest triangles with their neighbours, which preserves the
+        visual shape with fewer points.  None keeps every sample.
+        (default='minmax')
 
-def plot_simulated_data(inst, filename=None):
+    Returns
+    -------
+    np.array
+        Sorted indices of the samples to draw
 
-    import matplotlib
-    import matplotlib.pyplot as plt
+    """
+
+    values = np.asarray(values, dtype=float)
+    if method is None or len(values) <= num_points:
+        return np.arange(len(values))
+    if method == 'minmax':
+        return _minmax_indices(values, max(num_points // 2, 1))
+    elif method == 'lttb':
+        x = np.asarray(pds.Index(index).astype(np.int64), dtype=float)
+        return _lttb_indices(x - x[0], values, max(num_points, 3))
+
+    raise ValueError('Unknown decimation method: {:}'.format(method))
+
+
+def plot_simulated_data(inst, filename=None, decimation='minmax', dpi=100):
+    """
+    Plots a summary of simulated ionosphere, winds, field and position.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument object including the pysat_ephem model outputs.  The
+        instrument is not modified.
+    filename : string or NoneType
+        Output file.  If None, uses './summary_orbit_simulated_data.png'
+        (default=None)
+    decimation : string or NoneType
+        Method used to reduce each line to the resolution of the figure,
+        'minmax', 'lttb' or None to draw every sample. (default='minmax')
+    dpi : int
+        Resolution of the saved figure (default=100)
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+        The figure, rendered with the Agg backend without using pyplot
+
+    """
+
+    import matplotlib.dates as mdates
     import matplotlib.gridspec as gridspec
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
 
     if filename is None:
         out_fname = './summary_orbit_simulated_data.png'
     else:
         out_fname = filename
 
-    # make monotonically increasing longitude signal
-    diff = inst['glong'].diff()
+    index = inst.index
+    figsize = (8.5, 7)
+    # the plot panels take up about 80% of the figure width
+    num_points = int(0.8 * figsize[0] * dpi)
 
-    idx, = np.where(diff < 0.)
-    for item in idx:
-        inst[item:, 'glong'] += 360.
+    def plot(ax, values, *args, **kwargs):
+        values = np.asarray(values, dtype=float)
+        idx = decimate(index, values, num_points, method=decimation)
+        ax.plot(index[idx], values[idx], *args, **kwargs)
 
-    fig = plt.figure(figsize=(8.5, 7))
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
 
-    time1 = inst.data.index[0].strftime('%Y-%h-%d %H:%M:%S')
-    if inst.data.index[0].date() == inst.data.index[-1].date():
-        time2 = inst.data.index[-1].strftime('%H:%M:%S')
+    time1 = index[0].strftime('%Y-%h-%d %H:%M:%S')
+    if index[0].date() == index[-1].date():
+        time2 = index[-1].strftime('%H:%M:%S')
     else:
-        time2 = inst.data.index[-1].strftime('%Y-%h-%d %H:%M:%S')
+        time2 = index[-1].strftime('%Y-%h-%d %H:%M:%S')
     # Overall Plot Title
-    plt.suptitle(''.join(('Simulated inst ', time1, ' -- ', time2)),
+    fig.suptitle(''.join(('Simulated inst ', time1, ' -- ', time2)),
                  fontsize=18)
 
     # create grid for plots
-    gs = gridspec.GridSpec(5, 2, width_ratios=[12, 1])
+    gs = gridspec.GridSpec(5, 2, width_ratios=[12, 1], figure=fig)
 
     ax = fig.add_subplot(gs[0, 0])
-    plt.plot(np.log10(inst['ion_dens']), 'k', label='total')
-    plt.plot(np.log10(inst['ion_dens']*inst['frac_dens_o']), 'r', label='O+')
-    plt.plot(np.log10(inst['ion_dens']*inst['frac_dens_h']), 'b', label='H+')
-    plt.legend(loc=(01.01, 0.15))
+    ion_dens = np.asarray(inst['ion_dens'], dtype=float)
+    plot(ax, np.log10(ion_dens), 'k', label='total')
+    plot(ax, np.log10(ion_dens * np.asarray(inst['frac_dens_o'])), 'r',
+         label='O+')
+    plot(ax, np.log10(ion_dens * np.asarray(inst['frac_dens_h'])), 'b',
+         label='H+')
+    ax.legend(loc=(01.01, 0.15))
     ax.set_title('Log Ion Density')
     ax.set_ylabel('Log Density (N/cc)')
     ax.set_ylim([1., 6.])
     ax.axes.get_xaxis().set_visible(False)
 
     ax2 = fig.add_subplot(gs[1, 0], sharex=ax)
-    plt.plot(inst['ion_temp'])
-    plt.legend(loc=(1.01, 0.15))
+    plot(ax2, inst['ion_temp'])
     ax2.set_title('Ion Temperature')
     ax2.set_ylabel('Temp (K)')
     ax2.set_ylim([500., 1500.])
     ax2.axes.get_xaxis().set_visible(False)
 
     ax3 = fig.add_subplot(gs[2, 0], sharex=ax)
-    plt.plot(inst['sim_wind_sc_x'], color='b', linestyle='--')
-    plt.plot(inst['sim_wind_sc_y'], color='r', linestyle='--')
-    plt.plot(inst['sim_wind_sc_z'], color='g', linestyle='--')
+    for coord, color in zip(['x', 'y', 'z'], ['b', 'r', 'g']):
+        plot(ax3, inst['sim_wind_sc_' + coord], color=color, linestyle='--',
+             label=coord)
     ax3.set_title('Neutral Winds in S/C X, Y, and Z')
     ax3.set_ylabel('Velocity (m/s)')
     ax3.set_ylim([-200., 200.])
     ax3.axes.get_xaxis().set_visible(False)
-    plt.legend(loc=(1.01, 0.15))
-    ax3.xaxis.set_major_formatter(matplotlib.dates.DateFormatter('%H:%M'))
+    ax3.legend(loc=(1.01, 0.15))
 
     ax4 = fig.add_subplot(gs[3, 0], sharex=ax)
-    plt.plot(inst['B_sc_x']*1e5, color='b', linestyle='--')
-    plt.plot(inst['B_sc_y']*1e5, color='r', linestyle='--')
-    plt.plot(inst['B_sc_z']*1e5, color='g', linestyle='--')
+    for coord, color in zip(['x', 'y', 'z'], ['b', 'r', 'g']):
+        plot(ax4, np.asarray(inst['B_sc_' + coord], dtype=float) * 1e5,
+             color=color, linestyle='--', label=coord)
     ax4.set_title('Magnetic Field in S/C X, Y, and Z')
     ax4.set_ylabel('Gauss')
     ax4.set_ylim([-3.5, 3.5])
-    plt.legend(loc=(1.01, 0.15))
-    ax4.xaxis.set_major_formatter(matplotlib.dates.DateFormatter('%H:%M'))
-    plt.setp(ax4.xaxis.get_majorticklabels(), rotation=20, ha='right')
+    ax4.legend(loc=(1.01, 0.15))
+    ax4.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+    for label in ax4.xaxis.get_majorticklabels():
+        label.set_rotation(20)
+        label.set_horizontalalignment('right')
 
-    fig.add_subplot(gs[4, 0])
+    ax5 = fig.add_subplot(gs[4, 0])
     # do long time plot
-    inst['glat'].plot(label='glat')
-    inst['mlt'].plot(label='mlt')
-    plt.title('Satellite Position')
-    plt.legend(['mlat', 'mlt'], loc=(1.01, 0.15))
+    plot(ax5, inst['glat'], label='glat')
+    plot(ax5, inst['mlt'], label='mlt')
+    ax5.set_title('Satellite Position')
+    ax5.legend(loc=(1.01, 0.15))
+    ax5.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
 
     fig.tight_layout()
     # buffer for overall title
-    fig.subplots_adjust(bottom=0.06, top=0.91, right=.91)
-    plt.subplots_adjust(hspace=0.44)
+    fig.subplots_adjust(bottom=0.06, top=0.91, right=.91, hspace=0.44)
+
+    fig.savefig(out_fname, dpi=dpi)
+
+    return fig
+
+
+def _plot_day(module_name, date, filename, decimation, kwargs):
+    """Loads one day of a simulated instrument and plots it"""
+
+    import pysat
+
+    inst = pysat.Instrument(inst_module=importlib.import_module(module_name),
+                            **kwargs)
+    inst.load(date=date)
+    plot_simulated_data(inst, filename=filename, decimation=decimation)
+
+    return filename
+
+
+def plot_simulated_days(inst_module, dates, directory='.', max_workers=None,
+                        decimation='minmax', **kwargs):
+    """
+    Renders the summary plot of many days in parallel worker processes.
+
+    Parameters
+    ----------
+    inst_module : module
+        pysatMissions instrument module, such as `pysat_ephem`
+    dates : list of datetimes
+        Days to plot
+    directory : string
+        Directory of the plots, named by date, such as
+        'summary_2018-01-01.png' (default='.')
+    max_workers : int or NoneType
+        Number of worker processes.  If None, uses one per core.
+        (default=None)
+    decimation : string or NoneType
+        Passed to `plot_simulated_data` (default='minmax')
+    **kwargs : dict
+        Keywords passed to the Instrument of each day, such as `sat_id`
+
+    Returns
+    -------
+    list of strings
+        Files written, in the order of the dates
+
+    """
+
+    directory = os.path.expanduser(directory)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
 
-    plt.savefig(out_fname)
+    filenames = [os.path.join(directory, 'summary_{:s}.png'.format(
+        pds.Timestamp(date).strftime('%Y-%m-%d'))) for date in dates]
+    with futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        jobs = [pool.submit(_plot_day, inst_module.__name__,
+                            pds.Timestamp(date).to_pydatetime(), filename,
+                            decimation, kwargs)
+                for date, filename in zip(dates, filenames)]
+        filenames = [job.result() for job in jobs]
 
-    return
+    return filenames
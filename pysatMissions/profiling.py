@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Provides opt-in timing and memory instrumentation for simulated instrument
+loads and the custom functions attached to them.
+
+"""
+
+import datetime as dt
+import functools
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pds
+
+# absolute memory peaks reached inside the profiled calls in progress, which
+# are lost when a nested call resets the peak
+_peaks = []
+
+
+def _reset_peak():
+    """Resets the traced memory peak, returns current traced memory"""
+
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        # python < 3.9, clearing the traces also resets the peak
+        tracemalloc.clear_traces()
+
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _count_rows(args, result):
+    """Number of samples processed by a load routine or custom function"""
+
+    # custom functions receive the instrument as the first argument
+    if len(args) > 0 and hasattr(args[0], 'data'):
+        return len(args[0].data.index)
+    # load routines return data and metadata
+    if isinstance(result, tuple) and len(result) > 0:
+        if hasattr(result[0], 'index'):
+            return len(result[0].index)
+
+    return np.nan
+
+
+class Profiler(object):
+    """
+    Records wall time, CPU time, rows processed and peak memory of calls.
+
+    Parameters
+    ----------
+    track_memory : bool
+        If True, uses tracemalloc to measure the increase in peak memory
+        during each call.  This slows down allocation heavy code, so it is
+        off by default.  Tracing stops when the outermost profiled call
+        returns.  The peak is shared by the threads of a process, so calls
+        running at the same time in threads should not track memory.
+        (default=False)
+
+    Attributes
+    ----------
+    records : list of dicts
+        One record per call, with keys 'step', 'start', 'wall_time',
+        'cpu_time', 'rows' and 'peak_memory'
+
+    Example
+    -------
+        inst = pysat.Instrument(inst_module=pysat_ephem)
+        profiler = enable_profiling(inst)
+        inst.load(2018, 1)
+        print(inst.profiler.summary())
+
+    """
+
+    def __init__(self, track_memory=False):
+
+        self.track_memory = track_memory
+        self.records = []
+
+        return
+
+    def wrap(self, func, name=None):
+        """
+        Wraps a function so that each call is recorded.
+
+        Parameters
+        ----------
+        func : function
+            Load routine or custom function to time
+        name : string or NoneType
+            Step name used in the report.  If None, uses the function name.
+            (default=None)
+
+        Returns
+        -------
+        function
+            Wrapped function with the same signature as `func`
+
+        """
+
+        if name is None:
+            name = getattr(func, '__name__', repr(func))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            track_memory = self.track_memory
+            started = track_memory and not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            try:
+                if track_memory:
+                    if len(_peaks) > 0:
+                        _peaks[-1] = max(_peaks[-1],
+                                         tracemalloc.get_traced_memory()[1])
+                    start_mem = _reset_peak()
+                    _peaks.append(0)
+                start = dt.datetime.now(dt.timezone.utc)
+                wall = time.perf_counter()
+                cpu = time.process_time()
+
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    if track_memory:
+                        peak_mem = max(_peaks.pop(),
+                                       tracemalloc.get_traced_memory()[1])
+                        if len(_peaks) > 0:
+                            _peaks[-1] = max(_peaks[-1], peak_mem)
+
+                cpu = time.process_time() - cpu
+                wall = time.perf_counter() - wall
+            finally:
+                if started:
+                    tracemalloc.stop()
+            if track_memory:
+                peak_mem -= start_mem
+            else:
+                peak_mem = np.nan
+
+            self.records.append({'step': name, 'start': start,
+                                 'wall_time': wall, 'cpu_time': cpu,
+                                 'rows': _count_rows(args, result),
+                                 'peak_memory': peak_mem})
+            return result
+
+        wrapper.profiler = self
+        return wrapper
+
+    def reset(self):
+        """Removes all records"""
+
+        self.records = []
+
+        return
+
+    def report(self):
+        """
+        Returns every recorded call.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per call with the step name, start time, 'wall_time' and
+            'cpu_time' in seconds, 'rows' processed and the increase in
+            'peak_memory' in bytes (NaN unless memory is tracked)
+
+        """
+
+        columns = ['step', 'start', 'wall_time', 'cpu_time', 'rows',
+                   'peak_memory']
+        return pds.DataFrame(self.records, columns=columns)
+
+    def summary(self):
+        """
+        Returns totals for each step, sorted by wall time.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by step, with the number of 'calls', total 'wall_time',
+            'cpu_time' and 'rows', the largest 'peak_memory' increase,
+            'rows_per_sec' and the 'fraction' of the total wall time.
+
+        """
+
+        report = self.report()
+        summary = report.groupby('step').agg({'start': 'count',
+                                              'wall_time': 'sum',
+                                              'cpu_time': 'sum',
+                                              'rows': 'sum',
+                                              'peak_memory': 'max'})
+        summary = summary.rename(columns={'start': 'calls'})
+        summary['rows_per_sec'] = summary['rows'] / summary['wall_time']
+        summary['fraction'] = (summary['wall_time']
+                               / summary['wall_time'].sum())
+
+        return summary.sort_values('wall_time', ascending=False)
+
+    def to_json(self, filename=None):
+        """
+        Returns the records as JSON, optionally writing them to a file.
+
+        Parameters
+        ----------
+        filename : string or NoneType
+            File to write to.  If None, nothing is written. (default=None)
+
+        Returns
+        -------
+        string
+            JSON list with one object per call
+
+        """
+
+        records = []
+        for record in self.records:
+            record = dict(record)
+            record['start'] = record['start'].isoformat()
+            for key in ['rows', 'peak_memory']:
+                if np.isnan(record[key]):
+                    record[key] = None
+            records.append(record)
+        out = json.dumps(records, indent=1)
+
+        if filename is not None:
+            with open(filename, 'w') as fout:
+                fout.write(out)
+
+        return out
+
+    def to_prometheus(self, prefix='pysatmissions'):
+        """
+        Returns per-step totals in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        prefix : string
+            Prefix for the metric names (default='pysatmissions')
+
+        Returns
+        -------
+        string
+            Metrics suitable for a Prometheus textfile collector
+
+        """
+
+        summary = self.summary()
+        metrics = [('calls_total', 'calls', 'counter',
+                    'Number of calls of each step'),
+                   ('wall_seconds_total', 'wall_time', 'counter',
+                    'Wall time spent in each step'),
+                   ('cpu_seconds_total', 'cpu_time', 'counter',
+                    'CPU time spent in each step'),
+                   ('rows_total', 'rows', 'counter',
+                    'Samples processed by each step'),
+                   ('peak_memory_bytes', 'peak_memory', 'gauge',
+                    'Largest increase in peak memory during a step')]
+
+        lines = []
+        for metric, column, kind, desc in metrics:
+            name = '_'.join((prefix, 'step', metric))
+            lines.append('# HELP {:s} {:s}'.format(name, desc))
+            lines.append('# TYPE {:s} {:s}'.format(name, kind))
+            for step, value in summary[column].items():
+                if np.isnan(value):
+                    continue
+                lines.append('{:s}{{step="{:s}"}} {:.9g}'.format(
+                    name, step, value))
+
+        return '\n'.join(lines) + '\n'
+
+
+def enable_profiling(inst, track_memory=False):
+    """
+    Records timing of the load routine and custom functions of an instrument.
+
+    Parameters
+    ----------
+    inst : pysat.Instrument
+        Instrument to instrument.  Custom functions must already be attached.
+    track_memory : bool
+        If True, also records the increase in peak memory of each step.
+        Also applies to an existing `inst.profiler`. (default=False)
+
+    Returns
+    -------
+    Profiler
+        Profiler holding the records, also available as `inst.profiler`
+
+    Note
+    ----
+        May be called again after attaching more custom functions.  Functions
+        that are already profiled are not wrapped twice.
+
+    """
+
+    profiler = getattr(inst, 'profiler', None)
+    if profiler is None:
+        profiler = Profiler(track_memory=track_memory)
+        inst.profiler = profiler
+    profiler.track_memory = track_memory
+
+    if not hasattr(inst._load_rtn, 'profiler'):
+        inst._load_rtn = profiler.wrap(inst._load_rtn, name='load')
+    inst.custom._functions = [func if hasattr(func, 'profiler')
+                              else profiler.wrap(func)
+                              for func in inst.custom._functions]
+
+    return profiler
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Test the partitioned Parquet archive
+
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions import archive
+
+pytest.importorskip('pyarrow')
+
+
+def make_data(days=2):
+    """Simple orbit sampled every 10 seconds"""
+
+    index = pds.date_range('2018-01-01', periods=days * 8640, freq='10s')
+    phase = np.arange(len(index)) * 2. * np.pi / 554.
+    data = pds.DataFrame({'glat': 51.6 * np.sin(phase),
+                          'glong': np.mod(np.degrees(phase) * 0.94 + 180.,
+                                          360.) - 180.,
+                          'alt': 400. + 10. * np.cos(phase),
+                          'mlt': np.mod(np.arange(len(index)) / 460., 24.),
+                          'B': np.linspace(2.e4, 5.e4, len(index))},
+                         index=index)
+    data.index.name = 'Epoch'
+
+    return data
+
+
+class TestArchive():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.data = make_data()
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.data
+
+    def test_partitions(self, tmpdir):
+        """Check one file is written per satellite and day"""
+        store = archive.Archive(str(tmpdir), row_group_size=100)
+        store.write(self.data, satellite='a')
+        store.write(self.data.iloc[:10], satellite='b')
+        assert len(store.files()) == 3
+        assert store.index['num_rows'].sum() == len(self.data) + 10
+        assert list(tmpdir.visit(fil='*.tmp')) == []
+
+    def test_full_read(self, tmpdir):
+        """Check a query without limits returns all data"""
+        store = archive.Archive(str(tmpdir))
+        store.write(self.data, satellite='a')
+        data = store.query()
+        assert data.drop(columns='satellite').equals(self.data)
+        assert (data['satellite'] == 'a').all()
+
+    @pytest.mark.parametrize("ranges", [{'glat': (40., 50.)},
+                                        {'glat': (40., 50.),
+                                         'glong': (-110., -100.)},
+                                        {'glong': (170., -170.)},
+                                        {'mlt': (22., 2.), 'alt': (405., 420.)}])
+    def test_region_query(self, tmpdir, ranges):
+        """Check region queries match a full scan and skip row groups"""
+        store = archive.Archive(str(tmpdir), row_group_size=100)
+        store.write(self.data, satellite='a')
+        data = store.query(columns=['B'], **ranges)
+
+        keep = np.ones(len(self.data), dtype=bool)
+        for label, (low, high) in ranges.items():
+            values = self.data[label]
+            if low > high:
+                keep &= (values >= low) | (values <= high)
+            else:
+                keep &= (values >= low) & (values <= high)
+        assert list(data.columns) == ['B', 'satellite']
+        assert data.index.equals(self.data.index[keep])
+        assert store.last_query['row_groups_read'] < \
+            store.last_query['row_groups']
+
+    def test_time_and_satellite_query(self, tmpdir):
+        """Check other days and satellites are not read"""
+        store = archive.Archive(str(tmpdir), row_group_size=100)
+        store.write(self.data, satellite='a')
+        store.write(self.data, satellite='b')
+        data = store.query(start='2018-01-02 01:00', stop='2018-01-02 02:00',
+                           satellites=['b'])
+        assert len(data) == 361
+        assert store.last_query['files_read'] == 1
+        assert store.last_query['row_groups_read'] == 5
+
+    def test_reindex(self, tmpdir):
+        """Check the index is rebuilt from the files"""
+        store = archive.Archive(str(tmpdir))
+        store.write(self.data, satellite='a', update_index=False)
+        assert len(store.index) == 0
+        store.reindex()
+        index = archive.Archive(str(tmpdir)).index
+        assert index['num_rows'].sum() == len(self.data)
+        assert index['glat_max'].max() == self.data['glat'].max()
+
+    def test_rewrite(self, tmpdir):
+        """Check writing a day again replaces it"""
+        store = archive.Archive(str(tmpdir))
+        store.write(self.data, satellite='a')
+        store.write(self.data.iloc[:5], satellite='a')
+        assert len(store.query(stop='2018-01-01 23:59:59')) == 5
+        assert store.index['num_rows'].sum() == 5 + 8640
+
+    def test_unindexed_query(self, tmpdir):
+        """Check queries on variables that are not indexed fail"""
+        store = archive.Archive(str(tmpdir))
+        with pytest.raises(ValueError):
+            store.query(B=(0., 1.))
+
+    def test_empty_query(self, tmpdir):
+        """Check an empty archive returns no data"""
+        data = archive.Archive(str(tmpdir)).query(glat=(0., 1.),
+                                                  columns=['B'])
+        assert len(data) == 0
+        assert list(data.columns) == ['B', 'satellite']
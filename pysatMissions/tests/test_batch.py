@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# Test the resumable batch simulations and their command line tool
+
+import os
+import pytest
+
+from pysatMissions import batch
+
+pytest.importorskip('pyarrow')
+
+
+class TestJob():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.kwargs = {'sat_id': '100', 'cadence': 10., 'outputs': ['B'],
+                       'field_backend': 'dipole'}
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.kwargs
+
+    @pytest.mark.parametrize("sat_id,cadence,rows",
+                             [('', 1., 86400), ('', 10., 8640),
+                              ('100', 10., 11), ('100', 7., 15)])
+    def test_rows_per_chunk(self, tmpdir, sat_id, cadence, rows):
+        """Check the expected rows match the sample times"""
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-01',
+                        sat_id=sat_id, cadence=cadence)
+        assert job.rows_per_chunk() == rows
+
+    @pytest.mark.parametrize("kwargs",
+                             [{'instrument': 'nope'}, {'cadence': 0.5},
+                              {'cadence': 2.5}, {'stop': '2017-12-31'},
+                              {'satellites': {'a/b': {}}}])
+    def test_bad_options(self, tmpdir, kwargs):
+        """Check bad options raise errors"""
+        options = {'start': '2018-01-01', 'stop': '2018-01-02'}
+        options.update(kwargs)
+        with pytest.raises(ValueError):
+            batch.Job(str(tmpdir), **options)
+
+    def test_run(self, tmpdir):
+        """Check each day is written and timed"""
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-02',
+                        satellites={'a': {}, 'b': {}}, **self.kwargs)
+        lines = []
+        store = job.run(log=lines.append)
+        assert len(store.files()) == 4
+        assert len(lines) == 4
+        timing = job.timing()
+        assert list(timing.index.get_level_values('satellite')) == ['a', 'a',
+                                                                    'b', 'b']
+        assert (timing['rows'] == job.rows_per_chunk()).all()
+        data = store.query(satellites=['b'])
+        assert len(data) == 2 * job.rows_per_chunk()
+        assert 'B' in data.columns
+        assert list(tmpdir.visit(fil='*.tmp')) == []
+
+    def test_resume(self, tmpdir):
+        """Check a job created again only runs the remaining days"""
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-02',
+                        **self.kwargs)
+        job.run()
+        # remove a day, as if the job had stopped before it
+        del job.state['done']['sat/2018-01-02']
+        job._save_state()
+
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-02',
+                        **self.kwargs)
+        assert job.remaining == ['sat/2018-01-02']
+        lines = []
+        job.run(log=lines.append)
+        assert len(lines) == 1
+        assert job.remaining == []
+
+    def test_options_differ(self, tmpdir):
+        """Check a job may not resume with other options"""
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-01',
+                        **self.kwargs)
+        job.run()
+        self.kwargs['cadence'] = 20.
+        with pytest.raises(ValueError):
+            batch.Job(str(tmpdir), '2018-01-01', '2018-01-01', **self.kwargs)
+
+    def test_failed_day(self, tmpdir):
+        """Check failed days are recorded and retried"""
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-01',
+                        satellites={'bad': {'TLE1': 'bad', 'TLE2': 'bad'}},
+                        **self.kwargs)
+        job.run()
+        assert list(job.state['failed'].keys()) == ['bad/2018-01-01']
+        assert job.remaining == ['bad/2018-01-01']
+
+    def test_estimate(self, tmpdir):
+        """Check the estimate covers the remaining days"""
+        job = batch.Job(str(tmpdir), '2018-01-01', '2018-01-04',
+                        **self.kwargs)
+        estimate = job.estimate(max_workers=2, calibrate=50)
+        assert estimate['rows'] == 4 * job.rows_per_chunk()
+        assert estimate['remaining'] == 4
+        assert estimate['runtime'] == pytest.approx(
+            2. * estimate['seconds_per_chunk'])
+        # nothing is written by the estimate
+        assert not os.path.isfile(os.path.join(str(tmpdir), batch.state_file))
+
+        job.run()
+        estimate = job.estimate()
+        assert estimate['remaining_rows'] == 0
+        assert estimate['runtime'] == 0.
+
+
+class TestMain():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.args = ['--start', '2018-01-01', '--stop', '2018-01-02',
+                     '--seconds', '100', '--cadence', '10', '--outputs', 'B',
+                     '--field-backend', 'dipole']
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.args
+
+    def test_dry_run(self, tmpdir, capsys):
+        """Check a dry run prints the estimate without simulating"""
+        assert batch.main([str(tmpdir)] + self.args + ['--dry-run']) == 0
+        output = capsys.readouterr().out
+        assert '2 of 2 days remaining' in output
+        assert '22 rows remaining of 22' in output
+        assert not os.path.isfile(os.path.join(str(tmpdir), batch.state_file))
+
+    def test_run(self, tmpdir, capsys):
+        """Check the timing of each day is printed"""
+        assert batch.main([str(tmpdir)] + self.args) == 0
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 2
+        assert all(' 11 rows, simulate ' in line for line in lines)
+
+    def test_tle_options(self, tmpdir):
+        """Check conflicting TLE options exit with an error"""
+        with pytest.raises(SystemExit):
+            batch.main([str(tmpdir), '--satnum', '25544'] + self.args)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Test the lazy multi-day, multi-satellite simulations
+
+import datetime as dt
+import numpy as np
+import pytest
+
+from pysatMissions import campaign
+from pysatMissions.instruments import pysat_ephem
+
+dask = pytest.importorskip('dask')
+
+
+class TestCampaign():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        tle = {'TLE1': ''.join(('1 25544U 98067A   18135.61844383  .00002728',
+                                '  00000-0  48567-4 0  9998')),
+               'TLE2': ''.join(('2 25544  51.6402 181.0633 0004018  88.8954',
+                                '  22.2246 15.54059185113452'))}
+        self.campaign = campaign.Campaign(pysat_ephem, dt.datetime(2018, 1, 1),
+                                          dt.datetime(2018, 1, 2),
+                                          satellites={'a': tle, 'b': {}},
+                                          sat_id='100', scheduler='threads',
+                                          outputs=['B'],
+                                          field_backend='dipole')
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_chunks(self):
+        """Check there is one partition per satellite and day"""
+        data = self.campaign.to_dask(['glat', 'B'])
+        assert data.npartitions == 4
+        assert list(data.columns) == ['glat', 'B', 'satellite']
+
+    def test_compute(self):
+        """Check the chunks hold every sample of every satellite"""
+        data = self.campaign.compute(self.campaign.to_dask(['glat', 'B']))
+        assert data.groupby('satellite').size().to_dict() == {'a': 202,
+                                                              'b': 202}
+        assert not np.isnan(data['B']).any()
+
+    def test_orbit_average(self):
+        """Check orbit averages match a direct calculation"""
+        data = self.campaign.compute(self.campaign.to_dask(['B']))
+        averages = self.campaign.compute(self.campaign.orbit_average(['B'],
+                                                                     1.))
+        sat = data[data['satellite'] == 'a']
+        minutes = (sat.index - sat.index[0]).total_seconds() // 60
+        target = sat.groupby(minutes.values)['B'].mean()
+        assert np.allclose(averages.loc['a'].sort_index()['B'].values,
+                           target.values)
+
+    def test_binned_statistics(self):
+        """Check binned counts add up to the samples inside the bins"""
+        edges = np.arange(-60., 61., 30.)
+        data = self.campaign.compute(self.campaign.to_dask(['glat', 'B']))
+        stats = self.campaign.compute(
+            self.campaign.binned_statistics(['B'], {'glat': edges}))
+        inside = (data['glat'] >= edges[0]) & (data['glat'] < edges[-1])
+        assert stats[('B', 'count')].sum() == inside.sum()
+
+    def test_binned_statistics_last_edge(self):
+        """Check samples on the last edge are binned as by the accumulator"""
+        from pysatMissions.methods import binning as mm_bin
+        edges = np.arange(-60., 61., 30.)
+        data = self.campaign.compute(self.campaign.to_dask(['glat', 'B']))
+        data.iloc[:5, data.columns.get_loc('glat')] = edges[-1]
+        data.iloc[5:10, data.columns.get_loc('glat')] = edges[0]
+        stats = self.campaign.compute(self.campaign.binned_statistics(
+            ['B'], {'glat': edges},
+            data=dask.dataframe.from_pandas(data, npartitions=2)))
+        clim = mm_bin.BinnedStatistics({'glat': edges}, ['B'])
+        clim.update(data)
+        target = stats.groupby(level='glat_bin').sum()[('B', 'count')]
+        assert np.array_equal(clim.count[0][target.index.values],
+                              target.values)
+        assert target.loc[len(edges) - 2] >= 5
+
+    def test_to_archive(self, tmpdir):
+        """Check the campaign is written to an indexed archive"""
+        pytest.importorskip('pyarrow')
+        store = self.campaign.to_archive(str(tmpdir), columns=['glat', 'B'])
+        assert len(store.files()) == 4
+        data = store.query(glat=(-10., 10.), satellites=['a'])
+        assert (data['satellite'] == 'a').all()
+        assert ((data['glat'] >= -10.) & (data['glat'] <= 10.)).all()
+
+    def test_accumulate(self):
+        """Check merged accumulators match the binned statistics"""
+        edges = np.arange(-60., 61., 30.)
+        stats = self.campaign.compute(
+            self.campaign.binned_statistics(['B'], {'glat': edges}))
+        clim = self.campaign.compute(self.campaign.accumulate({'glat': edges},
+                                                              ['B']))
+        target = stats.groupby(level='glat_bin').sum()[('B', 'count')]
+        assert clim.count[0].sum() == target.sum()
+        assert np.array_equal(clim.count[0][target.index.values],
+                              target.values)
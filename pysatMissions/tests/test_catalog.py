@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# Test the TLE catalog
+
+import datetime as dt
+import numpy as np
+import os
+import pandas as pds
+import pytest
+
+from pysatMissions import catalog
+
+
+def make_tle(satnum, day, year=18):
+    """Element lines of an object at an epoch, with made up elements"""
+
+    epoch = '{:02d}{:012.8f}'.format(year, day)
+    line1 = ''.join(('1 {:>5s}U 98067A   {:s}'.format(satnum, epoch),
+                     '  .00002728  00000-0  48567-4 0  9998'))
+    line2 = ''.join(('2 {:>5s}  51.6402 181.0633 0004018'.format(satnum),
+                     '  88.8954  22.2246 15.54059185113452'))
+    return line1, line2
+
+
+class TestParse():
+
+    def test_two_line_file(self):
+        """Check element sets are read without name lines"""
+        lines = make_tle('25544', 135.5) + make_tle('25544', 136.5)
+        tles = catalog.parse_tle('\n'.join(lines))
+        assert list(tles['satnum']) == [25544, 25544]
+        assert tles['epoch'][0] == np.datetime64('2018-05-15T12:00')
+        assert tles['line1'][1].decode() == lines[2]
+        assert list(tles['name']) == [b'', b'']
+
+    def test_three_line_file(self):
+        """Check names are read from 3LE files"""
+        text = '\r\n'.join(('0 ISS (ZARYA)',) + make_tle('25544', 135.5)
+                           + ('HST',) + make_tle('20580', 1.25, year=99))
+        tles = catalog.parse_tle(text)
+        assert list(tles['name']) == [b'ISS (ZARYA)', b'HST']
+        assert list(tles['satnum']) == [25544, 20580]
+        assert tles['epoch'][1] == np.datetime64('1999-01-01T06:00')
+
+    def test_alpha5(self):
+        """Check Alpha-5 catalog numbers are decoded"""
+        tles = catalog.parse_tle('\n'.join(make_tle('A0001', 10.)
+                                           + make_tle('Z9999', 10.)))
+        assert list(tles['satnum']) == [100001, 339999]
+
+    def test_incomplete_sets_skipped(self):
+        """Check lines without a matching element line are ignored"""
+        line1, line2 = make_tle('25544', 135.5)
+        tles = catalog.parse_tle('\n'.join([line1, 'junk', line2, line1,
+                                            line2]))
+        assert len(tles['satnum']) == 1
+
+
+class TestCatalog():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.lines = []
+        for satnum in ['25544', '20580']:
+            for day in [10.5, 12.5, 20.]:
+                self.lines.extend(make_tle(satnum, day))
+        self.tles = catalog.TLECatalog(**catalog.parse_tle(
+            '\n'.join(self.lines)))
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.lines, self.tles
+
+    def test_sorted(self):
+        """Check element sets are sorted by catalog number and epoch"""
+        assert len(self.tles) == 6
+        assert list(self.tles.satellites) == [20580, 25544]
+        assert np.all(np.diff(self.tles.satnum) >= 0)
+        assert np.all(np.diff(self.tles.epoch[:3]) > np.timedelta64(0))
+
+    def test_repeated_epochs(self):
+        """Check the last element set of a repeated epoch is kept"""
+        line1, line2 = make_tle('25544', 10.5)
+        line2 = line2.replace('51.6402', '51.6403')
+        tles = catalog.TLECatalog(**catalog.parse_tle(
+            '\n'.join(self.lines + [line1, line2])))
+        assert len(tles) == 6
+        assert tles.select(dt.datetime(2018, 1, 10), 25544)[1] == line2
+
+    def test_nearest(self):
+        """Check the element set with the closest epoch is chosen"""
+        times = [dt.datetime(2018, 1, 1), dt.datetime(2018, 1, 11, 11),
+                 dt.datetime(2018, 1, 11, 13), dt.datetime(2018, 2, 1)]
+        index = self.tles.nearest(times, satnum=25544)
+        days = (self.tles.epoch[index] - np.datetime64('2018-01-01')) \
+            / np.timedelta64(1, 'D')
+        assert list(days) == [9.5, 9.5, 11.5, 19.]
+        assert np.all(self.tles.satnum[index] == 25544)
+
+    def test_select(self):
+        """Check select returns the element lines"""
+        line1, line2 = self.tles.select(dt.datetime(2018, 1, 19), 20580)
+        assert (line1, line2) == make_tle('20580', 20.)
+
+    def test_satnum_needed(self):
+        """Check the object must be given for several objects"""
+        with pytest.raises(ValueError):
+            self.tles.nearest([dt.datetime(2018, 1, 1)])
+        with pytest.raises(ValueError):
+            self.tles.nearest([dt.datetime(2018, 1, 1)], satnum=1)
+
+    def test_groups(self):
+        """Check each block of times uses one element set"""
+        times = pds.date_range(dt.datetime(2018, 1, 11), periods=144,
+                               freq='10min')
+        groups = self.tles.groups(times, satnum=25544, block=6.)
+        assert [len(index) for index, line1, line2 in groups] == [72, 72]
+        assert groups[0][1] == make_tle('25544', 10.5)[0]
+        assert groups[1][1] == make_tle('25544', 12.5)[0]
+
+    def test_save_load(self, tmpdir):
+        """Check a saved catalog can be reloaded"""
+        fname = str(tmpdir.join('catalog.npz'))
+        self.tles.save(fname)
+        tles = catalog.TLECatalog.load(fname)
+        for attr in ['satnum', 'epoch', 'line1', 'line2', 'name']:
+            assert np.array_equal(getattr(tles, attr),
+                                  getattr(self.tles, attr))
+
+    def test_read_cache(self, tmpdir):
+        """Check parsed files are cached until the source changes"""
+        fname = str(tmpdir.join('history.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join(self.lines[:6]))
+        tles = catalog.TLECatalog.read(fname)
+        assert os.path.isfile(fname + '.npz')
+        cached = catalog.TLECatalog.read(fname)
+        assert np.array_equal(cached.line1, tles.line1)
+
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join(self.lines))
+        assert len(catalog.TLECatalog.read(fname)) == 6
+
+    @pytest.mark.parametrize("damage", ['file', 'directory'])
+    def test_read_damaged_cache(self, tmpdir, damage):
+        """Check a cache that can't be used is parsed from the source"""
+        fname = str(tmpdir.join('history.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join(self.lines))
+        if damage == 'file':
+            with open(fname + '.npz', 'wb') as fout:
+                fout.write(b'not a cache')
+        else:
+            os.makedirs(os.path.join(fname + '.npz', 'inside'))
+        assert len(catalog.TLECatalog.read(fname)) == 6
+        assert len(catalog.TLECatalog.read(fname)) == 6
+        assert tmpdir.listdir(lambda path: path.ext == '.tmp') == []
+
+    def test_read_only_directory(self, tmpdir):
+        """Check files in a read-only directory are read without a cache"""
+        fname = str(tmpdir.join('history.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join(self.lines))
+        os.chmod(str(tmpdir), 0o555)
+        try:
+            if os.access(str(tmpdir), os.W_OK):
+                pytest.skip('the directory is still writable')
+            assert len(catalog.TLECatalog.read(fname)) == 6
+            assert not os.path.isfile(fname + '.npz')
+        finally:
+            os.chmod(str(tmpdir), 0o755)
+
+    def test_read_several_files(self, tmpdir):
+        """Check several files are combined into one catalog"""
+        fnames = [str(tmpdir.join('a.txt')), str(tmpdir.join('b.txt'))]
+        for fname, lines in zip(fnames, [self.lines[:6], self.lines[6:]]):
+            with open(fname, 'w') as fout:
+                fout.write('\n'.join(lines))
+        tles = catalog.TLECatalog.read(fnames, cache=False)
+        assert len(tles) == 6
+        assert not os.path.isfile(fnames[0] + '.npz')
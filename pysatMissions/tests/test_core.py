@@ -1,3 +1,8 @@
+import subprocess
+import sys
+
+import pytest
+
 import pysatMissions
 import pysat
 
@@ -18,3 +23,51 @@ class TestBasic():
         testInst = pysat.Instrument(inst_module=self.module)
 
         assert isinstance(testInst, pysat._instrument.Instrument)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='requires module level __getattr__')
+class TestLazyImports():
+    """Test that submodules are only imported on first use
+    """
+
+    def run_fresh(self, code):
+        """Run code in a new interpreter and return the printed output"""
+
+        return subprocess.check_output([sys.executable, '-c', code]).decode()
+
+    def test_import_is_lazy(self):
+        """Check that importing the package loads no models"""
+
+        out = self.run_fresh(' '.join(("import sys; import pysatMissions;",
+                                       "print(sorted(set(sys.modules) &",
+                                       "{'pysatMissions.instruments',",
+                                       "'pysatMissions.methods', 'apexpy',",
+                                       "'aacgmv2', 'ephem', 'pysatMagVect'}))"
+                                       )))
+        assert out.strip() == '[]'
+
+    def test_sgp4_import_skips_models(self):
+        """Check that pysat_sgp4 does not need the empirical models"""
+
+        out = self.run_fresh(' '.join(("import sys;",
+                                       "from pysatMissions.instruments",
+                                       "import pysat_sgp4;",
+                                       "print(sorted(set(sys.modules) &",
+                                       "{'apexpy', 'aacgmv2', 'ephem',",
+                                       "'pysatMagVect'}))")))
+        assert out.strip() == '[]'
+
+    @pytest.mark.parametrize("name", pysatMissions.__all__)
+    def test_submodule_access(self, name):
+        """Check that each submodule is available as an attribute"""
+
+        assert getattr(pysatMissions, name).__name__ == \
+            '.'.join(('pysatMissions', name))
+        assert name in dir(pysatMissions)
+
+    def test_bad_attribute(self):
+        """Check that unknown attributes still raise an error"""
+
+        with pytest.raises(AttributeError):
+            pysatMissions.not_a_module
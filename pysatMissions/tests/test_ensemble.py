@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Test the Monte Carlo TLE ensembles
+
+import datetime as dt
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions import ensemble
+
+
+class TestEnsemble():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.line1 = ''.join(('1 25544U 98067A   18135.61844383  .00002728',
+                              '  00000-0  48567-4 0  9998'))
+        self.line2 = ''.join(('2 25544  51.6402 181.0633 0004018  88.8954',
+                              '  22.2246 15.54059185113452'))
+        self.times = pds.date_range(dt.datetime(2018, 5, 16),
+                                    periods=600, freq='10s')
+        self.members = ensemble.perturb_elements(
+            self.line1, self.line2, 50, sigma={'mo': 1.e-4, 'bstar': 1.e-5},
+            seed=42)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.line1, self.line2, self.times, self.members
+
+    def test_perturb_elements(self):
+        """Check only the requested elements are perturbed"""
+        assert self.members.shape == (50, len(ensemble.elements))
+        spread = np.ptp(self.members, axis=0)
+        for i, name in enumerate(ensemble.elements):
+            if name in ['mo', 'bstar']:
+                assert spread[i] > 0.
+            else:
+                assert spread[i] == 0.
+
+    def test_perturb_elements_repeatable(self):
+        """Check a seed gives the same ensemble"""
+        members = ensemble.perturb_elements(
+            self.line1, self.line2, 50, sigma={'mo': 1.e-4, 'bstar': 1.e-5},
+            seed=42)
+        assert np.array_equal(members, self.members)
+
+    def test_covariance(self):
+        """Check a covariance matrix may be used instead of sigma"""
+        cov = np.diag(np.full(len(ensemble.elements), 1.e-12))
+        members = ensemble.perturb_elements(self.line1, self.line2, 10,
+                                            covariance=cov)
+        assert members.shape == (10, len(ensemble.elements))
+
+    @pytest.mark.parametrize("kwargs", [{},
+                                        {'sigma': {'mo': 1.}, 'covariance':
+                                         np.eye(7)},
+                                        {'sigma': {'mean_anomaly': 1.}},
+                                        {'covariance': np.eye(3)}])
+    def test_bad_spread(self, kwargs):
+        """Check the spread of the elements must be set once and valid"""
+        with pytest.raises(ValueError):
+            ensemble.perturb_elements(self.line1, self.line2, 10, **kwargs)
+
+    def test_nominal_matches_sgp4(self):
+        """Check the nominal orbit matches the sgp4 instrument"""
+        from sgp4.earth_gravity import wgs72
+        from sgp4.io import twoline2rv
+        position, velocity = ensemble.propagate_ensemble(
+            self.line1, self.line2, self.times[:3], self.members)
+        assert position.shape == (51, 3, 3)
+        satellite = twoline2rv(self.line1, self.line2, wgs72)
+        for i, time in enumerate(self.times[:3]):
+            target = satellite.propagate(time.year, time.month, time.day,
+                                         time.hour, time.minute, time.second)
+            assert np.allclose(position[0, i], target[0], atol=1.e-3)
+            assert np.allclose(velocity[0, i], target[1], atol=1.e-6)
+
+    def test_unperturbed_members(self):
+        """Check members without perturbation follow the nominal orbit"""
+        members = ensemble.perturb_elements(self.line1, self.line2, 3,
+                                            sigma={'mo': 0.})
+        position, velocity = ensemble.propagate_ensemble(
+            self.line1, self.line2, self.times, members)
+        assert np.allclose(position[1:], position[0], atol=1.e-3)
+
+    def test_statistics(self):
+        """Check the statistics match a direct calculation"""
+        stats = ensemble.ensemble_statistics(self.line1, self.line2,
+                                             self.times, self.members,
+                                             block_size=250)
+        position, velocity = ensemble.propagate_ensemble(
+            self.line1, self.line2, self.times, self.members)
+        assert len(stats) == len(self.times)
+        assert (stats.index == self.times).all()
+        assert np.allclose(stats['position_eci_x_mean'],
+                           position[1:, :, 0].mean(axis=0))
+        assert np.allclose(stats['position_eci_cov_xy'],
+                           [np.cov(position[1:, i, 0], position[1:, i, 1])[0,
+                                                                           1]
+                            for i in range(len(self.times))])
+        distance = np.linalg.norm(position[1:] - position[0], axis=-1)
+        assert np.allclose(stats['deviation_p95'],
+                           np.percentile(distance, 95., axis=0))
+
+    def test_along_track_dominates(self):
+        """Check mean anomaly errors grow mostly along the track"""
+        stats = ensemble.ensemble_statistics(self.line1, self.line2,
+                                             self.times, self.members)
+        spread = stats.iloc[-1]
+        along = spread['along_track_p95'] - spread['along_track_p5']
+        radial = spread['radial_p95'] - spread['radial_p5']
+        cross = spread['cross_track_p95'] - spread['cross_track_p5']
+        assert along > 10. * radial
+        assert along > 10. * cross
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Test writing files through temporary files
+
+import os
+import pytest
+import stat
+
+from pysatMissions import _files
+
+
+class TestReplaceFile():
+    def test_replace(self, tmpdir):
+        """Check the temporary file replaces the output"""
+        fname = str(tmpdir.join('out.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('old')
+        with _files.replace_file(fname) as tmp_file:
+            assert tmp_file != fname
+            with open(tmp_file, 'w') as fout:
+                fout.write('new')
+        with open(fname) as fin:
+            assert fin.read() == 'new'
+        assert tmpdir.listdir(lambda path: path.ext == '.tmp') == []
+
+    def test_mode_follows_umask(self, tmpdir):
+        """Check the output has the permissions open would give it"""
+        fname = str(tmpdir.join('out.txt'))
+        with _files.replace_file(fname) as tmp_file:
+            with open(tmp_file, 'w') as fout:
+                fout.write('new')
+        umask = os.umask(0)
+        os.umask(umask)
+        assert stat.S_IMODE(os.stat(fname).st_mode) == 0o666 & ~umask
+
+    def test_unique_names(self, tmpdir):
+        """Check writers of the same file use different temporary files"""
+        fname = str(tmpdir.join('out.txt'))
+        with _files.replace_file(fname) as first:
+            with _files.replace_file(fname) as second:
+                assert first != second
+
+    def test_error_removes_temporary_file(self, tmpdir):
+        """Check a failed write leaves the output and no temporary file"""
+        fname = str(tmpdir.join('out.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('old')
+        with pytest.raises(RuntimeError):
+            with _files.replace_file(fname) as tmp_file:
+                with open(tmp_file, 'w') as fout:
+                    fout.write('partial')
+                raise RuntimeError('failed write')
+        with open(fname) as fin:
+            assert fin.read() == 'old'
+        assert tmpdir.listdir(lambda path: path.ext == '.tmp') == []
@@ -7,6 +7,9 @@ To be replaced once pysat testing techniques are finalized
 
 import datetime as dt
 import numpy as np
+import pytest
+import warnings
+
 import pysat
 
 
@@ -60,6 +63,8 @@ class TestEphem(TestSGP4):
                          'obs_sat_az_angle', 'obs_sat_el_angle',
                          'position_ecef_x', 'position_ecef_y', 'position_ecef_z',
                          'qd_lat', 'qd_long', 'mlt',
+                         'sun_ecef_x', 'sun_ecef_y', 'sun_ecef_z', 'sza',
+                         'slt', 'sunlit_frac', 'umbra', 'penumbra',
                          'e_temp', 'frac_dens_h', 'frac_dens_he', 'frac_dens_o',
                          'ion_dens', 'ion_temp',
                          'B', 'B_east', 'B_north', 'B_up', 'B_ecef_x',
@@ -76,3 +81,450 @@ class TestEphem(TestSGP4):
     def teardown(self):
         """Clean up test environment after tests"""
         del self
+
+
+class TestEphemThreads(TestEphem):
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        TestEphem.setup(self)
+        from pysatMissions.instruments import pysat_ephem
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100', executor='thread')
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+
+class TestEphemOutputs():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        from pysatMissions.instruments import pysat_ephem
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100',
+                                         outputs=['qd_lat', 'sunlit_frac'])
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_selected_outputs(self):
+        """Check only the requested models are run"""
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        for target in ['glat', 'qd_lat', 'mlt', 'sunlit_frac']:
+            assert target in self.testInst.data.keys()
+        for target in ['aacgm_lat', 'B', 'ion_dens', 'Nn', 'zonal_wind',
+                       'velocity_ecef_x', 'sc_xhat_ecef_x']:
+            assert target not in self.testInst.data.keys()
+
+    @pytest.mark.parametrize("backend", ['dipole', 'numpy'])
+    def test_field_backend(self, backend):
+        """Check the field model can be selected along with the outputs"""
+        from pysatMissions.instruments import pysat_ephem
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100', outputs=['B_sc_x'],
+                                         field_backend=backend)
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        for target in ['B', 'B_ecef_x', 'B_sc_x', 'B_sc_y', 'B_sc_z']:
+            assert target in self.testInst.data.keys()
+            # the attitude is undefined at the ends of the day
+            assert not np.isnan(self.testInst[target][1:-1]).any()
+
+    def test_model_backend(self):
+        """Check the synthetic models run without pyglow"""
+        from pysatMissions.instruments import pysat_ephem
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100',
+                                         outputs=['ion_dens', 'Nn',
+                                                  'sim_wind_sc_x', 'B_sc_x'],
+                                         model_backend='synthetic')
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        for target in ['ion_dens', 'Nn', 'zonal_wind', 'sim_wind_sc_x',
+                       'B_sc_x']:
+            assert target in self.testInst.data.keys()
+            # the attitude is undefined at the ends of the day
+            assert not np.isnan(self.testInst[target][1:-1]).any()
+
+    def test_partial_model_backend(self):
+        """Check a field only backend is used for the field model alone"""
+        from pysatMissions.instruments import pysat_ephem
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100',
+                                         outputs=['B_sc_x', 'ion_dens'],
+                                         model_backend='dipole')
+        # IRI uses pyglow, which warns if it is not installed
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.testInst.load(date=dt.datetime(2018, 1, 1))
+        assert not np.isnan(self.testInst['B_sc_x'][1:-1]).any()
+
+    def test_model_backend_without_models(self):
+        """Check a backend providing no model raises an error"""
+        from pysatMissions.instruments import pysat_ephem
+        from pysatMissions.models import backends as mm_backends
+        with pytest.raises(ValueError):
+            pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                             sat_id='100',
+                             model_backend=mm_backends.ModelBackend())
+
+    @pytest.mark.parametrize("mode", ['ram', 'nadir', 'sun'])
+    def test_attitude_mode(self, mode):
+        """Check projections use the attitude of the pointing mode"""
+        from pysatMissions.instruments import pysat_ephem
+        from pysatMissions.methods import attitude as mm_att
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100', outputs=['B_sc_x'],
+                                         field_backend='dipole',
+                                         attitude={'mode': mode})
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        for target in mm_att.quaternion_labels + ['B_sc_x']:
+            assert target in self.testInst.data.keys()
+        assert 'sc_xhat_ecef_x' not in self.testInst.data.keys()
+        field = np.stack([self.testInst[label] for label in
+                          ['B_ecef_x', 'B_ecef_y', 'B_ecef_z']], axis=-1)
+        projected = mm_att.rotate(mm_att.get_attitude(self.testInst), field)
+        assert np.allclose(projected[:, 0], self.testInst['B_sc_x'],
+                           equal_nan=True)
+
+    def test_slant_tec(self):
+        """Check line of sight integrals use the spacecraft attitude"""
+        from pysatMissions.instruments import pysat_ephem
+        from pysatMissions.methods import lineofsight as mm_los
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100',
+                                         outputs=['sc_xhat_ecef_x'])
+        self.testInst.custom.attach(mm_los.add_slant_tec,
+                                    kwargs={'look': (-1., 0., 0.),
+                                            'backend': 'synthetic'})
+        self.testInst.custom.attach(mm_los.add_column_density,
+                                    kwargs={'backend': 'synthetic'})
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        for target in ['slant_tec', 'column_dens']:
+            assert target in self.testInst.data.keys()
+            # the attitude is undefined at the ends of the day
+            assert np.nanmin(self.testInst[target]) > 0.
+        assert self.testInst.meta['slant_tec', 'units'] == 'TECU'
+
+    def test_store(self):
+        """Check a reload reuses the stored load and model outputs"""
+        from pysatMissions.instruments import pysat_ephem
+        from pysatMissions.methods import cache as mm_cache
+        store = mm_cache.ColumnStore()
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100', outputs=['B_sc_x'],
+                                         field_backend='dipole', store=store)
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        first = self.testInst['B_sc_x'].copy()
+        misses = store.misses
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        assert store.misses == misses
+        assert store.hits == misses
+        assert first.equals(self.testInst['B_sc_x'])
+
+    def test_step(self):
+        """Check a step samples at a regular cadence and uses the store"""
+        from pysatMissions.instruments import pysat_ephem
+        from pysatMissions.methods import cache as mm_cache
+        store = mm_cache.ColumnStore()
+        full = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                sat_id='100', outputs=['B_sc_x'],
+                                field_backend='dipole')
+        full.load(date=dt.datetime(2018, 1, 1))
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                         sat_id='100', outputs=['B_sc_x'],
+                                         field_backend='dipole', store=store,
+                                         step=10.)
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        assert (self.testInst.index == full.index[::10]).all()
+        # velocity differences, and so the attitude, follow the cadence
+        for target in ['glat', 'alt', 'B_ecef_x']:
+            assert np.allclose(self.testInst[target], full[target][::10])
+        misses = store.misses
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        assert store.misses == misses
+
+
+class TestXarray():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        from pysatMissions.instruments import pysat_ephem, pysat_ephem_xarray
+        self.module = pysat_ephem
+        self.kwargs = {'tag': 'all', 'sat_id': '100',
+                       'outputs': ['B_sc_x', 'sim_wind_sc_x', 'sunlit_frac'],
+                       'model_backend': 'synthetic'}
+        self.testInst = pysat.Instrument(inst_module=pysat_ephem_xarray,
+                                         **self.kwargs)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_sgp4_load(self):
+        """Check sgp4 vectors are indexed by time and component"""
+        from pysatMissions.instruments import pysat_sgp4_xarray
+        self.testInst = pysat.Instrument(inst_module=pysat_sgp4_xarray,
+                                         sat_id='100')
+        assert not self.testInst.pandas_format
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        for target in ['position_eci', 'velocity_eci']:
+            assert self.testInst.data[target].dims == ('time', 'component')
+            assert not np.isnan(self.testInst.data[target].values).any()
+            assert target in self.testInst.meta.data.index
+
+    def test_ephem_matches_pandas(self):
+        """Check vectors match the components of pandas data"""
+        from pysatMissions.methods import spacecraft as mm_sc
+        assert not self.testInst.pandas_format
+        self.testInst.load(date=dt.datetime(2018, 1, 1))
+        pandasInst = pysat.Instrument(inst_module=self.module, **self.kwargs)
+        pandasInst.load(date=dt.datetime(2018, 1, 1))
+
+        data = self.testInst.data
+        assert data['sc_attitude_ecef'].dims == ('time', 'sc_axis',
+                                                 'component')
+        assert np.allclose(data['sc_attitude_ecef'].values,
+                           mm_sc._get_attitude(pandasInst), equal_nan=True)
+        for target in ['position_ecef', 'velocity_ecef', 'sun_ecef',
+                       'B_ecef', 'B_sc', 'sim_wind_sc']:
+            assert data[target].dims == ('time', 'component')
+            labels = ['_'.join((target, coord)) for coord in 'xyz']
+            assert np.allclose(data[target].values,
+                               mm_sc._get_vector(pandasInst, labels),
+                               equal_nan=True)
+        assert np.allclose(data['sunlit_frac'].values,
+                           pandasInst['sunlit_frac'].values)
+
+    def test_next_prev(self):
+        """Check iterating over days loads xarray data"""
+        self.testInst.bounds = (dt.datetime(2018, 1, 1),
+                                dt.datetime(2018, 1, 3))
+        self.testInst.next()
+        first = self.testInst.data['position_ecef'].values
+        self.testInst.next()
+        assert self.testInst.date == dt.datetime(2018, 1, 2)
+        assert self.testInst.data['position_ecef'].dims == ('time',
+                                                            'component')
+        self.testInst.prev()
+        assert self.testInst.date == dt.datetime(2018, 1, 1)
+        assert np.allclose(self.testInst.data['position_ecef'].values, first)
+
+    def test_bad_data_format(self):
+        """Check an unknown data format raises an error"""
+        with pytest.raises(ValueError):
+            pysat.Instrument(inst_module=self.module, data_format='numpy')
+
+    def test_xarray_needs_module(self):
+        """Check xarray data is refused by the pandas instrument module"""
+        with pytest.raises(ValueError):
+            pysat.Instrument(inst_module=self.module, data_format='xarray')
+
+
+class TestAdaptive():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        from pysatMissions.methods import sampling as mm_samp
+        self.sampler = mm_samp.AdaptiveSampler(
+            mm_samp.in_range('glat', low=30., absolute=True),
+            coarse_step=60.)
+        self.kwargs = {'tag': 'all', 'sat_id': '3600', 'outputs': ['B_sc_x'],
+                       'field_backend': 'dipole'}
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    @pytest.mark.parametrize("name,label,low,kwargs",
+                             [('pysat_sgp4', 'position_eci_z', 3000., {}),
+                              ('pysat_ephem', 'glat', 30.,
+                               {'outputs': ['glat']})])
+    def test_adaptive_load(self, name, label, low, kwargs):
+        """Check the adaptive samples are a subset of the 1 Hz samples"""
+        import importlib
+        from pysatMissions.methods import sampling as mm_samp
+        self.sampler.regions = [mm_samp.in_range(label, low=low,
+                                                 absolute=True)]
+        module = importlib.import_module('.'.join(('pysatMissions',
+                                                   'instruments', name)))
+        fullInst = pysat.Instrument(inst_module=module, sat_id='3600',
+                                    **kwargs)
+        fullInst.load(date=dt.datetime(2018, 1, 1))
+        testInst = pysat.Instrument(inst_module=module, sat_id='3600',
+                                    sampler=self.sampler, **kwargs)
+        testInst.load(date=dt.datetime(2018, 1, 1))
+
+        assert len(testInst.index) < len(fullInst.index)
+        assert self.sampler.last_sample['fine'] > 0
+        assert testInst.index.isin(fullInst.index).all()
+        assert testInst.index.is_monotonic_increasing
+        full = fullInst.data.loc[testInst.index]
+        for target in testInst.data.keys():
+            assert np.allclose(testInst[target], full[target])
+
+    def test_station_in_view(self):
+        """Check the ground station passes are found from the ephem output"""
+        from pysatMissions.instruments import pysat_ephem
+        from pysatMissions.methods import sampling as mm_samp
+        sampler = mm_samp.AdaptiveSampler(mm_samp.station_in_view(10.),
+                                          coarse_step=60.)
+        testInst = pysat.Instrument(inst_module=pysat_ephem, tag='all',
+                                    sat_id='', sampler=sampler,
+                                    outputs=['obs_sat_el_angle'])
+        testInst.load(date=dt.datetime(2018, 1, 1))
+
+        assert sampler.last_sample['fine'] > 0
+        elevation = np.degrees(testInst['obs_sat_el_angle'])
+        assert elevation.max() > 10.
+        # every sample of a pass is kept at the fine cadence
+        step = np.diff(testInst.index.values) / np.timedelta64(1, 's')
+        assert (step[(elevation >= 10.).values[1:]] == 1.).all()
+
+    def test_adaptive_velocity(self):
+        """Check the velocity accounts for the uneven time steps"""
+        from pysatMissions.instruments import pysat_ephem
+        testInst = pysat.Instrument(inst_module=pysat_ephem,
+                                    sampler=self.sampler, **self.kwargs)
+        testInst.load(date=dt.datetime(2018, 1, 1))
+        speed = np.sqrt(testInst['velocity_ecef_x']**2
+                        + testInst['velocity_ecef_y']**2
+                        + testInst['velocity_ecef_z']**2)
+        # LEO orbital speed, less the rotation of the Earth
+        assert np.all((speed[1:-1] > 6.5) & (speed[1:-1] < 8.))
+
+    def test_fine_region(self):
+        """Check samples inside the region are at the fine cadence"""
+        from pysatMissions.instruments import pysat_ephem
+        testInst = pysat.Instrument(inst_module=pysat_ephem,
+                                    sampler=self.sampler, **self.kwargs)
+        testInst.load(date=dt.datetime(2018, 1, 1))
+        steps = np.diff(testInst.index.values) / np.timedelta64(1, 's')
+        inside = np.abs(testInst['glat'].values) >= 30.
+        assert np.all(steps[inside[1:] & inside[:-1]] == 1.)
+        assert np.all(steps <= 60.)
+
+
+def tle_checksum(line):
+    """Replaces the checksum of a TLE line"""
+
+    total = sum(int(char) for char in line[:68] if char.isdigit())
+    total += line[:68].count('-')
+    return line[:68] + str(total % 10)
+
+
+class TestCatalog():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        from pysatMissions import catalog
+        self.line1 = ''.join(('1 25544U 98067A   18135.61844383  .00002728',
+                              '  00000-0  48567-4 0  9998'))
+        self.line2 = ''.join(('2 25544  51.6402 181.0633 0004018  88.8954',
+                              '  22.2246 15.54059185113452'))
+        # a second, later element set with a different node
+        self.late1 = tle_checksum(self.line1.replace('18135.61844383',
+                                                     '18140.00000000'))
+        self.late2 = tle_checksum(self.line2.replace('181.0633', '150.0000'))
+        self.tles = catalog.TLECatalog(**catalog.parse_tle(
+            '\n'.join([self.line1, self.line2, self.late1, self.late2])))
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    @pytest.mark.parametrize("name,kwargs",
+                             [('pysat_sgp4', {}),
+                              ('pysat_ephem', {'outputs': ['glat']})])
+    @pytest.mark.parametrize("date,late", [(dt.datetime(2018, 5, 15), False),
+                                           (dt.datetime(2018, 5, 20), True)])
+    def test_catalog_load(self, name, kwargs, date, late):
+        """Check the element set closest to the day is used"""
+        import importlib
+        module = importlib.import_module('.'.join(('pysatMissions',
+                                                   'instruments', name)))
+        testInst = pysat.Instrument(inst_module=module, sat_id='100',
+                                    catalog=self.tles, **kwargs)
+        testInst.load(date=date)
+        if late:
+            tles = {'TLE1': self.late1, 'TLE2': self.late2}
+        else:
+            tles = {'TLE1': self.line1, 'TLE2': self.line2}
+        kwargs.update(tles)
+        targetInst = pysat.Instrument(inst_module=module, sat_id='100',
+                                      **kwargs)
+        targetInst.load(date=date)
+        assert testInst.data.equals(targetInst.data)
+
+    def test_catalog_file(self, tmpdir):
+        """Check a catalog may be given as a file name"""
+        from pysatMissions.instruments import pysat_sgp4
+        fname = str(tmpdir.join('iss.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join([self.line1, self.line2]))
+        testInst = pysat.Instrument(inst_module=pysat_sgp4, sat_id='100',
+                                    catalog=fname)
+        testInst.load(date=dt.datetime(2018, 5, 15))
+        targetInst = pysat.Instrument(inst_module=pysat_sgp4, sat_id='100')
+        targetInst.load(date=dt.datetime(2018, 5, 15))
+        assert testInst.data.equals(targetInst.data)
+
+    def test_catalog_file_rewritten(self, tmpdir):
+        """Check a rewritten catalog file replaces the one read before"""
+        from pysatMissions.instruments import _core as mcore
+        fname = str(tmpdir.join('iss.txt'))
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join([self.line1, self.line2]))
+        assert len(mcore._get_catalog(fname)) == 1
+        num = len(mcore._catalogs)
+        with open(fname, 'w') as fout:
+            fout.write('\n'.join([self.line1, self.line2, self.late1,
+                                  self.late2]))
+        assert len(mcore._get_catalog(fname)) == 2
+        assert len(mcore._catalogs) == num
+
+
+class TestInterpolation():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        from pysatMissions.methods import interpolation as mm_interp
+        self.interpolator = mm_interp.Interpolator(step=60.)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    @pytest.mark.parametrize("name,kwargs,tolerance",
+                             [('pysat_sgp4', {},
+                               {'position_eci': 1.e-3, 'velocity_eci': 1.e-4}),
+                              ('pysat_ephem', {'outputs': ['glat']},
+                               {'position_ecef': 1.e-2, 'glat': 1.e-4,
+                                'alt': 1.e-3})])
+    def test_interpolated_load(self, name, kwargs, tolerance):
+        """Check the interpolated orbit matches the direct propagation"""
+        import importlib
+        module = importlib.import_module('.'.join(('pysatMissions',
+                                                   'instruments', name)))
+        fullInst = pysat.Instrument(inst_module=module, sat_id='3600',
+                                    **kwargs)
+        fullInst.load(date=dt.datetime(2018, 1, 1))
+        testInst = pysat.Instrument(inst_module=module, sat_id='3600',
+                                    interpolator=self.interpolator, **kwargs)
+        testInst.load(date=dt.datetime(2018, 1, 1))
+
+        assert testInst.index.equals(fullInst.index)
+        assert self.interpolator.last_nodes == 61
+        for label, limit in tolerance.items():
+            assert self.interpolator.last_error[label] < limit
+            targets = [key for key in fullInst.data.keys()
+                       if key.startswith(label)]
+            for target in targets:
+                assert np.abs(testInst[target]
+                              - fullInst[target]).max() < limit
+
+    def test_wrapped_longitude(self):
+        """Check longitudes stay within their range across the date line"""
+        from pysatMissions.instruments import pysat_ephem
+        testInst = pysat.Instrument(inst_module=pysat_ephem, sat_id='7200',
+                                    interpolator=self.interpolator,
+                                    outputs=['glong'])
+        testInst.load(date=dt.datetime(2018, 1, 1))
+        assert testInst['glong'].min() >= -180.
+        assert testInst['glong'].max() < 180.
+        assert np.abs(np.diff(testInst['glong'])).max() > 300.
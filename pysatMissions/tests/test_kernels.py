@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Test the fused geometry kernels
+
+import numpy as np
+import pytest
+
+from pysatMissions import _kernels
+
+
+class TestKernels():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        rng = np.random.RandomState(7)
+        num = 500
+        direction = rng.normal(size=(num, 3))
+        direction /= np.linalg.norm(direction, axis=-1)[:, np.newaxis]
+        self.position = 6778. * direction
+        # roughly horizontal velocity of a circular orbit
+        self.velocity = 7.6 * np.cross(direction, rng.normal(size=(num, 3)))
+        self.velocity += 0.01 * direction
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.position, self.velocity
+
+    def test_attitude_orthonormal(self):
+        """Check the attitude is a right handed orthonormal basis"""
+        attitude = _kernels.attitude_basis(self.position, self.velocity,
+                                           use_numba=False)
+        assert attitude.shape == (500, 3, 3)
+        product = np.einsum('nij,nkj->nik', attitude, attitude)
+        assert np.allclose(product, np.eye(3))
+        assert np.allclose(np.linalg.det(attitude), 1.)
+        # x is along the velocity and z towards the Earth
+        assert np.all(np.einsum('nj,nj->n', attitude[:, 0],
+                                self.velocity) > 0.)
+        assert np.all(np.einsum('nj,nj->n', attitude[:, 2],
+                                self.position) < 0.)
+
+    def test_wind_basis(self):
+        """Check the zonal and meridional vectors are horizontal units"""
+        basis = _kernels.wind_basis(self.position, use_numba=False)
+        assert basis.shape == (500, 2, 3)
+        assert np.allclose(np.linalg.norm(basis, axis=-1), 1.)
+        assert np.allclose(basis[:, 0, 2], 0.)
+        for i in range(2):
+            assert np.allclose(np.einsum('nj,nj->n', basis[:, i],
+                                         self.position), 0.)
+
+    @pytest.mark.parametrize("name,args", [('attitude_basis', 2),
+                                           ('wind_basis', 1)])
+    def test_numba_matches_numpy(self, name, args):
+        """Check the compiled kernels match the NumPy expressions"""
+        pytest.importorskip('numba')
+        kernel = getattr(_kernels, name)
+        inputs = [self.position, self.velocity][:args]
+        assert np.allclose(kernel(*inputs, use_numba=True),
+                           kernel(*inputs, use_numba=False), rtol=0.,
+                           atol=1.e-14)
+
+    def test_default(self):
+        """Check the default uses the compiled kernel only if available"""
+        assert _kernels._use_numba(None) == _kernels.numba_available()
+        assert not _kernels._use_numba(False)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# Test the spacecraft attitude modes and rotations
+
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions.methods import attitude as mm_att
+from pysatMissions.methods import spacecraft as mm_sc
+
+
+class TestRotations():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        rng = np.random.RandomState(3)
+        self.quaternion = rng.normal(size=(200, 4))
+        self.quaternion /= np.linalg.norm(self.quaternion, axis=-1,
+                                          keepdims=True)
+        self.quaternion *= np.sign(self.quaternion[:, :1])
+        self.vectors = rng.normal(size=(200, 3))
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.quaternion, self.vectors
+
+    def test_matrix_orthonormal(self):
+        """Check quaternions give proper rotation matrices"""
+        matrix = mm_att.matrix_from_quaternion(self.quaternion)
+        assert np.allclose(np.einsum('nij,nkj->nik', matrix, matrix),
+                           np.eye(3))
+        assert np.allclose(np.linalg.det(matrix), 1.)
+
+    def test_round_trip(self):
+        """Check matrices convert back to the same quaternions"""
+        matrix = mm_att.matrix_from_quaternion(self.quaternion)
+        assert np.allclose(mm_att.quaternion_from_matrix(matrix),
+                           self.quaternion)
+
+    def test_non_finite_matrix(self):
+        """Check undefined matrices give NaN quaternions"""
+        matrix = mm_att.matrix_from_quaternion(self.quaternion[:3])
+        matrix[1] = np.nan
+        quaternion = mm_att.quaternion_from_matrix(matrix)
+        assert np.isnan(quaternion[1]).all()
+        assert np.allclose(quaternion[[0, 2]], self.quaternion[[0, 2]])
+
+    @pytest.mark.parametrize("inverse", [False, True])
+    def test_rotate(self, inverse):
+        """Check quaternion and matrix rotations agree"""
+        matrix = mm_att.matrix_from_quaternion(self.quaternion)
+        by_matrix = mm_att.rotate(matrix, self.vectors, inverse=inverse)
+        by_quaternion = mm_att.rotate(self.quaternion, self.vectors,
+                                      inverse=inverse)
+        assert np.allclose(by_matrix, by_quaternion)
+        # rotating back returns the original vectors
+        restored = mm_att.rotate(matrix, by_matrix, inverse=not inverse)
+        assert np.allclose(restored, self.vectors)
+
+    def test_slerp(self):
+        """Check the interpolation rotates at a constant rate"""
+        times = pds.date_range('2018-01-01', periods=3, freq='10s')
+        angles = np.radians([0., 90.])
+        # rotations about z, the second given with the opposite sign
+        samples = np.array([[np.cos(angles[0] / 2.), 0., 0.,
+                             np.sin(angles[0] / 2.)],
+                            [-np.cos(angles[1] / 2.), 0., 0.,
+                             -np.sin(angles[1] / 2.)]])
+        result = mm_att.slerp(times, times[[0, 2]], samples)
+        target = np.array([[np.cos(angle / 2.), 0., 0., np.sin(angle / 2.)]
+                           for angle in np.radians([0., 45., 90.])])
+        assert np.allclose(np.abs(np.sum(result * target, axis=-1)), 1.)
+
+
+class TestPointing():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.times = pds.date_range('2018-01-01', periods=600, freq='s')
+        secs = np.arange(600.)
+        phase = 2. * np.pi * secs / 5550.
+        self.position = 6771. * np.stack([np.cos(phase),
+                                          np.sin(phase) * np.cos(0.9),
+                                          np.sin(phase) * np.sin(0.9)],
+                                         axis=-1)
+        self.velocity = 7.67 * np.stack([-np.sin(phase),
+                                         np.cos(phase) * np.cos(0.9),
+                                         np.cos(phase) * np.sin(0.9)],
+                                        axis=-1)
+        # slightly eccentric, so nadir and ram are not perpendicular
+        self.velocity += 0.05 * self.position / 6771.
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.times, self.position, self.velocity
+
+    def unit(self, vector):
+        """Unit vectors of a (time, 3) array"""
+        return vector / np.linalg.norm(vector, axis=-1, keepdims=True)
+
+    @pytest.mark.parametrize("mode,axis,target",
+                             [('ram', 0, 'velocity'), ('nadir', 2, 'nadir'),
+                              ('sun', 0, 'sun')])
+    def test_mode_axis(self, mode, axis, target):
+        """Check each mode points its axis along the target"""
+        attitude = mm_att.pointing_attitude(self.times, self.position,
+                                            velocity=self.velocity,
+                                            mode=mode)
+        targets = {'velocity': self.velocity, 'nadir': -self.position,
+                   'sun': mm_sc._sun_position_ecef(self.times)
+                   - self.position}
+        assert np.allclose(attitude[:, axis], self.unit(targets[target]))
+        assert np.allclose(np.einsum('nij,nkj->nik', attitude, attitude),
+                           np.eye(3))
+        assert np.allclose(np.linalg.det(attitude), 1.)
+
+    def test_ram_matches_attitude_vectors(self):
+        """Check the ram mode matches the ram pointing attitude vectors"""
+        attitude = mm_att.pointing_attitude(self.times, self.position,
+                                            velocity=self.velocity)
+        # y is shared with the nadir mode
+        nadir = mm_att.pointing_attitude(self.times, self.position,
+                                         velocity=self.velocity,
+                                         mode='nadir')
+        assert np.allclose(attitude[:, 1], nadir[:, 1])
+        assert not np.allclose(attitude[:, 0], nadir[:, 0])
+
+    def test_inertial(self):
+        """Check the inertial mode is fixed in the inertial frame"""
+        quaternion = [np.cos(0.3), np.sin(0.3), 0., 0.]
+        attitude = mm_att.pointing_attitude(self.times, self.position,
+                                            mode='inertial',
+                                            quaternions=quaternion)
+        inertial = np.einsum('nij,njk->nik', attitude,
+                             mm_att._eci_to_ecef(self.times))
+        assert np.allclose(inertial, mm_att.matrix_from_quaternion(
+            [quaternion])[0])
+        # the Earth rotates under the fixed attitude
+        assert not np.allclose(attitude[0], attitude[-1])
+
+    def test_quaternion_history(self):
+        """Check a quaternion history is interpolated to the sample times"""
+        history = pds.DataFrame({'w': [1., np.cos(0.5)], 'x': [0., 0.],
+                                 'y': [0., 0.], 'z': [0., np.sin(0.5)]},
+                                index=self.times[[0, -1]])
+        attitude = mm_att.pointing_attitude(self.times, self.position,
+                                            mode='quaternion',
+                                            quaternions=history,
+                                            frame='ecef')
+        assert np.allclose(attitude[0], np.eye(3))
+        # rotation about z at a constant rate
+        angles = np.arctan2(attitude[:, 1, 0], attitude[:, 0, 0])
+        assert np.allclose(angles, np.linspace(0., 1., 600))
+
+    @pytest.mark.parametrize("kwargs", [{'mode': 'target'},
+                                        {'frame': 'gse'},
+                                        {'mode': 'inertial'},
+                                        {'mode': 'nadir', 'velocity': None}])
+    def test_bad_options(self, kwargs):
+        """Check unknown or incomplete options raise a ValueError"""
+        kwargs = dict({'velocity': self.velocity}, **kwargs)
+        with pytest.raises(ValueError):
+            mm_att.pointing_attitude(self.times, self.position, **kwargs)
+
+    def test_undefined_attitude(self):
+        """Check a velocity along the position raises a ValueError"""
+        self.velocity[10] = self.position[10]
+        # unknown velocities at the ends are skipped
+        self.velocity[0] = np.nan
+        with pytest.raises(ValueError):
+            mm_att.pointing_attitude(self.times, self.position,
+                                     velocity=self.velocity)
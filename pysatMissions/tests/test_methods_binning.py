@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Test the binned statistics accumulator
+
+import datetime as dt
+import numpy as np
+import pandas as pds
+import pytest
+
+import pysat
+from pysatMissions.methods import binning as mm_bin
+
+
+class TestAccumulator():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        rng = np.random.RandomState(42)
+        num = 5000
+        self.data = pds.DataFrame({'qd_lat': rng.uniform(-90., 90., num),
+                                   'mlt': rng.uniform(0., 24., num),
+                                   'ion_dens': rng.lognormal(10., 1., num),
+                                   'B_sc_x': rng.normal(0., 1.e-5, num)})
+        self.bins = {'qd_lat': np.arange(-90., 91., 30.),
+                     'mlt': np.arange(0., 25., 6.)}
+        self.variables = ['ion_dens', 'B_sc_x']
+        self.stats = mm_bin.BinnedStatistics(self.bins, self.variables)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.data, self.bins, self.variables, self.stats
+
+    def direct(self):
+        """Statistics of the test data calculated with pandas"""
+        keys = [pds.cut(self.data[label], self.bins[label], right=False,
+                        labels=False) for label in self.bins]
+        return self.data.groupby(keys)[self.variables].agg(['count', 'mean',
+                                                            'std', 'min',
+                                                            'max'])
+
+    def test_shape(self):
+        """Check the statistics have one value per variable and bin"""
+        assert self.stats.shape == (6, 4)
+        assert self.stats.count.shape == (2, 6, 4)
+
+    def test_bad_edges(self):
+        """Check decreasing bin edges raise a ValueError"""
+        with pytest.raises(ValueError):
+            mm_bin.BinnedStatistics({'mlt': [24., 0.]}, ['ion_dens'])
+
+    def test_matches_direct(self):
+        """Check the statistics match a direct calculation"""
+        self.stats.update(self.data)
+        target = self.direct()
+        for i, var in enumerate(self.variables):
+            for stat, values in [('count', self.stats.count),
+                                 ('mean', self.stats.mean),
+                                 ('std', np.sqrt(self.stats.variance)),
+                                 ('min', self.stats.minimum),
+                                 ('max', self.stats.maximum)]:
+                result = np.array([values[i][int(lat), int(mlt)]
+                                   for lat, mlt in target.index])
+                assert np.allclose(result, target[(var, stat)].values)
+
+    def test_streaming_matches_single_update(self):
+        """Check updating in chunks gives the same statistics"""
+        whole = mm_bin.BinnedStatistics(self.bins, self.variables)
+        whole.update(self.data)
+        for start in range(0, len(self.data), 700):
+            self.stats.update(self.data.iloc[start:start + 700])
+        assert np.array_equal(self.stats.count, whole.count)
+        assert np.allclose(self.stats.mean, whole.mean, equal_nan=True)
+        assert np.allclose(self.stats.variance, whole.variance,
+                           equal_nan=True)
+        assert np.array_equal(self.stats.minimum, whole.minimum,
+                              equal_nan=True)
+
+    def test_merge(self):
+        """Check merging partial accumulators matches a single update"""
+        other = mm_bin.BinnedStatistics(self.bins, self.variables)
+        self.stats.update(self.data.iloc[:1234])
+        other.update(self.data.iloc[1234:])
+        whole = mm_bin.BinnedStatistics(self.bins, self.variables)
+        whole.update(self.data)
+        self.stats.merge(other)
+        assert np.array_equal(self.stats.count, whole.count)
+        assert np.allclose(self.stats.mean, whole.mean, equal_nan=True)
+        assert np.allclose(self.stats.variance, whole.variance,
+                           equal_nan=True)
+        assert np.array_equal(self.stats.maximum, whole.maximum,
+                              equal_nan=True)
+
+    def test_merge_different_bins(self):
+        """Check accumulators with different bins are not merged"""
+        other = mm_bin.BinnedStatistics({'qd_lat': self.bins['qd_lat']},
+                                        self.variables)
+        with pytest.raises(ValueError):
+            self.stats.merge(other)
+
+    def test_non_finite_ignored(self):
+        """Check NaN values and samples outside the bins are skipped"""
+        self.data.loc[:99, 'ion_dens'] = np.nan
+        self.data.loc[100:199, 'mlt'] = 25.
+        self.stats.update(self.data)
+        assert self.stats.count[0].sum() == len(self.data) - 200
+        assert self.stats.count[1].sum() == len(self.data) - 100
+
+    def test_last_edge_included(self):
+        """Check samples on the upper edge are in the last bin"""
+        self.data.loc[:9, 'qd_lat'] = 90.
+        self.data.loc[:4, 'mlt'] = 24.
+        self.stats.update(self.data)
+        assert self.stats.count[0].sum() == len(self.data)
+        counts, _ = np.histogramdd(self.data[['qd_lat', 'mlt']].values,
+                                   bins=[self.bins['qd_lat'],
+                                         self.bins['mlt']])
+        assert np.array_equal(self.stats.count[0], counts)
+
+    def test_save_load(self, tmpdir):
+        """Check a saved accumulator can be reloaded and updated"""
+        fname = str(tmpdir.join('clim.npz'))
+        self.stats.update(self.data.iloc[:2000])
+        self.stats.save(fname)
+        assert tmpdir.listdir(lambda path: path.ext == '.tmp') == []
+        restored = mm_bin.BinnedStatistics.load(fname)
+        restored.update(self.data.iloc[2000:])
+        self.stats.update(self.data.iloc[2000:])
+        assert restored.labels == self.stats.labels
+        assert restored.variables == self.stats.variables
+        assert np.array_equal(restored.count, self.stats.count)
+        assert np.allclose(restored.mean, self.stats.mean, equal_nan=True)
+
+    def test_summary(self):
+        """Check the summary has one row per bin"""
+        self.stats.update(self.data)
+        summary = self.stats.summary()
+        assert len(summary) == 24
+        for key in ['qd_lat', 'mlt', 'ion_dens_count', 'ion_dens_mean',
+                    'ion_dens_std', 'B_sc_x_min', 'B_sc_x_max']:
+            assert key in summary.columns
+        assert summary['ion_dens_count'].sum() == len(self.data)
+
+
+class TestBasics():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.testInst = pysat.Instrument(platform='pysat', name='testing',
+                                         sat_id='100', clean_level='clean')
+        self.stats = mm_bin.BinnedStatistics(
+            {'latitude': np.arange(-90., 91., 10.)}, ['mlt'])
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_accumulate_binned_statistics(self):
+        """Test accumulating statistics from a test inst"""
+        self.testInst.custom.attach(mm_bin.accumulate_binned_statistics,
+                                    kwargs={'accumulator': self.stats})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert self.stats.count.sum() == len(self.testInst.index)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Test the column store used for incremental recomputation
+
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions.methods import cache as mm_cache
+
+
+def model(inst, scale=1.):
+    inst['out'] = inst['in'] * scale
+
+
+class TestKeys():
+
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.data = pds.DataFrame({'in': np.arange(10.)},
+                                  index=pds.date_range('2019-01-01',
+                                                       periods=10,
+                                                       freq='s'))
+        self.step = {'name': 'model', 'func': model, 'args': [],
+                     'kwargs': {'scale': 2.}, 'inputs': ['in'],
+                     'outputs': ['out']}
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.data, self.step
+
+    def test_key_is_stable(self):
+        """Check equal inputs and parameters give equal keys"""
+        assert mm_cache.step_key(self.step, self.data) == \
+            mm_cache.step_key(dict(self.step), self.data.copy())
+
+    def test_key_changes_with_data(self):
+        """Check changed input values give a new key"""
+        data = self.data.copy()
+        data.iloc[3, 0] += 1.e-9
+        assert mm_cache.step_key(self.step, self.data) != \
+            mm_cache.step_key(self.step, data)
+
+    def test_key_changes_with_index(self):
+        """Check changed times give a new key"""
+        data = self.data.copy()
+        data.index = data.index + pds.Timedelta(1, 'D')
+        assert mm_cache.step_key(self.step, self.data) != \
+            mm_cache.step_key(self.step, data)
+
+    @pytest.mark.parametrize("key,value", [('kwargs', {'scale': 3.}),
+                                           ('args', [1.]),
+                                           ('outputs', ['out2'])])
+    def test_key_changes_with_parameters(self, key, value):
+        """Check changed parameters give a new key"""
+        step = dict(self.step)
+        step[key] = value
+        assert mm_cache.step_key(self.step, self.data) != \
+            mm_cache.step_key(step, self.data)
+
+    def test_key_changes_with_backend_parameters(self):
+        """Check objects differing only in their attributes give new keys"""
+        from pysatMissions.models import backends as mm_backends
+
+        step = dict(self.step)
+        step['kwargs'] = {'backend': mm_backends.DipoleBackend(eccentric=True)}
+        other = dict(self.step)
+        other['kwargs'] = {'backend':
+                           mm_backends.DipoleBackend(eccentric=False)}
+        assert mm_cache.step_key(step, self.data) != \
+            mm_cache.step_key(other, self.data)
+        # the same parameters give the same key
+        other['kwargs'] = {'backend': mm_backends.DipoleBackend(eccentric=True)}
+        assert mm_cache.step_key(step, self.data) == \
+            mm_cache.step_key(other, self.data)
+
+    @pytest.mark.parametrize("value", [pds.DataFrame({'w': [1., 0.]}),
+                                       pds.Series([1., 0.]),
+                                       np.array([1., 0.])])
+    def test_key_changes_with_nested_data(self, value):
+        """Check data passed as parameters is hashed by its contents"""
+        step = dict(self.step)
+        step['kwargs'] = {'quaternions': value}
+        other = dict(self.step)
+        other['kwargs'] = {'quaternions': value * 2.}
+        assert mm_cache.step_key(step, self.data) != \
+            mm_cache.step_key(other, self.data)
+
+    def test_pool_does_not_change_key(self):
+        """Check model pools are described by their type only"""
+        from pysatMissions.methods import contexts as mm_contexts
+
+        pool = mm_contexts.ModelPool()
+        pool.register('test', lambda date: {'date': date})
+        pool.get('test', pds.Timestamp('2019-01-01'))
+        assert mm_cache.hash_key(pool) == \
+            mm_cache.hash_key(mm_contexts.ModelPool())
+
+    def test_unhashable_parameter(self):
+        """Check parameters that cannot be described raise an error"""
+        import threading
+
+        step = dict(self.step)
+        step['kwargs'] = {'lock': threading.Lock()}
+        with pytest.raises(TypeError):
+            mm_cache.step_key(step, self.data)
+
+    def test_key_ignores_dict_order(self):
+        """Check keyword argument order does not change the key"""
+        assert mm_cache.hash_key({'a': 1, 'b': 2}) == \
+            mm_cache.hash_key({'b': 2, 'a': 1})
+
+
+class TestStore():
+
+    def test_memory_store(self):
+        """Check entries are returned and counted"""
+        store = mm_cache.ColumnStore()
+        assert store.get('a') is None
+        store.put('a', 1)
+        assert store.get('a') == 1
+        assert (store.hits, store.misses) == (1, 1)
+
+    def test_maxsize(self):
+        """Check the least recently used entry is removed when full"""
+        store = mm_cache.ColumnStore(maxsize=2)
+        store.put('a', 1)
+        store.put('b', 2)
+        store.get('a')
+        store.put('c', 3)
+        assert len(store) == 2
+        assert store.get('b') is None
+        assert store.get('a') == 1
+
+    def test_disk_store(self, tmpdir):
+        """Check entries are shared through the directory"""
+        store = mm_cache.ColumnStore(directory=str(tmpdir))
+        data = pds.DataFrame({'out': [1., 2.]})
+        store.put('a', (data, {'out': {'units': 'm'}}))
+
+        # a new store reads the entry written by the first
+        new_store = mm_cache.ColumnStore(directory=str(tmpdir))
+        entry = new_store.get('a')
+        assert entry[0].equals(data)
+        assert entry[1] == {'out': {'units': 'm'}}
+
+        new_store.clear()
+        assert len(new_store) == 0
+        assert mm_cache.ColumnStore(directory=str(tmpdir)).get('a') is None
+
+    def test_disk_store_damaged_entry(self, tmpdir):
+        """Check an entry that can't be read is a miss"""
+        store = mm_cache.ColumnStore(directory=str(tmpdir))
+        store.put('a', (1, 2))
+        with open(str(tmpdir.join('a.pkl')), 'r+b') as fout:
+            fout.truncate(5)
+        new_store = mm_cache.ColumnStore(directory=str(tmpdir))
+        assert new_store.get('a') is None
+        assert new_store.misses == 1
+
+    def test_disk_store_shared_key(self, tmpdir):
+        """Check several writers of one key do not share a temporary file"""
+        from concurrent import futures
+
+        def write(i):
+            store = mm_cache.ColumnStore(directory=str(tmpdir))
+            for j in range(20):
+                store.put('a', np.full(1000, i))
+
+        with futures.ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(write, range(4)))
+        assert tmpdir.listdir(lambda path: path.ext == '.tmp') == []
+        entry = mm_cache.ColumnStore(directory=str(tmpdir)).get('a')
+        assert len(entry) == 1000
+        assert (entry == entry[0]).all()
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# Test the model chain declaration and resolution functions
+
+import datetime as dt
+import numpy as np
+import os
+import pytest
+import threading
+
+import pysat
+from pysatMissions.methods import cache as mm_cache
+from pysatMissions.methods import chain as mm_chain
+
+
+def add_a(inst):
+    inst['a'] = inst['latitude'] * 2.
+
+
+def add_b(inst):
+    inst['b'] = inst['a'] + 1.
+
+
+def add_c(inst, offset=0.):
+    inst['c'] = inst['longitude'] + offset
+
+
+def add_d(inst):
+    inst['d'] = inst['b'] * inst['c']
+    inst.meta['d'] = {'units': 'm'}
+
+
+def add_v(inst):
+    inst[1:-1, 'v'] = inst['a'].values[2:] - inst['a'].values[:-2]
+
+
+def add_pid(inst):
+    inst['pid'] = os.getpid()
+
+
+def add_f(inst, meta):
+    inst['f'] = inst['a'] + 2.
+    meta['units'] = [meta['units']]
+    inst.meta['f'] = meta
+
+
+def add_e(inst, lock):
+    with lock:
+        inst['e'] = inst['a'] - 1.
+
+
+class TestResolve():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.steps = [mm_chain.make_step(add_a, ['latitude'], ['a']),
+                      mm_chain.make_step(add_b, ['a'], ['b']),
+                      mm_chain.make_step(add_c, ['longitude'], ['c'],
+                                         kwargs={'offset': 1.}),
+                      mm_chain.make_step(add_d, ['b', 'c'], ['d']),
+                      mm_chain.make_step(add_v, ['a'], ['v'])]
+        self.available = ['latitude', 'longitude']
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.steps, self.available
+
+    def test_make_step(self):
+        """Check step defaults"""
+        step = self.steps[0]
+        assert step['name'] == 'add_a'
+        assert step['args'] == []
+        assert step['kwargs'] == {}
+        assert self.steps[2]['kwargs'] == {'offset': 1.}
+
+    @pytest.mark.parametrize("outputs,names",
+                             [(['a'], ['add_a']),
+                              (['b'], ['add_a', 'add_b']),
+                              (['c'], ['add_c']),
+                              (['d'], ['add_a', 'add_b', 'add_c', 'add_d']),
+                              (['c', 'a'], ['add_a', 'add_c']),
+                              (['latitude'], [])])
+    def test_resolve_steps(self, outputs, names):
+        """Check the minimal set of steps is selected, in order"""
+        steps = mm_chain.resolve_steps(self.steps, outputs,
+                                       available=self.available)
+        assert [step['name'] for step in steps] == names
+
+    def test_set_step_kwargs(self):
+        """Check step keyword arguments are changed on a copy"""
+        steps = mm_chain.set_step_kwargs(self.steps, 'add_c',
+                                         {'offset': 2.})
+        assert steps[2]['kwargs'] == {'offset': 2.}
+        assert self.steps[2]['kwargs'] == {'offset': 1.}
+        assert steps[0] is self.steps[0]
+
+    def test_set_step_kwargs_unknown(self):
+        """Check unknown steps raise an error"""
+        with pytest.raises(ValueError):
+            mm_chain.set_step_kwargs(self.steps, 'add_e', {})
+
+    def test_step_dependencies(self):
+        """Check each step depends on the producers of its inputs"""
+        deps = mm_chain.step_dependencies(self.steps)
+        assert deps == [set(), {0}, set(), {1, 2}, {0}]
+
+    def test_output_conflict_dependency(self):
+        """Check steps writing the same variable keep their order"""
+        steps = [mm_chain.make_step(add_a, ['latitude'], ['a']),
+                 mm_chain.make_step(add_c, ['longitude'], ['a'])]
+        assert mm_chain.step_dependencies(steps) == [set(), {0}]
+
+    def test_resolve_unknown_output(self):
+        """Check that unknown outputs raise an error"""
+        with pytest.raises(ValueError):
+            mm_chain.resolve_steps(self.steps, ['e'],
+                                   available=self.available)
+
+    def test_resolve_missing_input(self):
+        """Check that unavailable inputs raise an error"""
+        with pytest.raises(ValueError):
+            mm_chain.resolve_steps(self.steps, ['a'])
+
+
+class TestBasics(TestResolve):
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        TestResolve.setup(self)
+        self.testInst = pysat.Instrument(platform='pysat', name='testing',
+                                         sat_id='10', clean_level='clean')
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_attach_steps(self):
+        """Check that resolved steps are attached and run"""
+        steps = mm_chain.resolve_steps(self.steps, ['c', 'b'],
+                                       available=self.available)
+        mm_chain.attach_steps(self.testInst, steps)
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        for target in ['a', 'b', 'c']:
+            assert target in self.testInst.data.keys()
+        assert 'd' not in self.testInst.data.keys()
+        assert (self.testInst['c'] == self.testInst['longitude'] + 1.).all()
+
+    @pytest.mark.parametrize("executor", ['serial', 'thread', 'process'])
+    def test_run_steps(self, executor):
+        """Check concurrent execution matches running each step in turn"""
+        self.testInst.custom.attach(mm_chain.run_steps,
+                                    kwargs={'steps': self.steps,
+                                            'executor': executor})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert (self.testInst['d'] == (2. * self.testInst['latitude'] + 1.)
+                * (self.testInst['longitude'] + 1.)).all()
+        assert np.isnan(self.testInst['v'][0])
+        assert np.isnan(self.testInst['v'][-1])
+        a = self.testInst['a'].values
+        assert np.allclose(self.testInst['v'].values[1:-1], a[2:] - a[:-2])
+        assert 'd' in self.testInst.meta.data.index
+
+    @pytest.mark.parametrize("executor", ['thread', 'process'])
+    def test_run_steps_reuses_executor(self, executor):
+        """Check the pool is kept between loads until it is shut down"""
+        steps = [mm_chain.make_step(add_pid, ['latitude'], ['pid'])]
+        self.testInst.custom.attach(mm_chain.run_steps,
+                                    kwargs={'steps': steps,
+                                            'executor': executor,
+                                            'max_workers': 1})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        pool = self.testInst._step_executor.pool
+        pid = self.testInst['pid'].iloc[0]
+        self.testInst.load(date=dt.datetime(2009, 1, 2))
+        assert self.testInst._step_executor.pool is pool
+        assert self.testInst['pid'].iloc[0] == pid
+
+        mm_chain.shutdown_executor(self.testInst)
+        assert self.testInst._step_executor.pool is None
+        self.testInst.load(date=dt.datetime(2009, 1, 3))
+        assert self.testInst._step_executor.pool is not pool
+        mm_chain.shutdown_executor(self.testInst)
+
+    def test_run_steps_bad_executor(self):
+        """Check that unknown executors raise an error"""
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        with pytest.raises(ValueError):
+            mm_chain.run_steps(self.testInst, self.steps, executor='gpu')
+
+    @pytest.mark.parametrize("executor", ['serial', 'thread'])
+    def test_run_steps_store(self, executor):
+        """Check stored steps are reused and give the same results"""
+        store = mm_cache.ColumnStore()
+        self.testInst.custom.attach(mm_chain.run_steps,
+                                    kwargs={'steps': self.steps,
+                                            'executor': executor,
+                                            'store': store})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        first = self.testInst.data[['a', 'b', 'c', 'd', 'v']].copy()
+        assert store.misses == len(self.steps)
+
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert store.hits == len(self.steps)
+        assert first.equals(self.testInst.data[['a', 'b', 'c', 'd', 'v']])
+        assert 'd' in self.testInst.meta.data.index
+
+    def test_run_steps_store_unhashable(self):
+        """Check steps that cannot be hashed run without the store"""
+        store = mm_cache.ColumnStore()
+        steps = self.steps + [mm_chain.make_step(add_e, ['a'], ['e'],
+                                                 args=[threading.Lock()])]
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        with pytest.warns(UserWarning):
+            mm_chain.run_steps(self.testInst, steps, executor='serial',
+                               store=store)
+        assert (self.testInst['e'] == self.testInst['a'] - 1.).all()
+        assert len(store) == len(self.steps)
+
+    def test_run_steps_store_mutated_kwargs(self):
+        """Check steps changing their parameters still reuse the store"""
+        store = mm_cache.ColumnStore()
+        steps = self.steps + [mm_chain.make_step(add_f, ['a'], ['f'],
+                                                 kwargs={'meta':
+                                                         {'units': 'm'}})]
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        mm_chain.run_steps(self.testInst, steps, executor='serial',
+                           store=store)
+        mm_chain.run_steps(self.testInst, steps, executor='serial',
+                           store=store)
+        assert store.hits == len(steps)
+        assert steps[-1]['kwargs'] == {'meta': {'units': 'm'}}
+
+    def test_run_steps_store_changed_kwargs(self):
+        """Check only steps depending on changed parameters are rerun"""
+        store = mm_cache.ColumnStore()
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        mm_chain.run_steps(self.testInst, self.steps, executor='serial',
+                           store=store)
+        steps = mm_chain.set_step_kwargs(self.steps, 'add_c',
+                                         {'offset': 2.})
+        mm_chain.run_steps(self.testInst, steps, executor='serial',
+                           store=store)
+        # add_c and add_d are rerun
+        assert store.hits == len(self.steps) - 2
+        assert (self.testInst['c'] == self.testInst['longitude'] + 2.).all()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Test the model handle pool
+
+import datetime as dt
+import pickle
+import pytest
+
+from pysatMissions.methods import contexts as mm_contexts
+
+
+def make_handle(date):
+    return {'date': date}
+
+
+class TestPool():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.pool = mm_contexts.ModelPool(maxsize=2)
+        self.pool.register('test', make_handle)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.pool
+
+    @pytest.mark.parametrize("epoch,start",
+                             [('day', dt.datetime(2019, 3, 2)),
+                              ('year', dt.datetime(2019, 1, 1))])
+    def test_epoch_start(self, epoch, start):
+        """Check the start of each kind of epoch"""
+        assert mm_contexts.epoch_start(dt.datetime(2019, 3, 2, 12, 5),
+                                       epoch) == start
+
+    def test_bad_epoch(self):
+        """Check that unknown epochs raise an error"""
+        with pytest.raises(ValueError):
+            self.pool.register('bad', make_handle, epoch='week')
+
+    def test_unknown_model(self):
+        """Check that unregistered models raise an error"""
+        with pytest.raises(ValueError):
+            self.pool.get('unknown', dt.datetime(2019, 1, 1))
+
+    def test_reuse_within_epoch(self):
+        """Check a handle is created once per epoch"""
+        first = self.pool.get('test', dt.datetime(2019, 1, 1, 3))
+        second = self.pool.get('test', dt.datetime(2019, 1, 1, 20))
+        assert first is second
+        assert first['date'] == dt.datetime(2019, 1, 1)
+        stats = self.pool.stats().loc['test']
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_lru_eviction(self):
+        """Check the least recently used handle is removed when full"""
+        for day in [1, 2, 1, 3]:
+            self.pool.get('test', dt.datetime(2019, 1, day))
+        assert len(self.pool) == 2
+        assert self.pool.stats().loc['test', 'evictions'] == 1
+        # day 1 was used more recently than day 2, so is still pooled
+        self.pool.get('test', dt.datetime(2019, 1, 1))
+        assert self.pool.stats().loc['test', 'hits'] == 2
+
+    def test_pickle(self):
+        """Check a copied pool starts empty and keeps its models"""
+        self.pool.get('test', dt.datetime(2019, 1, 1))
+        copy = pickle.loads(pickle.dumps(self.pool))
+        assert len(copy) == 0
+        assert 'test' in copy.factories
+        assert 'apex' in copy.factories
+
+    def test_activate(self):
+        """Check handles of models with global state are switched back"""
+        activated = []
+        self.pool.register('state', make_handle, epoch='year',
+                           activate=activated.append)
+        first = self.pool.get('state', dt.datetime(2000, 5, 1))
+        self.pool.get('state', dt.datetime(2000, 6, 1))
+        # creating a handle makes it active
+        assert activated == []
+        self.pool.get('state', dt.datetime(2025, 1, 1))
+        assert self.pool.get('state', dt.datetime(2000, 7, 1)) is first
+        assert activated == [first]
+
+    def test_apex_earlier_epoch(self):
+        """Check a pooled Apex for an earlier year uses its own epoch"""
+        apexpy = pytest.importorskip('apexpy')
+        target = apexpy.Apex(date=dt.datetime(2000, 1, 1)).geo2qd(60., 20.,
+                                                                  400.)
+        self.pool.get('apex', dt.datetime(2000, 1, 1))
+        self.pool.get('apex', dt.datetime(2025, 1, 1))
+        apex = self.pool.get('apex', dt.datetime(2000, 1, 1))
+        assert apex.geo2qd(60., 20., 400.) == pytest.approx(target)
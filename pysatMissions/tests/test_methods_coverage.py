@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Test the coverage method functions
+
+import datetime as dt
+import numpy as np
+import pandas as pds
+import pytest
+
+import pysat
+from pysatMissions.methods import coverage as mm_cov
+
+
+class TestFootprint():
+
+    def test_footprint_radius_narrow_cone(self):
+        """Narrow cones should give the flat Earth footprint"""
+        radius = mm_cov.footprint_radius(500., 1.)
+        assert np.isclose(radius, 500. * np.tan(np.radians(1.)), rtol=1.e-3)
+
+    def test_footprint_radius_horizon_limited(self):
+        """Cones wider than the Earth disk should stop at the horizon"""
+        alt = 500.
+        horizon = mm_cov.earth_radius * np.arccos(mm_cov.earth_radius
+                                                  / (mm_cov.earth_radius
+                                                     + alt))
+        radius = mm_cov.footprint_radius(alt, [80., 89.])
+        assert np.allclose(radius, horizon)
+
+    def test_footprint_radius_increases_with_altitude(self):
+        """Footprint should grow with altitude for a fixed cone"""
+        radius = mm_cov.footprint_radius(np.array([300., 500., 800.]), 20.)
+        assert np.all(np.diff(radius) > 0.)
+
+
+class TestAccumulator():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.cov = mm_cov.CoverageAccumulator(half_angle=20., lat_res=2.,
+                                              lon_res=2., pass_gap=60.)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.cov
+
+    def test_grid_shape(self):
+        """Check grid dimensions match the requested resolution"""
+        assert self.cov.count.shape == (90, 180)
+        assert len(self.cov.lat_centers) == 90
+        assert len(self.cov.lon_centers) == 180
+
+    def test_access_count_and_revisit_gap(self):
+        """Two separated overflights of one location give two accesses"""
+        times = pds.to_datetime([dt.datetime(2018, 1, 1, 0, 0, 0),
+                                 dt.datetime(2018, 1, 1, 0, 0, 1),
+                                 dt.datetime(2018, 1, 1, 1, 0, 0)])
+        self.cov.update(times, [1., 1., 1.], [1., 1., 1.],
+                        [500., 500., 500.])
+        i = np.searchsorted(self.cov.lat_edges, 1.) - 1
+        j = np.searchsorted(self.cov.lon_edges, 1.) - 1
+        assert self.cov.count[i, j] == 2
+        assert self.cov.max_revisit_gap[i, j] == 3599.
+        assert self.cov.first_access[i, j] == times[0].value * 1.e-9
+        assert self.cov.last_access[i, j] == times[-1].value * 1.e-9
+        # far away cells are untouched
+        assert self.cov.count[0, 0] == 0
+        assert np.isnan(self.cov.first_access[0, 0])
+
+    def test_streaming_matches_single_update(self):
+        """Splitting the data across updates should not change results"""
+        times = pds.date_range(dt.datetime(2018, 1, 1), periods=2000,
+                               freq='30s')
+        lat = 80. * np.sin(np.linspace(0., 20. * np.pi, 2000))
+        lon = np.mod(np.linspace(0., 3600., 2000) + 180., 360.) - 180.
+        alt = np.full(2000, 500.)
+        self.cov.update(times, lat, lon, alt)
+
+        split = mm_cov.CoverageAccumulator(half_angle=20., lat_res=2.,
+                                           lon_res=2., pass_gap=60.,
+                                           chunk_size=97)
+        split.update(times[:1000], lat[:1000], lon[:1000], alt[:1000])
+        split.update(times[1000:], lat[1000:], lon[1000:], alt[1000:])
+
+        assert np.all(self.cov.count == split.count)
+        assert np.array_equal(self.cov.max_revisit_gap, split.max_revisit_gap,
+                              equal_nan=True)
+        assert np.array_equal(self.cov.last_access, split.last_access,
+                              equal_nan=True)
+
+    def test_out_of_order_update(self):
+        """Check that data earlier than previous updates is rejected"""
+        times = pds.to_datetime([dt.datetime(2018, 1, 2)])
+        self.cov.update(times, [0.], [0.], [500.])
+        with pytest.raises(ValueError):
+            self.cov.update(times - pds.DateOffset(days=1), [0.], [0.],
+                            [500.])
+
+    def test_summary(self):
+        """Check summary frame covers every cell"""
+        summary = self.cov.summary()
+        assert len(summary) == self.cov.count.size
+        for key in ['lat', 'long', 'count', 'first_access', 'last_access',
+                    'max_revisit_gap']:
+            assert key in summary.columns
+
+
+class TestBasics():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.testInst = pysat.Instrument(platform='pysat', name='testing',
+                                         sat_id='100', clean_level='clean')
+        self.cov = mm_cov.CoverageAccumulator(half_angle=30.)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_accumulate_coverage(self):
+        """Test accumulating coverage from a test inst"""
+        self.testInst.custom.attach(mm_cov.accumulate_coverage,
+                                    kwargs={'accumulator': self.cov,
+                                            'glat_label': 'latitude',
+                                            'glong_label': 'longitude',
+                                            'alt_label': 'altitude'})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert self.cov.count.sum() > 0
+        assert np.nanmin(self.cov.first_access) >= \
+            self.testInst.index[0].value * 1.e-9
@@ -3,8 +3,25 @@
 
 import datetime as dt
 import numpy as np
+import pytest
+
 import pysat
 from pysatMissions.methods import empirical as mm_emp
+from pysatMissions.models import backends as mm_backends
+
+
+class UnavailableBackend(mm_backends.ModelBackend):
+    """Backend whose model package is not installed"""
+
+    def iri(self, times, glat, glong, alt):
+        raise mm_backends.ModelUnavailable('not installed')
+
+
+class BrokenBackend(mm_backends.ModelBackend):
+    """Backend with a bug"""
+
+    def iri(self, times, glat, glong, alt):
+        return {'ion_dens': undefined_name}  # noqa: F821
 
 
 class TestBasics():
@@ -49,6 +66,68 @@ class TestBasics():
             # Check if metadata is added
             assert target in self.testInst.meta.data.index
 
+    @pytest.mark.parametrize("backend", ['numpy', 'dipole',
+                                         'eccentric_dipole'])
+    def test_add_igrf_vectorized(self, backend):
+        """Test adding the vectorized field models to test inst"""
+        self.testInst.custom.attach(mm_emp.add_igrf,
+                                    kwargs={'glat_label': 'latitude',
+                                            'glong_label': 'longitude',
+                                            'alt_label': 'altitude',
+                                            'backend': backend})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        targets = ['B', 'B_east', 'B_north', 'B_up', 'B_ecef_x', 'B_ecef_y',
+                   'B_ecef_z']
+        for target in targets:
+            assert target in self.testInst.data.keys()
+            assert not np.isnan(self.testInst[target]).any()
+            assert target in self.testInst.meta.data.index
+
+    @pytest.mark.parametrize("func,targets",
+                             [(mm_emp.add_iri_thermal_plasma,
+                               ['ion_temp', 'ion_dens']),
+                              (mm_emp.add_msis, ['Nn', 'Tn_msis']),
+                              (mm_emp.add_igrf, ['B', 'B_ecef_x'])])
+    def test_synthetic_backend(self, func, targets):
+        """Test adding models from the synthetic backend to test inst"""
+        self.testInst.custom.attach(func,
+                                    kwargs={'glat_label': 'latitude',
+                                            'glong_label': 'longitude',
+                                            'alt_label': 'altitude',
+                                            'backend': 'synthetic'})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        for target in targets:
+            assert target in self.testInst.data.keys()
+            assert not np.isnan(self.testInst[target]).any()
+            assert target in self.testInst.meta.data.index
+
+    def test_add_igrf_bad_backend(self):
+        """Test that unknown igrf backends raise an error"""
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        with pytest.raises(ValueError):
+            mm_emp.add_igrf(self.testInst, glat_label='latitude',
+                            glong_label='longitude', alt_label='altitude',
+                            backend='fortran')
+
+    def test_unavailable_backend(self):
+        """Test that a missing model package warns and adds nothing"""
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        with pytest.warns(UserWarning):
+            mm_emp.add_iri_thermal_plasma(self.testInst, glat_label='latitude',
+                                          glong_label='longitude',
+                                          alt_label='altitude',
+                                          backend=UnavailableBackend())
+        assert 'ion_dens' not in self.testInst.data.keys()
+
+    def test_backend_error_raised(self):
+        """Test that errors of a backend are not reported as missing models"""
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        with pytest.raises(NameError):
+            mm_emp.add_iri_thermal_plasma(self.testInst, glat_label='latitude',
+                                          glong_label='longitude',
+                                          alt_label='altitude',
+                                          backend=BrokenBackend())
+
     def test_add_msis(self):
         """Test adding msis model to test inst"""
         self.testInst.custom.attach(mm_emp.add_msis,
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Test the interpolated ephemerides
+
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions.methods import interpolation as mm_interp
+
+
+class TestHermite():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.nodes = np.arange(0., 601., 60.)
+        self.times = np.linspace(0., 600., 1201)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.nodes, self.times
+
+    def test_cubic_exact(self):
+        """Check cubic polynomials are reproduced exactly"""
+        coeffs = [2.e-6, -3.e-4, 0.5, 7.]
+        values = np.polyval(coeffs, self.nodes)
+        rates = np.polyval(np.polyder(coeffs), self.nodes)
+        interp, rate = mm_interp.hermite(self.times, self.nodes, values,
+                                         rates)
+        assert np.allclose(interp, np.polyval(coeffs, self.times))
+        assert np.allclose(rate, np.polyval(np.polyder(coeffs), self.times))
+
+    def test_nodes_reproduced(self):
+        """Check the values at the nodes are unchanged"""
+        values = np.sin(self.nodes)
+        interp, rate = mm_interp.hermite(self.nodes, self.nodes, values,
+                                         np.cos(self.nodes))
+        assert np.allclose(interp, values)
+        assert np.allclose(rate, np.cos(self.nodes))
+
+    def test_circular_orbit(self):
+        """Check a LEO circular orbit is interpolated to within a meter"""
+        omega = 2. * np.pi / 5580.
+        radius = 6800.
+
+        def orbit(secs):
+            return radius * np.stack([np.cos(omega * secs),
+                                      np.sin(omega * secs)], axis=-1)
+
+        rates = radius * omega * np.stack([-np.sin(omega * self.nodes),
+                                           np.cos(omega * self.nodes)],
+                                          axis=-1)
+        interp, rate = mm_interp.hermite(self.times, self.nodes,
+                                         orbit(self.nodes), rates)
+        assert interp.shape == (len(self.times), 2)
+        assert np.abs(interp - orbit(self.times)).max() < 1.e-3
+
+
+class TestInterpolator():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.interpolator = mm_interp.Interpolator(step=60., delta=1.)
+        self.times = pds.date_range('2018-01-01', periods=601, freq='s')
+        self.calls = []
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.interpolator, self.times, self.calls
+
+    def propagate(self, times):
+        """Propagates a circular orbit and a wrapping angle"""
+        self.calls.append(len(times))
+        secs = (times - self.times[0]) / pds.Timedelta(seconds=1)
+        secs = np.asarray(secs, dtype=float)
+        omega = 2. * np.pi / 5580.
+        position = 6800. * np.stack([np.cos(omega * secs),
+                                     np.sin(omega * secs),
+                                     np.zeros(len(secs))], axis=-1)
+        velocity = 6800. * omega * np.stack([-np.sin(omega * secs),
+                                             np.cos(omega * secs),
+                                             np.zeros(len(secs))], axis=-1)
+        angle = np.mod(170. + 0.06 * secs + 180., 360.) - 180.
+        return [('position', position), ('velocity', velocity),
+                ('angle', angle)]
+
+    def test_bad_step(self):
+        """Check nodes closer than the central difference raise an error"""
+        with pytest.raises(ValueError):
+            mm_interp.Interpolator(step=1., delta=1.)
+
+    def test_node_times(self):
+        """Check nodes surround the times on the node spacing"""
+        nodes = self.interpolator.node_times(self.times[30:200])
+        assert nodes[0] == self.times[0]
+        assert nodes[-1] == self.times[240]
+        assert len(self.interpolator.node_times(self.times[60:61])) == 2
+        assert len(nodes) == 5
+
+    def test_propagate(self):
+        """Check interpolated values match the direct propagation"""
+        result = dict(self.interpolator.propagate(
+            self.times, self.propagate, rates={'position': 'velocity'},
+            periodic={'angle': (-180., 180.)}))
+        target = dict(self.propagate(self.times))
+        assert np.abs(result['position'] - target['position']).max() < 1.e-3
+        assert np.abs(result['velocity'] - target['velocity']).max() < 1.e-4
+        # the angle wraps from 180 to -180 between nodes
+        assert np.allclose(result['angle'], target['angle'])
+        assert result['angle'].min() >= -180.
+        assert result['angle'].max() < 180.
+
+    def test_propagation_count(self):
+        """Check only the nodes and check times are propagated"""
+        self.interpolator.num_checks = 0
+        self.interpolator.propagate(self.times, self.propagate,
+                                    rates={'position': 'velocity'})
+        # the angle uses a central difference, with two more propagations
+        assert self.calls == [11, 11, 11]
+        assert self.interpolator.last_nodes == 11
+
+    def test_error_estimate(self):
+        """Check the error estimate covers each variable"""
+        self.interpolator.num_checks = 5
+        self.interpolator.propagate(self.times, self.propagate,
+                                    rates={'position': 'velocity'},
+                                    periodic={'angle': (-180., 180.)})
+        assert self.calls[-1] == 5
+        assert sorted(self.interpolator.last_error.keys()) == \
+            ['angle', 'position', 'velocity']
+        assert self.interpolator.last_error['position'] < 1.e-3
+        assert self.interpolator.last_error['angle'] < 1.e-8
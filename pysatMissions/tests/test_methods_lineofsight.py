@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Test the line of sight sampling and integration
+
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions.methods import attitude as mm_att
+from pysatMissions.methods import lineofsight as mm_los
+from pysatMissions.models import backends as mm_backends
+from pysatMissions.models import igrf as mm_igrf
+
+
+class TestLineOfSight():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.times = pds.date_range('2018-06-01', periods=300, freq='s')
+        phase = 2. * np.pi * np.arange(300.) / 5550.
+        self.position = 6771. * np.stack([np.cos(phase), np.sin(phase),
+                                          np.zeros(300)], axis=-1)
+        velocity = 7.67 * np.stack([-np.sin(phase), np.cos(phase),
+                                    np.zeros(300)], axis=-1)
+        self.attitude = mm_att.pointing_attitude(self.times, self.position,
+                                                 velocity=velocity,
+                                                 mode='ram', frame='ecef')
+        self.distances = np.linspace(0., 3000., 31)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.times, self.position, self.attitude, self.distances
+
+    def test_look_vectors(self):
+        """Check spacecraft axes map onto the attitude vectors"""
+        for axis in range(3):
+            look = np.zeros(3)
+            look[axis] = 2.
+            assert np.allclose(mm_los.look_vectors(self.attitude, look),
+                               self.attitude[:, axis])
+
+    def test_ray_points(self):
+        """Check points lie along the look direction"""
+        look = mm_los.look_vectors(self.attitude, (1., 0., 0.))
+        points = mm_los.ray_points(self.position, look, self.distances)
+        assert points.shape == (300, 31, 3)
+        assert np.allclose(points[:, 0], self.position)
+        assert np.allclose(np.linalg.norm(points[:, -1] - self.position,
+                                          axis=-1), 3000.)
+
+    def test_integral(self):
+        """Check the integral against a direct trapezoid integration"""
+        look = mm_los.look_vectors(self.attitude, (1., 0., 0.))
+        result = mm_los.integrate_rays(self.times, self.position, look,
+                                       self.distances, variables=['ion_dens',
+                                                                  'e_temp'],
+                                       backend='synthetic', block_size=70)
+
+        points = mm_los.ray_points(self.position[:2], look[:2],
+                                   self.distances)
+        glat, glong, alt = mm_igrf.ecef_to_geodetic(points[..., 0],
+                                                    points[..., 1],
+                                                    points[..., 2])
+        backend = mm_backends.get_backend('synthetic')
+        for i in range(2):
+            dens = backend.iri([self.times[i]] * 31, glat[i], glong[i],
+                               alt[i])['ion_dens']
+            step = np.diff(self.distances)
+            target = np.sum(0.5 * (dens[1:] + dens[:-1]) * step)
+            assert np.isclose(result['ion_dens'][i], target)
+        assert result['e_temp'].shape == (300,)
+
+    @pytest.mark.parametrize("max_workers", [1, 3])
+    def test_blocks_agree(self, max_workers):
+        """Check the integrals do not depend on the blocks or workers"""
+        look = mm_los.look_vectors(self.attitude, (-1., 0., 0.5))
+        whole = mm_los.integrate_rays(self.times, self.position, look,
+                                      self.distances, model='msis',
+                                      variables=['Nn'], backend='synthetic',
+                                      block_size=300)
+        blocks = mm_los.integrate_rays(self.times, self.position, look,
+                                       self.distances, model='msis',
+                                       variables=['Nn'], backend='synthetic',
+                                       block_size=17, max_workers=max_workers)
+        assert np.allclose(whole['Nn'], blocks['Nn'])
+
+    def test_surface_blocks_ray(self):
+        """Check points below the surface do not contribute"""
+        look = mm_los.look_vectors(self.attitude, (0., 0., 1.))
+        result = mm_los.integrate_rays(self.times, self.position, look,
+                                       self.distances, backend='synthetic')
+        # only the first 400 km of a nadir ray are above the surface
+        short = mm_los.integrate_rays(self.times, self.position, look,
+                                      self.distances[:5],
+                                      backend='synthetic')
+        assert np.allclose(result['ion_dens'], short['ion_dens'], rtol=1.e-3)
+
+    @pytest.mark.parametrize("distances,kwargs",
+                             [([0.], {}),
+                              ([0., 100., 50.], {}),
+                              ([0., 100.], {'block_size': 0})])
+    def test_bad_options(self, distances, kwargs):
+        """Check bad ray options raise errors"""
+        look = mm_los.look_vectors(self.attitude, (1., 0., 0.))
+        with pytest.raises(ValueError):
+            mm_los.integrate_rays(self.times, self.position, look, distances,
+                                  backend='synthetic', **kwargs)
@@ -4,6 +4,7 @@
 import datetime as dt
 import numpy as np
 import pysat
+import pysatMissions.methods.contexts as mm_contexts
 import pysatMissions.methods.magcoord as mm_magcoord
 
 
@@ -46,3 +47,19 @@ class TestBasics():
             assert not np.isnan(self.testInst[target]).any()
             # Check if metadata is added
             assert target in self.testInst.meta.data.index
+
+    def test_quasi_dipole_pool_reuse(self):
+        """Test the Apex object is reused by later loads of the same day"""
+        pool = mm_contexts.ModelPool()
+        self.testInst.custom.attach(mm_magcoord.add_quasi_dipole_coordinates,
+                                    kwargs={'glat_label': 'latitude',
+                                            'glong_label': 'longitude',
+                                            'alt_label': 'altitude',
+                                            'pool': pool})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        first = self.testInst['qd_lat'].copy()
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert (first == self.testInst['qd_lat']).all()
+        stats = pool.stats().loc['apex']
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Test the adaptive sampling of simulated orbits
+
+import datetime as dt
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions.methods import sampling as mm_samp
+
+
+def propagate(times):
+    """Simple orbit with a 90 minute period"""
+
+    secs = (times - dt.datetime(2018, 1, 1)).total_seconds().values
+    phase = 2. * np.pi * secs / 5400.
+    glat = 80. * np.sin(phase)
+    position = np.stack([np.cos(phase), np.sin(phase), np.zeros(len(secs))],
+                        axis=-1)
+    return [('glat', glat), ('position', position)]
+
+
+class TestAdaptiveSampler():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.times = pds.date_range(dt.datetime(2018, 1, 1),
+                                    dt.datetime(2018, 1, 1, 3), freq='s')
+        self.sampler = mm_samp.AdaptiveSampler(
+            mm_samp.in_range('glat', low=60., absolute=True),
+            coarse_step=60.)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.times, self.sampler
+
+    def test_bad_steps(self):
+        """Check the coarse step must be a multiple of the fine step"""
+        with pytest.raises(ValueError):
+            mm_samp.AdaptiveSampler(self.sampler.regions, coarse_step=10.,
+                                    fine_step=3.)
+        with pytest.raises(ValueError):
+            mm_samp.AdaptiveSampler(self.sampler.regions, coarse_step=1.,
+                                    fine_step=10.)
+
+    def test_sample_matches_full_cadence(self):
+        """Check sampled variables match those at the full cadence"""
+        times, variables = self.sampler.sample(self.times, propagate)
+        full = dict(propagate(self.times))
+        index = self.times.get_indexer(times)
+        assert np.all(index >= 0)
+        assert np.all(np.diff(index) > 0)
+        assert index[0] == 0
+        assert index[-1] == len(self.times) - 1
+        for name, values in variables:
+            assert np.allclose(values, full[name][index])
+
+    def test_region_at_fine_cadence(self):
+        """Check every sample in the region is kept, and few outside"""
+        times, variables = self.sampler.sample(self.times, propagate)
+        glat = dict(propagate(self.times))['glat']
+        inside = self.times[np.abs(glat) >= 60.]
+        assert inside.isin(times).all()
+        assert len(times) < len(self.times) / 2
+        stats = self.sampler.last_sample
+        assert stats['coarse'] + stats['fine'] == len(times)
+        assert stats['full'] == len(self.times)
+
+    def test_no_region(self):
+        """Check only the coarse samples are kept outside any region"""
+        sampler = mm_samp.AdaptiveSampler(mm_samp.in_range('glat', low=90.),
+                                          coarse_step=60.)
+        times, variables = sampler.sample(self.times, propagate)
+        assert len(times) == len(self.times[::60])
+        assert sampler.last_sample['fine'] == 0
+
+    def test_margin(self):
+        """Check a margin extends the refined regions"""
+        times, variables = self.sampler.sample(self.times, propagate)
+        sampler = mm_samp.AdaptiveSampler(self.sampler.regions,
+                                          coarse_step=60., margin=120.)
+        wide_times, variables = sampler.sample(self.times, propagate)
+        assert times.isin(wide_times).all()
+        assert len(wide_times) > len(times)
+
+    def test_magnetic_latitude_above(self):
+        """Check the dipole latitude region flags the polar samples"""
+        data = pds.DataFrame({'glat': [0., 85., -75.], 'glong': [0., 0., 0.],
+                              'alt': [400., 400., 400.]},
+                             index=pds.DatetimeIndex([dt.datetime(2018, 1,
+                                                                  1)] * 3))
+        region = mm_samp.magnetic_latitude_above(60.)
+        assert list(region(data)) == [False, True, True]
+
+    def test_station_in_view(self):
+        """Check the ground station region uses the elevation"""
+        data = pds.DataFrame({'obs_sat_el_angle':
+                              np.radians([-10., 5., 20.])})
+        region = mm_samp.station_in_view(10.)
+        assert list(region(data)) == [False, False, True]
@@ -3,6 +3,8 @@
 
 import datetime as dt
 import numpy as np
+import pytest
+
 import pysat
 from pysatMissions.methods import spacecraft as mm_sc
 
@@ -88,3 +90,118 @@ class TestBasics():
             assert np.isnan(self.testInst[target][-1])
             # Check if metadata is added
             assert target in self.testInst.meta.data.index
+
+    def test_add_solar_geometry(self):
+        """Test adding solar geometry to test inst"""
+        self.testInst.custom.attach(mm_sc.add_solar_geometry,
+                                    kwargs={'glat_label': 'latitude',
+                                            'glong_label': 'longitude'})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        targets = ['sun_ecef_x', 'sun_ecef_y', 'sun_ecef_z', 'subsolar_lat',
+                   'subsolar_long', 'sza', 'slt', 'sunlit_frac', 'umbra',
+                   'penumbra']
+        for target in targets:
+            # Check if data is added
+            assert target in self.testInst.data.keys()
+            assert not np.isnan(self.testInst[target].astype(float)).any()
+            # Check if metadata is added
+            assert target in self.testInst.meta.data.index
+        # Sun is near the Tropic of Capricorn in January
+        assert (self.testInst['subsolar_lat'] < -22.).all()
+        assert ((self.testInst['sza'] >= 0.)
+                & (self.testInst['sza'] <= 180.)).all()
+        assert ((self.testInst['slt'] >= 0.)
+                & (self.testInst['slt'] < 24.)).all()
+
+    @pytest.mark.parametrize("model", ['conical', 'cylindrical'])
+    def test_eclipse_flags(self, model):
+        """Spacecraft opposite the Sun must be in the umbra"""
+        self.testInst.custom.attach(mm_sc.add_solar_geometry,
+                                    kwargs={'glat_label': 'latitude',
+                                            'glong_label': 'longitude',
+                                            'shadow_model': model})
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        sun = np.stack([self.testInst['sun_ecef_x'],
+                        self.testInst['sun_ecef_y'],
+                        self.testInst['sun_ecef_z']], axis=-1)
+        sun_hat = sun / np.linalg.norm(sun, axis=1)[:, np.newaxis]
+        # place spacecraft 500 km above the anti-sunward point
+        pos = -(mm_sc.earth_radius + 500.) * sun_hat
+        for i, coord in enumerate(['x', 'y', 'z']):
+            self.testInst['position_ecef_' + coord] = pos[:, i]
+        mm_sc.add_solar_geometry(self.testInst, glat_label='latitude',
+                                 glong_label='longitude', shadow_model=model)
+        assert self.testInst['umbra'].all()
+        assert not self.testInst['penumbra'].any()
+        assert (self.testInst['sunlit_frac'] == 0.).all()
+
+        # and sunlit on the dayside
+        for i, coord in enumerate(['x', 'y', 'z']):
+            self.testInst['position_ecef_' + coord] = -pos[:, i]
+        mm_sc.add_solar_geometry(self.testInst, glat_label='latitude',
+                                 glong_label='longitude', shadow_model=model)
+        assert not self.testInst['umbra'].any()
+        assert (self.testInst['sunlit_frac'] == 1.).all()
+
+    def test_add_solar_geometry_bad_model(self):
+        """Check that unknown shadow models raise an error"""
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        with pytest.raises(ValueError):
+            mm_sc.add_solar_geometry(self.testInst, glat_label='latitude',
+                                     glong_label='longitude',
+                                     shadow_model='tophat')
+
+    def test_calculate_eclipse_durations(self):
+        """Test eclipse interval extraction from umbra flags"""
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        self.testInst['umbra'] = [False, True, True, False, False, True, True,
+                                  True, False]
+        self.testInst['penumbra'] = [True, False, False, True, False, False,
+                                     False, False, True]
+        eclipses = mm_sc.calculate_eclipse_durations(self.testInst)
+        assert len(eclipses) == 2
+        assert list(eclipses['duration']) == [2., 3.]
+        assert not eclipses['partial'].any()
+
+        eclipses = mm_sc.calculate_eclipse_durations(self.testInst,
+                                                     kind='eclipse')
+        assert len(eclipses) == 2
+        assert list(eclipses['partial']) == [True, True]
+
+
+class TestBasicsXarray():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.testInst = pysat.Instrument(platform='pysat',
+                                         name='testing_xarray',
+                                         sat_id='9', clean_level='clean')
+        self.testInst.custom.attach(add_eci)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_vectors_match_pandas(self):
+        """Test vectors and attitude are stored as arrays for xarray"""
+        pandasInst = pysat.Instrument(platform='pysat', name='testing',
+                                      sat_id='9', clean_level='clean')
+        for inst in [self.testInst, pandasInst]:
+            inst.custom.attach(add_eci)
+            inst.custom.attach(mm_sc.calculate_ecef_velocity)
+            inst.custom.attach(mm_sc.add_ram_pointing_sc_attitude_vectors)
+            inst.custom.attach(add_fake_data)
+            inst.custom.attach(mm_sc.project_ecef_vector_onto_sc,
+                               args=['ax', 'ay', 'az', 'b_x', 'b_y', 'b_z'])
+            inst.load(date=dt.datetime(2009, 1, 1))
+
+        data = self.testInst.data
+        assert data['velocity_ecef'].dims == ('time', 'component')
+        assert data['sc_attitude_ecef'].shape == (9, 3, 3)
+        assert 'velocity_ecef_x' not in data
+        assert np.isnan(data['velocity_ecef'].values[[0, -1]]).all()
+        assert np.allclose(mm_sc._get_attitude(self.testInst),
+                           mm_sc._get_attitude(pandasInst), equal_nan=True)
+        assert np.allclose(data['b'].values,
+                           mm_sc._get_vector(pandasInst,
+                                             ['b_x', 'b_y', 'b_z']),
+                           equal_nan=True)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# Test the empirical model backend interface
+
+import datetime as dt
+import numpy as np
+import pandas as pds
+import pytest
+
+from pysatMissions.models import backends as mm_backends
+
+
+class TestBackends():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.times = pds.date_range(dt.datetime(2019, 3, 1), periods=24,
+                                    freq='h')
+        self.glat = np.linspace(-60., 60., 24)
+        self.glong = np.linspace(-180., 165., 24)
+        self.alt = np.linspace(350., 700., 24)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.times, self.glat, self.glong, self.alt
+
+    @pytest.mark.parametrize("model,targets",
+                             [('iri', ['ion_temp', 'e_temp', 'ion_dens',
+                                       'frac_dens_o', 'frac_dens_h',
+                                       'frac_dens_he']),
+                              ('msis', ['Nn', 'Nn_H', 'Nn_He', 'Nn_N',
+                                        'Nn_N2', 'Nn_O', 'Nn_O2', 'Nn_Ar',
+                                        'Tn_msis']),
+                              ('hwm', ['zonal_wind', 'meridional_wind']),
+                              ('igrf', ['B', 'B_east', 'B_north', 'B_up',
+                                        'B_ecef_x', 'B_ecef_y',
+                                        'B_ecef_z'])])
+    def test_synthetic_outputs(self, model, targets):
+        """Check the synthetic backend returns every variable as arrays"""
+        backend = mm_backends.get_backend('synthetic')
+        output = getattr(backend, model)(self.times, self.glat, self.glong,
+                                         self.alt)
+        assert sorted(output.keys()) == sorted(targets)
+        for target in targets:
+            assert output[target].shape == (24,)
+            assert np.all(np.isfinite(output[target]))
+
+    def test_synthetic_fractions(self):
+        """Check ion fractions sum to one"""
+        iri = mm_backends.get_backend('synthetic').iri(self.times, self.glat,
+                                                       self.glong, self.alt)
+        assert np.allclose(iri['frac_dens_o'] + iri['frac_dens_h']
+                           + iri['frac_dens_he'], 1.)
+
+    def test_synthetic_dayside_density(self):
+        """Check the synthetic ionosphere is denser on the day side"""
+        times = [dt.datetime(2019, 3, 21, 12)] * 2
+        iri = mm_backends.get_backend('synthetic').iri(times, [0., 0.],
+                                                       [0., 180.],
+                                                       [300., 300.])
+        assert iri['ion_dens'][0] > 5. * iri['ion_dens'][1]
+
+    def test_missing_model(self):
+        """Check backends raise an error for models they do not provide"""
+        with pytest.raises(NotImplementedError):
+            mm_backends.get_backend('dipole').msis(self.times, self.glat,
+                                                   self.glong, self.alt)
+
+    @pytest.mark.parametrize("name,models",
+                             [('dipole', ['igrf']),
+                              ('synthetic', ['iri', 'msis', 'hwm', 'igrf'])])
+    def test_provides(self, name, models):
+        """Check backends report the models they provide"""
+        backend = mm_backends.get_backend(name)
+        for model in ['iri', 'msis', 'hwm', 'igrf']:
+            assert backend.provides(model) == (model in models)
+
+    def test_synthetic_ion_fractions(self):
+        """Check the synthetic ion fractions are valid at every altitude"""
+        alt = np.linspace(0., 40000., 4001)
+        times = pds.date_range(dt.datetime(2019, 3, 1), periods=len(alt),
+                               freq='min')
+        iri = mm_backends.get_backend('synthetic').iri(times,
+                                                       np.zeros(len(alt)),
+                                                       np.zeros(len(alt)),
+                                                       alt)
+        fracs = np.stack([iri['frac_dens_o'], iri['frac_dens_h'],
+                          iri['frac_dens_he']])
+        assert (fracs >= 0.).all()
+        assert (fracs <= 1.).all()
+        assert np.allclose(fracs.sum(axis=0), 1.)
+
+    def test_pyglow_unavailable(self):
+        """Check a missing pyglow raises an ImportError"""
+        try:
+            import pyglow  # noqa: F401
+            pytest.skip('pyglow is installed')
+        except ImportError:
+            pass
+        with pytest.raises(ImportError):
+            mm_backends.get_backend('pyglow').iri(self.times, self.glat,
+                                                  self.glong, self.alt)
+
+    def test_unknown_backend(self):
+        """Check unknown backend names raise an error"""
+        with pytest.raises(ValueError):
+            mm_backends.get_backend('not_a_backend')
+
+    def test_register_backend(self):
+        """Check backends may be registered and passed directly"""
+        backend = mm_backends.SyntheticBackend()
+        mm_backends.register_backend(backend, name='test')
+        assert mm_backends.get_backend('test') is backend
+        assert mm_backends.get_backend(backend) is backend
+        del mm_backends.backends['test']
+
+    def test_enu_round_trip(self):
+        """Check the ECEF components of the pyglow adapter conversion"""
+        from pysatMissions.models import igrf as mm_igrf
+        x, y, z = mm_igrf.enu_to_ecef([1., 0.], [0., 1.], [2., -1.],
+                                      [30., -45.], [10., 200.])
+        east, north, up = mm_igrf.ecef_to_enu(x, y, z, [30., -45.],
+                                              [10., 200.])
+        assert np.allclose(east, [1., 0.])
+        assert np.allclose(north, [0., 1.])
+        assert np.allclose(up, [2., -1.])
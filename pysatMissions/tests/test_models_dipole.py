@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Test the tilted dipole field models
+
+import datetime as dt
+import numpy as np
+
+from pysatMissions.models import dipole as mm_dipole
+from pysatMissions.models import igrf as mm_igrf
+
+
+class TestDipole():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.times = [dt.datetime(2020, 6, 1)] * 4
+        self.glat = np.array([-35., 0., 45., 85.])
+        self.glong = np.array([-40., 100., -75., 30.])
+        self.alt = np.array([400., 500., 600., 800.])
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.times, self.glat, self.glong, self.alt
+
+    def test_centered_matches_igrf_degree_one(self):
+        """Check the centered dipole is the degree 1 IGRF field"""
+        dipole = mm_dipole.dipole_field(self.times, self.glat, self.glong,
+                                        self.alt)
+        igrf = mm_igrf.igrf_field(self.times, self.glat, self.glong,
+                                  self.alt, max_degree=1)
+        for key in igrf.keys():
+            assert np.allclose(dipole[key], igrf[key])
+
+    def test_eccentric_offset(self):
+        """Check the eccentric dipole lies about 550 km toward the Pacific"""
+        g, h = mm_dipole.dipole_coefficients(self.times[:1])
+        offset = mm_dipole.dipole_offset(g, h)[0]
+        assert 500. < np.sqrt(np.sum(offset**2)) < 650.
+        assert 120. < np.degrees(np.arctan2(offset[1], offset[0])) < 160.
+
+    def test_eccentric_closer_to_igrf(self):
+        """Check the eccentric dipole improves on the centered dipole"""
+        igrf = mm_igrf.igrf_field(self.times, self.glat, self.glong,
+                                  self.alt)
+        errors = []
+        for eccentric in [False, True]:
+            dipole = mm_dipole.dipole_field(self.times, self.glat,
+                                            self.glong, self.alt,
+                                            eccentric=eccentric)
+            errors.append(np.sqrt(np.mean((dipole['B'] - igrf['B'])**2)))
+        assert errors[1] < errors[0]
+
+    def test_dipole_latitude(self):
+        """Check the geomagnetic poles lie near their known locations"""
+        times = [dt.datetime(2020, 6, 1)] * 2
+        # IGRF-13 geomagnetic poles for 2020
+        mlat = mm_dipole.dipole_latitude(times, [80.65, -80.65],
+                                         [-72.68, 107.32], [0., 0.])
+        assert np.allclose(mlat, [90., -90.], atol=0.5)
+
+    def test_dipole_latitude_follows_field_inclination(self):
+        """Check the sign of the latitude matches the dipole field"""
+        mlat = mm_dipole.dipole_latitude(self.times, self.glat, self.glong,
+                                         self.alt)
+        field = mm_dipole.dipole_field(self.times, self.glat, self.glong,
+                                       self.alt)
+        # field points down in the northern geomagnetic hemisphere
+        assert np.all(np.sign(mlat) == -np.sign(field['B_up']))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Test the vectorized IGRF model
+
+import datetime as dt
+import numpy as np
+import pytest
+
+from pysatMissions.models import igrf as mm_igrf
+
+
+class TestIGRF():
+
+    def test_load_coefficients(self):
+        """Check the bundled coefficient file is read"""
+        epochs, g, h = mm_igrf.load_coefficients()
+        assert epochs[0] == 1900.
+        assert g.shape == h.shape == (len(epochs), 14, 14)
+        assert g[epochs == 2020., 1, 0] == -29403.41
+        assert h[epochs == 2020., 1, 1] == 4653.35
+
+    def test_decimal_year(self):
+        """Check conversion of times to decimal years"""
+        year = mm_igrf.decimal_year([dt.datetime(2020, 1, 1),
+                                     dt.datetime(2021, 7, 2, 12)])
+        assert np.allclose(year, [2020., 2021.5])
+
+    # reference values from the IAGA reference implementation, in nT
+    @pytest.mark.parametrize("time,glat,glong,alt,enu",
+                             [(dt.datetime(2020, 1, 1), 0., 0., 0.,
+                               [-2244.62, 27539.07, 16008.52]),
+                              (dt.datetime(2020, 1, 1), 45., -75., 400.,
+                               [-3228.20, 15069.12, -41319.37]),
+                              (dt.datetime(2022, 7, 2), -60., 120., 550.,
+                               [-2914.33, 2307.52, 50232.54]),
+                              (dt.datetime(2024, 3, 1, 12), 80., 10., 800.,
+                               [259.32, 4506.79, -39910.26])])
+    def test_reference_values(self, time, glat, glong, alt, enu):
+        """Check the field against reference values"""
+        field = mm_igrf.igrf_field([time], [glat], [glong], [alt])
+        assert np.allclose([field['B_east'][0], field['B_north'][0],
+                            field['B_up'][0]], enu, atol=0.5)
+
+    def test_bases_agree(self):
+        """Check the ENU and ECEF components describe the same vector"""
+        times = [dt.datetime(2019, 5, 1)] * 3
+        glat = np.array([-30., 10., 89.])
+        glong = np.array([200., -45., 5.])
+        field = mm_igrf.igrf_field(times, glat, glong, [300., 500., 700.])
+        east, north, up = mm_igrf.ecef_to_enu(field['B_ecef_x'],
+                                              field['B_ecef_y'],
+                                              field['B_ecef_z'], glat, glong)
+        assert np.allclose(east, field['B_east'])
+        assert np.allclose(north, field['B_north'])
+        assert np.allclose(up, field['B_up'])
+        assert np.allclose(np.sqrt(east**2 + north**2 + up**2), field['B'])
+
+    def test_geodetic_round_trip(self):
+        """Check ECEF positions convert back to the geodetic coordinates"""
+        glat = np.array([-90., -45., 0., 30., 89.9, 90.])
+        glong = np.array([0., -170., 10., 179., 45., 0.])
+        alt = np.array([0., 100., 400., 2000., 35786., 550.])
+        x, y, z = mm_igrf.geodetic_to_ecef(glat, glong, alt)
+        result = mm_igrf.ecef_to_geodetic(x, y, z)
+        assert np.allclose(result[0], glat)
+        assert np.allclose(result[2], alt)
+        # longitude is undefined at the poles
+        assert np.allclose(result[1][1:-1], glong[1:-1])
+
+    def test_extrapolation_warning(self):
+        """Check a warning is raised beyond the coefficient epochs"""
+        with pytest.warns(UserWarning):
+            mm_igrf.igrf_field([dt.datetime(2035, 1, 1)], [0.], [0.], [0.])
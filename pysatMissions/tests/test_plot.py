@@ -1,4 +1,8 @@
 import datetime as dt
+import numpy as np
+import os
+import pandas as pds
+import pytest
 
 import pysat
 from pysatMissions import plot as mplt
@@ -25,3 +29,74 @@ class TestPlot():
         mplt.plot_simulated_data(self.testInst)
 
         assert True
+
+    def test_plot_does_not_modify(self, tmpdir):
+        """Check the instrument data is unchanged by plotting"""
+
+        glong = self.testInst['glong'].copy()
+        mplt.plot_simulated_data(self.testInst,
+                                 filename=os.path.join(str(tmpdir), 'a.png'))
+        assert glong.equals(self.testInst['glong'])
+
+    def test_plot_simulated_days(self, tmpdir):
+        """Check a quicklook is written for each day"""
+
+        from pysatMissions.instruments import pysat_ephem
+        dates = [dt.datetime(2018, 1, 1), dt.datetime(2018, 1, 2)]
+        files = mplt.plot_simulated_days(pysat_ephem, dates,
+                                         directory=str(tmpdir), max_workers=2,
+                                         tag='all', sat_id='100',
+                                         model_backend='synthetic',
+                                         field_backend='dipole')
+        assert [os.path.basename(fname) for fname in files] == \
+            ['summary_2018-01-01.png', 'summary_2018-01-02.png']
+        for fname in files:
+            assert os.path.isfile(fname)
+
+
+class TestDecimation():
+
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+
+        self.index = pds.date_range('2018-01-01', periods=10000, freq='1s')
+        self.values = np.sin(np.arange(10000) / 300.)
+        self.values[1234] = 50.
+        self.values[:10] = np.nan
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+
+        del self.index, self.values
+
+    @pytest.mark.parametrize("step", [7., -7.])
+    def test_unwrap_longitude(self, step):
+        """Check longitude is continuous across each wrap"""
+
+        glong = np.mod(np.arange(0., 1000., 7.) * np.sign(step) + 180.,
+                       360.) - 180.
+        unwrapped = mplt.unwrap_longitude(glong)
+        assert np.allclose(np.diff(unwrapped), step)
+        assert np.allclose(np.mod(unwrapped + 180., 360.) - 180., glong)
+
+    @pytest.mark.parametrize("method", ['minmax', 'lttb'])
+    def test_decimate(self, method):
+        """Check decimation keeps spikes and reduces the number of points"""
+
+        idx = mplt.decimate(self.index, self.values, 500, method=method)
+        assert len(idx) <= 500
+        assert np.all(np.diff(idx) > 0)
+        assert 1234 in idx
+        assert not np.isnan(self.values[idx]).any()
+
+    def test_decimate_short(self):
+        """Check short series are not decimated"""
+
+        idx = mplt.decimate(self.index[:100], self.values[:100], 500)
+        assert np.array_equal(idx, np.arange(100))
+
+    def test_bad_method(self):
+        """Check an unknown method raises an error"""
+
+        with pytest.raises(ValueError):
+            mplt.decimate(self.index, self.values, 500, method='mean')
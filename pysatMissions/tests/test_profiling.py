@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# Test the profiling instrumentation
+
+import datetime as dt
+import json
+import numpy as np
+import pytest
+import tracemalloc
+
+import pysat
+from pysatMissions.methods import chain as mm_chain
+from pysatMissions.methods import spacecraft as mm_sc
+from pysatMissions import profiling
+
+
+def add_eci(inst):
+    """Add ECEF position to pysat_testing instrument"""
+
+    inst['position_ecef_x'] = inst['longitude']
+    inst['position_ecef_y'] = inst['latitude']
+    inst['position_ecef_z'] = inst['altitude']
+
+
+class TestProfiler():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.profiler = profiling.Profiler()
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self.profiler
+
+    def test_wrap(self):
+        """Check wrapped functions are recorded and results unchanged"""
+        func = self.profiler.wrap(np.arange, name='arange')
+        assert len(func(10)) == 10
+        report = self.profiler.report()
+        assert len(report) == 1
+        assert report['step'][0] == 'arange'
+        assert report['wall_time'][0] >= 0.
+        assert np.isnan(report['peak_memory'][0])
+        assert self.profiler.records[0]['start'].tzinfo == dt.timezone.utc
+
+    def test_track_memory(self):
+        """Check the peak memory increase is recorded"""
+        self.profiler.track_memory = True
+        func = self.profiler.wrap(np.ones)
+        func(100000)
+        assert self.profiler.report()['peak_memory'][0] >= 800000
+        assert not tracemalloc.is_tracing()
+
+    def test_track_memory_keeps_tracing(self):
+        """Check tracing started elsewhere is not stopped"""
+        self.profiler.track_memory = True
+        tracemalloc.start()
+        try:
+            self.profiler.wrap(np.ones)(100000)
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_track_memory_nested(self):
+        """Check a profiled call counts the peaks of profiled calls in it"""
+        self.profiler.track_memory = True
+        inner = self.profiler.wrap(np.ones, name='inner')
+
+        def outer():
+            inner(100000)
+            return np.ones(10)
+
+        self.profiler.wrap(outer, name='outer')()
+        report = self.profiler.report().set_index('step')
+        assert report['peak_memory']['inner'] >= 800000
+        assert (report['peak_memory']['outer']
+                >= report['peak_memory']['inner'])
+
+    def test_reset(self):
+        """Check records can be removed"""
+        self.profiler.wrap(np.arange)(10)
+        self.profiler.reset()
+        assert len(self.profiler.report()) == 0
+
+
+class TestBasics():
+    def setup(self):
+        """Runs before every method to create a clean testing setup."""
+        self.testInst = pysat.Instrument(platform='pysat', name='testing',
+                                         sat_id='100', clean_level='clean')
+        self.testInst.custom.attach(add_eci)
+        self.testInst.custom.attach(mm_sc.calculate_ecef_velocity)
+
+    def teardown(self):
+        """Clean up test environment after tests"""
+        del self
+
+    def test_enable_profiling(self):
+        """Check that load and each custom function are recorded"""
+        profiler = profiling.enable_profiling(self.testInst)
+        assert self.testInst.profiler is profiler
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        report = profiler.report()
+        assert list(report['step']) == ['load', 'add_eci',
+                                        'calculate_ecef_velocity']
+        assert (report['rows'] == 100).all()
+        summary = profiler.summary()
+        assert np.isclose(summary['fraction'].sum(), 1.)
+        assert (summary['calls'] == 1).all()
+
+    @pytest.mark.parametrize("executor", ['serial', 'thread', 'process'])
+    def test_run_steps(self, executor):
+        """Check each step run by run_steps is recorded"""
+        position = ['position_ecef_x', 'position_ecef_y', 'position_ecef_z']
+        steps = [mm_chain.make_step(add_eci, ['longitude', 'latitude',
+                                              'altitude'], position),
+                 mm_chain.make_step(mm_sc.calculate_ecef_velocity, position,
+                                    ['velocity_ecef_x', 'velocity_ecef_y',
+                                     'velocity_ecef_z'])]
+        self.testInst = pysat.Instrument(platform='pysat', name='testing',
+                                         sat_id='100', clean_level='clean')
+        self.testInst.custom.attach(mm_chain.run_steps,
+                                    kwargs={'steps': steps,
+                                            'executor': executor})
+        profiler = profiling.enable_profiling(self.testInst)
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        mm_chain.shutdown_executor(self.testInst)
+        report = profiler.report()
+        assert sorted(report['step']) == ['add_eci',
+                                          'calculate_ecef_velocity', 'load',
+                                          'run_steps']
+        assert (report['rows'] == 100).all()
+        assert 'velocity_ecef_x' in self.testInst.data.keys()
+
+    def test_enable_profiling_twice(self):
+        """Check that functions are not wrapped more than once"""
+        profiling.enable_profiling(self.testInst)
+        profiling.enable_profiling(self.testInst)
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert len(self.testInst.profiler.report()) == 3
+
+    def test_enable_profiling_track_memory(self):
+        """Check a later call updates the memory tracking"""
+        profiling.enable_profiling(self.testInst)
+        profiler = profiling.enable_profiling(self.testInst,
+                                              track_memory=True)
+        assert profiler.track_memory
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        assert not np.isnan(profiler.report()['peak_memory']).any()
+
+    def test_output_formats(self):
+        """Check JSON and Prometheus output"""
+        profiling.enable_profiling(self.testInst, track_memory=True)
+        self.testInst.load(date=dt.datetime(2009, 1, 1))
+        records = json.loads(self.testInst.profiler.to_json())
+        assert len(records) == 3
+        assert records[0]['step'] == 'load'
+        text = self.testInst.profiler.to_prometheus()
+        assert 'pysatmissions_step_wall_seconds_total{step="load"}' in text
+        assert '# TYPE pysatmissions_step_peak_memory_bytes gauge' in text
@@ -19,8 +19,8 @@ with codecs.open(os.path.join(here, version_filename)) as version_file:
 # change setup.py for readthedocs - commented for now
 # on_rtd = os.environ.get('READTHEpysatMissionsDOCS') == 'True'
 
-install_requires = ['pysat', 'numpy', 'pandas', 'sgp4', 'pyEphem',
-                    'matplotlib', 'apexpy', 'aacgmv2', 'pysatMagVect']
+install_requires = ['pysat', 'numpy', 'pandas', 'sgp4>=2.0', 'pyEphem',
+                    'matplotlib', 'apexpy', 'aacgmv2']
 
 
 # Run setup
@@ -33,7 +33,7 @@ setup(name='pysatMissions',
       description='Mission Planning toolkit for pysat',
       long_description=long_description,
       long_description_content_type='text/markdown',
-      packages=find_packages(),
+      packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
       classifiers=[
           "Development Status :: 4 - Beta",
           "Topic :: Scientific/Engineering :: Astronomy",
@@ -50,4 +50,9 @@ setup(name='pysatMissions',
       include_package_data=True,
       zip_safe=False,
       install_requires=install_requires,
+      entry_points={
+          'console_scripts': [
+              'pysatmissions-batch = pysatMissions.batch:main',
+          ],
+      },
       )